@@ -279,46 +279,6 @@ def resolve_stats_window(days: Optional[float], start_date: Optional[str],
 import requests
 import asyncio
 
-# In-memory cache for DEX Screener TVL to avoid duplicate/rate-limited API calls
-# key: (chainId, pool_addr_or_id) -> tvl_usd (float)
-DEX_SCREENER_CACHE = {}
-
-def fetch_dexscreener_tvl(network: str, pool_addr: str) -> Optional[float]:
-    if not pool_addr:
-        return None
-        
-    net_map = {
-        'ethereum': 'ethereum',
-        'arbitrum': 'arbitrum',
-        'base': 'base',
-        'bnb': 'bsc',
-        'bsc': 'bsc'
-    }
-    chain_id = net_map.get(network.lower())
-    if not chain_id:
-        return None
-        
-    cache_key = (chain_id, pool_addr.lower())
-    if cache_key in DEX_SCREENER_CACHE:
-        return DEX_SCREENER_CACHE[cache_key]
-        
-    url = f"https://api.dexscreener.com/latest/dex/pairs/{chain_id}/{pool_addr.lower()}"
-    try:
-        resp = requests.get(url, timeout=3.0)
-        if resp.status_code == 200:
-            data = resp.json()
-            pair = data.get('pair')
-            if pair:
-                liq_usd = pair.get('liquidity', {}).get('usd')
-                if liq_usd is not None:
-                    val = float(liq_usd)
-                    DEX_SCREENER_CACHE[cache_key] = val
-                    return val
-    except Exception as e:
-        print(f"Error querying DexScreener for {chain_id}/{pool_addr}: {e}")
-        
-    return None
-
 
 def parse_fee_rate(fee_str: str) -> Optional[float]:
     try:
@@ -398,7 +358,8 @@ async def get_enriched_pool_stat(key: str, rev_key: str, aprs: dict, pool_addr:
     is_unreliable = is_v4 or tvl_val <= 1.0 or (vol_val > 0.0 and tvl_val < (vol_val / period_days) * 0.05)
     
     if pool_addr and is_unreliable:
-        ds_tvl = await asyncio.to_thread(fetch_dexscreener_tvl, pool_network, pool_addr)
+        # Batched, TTL/negative-cached and deadline-bounded (enrichment_client).
+        ds_tvl = await enrichment_client.get_client().dexscreener_tvl(pool_network, pool_addr)
         
         # Fallback to DeFi Llama TVL if DexScreener fails
         if not ds_tvl or ds_tvl <= 1.0:
@@ -435,6 +396,8 @@ async def get_enriched_pool_stat(key: str, rev_key: str, aprs: dict, pool_addr:
 DEFILLAMA_INDEX: Dict[str, dict] = {}
 DEFILLAMA_INDEX_BUILT_AT: float = 0.0
 DEFILLAMA_INDEX_TTL = 24 * 3600  # 24h
+DEFILLAMA_RETRY_S = 300  # a failed (or empty) build is not retried sooner
+DEFILLAMA_FAILED_AT: float = 0.0
 _DEFILLAMA_LOCK = threading.Lock()
 
 # DeFi Llama chain name -> dex_config network key
@@ -481,7 +444,7 @@ def _derive_v4_pool_id(c0_hex: str, c1_hex: str, fee: int, tick_spacing: int) ->
 
 
 def _build_defillama_index() -> Dict[str, str]:
-    resp = requests.get('https://yields.llama.fi/pools', timeout=30.0)
+    resp = requests.get(f"{enrichment_client.DEFILLAMA_YIELDS_URL}/pools", timeout=30.0)
     resp.raise_for_status()
     pools = resp.json().get('data', [])
     index: Dict[str, str] = {}
@@ -551,14 +514,17 @@ def trigger_defillama_index_build():
         _DEFILLAMA_BUILDING = True
 
     def _worker():
-        global DEFILLAMA_INDEX, DEFILLAMA_INDEX_BUILT_AT, _DEFILLAMA_BUILDING
+        global DEFILLAMA_INDEX, DEFILLAMA_INDEX_BUILT_AT, DEFILLAMA_FAILED_AT, _DEFILLAMA_BUILDING
         try:
             idx = _build_defillama_index()
             if idx:
                 DEFILLAMA_INDEX = idx
                 DEFILLAMA_INDEX_BUILT_AT = time.time()
                 print(f"[DeFiLlama] yields index built: {len(idx)} pools")
+            else:
+                DEFILLAMA_FAILED_AT = time.time()
         except Exception as e:
+            DEFILLAMA_FAILED_AT = time.time()
             print(f"[DeFiLlama] yields index build failed: {e}")
         finally:
             with _DEFILLAMA_LOCK:
@@ -568,9 +534,11 @@ def trigger_defillama_index_build():
     t.start()
 
 def get_defillama_index() -> Dict[str, dict]:
-    """Return the cached pool_address->UUID index, triggering background rebuild if stale."""
+    """Return the cached pool_address->UUID index, triggering background rebuild if stale
+    (at most once per DEFILLAMA_RETRY_S while builds keep failing)."""
     now = time.time()
-    if not DEFILLAMA_INDEX or (now - DEFILLAMA_INDEX_BUILT_AT >= DEFILLAMA_INDEX_TTL):
+    stale = not DEFILLAMA_INDEX or (now - DEFILLAMA_INDEX_BUILT_AT >= DEFILLAMA_INDEX_TTL)
+    if stale and now - DEFILLAMA_FAILED_AT >= DEFILLAMA_RETRY_S:
         trigger_defillama_index_build()
     return DEFILLAMA_INDEX
 
@@ -731,6 +699,11 @@ try:
     from shortcut_finder import ShortcutFinder
     from config import DATA_WAREHOUSE_DB
     import undercut_analyzer as ua
+    import swap_set_cache
+    import response_cache
+    import enrichment_client
+    import async_db
+    import response_format as rf
     import swap_distribution as sd
     from graph import (  # JSON:API object-graph serializer
         build_coin_documents, build_coin_family_documents,
@@ -829,37 +802,28 @@ class PoolArenaRequest(BaseModel):
     swaps: PoolArenaSwaps = Field(default_factory=PoolArenaSwaps)
     days: float = 30.0
 
-def resolve_token_input(input_str: str) -> list[str]:
+# Members of a coin family, matched case-insensitively on the official
+# coin_family name.
+_FAMILY_MEMBERS_SQL = """
+    SELECT c.symbol 
+    FROM coin_family f
+    JOIN coin c ON f.coin_id = c.coin_id
+    WHERE UPPER(f.name) = %s
+"""
+
+
+async def aresolve_token_input(input_str: str, statement_timeout: Optional[int] = None) -> list[str]:
     """
-    Resolve input string to a list of tokens.
+    Resolve input string to a list of tokens without blocking the event loop.
     Checks if input is a family name (e.g. 'USD') -> returns ['USDC', 'USDT', ...].
     Otherwise returns [input].
     """
     if input_str == '*':
         return ['*']
-
     try:
-        with get_conn() as conn:
-            cur = conn.cursor()
-
-            # Check if it's a family
-            # We search case-insensitive for family name in the official coin_family table
-            cur.execute("""
-                SELECT c.symbol 
-                FROM coin_family f
-                JOIN coin c ON f.coin_id = c.coin_id
-                WHERE UPPER(f.name) = %s
-            """, (input_str.upper(),))
-            rows = cur.fetchall()
-
-            cur.close()
-
-        if rows:
-            return [row[0] for row in rows]
-
-        # Not a family, assume single token
-        return [input_str]
-
+        rows = await async_db.fetch_all(_FAMILY_MEMBERS_SQL, (input_str.upper(),),
+                                        statement_timeout=statement_timeout)
+        return [row[0] for row in rows] if rows else [input_str]
     except Exception as e:
         print(f"Error resolving token family: {e}")
         return [input_str]
@@ -976,6 +940,42 @@ def _od_set_side_sql(side: str, res: dict) -> tuple[str, list]:
 # Global memory cache for resolved token symbols to contract addresses per network to prevent repetitive slow DB queries
 TOKEN_ADDRESS_CACHE = {}
 
+def _accepted_format(request: Request) -> str:
+    """Negotiated response encoding ("json" or "arrow") for the analytics
+    endpoints; 406 when only Arrow is acceptable and pyarrow is missing."""
+    fmt = rf.negotiate(request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"{rf.ARROW_STREAM} is not available on this server")
+    return fmt
+
+
+def _encoded_response(fmt: str, payload: dict, table) -> Response:
+    """JSON (orjson) or Arrow IPC response. `table` maps the payload to
+    (rows, meta) for the Arrow encoding."""
+    headers = {"Vary": "Accept"}
+    if fmt == "arrow":
+        rows, meta = table(payload)
+        return Response(rf.to_arrow(rows, meta), media_type=rf.ARROW_STREAM, headers=headers)
+    return Response(rf.dumps(payload), media_type=rf.JSON, headers=headers)
+
+
+# The route_stats watermark only moves when a recompute commits, so it is read
+# at most every RESPONSE_CACHE_WATERMARK_POLL_S instead of on every request.
+RESPONSE_CACHE_WATERMARK_POLL_S = float(os.getenv("RESPONSE_CACHE_WATERMARK_POLL_S", "5"))
+_ROUTE_STATS_WATERMARK = {"version": None, "checked_at": float("-inf")}
+
+
+async def _route_stats_watermark(fetcher: "PostgresFetcher", statement_timeout: Optional[int] = None):
+    """materialization_watermark version stamped on response_cache entries
+    (None: nothing is cached, identical requests are still coalesced)."""
+    now = time.monotonic()
+    if now - _ROUTE_STATS_WATERMARK["checked_at"] > RESPONSE_CACHE_WATERMARK_POLL_S:
+        _ROUTE_STATS_WATERMARK["version"] = await fetcher.afetch_materialization_watermark(
+            statement_timeout=statement_timeout)
+        _ROUTE_STATS_WATERMARK["checked_at"] = now
+    return _ROUTE_STATS_WATERMARK["version"]
+
+
 @app.get("/api/routes/analyze", tags=["Route"])
 async def analyze(
     start_token: str,
@@ -985,9 +985,15 @@ async def analyze(
     end_date: Optional[str] = Query(None, description="ISO format end date"),
     network: Optional[str] = Query(None, description="Filter swaps by network"),
     direction: str = Query("forward", description="Route direction: forward (start->end), reverse (end->start), or both"),
-    max_hops: Optional[int] = Query(None, description="Max route hop count (1 for direct routes only)")
+    max_hops: Optional[int] = Query(None, description="Max route hop count (1 for direct routes only)"),
+    request: Request = None,
 ):
-    """Analyze swap routes between two tokens."""
+    """Analyze swap routes between two tokens.
+
+    Streams NDJSON progress lines and a final result line. With
+    `Accept: application/vnd.apache.arrow.stream` the progress is skipped and
+    only the result is returned, as an Arrow table of routes."""
+    fmt = _accepted_format(request) if request is not None else "json"
     try:
         now = datetime.now()
         if days is not None:
@@ -1024,8 +1030,9 @@ async def analyze(
             start_dt = end_dt - timedelta(days=1)
 
         # Resolve tokens/families FIRST so we can use them in processing
-        start_tokens_list = resolve_token_input(start_token)
-        end_tokens_list = resolve_token_input(end_token)
+        stmt_timeout = async_db.statement_timeout_ms("analyze")
+        start_tokens_list = await aresolve_token_input(start_token, stmt_timeout)
+        end_tokens_list = await aresolve_token_input(end_token, stmt_timeout)
         
         if not start_tokens_list: start_tokens_list = [start_token]
         if not end_tokens_list: end_tokens_list = [end_token]
@@ -1063,9 +1070,12 @@ async def analyze(
         if dir_norm in ('reverse', 'both'):
             analytics_inputs.append(('reverse', end_tokens_list, start_tokens_list))
 
-        async def generate():
-            yield json.dumps({"type": "progress", "pct": 10.0, "message": f"Loading pre-aggregated route stats for {start_dt.strftime('%Y-%m-%d')} → {end_dt.strftime('%Y-%m-%d')}..."}) + "\n"
-            await asyncio.sleep(0.01)
+        async def _analysis(emit):
+            async def progress(pct, message):
+                emit({"type": "progress", "pct": pct, "message": message})
+                await asyncio.sleep(0.01)
+
+            await progress(10.0, f"Loading pre-aggregated route stats for {start_dt.strftime('%Y-%m-%d')} → {end_dt.strftime('%Y-%m-%d')}...")
 
             async def _fetch_stats(label, s_tokens, e_tokens):
                 # Stat-backed fast path: route_daily_stats groups per (route, day),
@@ -1090,8 +1100,7 @@ async def analyze(
                 # No route stats for this token pair in the window. Report an
                 # empty result with the available data range sourced from
                 # liquidity_pool_daily_stats (no raw-swaps read).
-                yield json.dumps({"type": "progress", "pct": 40.0, "message": "No route data for this window..."}) + "\n"
-                await asyncio.sleep(0.01)
+                await progress(40.0, "No route data for this window...")
 
                 def _db_range():
                     with get_conn() as conn:
@@ -1112,11 +1121,9 @@ async def analyze(
                 row = await asyncio.to_thread(_db_range)
                 db_min = row[0].isoformat() if row and row[0] else None
                 db_max = row[1].isoformat() if row and row[1] else None
-                yield json.dumps({"type": "result", "data": {"routes": [], "total_tx": 0, "total_volume": 0, "db_range": {"min": db_min, "max": db_max}}}) + "\n"
-                return
+                return {"routes": [], "total_tx": 0, "total_volume": 0, "db_range": {"min": db_min, "max": db_max}}
             else:
-                yield json.dumps({"type": "progress", "pct": 75.0, "message": "Building routing path graph..."}) + "\n"
-                await asyncio.sleep(0.01)
+                await progress(75.0, "Building routing path graph...")
 
                 # Combine per-direction results. Each direction labels its routes so
                 # the frontend can distinguish forward vs reverse chains in `both`.
@@ -1154,8 +1161,7 @@ async def analyze(
             # 2. Fetch stats
             aprs = {}
             if pools_to_fetch:
-                yield json.dumps({"type": "progress", "pct": 80.0, "message": "Querying pool stats & APRs..."}) + "\n"
-                await asyncio.sleep(0.01)
+                await progress(80.0, "Querying pool stats & APRs...")
                 try:
                     aprs = await asyncio.to_thread(
                         fetcher.fetch_pool_stats, list(pools_to_fetch), start_dt, end_dt
@@ -1167,8 +1173,7 @@ async def analyze(
             # 2b. Compute pool addresses deterministically using Create2/Keccak-256
             pool_addresses = {}
             if pools_to_fetch:
-                yield json.dumps({"type": "progress", "pct": 90.0, "message": "Generating pool smart contract addresses..."}) + "\n"
-                await asyncio.sleep(0.01)
+                await progress(90.0, "Generating pool smart contract addresses...")
                 token_symbols = set()
                 # Collect all unique networks needed for these pools
                 needed_networks = set()
@@ -1196,7 +1201,7 @@ async def analyze(
                         # Database lookup for any remaining missing symbols (using central coin_contract table)
                         missing_symbols = [sym for sym in token_symbols if sym not in token_addresses[target_network]]
                         if missing_symbols:
-                            try:
+                            def _lookup_addresses(target_network, missing_symbols):
                                 with get_conn() as conn:
                                     cur = conn.cursor()
                                     db_chain = 'bsc' if target_network.lower() == 'bnb' else target_network.lower()
@@ -1208,11 +1213,16 @@ async def analyze(
                                         WHERE (LOWER(ch.name) = %s OR (LOWER(ch.name) = 'bnb' AND %s = 'bsc'))
                                           AND UPPER(c.symbol) = ANY(%s)
                                     """, (db_chain, db_chain, missing_symbols))
-                                    for row in cur.fetchall():
-                                        if row[1]:
-                                            token_addresses[target_network][row[0]] = row[1]
-                                            TOKEN_ADDRESS_CACHE[target_network][row[0]] = row[1]
+                                    rows = cur.fetchall()
                                     cur.close()
+                                    return rows
+
+                            try:
+                                rows = await asyncio.to_thread(_lookup_addresses, target_network, missing_symbols)
+                                for row in rows:
+                                    if row[1]:
+                                        token_addresses[target_network][row[0]] = row[1]
+                                        TOKEN_ADDRESS_CACHE[target_network][row[0]] = row[1]
                             except Exception as e:
                                 print(f"Error fetching token addresses from DB: {e}")
             
@@ -1558,7 +1568,8 @@ async def analyze(
 
             # Pre-load canonical routes indexed strictly by (origin, dest, exact pool CID tuple)
             route_by_pool_tuple = {}
-            try:
+
+            def _load_route_pool_tuples():
                 with get_conn() as db_conn:
                     d_cur = db_conn.cursor()
                     d_cur.execute("""
@@ -1568,9 +1579,13 @@ async def analyze(
                         JOIN route_hop h ON h.route_id = r.route_id
                         GROUP BY r.route_id, pair.id, pair.origin_symbol, pair.dest_symbol
                     """)
-                    for rid, pair_id, orig, dest, pids in d_cur.fetchall():
-                        route_by_pool_tuple[(orig, dest, tuple(pids))] = (rid, pair_id)
+                    rows = d_cur.fetchall()
                     d_cur.close()
+                    return rows
+
+            try:
+                for rid, pair_id, orig, dest, pids in await asyncio.to_thread(_load_route_pool_tuples):
+                    route_by_pool_tuple[(orig, dest, tuple(pids))] = (rid, pair_id)
             except Exception as _ex:
                 print(f"Error pre-loading route_by_pool_tuple: {_ex}")
 
@@ -1707,11 +1722,9 @@ async def analyze(
                             if not analysis['routes'][route_idx].get('pair_id'):
                                 analysis['routes'][route_idx]['pair_id'] = p_id
 
-            yield json.dumps({"type": "progress", "pct": 98.0, "message": "Formatting routing path data..."}) + "\n"
-            await asyncio.sleep(0.01)
+            await progress(98.0, "Formatting routing path data...")
             
-            yield json.dumps({"type": "progress", "pct": 100.0, "message": "Analysis complete!"}) + "\n"
-            await asyncio.sleep(0.01)
+            await progress(100.0, "Analysis complete!")
 
             for _r in analysis.get('routes', []):
                 if _r.get('route_id') is not None:
@@ -1719,7 +1732,28 @@ async def analyze(
                 if _r.get('pair_id') is not None:
                     _r['pair_id'] = route_hash_hex(_r['pair_id'])
 
-            yield json.dumps({"type": "result", "data": analysis}) + "\n"
+            return analysis
+
+        # Identical requests (same families, days, network, direction, hops)
+        # share one computation and its cached result; see response_cache.
+        cache = response_cache.get_cache()
+        day_lo, day_hi = response_cache.align_window(start_dt, end_dt)
+        cache_key = response_cache.cache_key(
+            "analyze", (start_tokens_list, end_tokens_list),
+            None if (network or '').lower() == 'all' else network, day_lo, day_hi,
+            direction=dir_norm, max_hops=max_hops, period_days=max(1, (end_dt - start_dt).days))
+        watermark = await _route_stats_watermark(fetcher, stmt_timeout)
+
+        if fmt == "arrow":
+            analysis = await cache.get(cache_key, watermark, _analysis)
+            return _encoded_response(fmt, analysis, lambda data: rf.split_table(data, "routes"))
+
+        async def generate():
+            async for kind, data in cache.stream(cache_key, watermark, _analysis):
+                if kind == "progress":
+                    yield json.dumps(data) + "\n"
+                else:
+                    yield rf.dumps({"type": "result", "data": data}) + b"\n"
 
         return StreamingResponse(generate(), media_type="application/x-ndjson")
     except Exception as e:
@@ -1728,6 +1762,264 @@ async def analyze(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _undercut_window(start_date: Optional[str], end_date: Optional[str]):
+    """Parse the undercut backtest window (defaults: the last 30 days).
+    Date-only bounds are UTC; a midnight end_date covers that whole day."""
+    now = datetime.now(timezone.utc)
+    if start_date:
+        s = start_date.replace('Z', '+00:00').strip()
+        try:
+            start_dt = datetime.fromisoformat(s)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid start_date: {start_date}")
+        if start_date.endswith('Z') or 'T' in start_date:
+            if start_dt.tzinfo is None:
+                start_dt = start_dt.replace(tzinfo=timezone.utc)
+        else:
+            start_dt = start_dt.replace(tzinfo=timezone.utc)
+    else:
+        start_dt = now - timedelta(days=30)
+
+    if end_date:
+        s = end_date.replace('Z', '+00:00').strip()
+        try:
+            end_dt = datetime.fromisoformat(s)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid end_date: {end_date}")
+        if end_dt.tzinfo is None:
+            end_dt = end_dt.replace(tzinfo=timezone.utc)
+        if end_dt.hour == 0 and end_dt.minute == 0 and end_dt.second == 0 and end_dt.microsecond == 0:
+            end_dt = end_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
+    else:
+        end_dt = now
+
+    if start_dt >= end_dt:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return start_dt, end_dt
+
+
+def _undercut_fee_label(fb):
+    return 'Dynamic' if fb is None else f"{fb / 100.0:g}%"
+
+
+def _undercut_pool_key(s):
+    return (s.get("cid"), s["fee_bps"], s.get("protocol", "Uniswap V3"), s.get("pool_address", ""))
+
+
+def _load_undercut_legs(fetcher, start_tokens_list: List[str], end_tokens_list: List[str],
+                        token_filter: Optional[List[str]], network: Optional[str],
+                        start_dt: datetime, end_dt: datetime, latest_prices: Dict[str, float]) -> dict:
+    """Stream a pair's legs from the DB and split them by first-leg direction.
+
+    Returns ua.pair_legs(): {"forward": [...], "reverse": [...]}, already
+    deduplicated per (tx, pool) with the raw per-pool counts attached. The
+    swaps are consumed batch by batch from a server-side cursor, so only the
+    kept legs are ever materialized. Blocking; run it in a thread. This is
+    what swap_set_cache keeps per (families, network, day window)."""
+    import itertools
+
+    batches = fetcher.iter_swaps(
+        start_dt, end_dt,
+        token_filter=token_filter, network=network,
+        start_tokens=start_tokens_list, end_tokens=end_tokens_list,
+        broad=True
+    )
+    # Each tx's direction is decided by its first (lowest log_index) entry —
+    # matching the top routes table. Reverse-first txs (arb round-trips that
+    # start by buying the start token) are excluded from the forward demand
+    # so both tables count the same swaps; the real end->start counter-swaps
+    # become the reverse demand that rebalances the hypothetical pool.
+    return ua.pair_legs(itertools.chain.from_iterable(batches),
+                        start_tokens_list, end_tokens_list, latest_prices)
+
+
+def _undercut_rehydrate(part: str, rows: List[dict]) -> None:
+    """Rebuild the Q64.96 price of legs read back from a cache spill."""
+    for s in rows:
+        s["price"] = ua.leg_price_x96(s)
+
+
+async def _prepare_undercut(t0_sym: str, t1_sym: str, start_dt: datetime, end_dt: datetime,
+                            network: Optional[str]) -> dict:
+    """Load and prepare a pair's swap demand for undercut simulations.
+
+    Everything here is independent of the hypothetical pool's fee / liquidity /
+    range, so one preparation can back any number of ua.simulate_columnar runs
+    (see /api/routes/undercut/sweep). Returns the deduplicated forward and
+    reverse demand restricted to active competitor pools (`sim_swaps`,
+    `sim_reverse`), the market anchor (`center`, `p0_usd`, `p1_usd`), the
+    competitor pools (`by_pool`, `pool_stats`) and the pair totals. `swaps` is
+    empty when the window has no start->end demand."""
+    from collections import defaultdict
+    from fractions import Fraction
+
+    fetcher = PostgresFetcher(verbose=False)
+    prep = {"t0_sym": t0_sym, "t1_sym": t1_sym, "network": network,
+            "net_label": network or "Ethereum",
+            "days": max(1, (end_dt - start_dt).days), "swaps": []}
+
+    # Resolve token families (mirror /api/routes/analyze) so the backtest
+    # competes against the real market pools that route the pair's traffic.
+    # E.g. STETH->ETH flows through the STETH-WETH 1% V3 pool (the live
+    # competitor) because WETH is in the ETH coin family; only fetching the
+    # exact STETH<->ETH pair would miss it and show only dead V4 pools.
+    stmt_timeout = async_db.statement_timeout_ms("undercut")
+    start_tokens_list = await aresolve_token_input(t0_sym, stmt_timeout)
+    end_tokens_list = await aresolve_token_input(t1_sym, stmt_timeout)
+    if not start_tokens_list:
+        start_tokens_list = [t0_sym]
+    if not end_tokens_list:
+        end_tokens_list = [t1_sym]
+
+    token_filter = []
+    if "*" not in start_tokens_list:
+        token_filter.extend(start_tokens_list)
+    if "*" not in end_tokens_list:
+        token_filter.extend(end_tokens_list)
+    if not token_filter:
+        token_filter = None
+
+    latest_prices = await fetcher.afetch_latest_prices(token_filter, stmt_timeout)
+
+    # The normalized, direction-split legs depend only on the families,
+    # network and window, so they are cached per whole-UTC-day window
+    # (invalidated by the ingestion watermark) and trimmed to the exact
+    # bounds here.
+    day_lo, day_hi = swap_set_cache.day_window(start_dt, end_dt)
+    cache = swap_set_cache.get_cache()
+    cache_key = swap_set_cache.cache_key("undercut", (start_tokens_list, end_tokens_list),
+                                         network, day_lo, day_hi)
+    watermark = await fetcher.afetch_ingestion_watermark(network, stmt_timeout)
+    legs = cache.get(cache_key, watermark)
+    if legs is None:
+        legs = await asyncio.to_thread(
+            _load_undercut_legs, fetcher, start_tokens_list, end_tokens_list, token_filter,
+            network, day_lo, day_hi - timedelta(microseconds=1), latest_prices)
+        cache.put(cache_key, watermark, legs, rehydrate=_undercut_rehydrate)
+    swaps = [s for s in legs["forward"] if start_dt <= s["ts"] <= end_dt]
+    reverse_swaps = [s for s in legs["reverse"] if start_dt <= s["ts"] <= end_dt]
+
+    if not swaps:
+        return prep
+
+    # Raw swap-event count and volume per pool (before the (tx, pool) dedup
+    # in ua.pair_legs), so the table can show both TXs (unique transactions),
+    # Swaps (individual swap events — exceed TXs when one tx emits multiple
+    # swaps in the same pool, e.g. aggregator splits), and full log-entry
+    # volume.
+    raw_pool_swaps = {}
+    raw_pool_vol = {}
+    for s in swaps:
+        pkey = _undercut_pool_key(s)
+        raw_pool_swaps[pkey] = raw_pool_swaps.get(pkey, 0) + s["raw_count"]
+        raw_pool_vol[pkey] = raw_pool_vol.get(pkey, 0.0) + s["raw_usd"]
+
+    # True totals for the pair (pre-dedup): the number of unique user swaps
+    # (TXs, one per tx_hash) and the full volume (sum of ALL log entries),
+    # so the backtest reports the same totals as the top routes table.
+    unique_tx_count = len({s["tx_hash"] for s in swaps})
+    raw_total_usd = sum(s["raw_usd"] for s in swaps)
+
+    # market_prices() needs chronological order
+    swaps.sort(key=lambda s: s["ts"])
+
+    # Fee-free price per swap for market-price estimation
+    # (Q64.96 ints throughout; see undercut_analyzer "Fixed-point prices").
+    # The legs are shared with the swap-set cache and other requests, so
+    # annotate shallow copies rather than the cached dicts.
+    swaps = [{**s, "fee_free_price": ua.fee_free_price_x96(s["price"], s["t0_in"], s["fee_bps"])}
+             for s in swaps]
+
+    # Sort the (already deduplicated) reverse swaps chronologically so the
+    # two-sided simulation can interleave them.
+    reverse_swaps.sort(key=lambda s: s["ts"])
+
+    # Market price anchor: median of the fee-free market estimates (the mean
+    # is skewed by whale swaps with huge slippage). The band is centered on
+    # the market median, NOT the opening raw price.
+    markets = ua.market_prices(swaps)
+    center = Fraction(sorted(markets)[len(markets) // 2], ua.PRICE_ONE)
+    _, p0_usd, p1_usd = ua.opening_price_and_usd(swaps)
+
+    # Fallback token USD prices (only used to size the hypothetical pool)
+    if p0_usd is None or p1_usd is None:
+        prices = await fetcher.afetch_latest_prices([t0_sym, t1_sym], stmt_timeout)
+        if p0_usd is None:
+            p0_usd = prices.get(t0_sym, 1.0 if 'USD' in t0_sym else 100.0)
+        if p1_usd is None:
+            p1_usd = prices.get(t1_sym, 1.0 if 'USD' in t1_sym else 100.0)
+
+    # Group swaps by pool (cid, fee_bps, protocol, pool_address) so all distinct competitor pools are retained
+    by_pool = defaultdict(lambda: {"count": 0, "volume": 0.0, "cid": None,
+                                   "pool_address": '', "pool_id": '',
+                                   "protocol": 'Uniswap V3', "fee_bps": 0, "s0": '', "s1": '',
+                                   "last_ts": None})
+    for s in swaps:
+        b = by_pool[_undercut_pool_key(s)]
+        b["fee_bps"] = s["fee_bps"]
+        b["protocol"] = s.get("protocol") or "Uniswap V3"
+        b["count"] += 1
+        b["volume"] += s["usd"]
+        if b["last_ts"] is None or s["ts"] > b["last_ts"]:
+            b["last_ts"] = s["ts"]
+        if b["cid"] is None and s.get("cid") is not None:
+            b["cid"] = s["cid"]
+        if not b["pool_address"] and s.get("pool_address"):
+            b["pool_address"] = s["pool_address"]
+        if not b["pool_id"] and s.get("pool_id"):
+            b["pool_id"] = s["pool_id"]
+        if not b["s0"] and s.get("s0"):
+            b["s0"] = s["s0"]
+        if not b["s1"] and s.get("s1"):
+            b["s1"] = s["s1"]
+
+    # Pool volume = sum of ALL the pool's log entries (pre-dedup), so
+    # per-pool volume and the response total reconcile with the top routes
+    # table (which counts every start-token-consuming leg).
+    for pkey, st in by_pool.items():
+        st["volume"] = raw_pool_vol.get(pkey, st["volume"])
+
+    net_label = prep["net_label"]
+    try:
+        pool_stats = await asyncio.to_thread(
+            fetcher.fetch_pool_stats,
+            [[st["s0"] or t0_sym, st["s1"] or t1_sym,
+              f"{_undercut_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"] for st in by_pool.values()],
+            start_dt, end_dt,
+            prices=latest_prices,
+            tvl_mode='latest',
+            use_swaps_fallback=True,
+        )
+    except Exception:
+        pool_stats = {}
+
+    # The hypothetical pool only competes with pools that will actually
+    # be shown (real TVL > $1 or window volume > $1). Excluding dead
+    # pools' swaps keeps the backtest table self-consistent:
+    #   sum(displayed count) == sum(displayed hyp_count) + diverted_count
+    active_keys = set()
+    for pkey, st in by_pool.items():
+        pool_key = f"{st['s0'] or t0_sym}-{st['s1'] or t1_sym}-{_undercut_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"
+        rev_pool_key = f"{st['s1'] or t1_sym}-{st['s0'] or t0_sym}-{_undercut_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"
+        stat = pool_stats.get(pool_key) or pool_stats.get(rev_pool_key)
+        real_tvl = (stat or {}).get("tvl", 0.0) or 0.0
+        if real_tvl > 1.0 or (st["volume"] or 0) > 1.0:
+            active_keys.add(pkey)
+    sim_swaps = [s for s in swaps if _undercut_pool_key(s) in active_keys]
+    sim_reverse = [s for s in reverse_swaps if _undercut_pool_key(s) in active_keys]
+
+    prep.update({
+        "swaps": swaps, "reverse_swaps": reverse_swaps,
+        "sim_swaps": sim_swaps, "sim_reverse": sim_reverse,
+        "sim_total_usd": sum(s["usd"] for s in sim_swaps),
+        "center": center, "p0_usd": p0_usd, "p1_usd": p1_usd,
+        "by_pool": by_pool, "pool_stats": pool_stats,
+        "raw_pool_swaps": raw_pool_swaps, "unique_tx_count": unique_tx_count,
+        "raw_total_usd": raw_total_usd,
+    })
+    return prep
+
+
 @app.get("/api/routes/undercut", tags=["Route"])
 async def undercut(
     start_token: str,
@@ -1744,331 +2036,69 @@ async def undercut(
     with the given fee tier, liquidity and range. Returns the hypothetical pool
     row plus the existing pools' rows with hypothetical post-diversion stats."""
     try:
-        now = datetime.now()
-        if start_date:
-            s = start_date.replace('Z', '+00:00').strip()
-            try:
-                start_dt = datetime.fromisoformat(s)
-            except ValueError:
-                date_part = s.split('T')[0]
-                parts = date_part.split('-')
-                if len(parts) == 3:
-                    import calendar
-                    yr, mo, dy = int(parts[0]), int(parts[1]), int(parts[2])
-                    max_d = calendar.monthrange(yr, mo)[1]
-                    if dy > max_d:
-                        s_fixed = f"{yr:04d}-{mo:02d}-{max_d:02d}"
-                        if 'T' in s:
-                            s_fixed += 'T' + s.split('T')[1]
-                        return HTTPException(status_code=400, detail=f"Invalid start_date: {start_date}")
-                raise
-            if start_date.endswith('Z') or 'T' in start_date:
-                if start_dt.tzinfo is None:
-                    start_dt = start_dt.replace(tzinfo=timezone.utc)
-            else:
-                start_dt = start_dt.replace(tzinfo=timezone.utc)
-        else:
-            start_dt = now - timedelta(days=30)
-
-        if end_date:
-            s = end_date.replace('Z', '+00:00').strip()
-            try:
-                end_dt = datetime.fromisoformat(s)
-            except ValueError:
-                date_part = s.split('T')[0]
-                parts = date_part.split('-')
-                if len(parts) == 3:
-                    import calendar
-                    yr, mo, dy = int(parts[0]), int(parts[1]), int(parts[2])
-                    max_d = calendar.monthrange(yr, mo)[1]
-                    if dy > max_d:
-                        s_fixed = f"{yr:04d}-{mo:02d}-{max_d:02d}"
-                        if 'T' in s:
-                            s_fixed += 'T' + s.split('T')[1]
-                        return HTTPException(status_code=400, detail=f"Invalid end_date: {end_date}")
-                raise
-            if end_dt.tzinfo is None:
-                end_dt = end_dt.replace(tzinfo=timezone.utc)
-            if end_dt.hour == 0 and end_dt.minute == 0 and end_dt.second == 0 and end_dt.microsecond == 0:
-                end_dt = end_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
-        else:
-            end_dt = now
-
-        if start_dt >= end_dt:
-            raise HTTPException(status_code=400, detail="start_date must be before end_date")
+        start_dt, end_dt = _undercut_window(start_date, end_date)
 
         t0_sym, t1_sym = start_token.strip().upper(), end_token.strip().upper()
         if t0_sym == '*' or t1_sym == '*':
             raise HTTPException(status_code=400, detail="Wildcard tokens are not supported for the undercut experiment")
 
-        fetcher = PostgresFetcher(verbose=False)
-        import asyncio
-        import math
         from fractions import Fraction
 
-        # Resolve token families (mirror /api/routes/analyze) so the backtest
-        # competes against the real market pools that route the pair's traffic.
-        # E.g. STETH->ETH flows through the STETH-WETH 1% V3 pool (the live
-        # competitor) because WETH is in the ETH coin family; only fetching the
-        # exact STETH<->ETH pair would miss it and show only dead V4 pools.
-        start_tokens_list = resolve_token_input(t0_sym)
-        end_tokens_list = resolve_token_input(t1_sym)
-        if not start_tokens_list:
-            start_tokens_list = [t0_sym]
-        if not end_tokens_list:
-            end_tokens_list = [t1_sym]
-
-        token_filter = []
-        if "*" not in start_tokens_list:
-            token_filter.extend(start_tokens_list)
-        if "*" not in end_tokens_list:
-            token_filter.extend(end_tokens_list)
-        if not token_filter:
-            token_filter = None
-
-        raw_swaps = await asyncio.to_thread(
-            fetcher.fetch_swaps, start_dt, end_dt,
-            token_filter=token_filter, network=network,
-            start_tokens=start_tokens_list, end_tokens=end_tokens_list,
-            broad=True
-        )
-
-        latest_prices = fetcher.fetch_latest_prices(token_filter)
-        # Build ALL fetched events for the token families (both directions and
-        # any intermediate-hop pools) so each tx's first log entry can decide
-        # its direction — matching the top routes table, which treats a tx's
-        # direction as whatever its first (lowest log_index) entry initiated.
-        swaps = []
-        for r in raw_swaps:
-            a0f, a1f = float(r.get('amount0', 0) or 0), float(r.get('amount1', 0) or 0)
-            if a0f == 0 or a1f == 0 or not (math.isfinite(a0f) and math.isfinite(a1f)):
-                continue
-            usd = float(r.get('amountUSD', r.get('amount_usd', 0)) or 0)
-            t0_in = a0f > 0
-            s0 = (r.get('token0_symbol') or '').upper()
-            s1 = (r.get('token1_symbol') or '').upper()
-
-            if usd <= 0:
-                p0 = latest_prices.get(s0, 0.0) if latest_prices else 0.0
-                p1 = latest_prices.get(s1, 0.0) if latest_prices else 0.0
-                if p0 == 0.0 and any(x in s0 for x in ['USD', 'EUR']): p0 = 1.0
-                if p1 == 0.0 and any(x in s1 for x in ['USD', 'EUR']): p1 = 1.0
-                v0 = abs(a0f)
-                if v0 > 1e12:
-                    v0 /= 1e18
-                elif any(b in s0 for b in ['BTC', 'WBTC', 'BTCB']) and v0 > 1e4:
-                    v0 /= 1e8
-
-                v1 = abs(a1f)
-                if v1 > 1e12:
-                    v1 /= 1e18
-                elif any(b in s1 for b in ['BTC', 'WBTC', 'BTCB']) and v1 > 1e4:
-                    v1 /= 1e8
-
-                if p0 > 0:
-                    usd = v0 * p0
-                elif p1 > 0:
-                    usd = v1 * p1
-
-            swaps.append({
-                "ts": datetime.fromtimestamp(r['timestamp'], tz=timezone.utc),
-                "log_index": r.get('log_index') or 0,
-                "fee_bps": float(r.get('fee_bps') or 0),
-                "fee_tier": r.get('fee_tier') or '',
-                "t0_in": t0_in,
-                "input": abs(a0f if t0_in else a1f),
-                "output": abs(a1f if t0_in else a0f),
-                "usd": usd,
-                "price": Fraction(abs(a1f)) / Fraction(abs(a0f)),
-                "protocol": r.get('protocol', 'Uniswap V3'),
-                "network": r.get('network', 'Ethereum'),
-                "cid": r.get('cid'),
-                "pool_address": r.get('pool_address') or '',
-                "pool_id": r.get('pool_id') or '',
-                "s0": s0,
-                "s1": s1,
-                "tx_hash": r.get('tx_hash') or '',
-            })
-
-        # First log entry per tx decides its direction. A tx counts as a
-        # start->end swap only if its FIRST log entry spends the start token —
-        # the same rule as the top routes table. Reverse-first txs (arb
-        # round-trips that start by buying the start token) are excluded so
-        # both tables count the same swaps.
-        first_by_tx = {}
-        for s in swaps:
-            prev = first_by_tx.get(s["tx_hash"])
-            if prev is None or s["log_index"] < prev["log_index"]:
-                first_by_tx[s["tx_hash"]] = s
-
-        all_events = swaps
-        swaps = [s for s in all_events
-                 if (s["s0"] if s["t0_in"] else s["s1"]) in start_tokens_list
-                 and (s["s1"] if s["t0_in"] else s["s0"]) in end_tokens_list
-                 and (first_by_tx[s["tx_hash"]]["s0"] if first_by_tx[s["tx_hash"]]["t0_in"] else first_by_tx[s["tx_hash"]]["s1"]) in start_tokens_list]
-        # Reverse-direction (end->start) demand for the two-sided inventory
-        # simulation. Same first-log-entry rule mirrored: a tx counts as an
-        # end->start swap only if its FIRST log entry spends the end token.
-        # These are the real counter-swaps that rebalance the hypothetical pool.
-        reverse_swaps = [s for s in all_events
-                         if (s["s1"] if s["t0_in"] else s["s0"]) in start_tokens_list
-                         and (s["s0"] if s["t0_in"] else s["s1"]) in end_tokens_list
-                         and (first_by_tx[s["tx_hash"]]["s0"] if first_by_tx[s["tx_hash"]]["t0_in"] else first_by_tx[s["tx_hash"]]["s1"]) in end_tokens_list]
-
-        if not swaps:
+        prep = await _prepare_undercut(t0_sym, t1_sym, start_dt, end_dt, network)
+        days = prep["days"]
+        if not prep["swaps"]:
             return {"hypothetical": None, "pools": [], "total_volume": 0,
-                    "total_tx": 0, "days": max(1, (end_dt - start_dt).days),
+                    "total_tx": 0, "days": days,
                     "start_token": t0_sym, "end_token": t1_sym, "network": network or "Ethereum",
                     "fee_bps": fee_bps, "liquidity_usd": liquidity_usd, "range_pct": range_pct}
 
-        # Raw swap-event count and volume per pool (before the (tx, pool) dedup
-        # below), so the table can show both TXs (unique transactions), Swaps
-        # (individual swap events — exceed TXs when one tx emits multiple swaps
-        # in the same pool, e.g. aggregator splits), and full log-entry volume.
-        raw_pool_swaps = {}
-        raw_pool_vol = {}
-        for s in swaps:
-            pkey = (s.get("cid"), s["fee_bps"], s.get("protocol", "Uniswap V3"), s.get("pool_address", ""))
-            raw_pool_swaps[pkey] = raw_pool_swaps.get(pkey, 0) + 1
-            raw_pool_vol[pkey] = raw_pool_vol.get(pkey, 0.0) + s["usd"]
-
-        # True totals for the pair (pre-dedup): the number of unique user swaps
-        # (TXs, one per tx_hash) and the full volume (sum of ALL log entries),
-        # so the backtest reports the same totals as the top routes table.
-        unique_tx_count = len({s["tx_hash"] for s in swaps})
-        raw_total_usd = sum(s["usd"] for s in swaps)
-
-        # Deduplicate by (tx_hash, pool) so each unique transaction is counted
-        # once per pool – matching how the Route Analyzer counts TXs.  When a
-        # single transaction emits multiple swap events in the same pool (e.g.
-        # aggregator splits), keep the event with the highest USD value.
-        seen_tx_pool = {}
-        for s in swaps:
-            key = (s["tx_hash"], s.get("cid"))
-            if key not in seen_tx_pool or s["usd"] > seen_tx_pool[key]["usd"]:
-                seen_tx_pool[key] = s
-        swaps = list(seen_tx_pool.values())
-
-        # market_prices() needs chronological order
-        swaps.sort(key=lambda s: s["ts"])
-
-        # Fee-free price per swap for market-price estimation
-        for s in swaps:
-            fee_frac = ua.fee_fraction_from_bps(s["fee_bps"])
-            s["fee_free_price"] = ua.fee_free_price(s["price"], s["t0_in"], fee_frac)
-
-        # Dedup reverse swaps by (tx, pool) the same way, then sort
-        # chronologically so the two-sided simulation can interleave them.
-        seen_rev = {}
-        for s in reverse_swaps:
-            key = (s["tx_hash"], s.get("cid"))
-            if key not in seen_rev or s["usd"] > seen_rev[key]["usd"]:
-                seen_rev[key] = s
-        reverse_swaps = list(seen_rev.values())
-        reverse_swaps.sort(key=lambda s: s["ts"])
-
-        days = max(1, (end_dt - start_dt).days)
-
-        # Market price anchor: median of the fee-free market estimates (the mean
-        # is skewed by whale swaps with huge slippage). The band is centered on
-        # the market median, NOT the opening raw price.
-        markets = ua.market_prices(swaps)
-        sorted_mk = sorted(float(m) for m in markets)
-        center = sorted_mk[len(sorted_mk) // 2]
-        opening_px, p0_usd, p1_usd = ua.opening_price_and_usd(swaps)
-
-        # Fallback token USD prices (only used to size the hypothetical pool)
-        if p0_usd is None or p1_usd is None:
-            prices = fetcher.fetch_latest_prices([t0_sym, t1_sym])
-            if p0_usd is None:
-                p0_usd = prices.get(t0_sym, 1.0 if 'USD' in t0_sym else 100.0)
-            if p1_usd is None:
-                p1_usd = prices.get(t1_sym, 1.0 if 'USD' in t1_sym else 100.0)
-
+        by_pool = prep["by_pool"]
+        pool_stats = prep["pool_stats"]
+        raw_pool_swaps = prep["raw_pool_swaps"]
+        net_label = prep["net_label"]
         fee_pips = int(round(fee_bps * 100))
 
-        # Group swaps by pool (cid, fee_bps, protocol, pool_address) so all distinct competitor pools are retained
-        from collections import defaultdict
-        by_pool = defaultdict(lambda: {"count": 0, "volume": 0.0, "cid": None,
-                                       "pool_address": '', "pool_id": '',
-                                       "protocol": 'Uniswap V3', "fee_bps": 0, "s0": '', "s1": '',
-                                       "last_ts": None})
-        for s in swaps:
-            pkey = (s.get("cid"), s["fee_bps"], s.get("protocol", "Uniswap V3"), s.get("pool_address", ""))
-            b = by_pool[pkey]
-            b["fee_bps"] = s["fee_bps"]
-            b["protocol"] = s.get("protocol") or "Uniswap V3"
-            b["count"] += 1
-            b["volume"] += s["usd"]
-            if b["last_ts"] is None or s["ts"] > b["last_ts"]:
-                b["last_ts"] = s["ts"]
-            if b["cid"] is None and s.get("cid") is not None:
-                b["cid"] = s["cid"]
-            if not b["pool_address"] and s.get("pool_address"):
-                b["pool_address"] = s["pool_address"]
-            if not b["pool_id"] and s.get("pool_id"):
-                b["pool_id"] = s["pool_id"]
-            if not b["s0"] and s.get("s0"):
-                b["s0"] = s["s0"]
-            if not b["s1"] and s.get("s1"):
-                b["s1"] = s["s1"]
-
-        # Pool volume = sum of ALL the pool's log entries (pre-dedup), so
-        # per-pool volume and the response total reconcile with the top routes
-        # table (which counts every start-token-consuming leg).
-        for pkey, st in by_pool.items():
-            st["volume"] = raw_pool_vol.get(pkey, st["volume"])
-
         pools = []
-        if by_pool:
-            net_label = network or "Ethereum"
-            def _fee_label(fb):
-                return 'Dynamic' if fb is None else f"{fb / 100.0:g}%"
-            try:
-                pool_stats = await asyncio.to_thread(
-                    fetcher.fetch_pool_stats,
-                    [[st["s0"] or t0_sym, st["s1"] or t1_sym,
-                      f"{_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"] for st in by_pool.values()],
-                    start_dt, end_dt,
-                    prices=latest_prices,
-                    tvl_mode='latest',
-                    use_swaps_fallback=True,
-                )
-            except Exception:
-                pool_stats = {}
-
-            # The hypothetical pool only competes with pools that will actually
-            # be shown (real TVL > $1 or window volume > $1). Excluding dead
-            # pools' swaps keeps the backtest table self-consistent:
-            #   sum(displayed count) == sum(displayed hyp_count) + diverted_count
-            def _pkey_of(s):
-                return (s.get("cid"), s["fee_bps"], s.get("protocol", "Uniswap V3"), s.get("pool_address", ""))
-            active_keys = set()
-            for pkey, st in by_pool.items():
-                pool_key = f"{st['s0'] or t0_sym}-{st['s1'] or t1_sym}-{_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"
-                rev_pool_key = f"{st['s1'] or t1_sym}-{st['s0'] or t0_sym}-{_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"
-                stat = pool_stats.get(pool_key) or pool_stats.get(rev_pool_key)
-                real_tvl = (stat or {}).get("tvl", 0.0) or 0.0
-                if real_tvl > 1.0 or (st["volume"] or 0) > 1.0:
-                    active_keys.add(pkey)
-            sim_swaps = [s for s in swaps if _pkey_of(s) in active_keys]
-            sim_reverse = [s for s in reverse_swaps if _pkey_of(s) in active_keys]
-            res = ua.simulate(liquidity_usd / 2.0, range_pct, fee_pips, sim_swaps,
-                              Fraction(center), p0_usd, p1_usd, sum(s["usd"] for s in sim_swaps),
-                              reverse_swaps=sim_reverse)
-        else:
-            pool_stats = {}
-            res = ua.simulate(liquidity_usd / 2.0, range_pct, fee_pips, [],
-                              Fraction(center), p0_usd, p1_usd, 0.0, reverse_swaps=[])
+        res = ua.simulate_columnar(liquidity_usd / 2.0, range_pct, fee_pips, prep["sim_swaps"],
+                                   Fraction(prep["center"]), prep["p0_usd"], prep["p1_usd"],
+                                   prep["sim_total_usd"], reverse_swaps=prep["sim_reverse"])
+
+        ranked = sorted(by_pool.items(), key=lambda kv: (kv[1]["volume"] or 0), reverse=True)
+
+        def _pool_keys(st):
+            s0 = st["s0"] or t0_sym
+            s1 = st["s1"] or t1_sym
+            fee_tier = f"{_undercut_fee_label(st['fee_bps'])}|{st['protocol']}|{net_label}"
+            return f"{s0}-{s1}-{fee_tier}", f"{s1}-{s0}-{fee_tier}", fee_tier
+
+        # Mirror the Show Routes enrichment: when the DB TVL is missing or
+        # unreliable, fall back to DexScreener / DeFi Llama for the real TVL
+        # so the backtest competitor pools match the routes table. All pools
+        # are enriched concurrently (one batched DexScreener fan-out under the
+        # client deadline) instead of one awaited lookup per pool.
+        # V4 pools have no pool_address; fall back to pool_id for lookups.
+        async def _enrich(st):
+            lookup_addr = st.get("pool_address") or st.get("pool_id") or ''
+            if not lookup_addr:
+                return None
+            pool_key, rev_pool_key, fee_tier = _pool_keys(st)
+            return await get_enriched_pool_stat(
+                key=pool_key,
+                rev_key=rev_pool_key,
+                aprs=pool_stats,
+                pool_addr=lookup_addr,
+                pool_network=net_label,
+                period_days=days,
+                fee_tier=fee_tier,
+            )
+
+        enriched_by_pool = await asyncio.gather(*[_enrich(st) for _, st in ranked])
 
-        for pkey, st in sorted(by_pool.items(), key=lambda kv: (kv[1]["volume"] or 0), reverse=True):
+        for (pkey, st), enriched in zip(ranked, enriched_by_pool):
             fee_b = st["fee_bps"]
             div_cnt, div_vol = res.get("by_pool", {}).get(pkey, [0, 0.0])
             hyp_vol = max(0.0, st["volume"] - div_vol)
-            s0 = st["s0"] or t0_sym
-            s1 = st["s1"] or t1_sym
-            pool_key = f"{s0}-{s1}-{_fee_label(fee_b)}|{st['protocol']}|{net_label}"
-            rev_pool_key = f"{s1}-{s0}-{_fee_label(fee_b)}|{st['protocol']}|{net_label}"
+            pool_key, rev_pool_key, _ = _pool_keys(st)
             stat = pool_stats.get(pool_key) or pool_stats.get(rev_pool_key)
             real_tvl = (stat or {}).get("tvl", 0.0) or 0.0
             # Bidirectional volume from DB: pools earn fees on swaps in both
@@ -2082,21 +2112,7 @@ async def undercut(
             # For post-undercut fees: scale proportionally by volume diverted
             hyp_fees = orig_fees * (hyp_vol / st["volume"]) if st["volume"] > 0 else 0.0
 
-            # Mirror the Show Routes enrichment: when the DB TVL is missing or
-            # unreliable, fall back to DexScreener / DeFi Llama for the real TVL
-            # so the backtest competitor pools match the routes table.
-            # V4 pools have no pool_address; fall back to pool_id for lookups.
-            lookup_addr = st.get("pool_address") or st.get("pool_id") or ''
-            if lookup_addr:
-                enriched = await get_enriched_pool_stat(
-                    key=pool_key,
-                    rev_key=rev_pool_key,
-                    aprs=pool_stats,
-                    pool_addr=lookup_addr,
-                    pool_network=net_label,
-                    period_days=days,
-                    fee_tier=f"{_fee_label(fee_b)}|{st['protocol']}|{net_label}",
-                )
+            if enriched is not None:
                 # Prefer DexScreener / DeFi Llama real-time TVL whenever it
                 # returns a valid value — this matches the top Routes table which
                 # calls the same get_enriched_pool_stat function and always uses
@@ -2113,7 +2129,7 @@ async def undercut(
             real_apr_pct = (orig_fees / real_tvl) * (365.0 / days) * 100.0 if (orig_fees > 0 and real_tvl > 0) else 0.0
             pools.append({
                 "fee_bps": fee_b,
-                "fee_display": _fee_label(fee_b),
+                "fee_display": _undercut_fee_label(fee_b),
                 "protocol": st["protocol"],
                 "count": st["count"],
                 "swaps": raw_pool_swaps.get(pkey, st["count"]),
@@ -2153,8 +2169,8 @@ async def undercut(
                 "reverse_fee_usd": res["reverse_fee_usd"],
             },
             "pools": pools,
-            "total_volume": raw_total_usd,
-            "total_tx": unique_tx_count,
+            "total_volume": prep["raw_total_usd"],
+            "total_tx": prep["unique_tx_count"],
             "days": days,
             "start_token": t0_sym,
             "end_token": t1_sym,
@@ -2171,6 +2187,117 @@ async def undercut(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+UNDERCUT_SWEEP_MAX_POINTS = int(os.getenv("UNDERCUT_SWEEP_MAX_POINTS", "1000"))
+UNDERCUT_SWEEP_WORKERS = int(os.getenv("UNDERCUT_SWEEP_WORKERS", "4"))
+# Sweeps running at once; each owns a process pool of up to
+# UNDERCUT_SWEEP_WORKERS workers holding its demand, so later ones queue here.
+UNDERCUT_SWEEP_CONCURRENCY = int(os.getenv("UNDERCUT_SWEEP_CONCURRENCY", "2"))
+_UNDERCUT_SWEEP_SLOTS = asyncio.Semaphore(max(1, UNDERCUT_SWEEP_CONCURRENCY))
+
+
+def _parse_float_list(name: str, value: str) -> List[float]:
+    try:
+        out = [float(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma-separated list of numbers")
+    if not out:
+        raise HTTPException(status_code=400, detail=f"{name} must not be empty")
+    return out
+
+
+async def _undercut_sweep_lines(t0_sym: str, t1_sym: str, start_dt: datetime, end_dt: datetime,
+                                network: Optional[str], grid: List[dict]):
+    """NDJSON lines of one undercut sweep (see undercut_sweep)."""
+    import json
+    from fractions import Fraction
+
+    yield json.dumps({"type": "progress", "pct": 5.0, "message": f"Loading {t0_sym}->{t1_sym} swaps for {start_dt.strftime('%Y-%m-%d')} → {end_dt.strftime('%Y-%m-%d')}..."}) + "\n"
+    prep = await _prepare_undercut(t0_sym, t1_sym, start_dt, end_dt, network)
+    summary = {"total_volume": prep.get("raw_total_usd", 0), "total_tx": prep.get("unique_tx_count", 0),
+               "days": prep["days"], "start_token": t0_sym, "end_token": t1_sym,
+               "network": prep["net_label"]}
+    if not prep["swaps"]:
+        yield json.dumps({"type": "result", "data": dict(summary, points=[])}) + "\n"
+        return
+
+    if _UNDERCUT_SWEEP_SLOTS.locked():
+        yield json.dumps({"type": "progress", "pct": 15.0, "message": "Waiting for a free sweep slot..."}) + "\n"
+    async with _UNDERCUT_SWEEP_SLOTS:
+        yield json.dumps({"type": "progress", "pct": 20.0, "message": f"Simulating {len(grid)} hypothetical pools..."}) + "\n"
+        columns = await asyncio.to_thread(ua.event_columns, prep["sim_swaps"], prep["sim_reverse"])
+        executor = ua.sweep_executor(columns, Fraction(prep["center"]), prep["p0_usd"], prep["p1_usd"],
+                                     prep["sim_total_usd"],
+                                     max_workers=max(1, min(UNDERCUT_SWEEP_WORKERS, len(grid))))
+        loop = asyncio.get_running_loop()
+        rows = [None] * len(grid)
+        try:
+            futures = [loop.run_in_executor(executor, ua.sweep_point, pt) for pt in grid]
+            for done, fut in enumerate(asyncio.as_completed(futures), 1):
+                point, res = await fut
+                liq = point["liquidity_usd"]
+                row = dict(point,
+                           fee_display=f"{point['fee_bps'] / 100.0:g}%",
+                           diverted_count=res["div_count"],
+                           diverted_volume=res["div_usd"],
+                           diverted_pct=res["pct"],
+                           fee_usd=res["fee_usd"],
+                           apr_pct=(res["fee_usd"] / liq) * (365.0 / prep["days"]) * 100.0 if liq > 0 else 0.0,
+                           in_range=res["in_range"],
+                           reverse_count=res["reverse_count"],
+                           reverse_volume=res["reverse_usd"],
+                           reverse_fee_usd=res["reverse_fee_usd"])
+                rows[point["index"]] = row
+                yield json.dumps({"type": "point", "pct": 20.0 + 80.0 * done / len(grid), "data": row}) + "\n"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    yield json.dumps({"type": "result", "data": dict(summary, points=rows)}) + "\n"
+
+
+@app.get("/api/routes/undercut/sweep", tags=["Route"])
+async def undercut_sweep(
+    start_token: str,
+    end_token: str,
+    start_date: Optional[str] = Query(None, description="ISO format start date"),
+    end_date: Optional[str] = Query(None, description="ISO format end date"),
+    network: Optional[str] = Query(None, description="Filter swaps by network"),
+    fee_bps: str = Query(..., description="Comma-separated hypothetical fee tiers in basis points (e.g. 1,5,30)"),
+    liquidity_usd: str = Query(..., description="Comma-separated total USD liquidity values"),
+    range_pct: str = Query(..., description="Comma-separated +/- range percents"),
+):
+    """Parameter sweep for the undercut backtest. Loads and prepares the pair's
+    swap demand once (same rules as /api/routes/undercut), then simulates every
+    (fee_bps x liquidity_usd x range_pct) hypothetical pool across a process
+    pool. Streams NDJSON: progress lines, one `point` line per finished grid
+    point (in completion order, tagged with its grid `index`), then a `result`
+    line with all points in grid order plus the pair totals, or an `error`
+    line if the sweep fails. At most UNDERCUT_SWEEP_CONCURRENCY sweeps
+    simulate at once; later ones wait for a slot."""
+    start_dt, end_dt = _undercut_window(start_date, end_date)
+    t0_sym, t1_sym = start_token.strip().upper(), end_token.strip().upper()
+    if t0_sym == '*' or t1_sym == '*':
+        raise HTTPException(status_code=400, detail="Wildcard tokens are not supported for the undercut experiment")
+    grid = ua.sweep_grid(_parse_float_list("fee_bps", fee_bps),
+                         _parse_float_list("liquidity_usd", liquidity_usd),
+                         _parse_float_list("range_pct", range_pct))
+    if len(grid) > UNDERCUT_SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Sweep grid has {len(grid)} points; the maximum is {UNDERCUT_SWEEP_MAX_POINTS}")
+
+    from fastapi.responses import StreamingResponse
+    import json
+
+    async def generate():
+        try:
+            async for line in _undercut_sweep_lines(t0_sym, t1_sym, start_dt, end_dt, network, grid):
+                yield line
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @app.post("/api/pool-arena/simulate", tags=["Pool Arena"])
 async def pool_arena_simulate(req: PoolArenaRequest):
     """Run the coupled N-pool simulation on generated random swap demand.
@@ -2188,19 +2315,13 @@ async def pool_arena_simulate(req: PoolArenaRequest):
         raise HTTPException(status_code=400, detail="direction_bias must be in [0, 1]")
 
     # Generate the demand server-side (deterministic via seed).
-    import random as _random
     from fractions import Fraction as _Fraction
-    rng = _random.Random(req.swaps.seed)
-    fwd, rev = [], []
-    for i in range(req.swaps.count):
-        usd = rng.uniform(req.swaps.vol_min, req.swaps.vol_max)
-        sw = {"ts": i, "input": usd, "output": usd, "usd": usd, "fee_bps": 30,
-              "cid": 1, "protocol": "Arena", "pool_address": "0xARENA"}
-        (fwd if rng.random() < req.swaps.direction_bias else rev).append(sw)
+    fwd, rev = ua.arena_demand(req.swaps.count, req.swaps.seed, req.swaps.vol_min,
+                               req.swaps.vol_max, req.swaps.direction_bias)
     total_fwd = sum(s["usd"] for s in fwd)
 
     def _run():
-        return ua.simulate_pools(
+        return ua.simulate_pools_columnar(
             [{"name": p.name, "cap": p.liquidity_usd / 2.0,
               "range_pct": p.range_pct,
               "fee_pips": int(round(p.fee_bps * 100))} for p in req.pools],
@@ -2252,7 +2373,8 @@ async def swap_distribution(
                           description="Split the histogram groups. Only 'route' is served (from pre-aggregated route_daily_stats_bucket); other groupings were dropped with the raw-swaps migration."),
     direction: str = Query("both", pattern="^(both|forward|reverse)$",
                            description="Restrict to a single swap direction: both (default), forward (start→end), or reverse (end→start)"),
-    max_hops: Optional[int] = Query(None, description="Max route hop count (1 for direct routes only)")
+    max_hops: Optional[int] = Query(None, description="Max route hop count (1 for direct routes only)"),
+    request: Request = None,
 ):
     """Analyze the swap-size distribution for a token route.
 
@@ -2266,7 +2388,11 @@ async def swap_distribution(
     Only `group_by=route` is supported. Every route is bucketed daily, so a
     query whose routes have no completed bucket rollup in the window returns no
     data (the raw-swaps fallback was removed).
+
+    Responds with JSON, or with an Arrow table of the per-route histograms
+    (`chains`) when the Accept header asks for application/vnd.apache.arrow.stream.
     """
+    fmt = _accepted_format(request) if request is not None else "json"
     try:
         now = datetime.now()
         if days is not None:
@@ -2294,8 +2420,9 @@ async def swap_distribution(
         if end_dt <= start_dt:
             raise HTTPException(status_code=400, detail="start_date must be before end_date")
 
-        start_list = resolve_token_input(start_token)
-        end_list = resolve_token_input(end_token)
+        stmt_timeout = async_db.statement_timeout_ms("swap_distribution")
+        start_list = await aresolve_token_input(start_token, stmt_timeout)
+        end_list = await aresolve_token_input(end_token, stmt_timeout)
         if not start_list:
             start_list = [start_token.strip().upper()]
         if not end_list:
@@ -2456,12 +2583,20 @@ async def swap_distribution(
             # no-raw-swaps migration.
             return None
 
-        result = await asyncio.to_thread(_fetch_and_analyze)
+        day_lo, day_hi = response_cache.align_window(start_dt, end_dt)
+        cache_key = response_cache.cache_key(
+            "swap_distribution", (start_list, end_list), network, day_lo, day_hi,
+            group_by=group_by, direction=direction, max_hops=max_hops, exclude=exclude)
+        watermark = await _route_stats_watermark(PostgresFetcher(), stmt_timeout)
+        result = await response_cache.get_cache().get(
+            cache_key, watermark, lambda emit: asyncio.to_thread(_fetch_and_analyze))
         if not result:
-            return {"data": None, "n": 0, "start_token": ",".join(start_list),
-                    "end_token": ",".join(end_list),
-                    "network": network, "start_date": start_dt.isoformat(),
-                    "end_date": end_dt.isoformat()}
+            return _encoded_response(fmt, {"data": None, "n": 0, "start_token": ",".join(start_list),
+                                           "end_token": ",".join(end_list),
+                                           "network": network, "start_date": start_dt.isoformat(),
+                                           "end_date": end_dt.isoformat()},
+                                     lambda payload: ([], payload))
+        result = dict(result)  # the cached result is shared; label a copy
         result["start_token"] = ",".join(start_list)
         result["end_token"] = ",".join(end_list)
         result["network"] = network
@@ -2470,7 +2605,8 @@ async def swap_distribution(
         result["exclude_chains"] = exclude
         result["group_by"] = group_by
         result["direction"] = direction
-        return {"data": result}
+        return _encoded_response(fmt, {"data": result},
+                                 lambda payload: rf.split_table(payload["data"], "chains"))
     except HTTPException:
         raise
     except Exception as e:
@@ -2478,6 +2614,12 @@ async def swap_distribution(
         raise HTTPException(status_code=500, detail=f"Error analyzing swap distribution: {e}")
 
 
+# interval=auto picks hourly buckets up to this span; interval=hour is capped
+# (route_hourly_stats only keeps ROUTE_HOURLY_RETENTION_DAYS, 30 by default).
+TIME_SERIES_AUTO_HOURLY_DAYS = 2
+TIME_SERIES_MAX_HOURLY_DAYS = 31
+
+
 @app.get("/api/swap-time-series", tags=["Route"])
 async def swap_time_series(
     start_token: str,
@@ -2493,15 +2635,24 @@ async def swap_time_series(
     direction: str = Query("both", pattern="^(both|forward|reverse)$",
                            description="Restrict to swap direction"),
     max_hops: Optional[int] = Query(None, description="Max route hop count (1 for direct routes only)"),
-    interval: str = Query("day", pattern="^(auto|day)$", description="Time interval: day (hourly was dropped when time-series moved to pre-aggregated route_daily_stats)")
+    interval: str = Query("day", pattern="^(auto|day|hour)$",
+                          description="Time interval: day, hour (recent days only, from route_hourly_stats) "
+                                      f"or auto (hour for spans up to {TIME_SERIES_AUTO_HOURLY_DAYS} days)"),
+    request: Request = None,
 ):
-    """Analyze time series of swaps (Volume $, Fees $, Count) over day buckets.
+    """Analyze time series of swaps (Volume $, Fees $, Count) over day or hour buckets.
 
-    Served from route_daily_stats (pre-aggregated, no raw swaps reads). Grouping
+    Served from route_daily_stats, or route_hourly_stats for interval=hour
+    (pre-aggregated, no raw swaps reads; hourly rows cover recent days only). Grouping
     is restricted to route-level attributes (chain, direction, split, hops,
     route) because per-leg fee_tier/protocol breakdowns are not part of the
     aggregate.
+
+    Responds with JSON, or with a long-format Arrow table (timestamp, group,
+    volume, fees, count) when the Accept header asks for
+    application/vnd.apache.arrow.stream.
     """
+    fmt = _accepted_format(request) if request is not None else "json"
     try:
         now = datetime.now()
         if days is not None:
@@ -2525,16 +2676,17 @@ async def swap_time_series(
 
         # Resolve tokens/families (e.g. 'BTC' -> WBTC, CBBTC, TBTC...; 'USD' -> USDC, USDT, DAI...)
         # the same way /api/routes/analyze does, so 'USD' matches stablecoins rather than nothing.
+        stmt_timeout = async_db.statement_timeout_ms("swap_time_series")
         start_list = []
         for s in start_token.split(","):
             s = s.strip()
             if s:
-                start_list.extend(resolve_token_input(s))
+                start_list.extend(await aresolve_token_input(s, stmt_timeout))
         end_list = []
         for e in end_token.split(","):
             e = e.strip()
             if e:
-                end_list.extend(resolve_token_input(e))
+                end_list.extend(await aresolve_token_input(e, stmt_timeout))
         start_list = [s.upper() for s in start_list]
         end_list = [e.upper() for e in end_list]
         if not start_list or not end_list:
@@ -2547,7 +2699,15 @@ async def swap_time_series(
         if isinstance(exclude_chains, str) and exclude_chains:
             exclude = [c.strip().lower() for c in exclude_chains.split(",") if c.strip()]
 
-        chosen_interval = "day"
+        span_days = (end_dt - start_dt).total_seconds() / 86400
+        if interval == "auto":
+            chosen_interval = "hour" if span_days <= TIME_SERIES_AUTO_HOURLY_DAYS else "day"
+        else:
+            chosen_interval = interval
+        if chosen_interval == "hour" and span_days > TIME_SERIES_MAX_HOURLY_DAYS:
+            raise HTTPException(status_code=400,
+                                detail=f"interval=hour supports at most {TIME_SERIES_MAX_HOURLY_DAYS} days")
+        hourly = chosen_interval == "hour"
 
         def _fetch_time_series():
             with get_conn() as conn:
@@ -2595,7 +2755,18 @@ async def swap_time_series(
                     max_hops_sql = " AND r.hops <= %s"
                     params.append(max_hops)
 
-                q_params = [start_dt, end_dt] + pair_params + params
+                if hourly:
+                    stats_table, bucket_sql = "route_hourly_stats", "rs.hour >= %s AND rs.hour <= %s"
+                    bucket_start = start_dt.replace(minute=0, second=0, microsecond=0)
+                    bucket_step = timedelta(hours=1)
+                    bucket_fmt = "%Y-%m-%d %H:00"
+                else:
+                    stats_table, bucket_sql = "route_daily_stats", "rs.day >= %s::date AND rs.day <= %s::date"
+                    bucket_start = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+                    bucket_step = timedelta(days=1)
+                    bucket_fmt = "%Y-%m-%d"
+
+                q_params = [bucket_start, end_dt] + pair_params + params
                 cur.execute(f"""
                     SELECT
                         r.route_id,
@@ -2603,16 +2774,16 @@ async def swap_time_series(
                         UPPER(pair.dest_symbol),
                         r.hops,
                         ch.name,
-                        rs.day,
+                        rs.{chosen_interval},
                         rs.tx_count,
                         rs.swap_count,
                         rs.volume_usd,
                         rs.fees_usd
-                    FROM route_daily_stats rs
+                    FROM {stats_table} rs
                     JOIN route r ON rs.route_id = r.route_id
                     JOIN origin_destination_pair pair ON r.pair_id = pair.id
                     JOIN chain ch ON r.chain_id = ch.id
-                    WHERE rs.day >= %s::date AND rs.day <= %s::date
+                    WHERE {bucket_sql}
                       AND {pair_sql}
                       {net_sql}
                       {exclude_sql}
@@ -2661,18 +2832,18 @@ async def swap_time_series(
                             route_paths[rid] = " ".join(parts)
                 cur.close()
 
-                # Generate contiguous day buckets.
+                # Generate contiguous day/hour buckets.
                 buckets_list = []
-                cur_b = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+                cur_b = bucket_start
                 while cur_b <= end_dt:
-                    buckets_list.append(cur_b.strftime("%Y-%m-%d"))
-                    cur_b += timedelta(days=1)
+                    buckets_list.append(cur_b.strftime(bucket_fmt))
+                    cur_b += bucket_step
                 bucket_set = set(buckets_list)
 
                 series_data = {}
                 for (route_id, origin_sym, dest_sym, hops, chain_name,
-                     day, tx_count, swap_count, volume_usd, fees_usd) in rows:
-                    b_key = day.isoformat() if hasattr(day, 'isoformat') else str(day)[:10]
+                     bucket, tx_count, swap_count, volume_usd, fees_usd) in rows:
+                    b_key = bucket.strftime(bucket_fmt) if hasattr(bucket, 'strftime') else str(bucket)[:10]
                     if b_key not in bucket_set:
                         continue
 
@@ -2755,7 +2926,7 @@ async def swap_time_series(
                 }
 
                 return {
-                    'interval': 'day',
+                    'interval': chosen_interval,
                     'timestamps': buckets_list,
                     'groups': top_groups,
                     'series': formatted_series,
@@ -2763,12 +2934,21 @@ async def swap_time_series(
                     'grand_totals': grand_totals
                 }
 
-        result = await asyncio.to_thread(_fetch_time_series)
+        bucket_lo, bucket_hi = response_cache.align_window(start_dt, end_dt, chosen_interval)
+        cache_key = response_cache.cache_key(
+            "swap_time_series", (start_list, end_list), network, bucket_lo, bucket_hi,
+            interval=chosen_interval, group_by=group_by, direction=direction,
+            max_hops=max_hops, exclude=exclude)
+        watermark = await _route_stats_watermark(PostgresFetcher(), stmt_timeout)
+        result = await response_cache.get_cache().get(
+            cache_key, watermark, lambda emit: asyncio.to_thread(_fetch_time_series))
         if not result:
-            return {"data": None, "n": 0, "start_token": ",".join(start_list),
-                    "end_token": ",".join(end_list), "network": network,
-                    "start_date": start_dt.isoformat(), "end_date": end_dt.isoformat()}
+            return _encoded_response(fmt, {"data": None, "n": 0, "start_token": ",".join(start_list),
+                                           "end_token": ",".join(end_list), "network": network,
+                                           "start_date": start_dt.isoformat(), "end_date": end_dt.isoformat()},
+                                     lambda payload: ([], payload))
 
+        result = dict(result)  # the cached result is shared; label a copy
         result["start_token"] = ",".join(start_list)
         result["end_token"] = ",".join(end_list)
         result["network"] = network
@@ -2776,7 +2956,8 @@ async def swap_time_series(
         result["end_date"] = end_dt.isoformat()
         result["group_by"] = group_by
         result["direction"] = direction
-        return {"data": result}
+        return _encoded_response(fmt, {"data": result},
+                                 lambda payload: rf.time_series_table(payload["data"]))
     except HTTPException:
         raise
     except Exception as e:
@@ -3737,8 +3918,9 @@ async def analyze_pools(
             end_dt = now
             start_dt = end_dt - timedelta(days=1)
 
-        start_tokens_list = resolve_token_input(start_token)
-        end_tokens_list = resolve_token_input(end_token)
+        stmt_timeout = async_db.statement_timeout_ms("pools_search")
+        start_tokens_list = await aresolve_token_input(start_token, stmt_timeout)
+        end_tokens_list = await aresolve_token_input(end_token, stmt_timeout)
         
         if not start_tokens_list: start_tokens_list = [start_token]
         if not end_tokens_list: end_tokens_list = [end_token]
@@ -3753,7 +3935,7 @@ async def analyze_pools(
         if not token_filter:
             token_filter = None
 
-        latest_prices = fetcher.fetch_latest_prices(token_filter)
+        latest_prices = await fetcher.afetch_latest_prices(token_filter, stmt_timeout)
 
         from fastapi.responses import StreamingResponse
         import json
@@ -3848,7 +4030,8 @@ async def analyze_pools(
             # Batch-fetch daily history when requested
             if include_history and pools:
                 pool_ids = [pool['id'] for pool in pools]
-                try:
+
+                def _fetch_history():
                     with get_conn() as conn:
                         cur = conn.cursor()
                         cur.execute("""
@@ -3866,6 +4049,10 @@ async def analyze_pools(
                                 'tx_count': txc or 0,
                             })
                         cur.close()
+                        return hist_by_pool
+
+                try:
+                    hist_by_pool = await asyncio.to_thread(_fetch_history)
                     for pool in pools:
                         pool['history'] = hist_by_pool.get(pool['id'], [])
                 except Exception as e:
@@ -3991,6 +4178,21 @@ def _background_refresh_goal_state(cache_key: tuple) -> None:
                      daemon=True, name="goal-state-refresh").start()
 
 
+@app.on_event("startup")
+async def _open_async_db_pool() -> None:
+    await async_db.open_pool()
+
+
+@app.on_event("shutdown")
+async def _close_async_db_pool() -> None:
+    await async_db.close_pool()
+
+
+@app.on_event("shutdown")
+async def _close_enrichment_client() -> None:
+    await enrichment_client.close_client()
+
+
 @app.on_event("startup")
 def _warm_goal_state_cache() -> None:
     # Warm the goal-state report + reconciliation view at boot so the first
@@ -5147,18 +5349,20 @@ async def get_dag_run_status(dag_id: str, dag_run_id: str):
 async def get_coins():
     """Get list of active indexed coins for the backtester."""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                query = """
-                SELECT symbol, name, image_url as image, cmc_rank as market_cap_rank, slug
-                FROM coin
-                ORDER BY cmc_rank ASC NULLS LAST;
-                """
-                cur.execute(query)
-                colnames = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                coins = [dict(zip(colnames, row)) for row in rows]
-                return coins
+        def _query():
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    query = """
+                    SELECT symbol, name, image_url as image, cmc_rank as market_cap_rank, slug
+                    FROM coin
+                    ORDER BY cmc_rank ASC NULLS LAST;
+                    """
+                    cur.execute(query)
+                    colnames = [desc[0] for desc in cur.description]
+                    rows = cur.fetchall()
+                    return [dict(zip(colnames, row)) for row in rows]
+
+        return await asyncio.to_thread(_query)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -5293,73 +5497,77 @@ async def search_coins_by_symbol(
     WBTC, KBTC, TBTC, ...).
     """
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT coin_id FROM coin WHERE UPPER(symbol) = UPPER(%s)", (symbol.strip(),))
-                matched_coin_ids = [row[0] for row in cur.fetchall()]
-                if not matched_coin_ids:
-                    raise HTTPException(status_code=404, detail=f"No coin found for symbol '{symbol}'")
-
-                if include_coin_families:
-                    # Only expand through the family whose name matches the
-                    # queried symbol (e.g. `BTC` -> the "BTC" family with WBTC,
-                    # KBTC, ...). A coin can also belong to broad meta-families
-                    # like Tier1/STOCK which we must not expand through.
-                    cur.execute("""
-                        SELECT DISTINCT f.name
-                        FROM coin_family f
-                        JOIN coin c ON f.coin_id = c.coin_id
-                        WHERE UPPER(f.name) = UPPER(%s)
-                    """, (symbol.strip(),))
-                    family_names = [row[0] for row in cur.fetchall()]
-                    if family_names:
+        def _query():
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT coin_id FROM coin WHERE UPPER(symbol) = UPPER(%s)", (symbol.strip(),))
+                    matched_coin_ids = [row[0] for row in cur.fetchall()]
+                    if not matched_coin_ids:
+                        raise HTTPException(status_code=404, detail=f"No coin found for symbol '{symbol}'")
+
+                    if include_coin_families:
+                        # Only expand through the family whose name matches the
+                        # queried symbol (e.g. `BTC` -> the "BTC" family with WBTC,
+                        # KBTC, ...). A coin can also belong to broad meta-families
+                        # like Tier1/STOCK which we must not expand through.
                         cur.execute("""
-                            SELECT DISTINCT f.coin_id
+                            SELECT DISTINCT f.name
                             FROM coin_family f
-                            WHERE f.name = ANY(%s)
-                        """, (family_names,))
-                        matched_coin_ids = [row[0] for row in cur.fetchall()]
-
-                cur.execute("""
-                    SELECT c.coin_id, c.symbol, c.name, c.slug, c.hardness,
-                           c.cmc_rank, c.cmc_id, c.first_historical_data,
-                           c.image_url, c.price, c.price_timestamp, c.decimals,
-                           c.percent_change_1h, c.percent_change_24h, c.percent_change_7d,
-                           c.percent_change_30d, c.percent_change_60d, c.percent_change_90d,
-                           c.market_cap, c.market_cap_dominance, c.fully_diluted_market_cap,
-                           c.tvl, c.total_supply, c.circulating_supply, c.max_supply,
-                           c.cmc_last_updated
-                    FROM coin c
-                    WHERE c.coin_id = ANY(%s)
-                    ORDER BY c.coin_id
-                """, (matched_coin_ids,))
-                coins = cur.fetchall()
-
-                coin_cols = [
-                    "coin_id", "symbol", "name", "slug", "hardness",
-                    "cmc_rank", "cmc_id", "first_historical_data",
-                    "image_url", "price", "price_timestamp", "decimals",
-                    "percent_change_1h", "percent_change_24h", "percent_change_7d",
-                    "percent_change_30d", "percent_change_60d", "percent_change_90d",
-                    "market_cap", "market_cap_dominance", "fully_diluted_market_cap",
-                    "tvl", "total_supply", "circulating_supply", "max_supply",
-                    "cmc_last_updated"
-                ]
+                            JOIN coin c ON f.coin_id = c.coin_id
+                            WHERE UPPER(f.name) = UPPER(%s)
+                        """, (symbol.strip(),))
+                        family_names = [row[0] for row in cur.fetchall()]
+                        if family_names:
+                            cur.execute("""
+                                SELECT DISTINCT f.coin_id
+                                FROM coin_family f
+                                WHERE f.name = ANY(%s)
+                            """, (family_names,))
+                            matched_coin_ids = [row[0] for row in cur.fetchall()]
 
-                result = []
-                for row in coins:
-                    coin = dict(zip(coin_cols, row))
-                    coin["price"] = float(coin["price"]) if coin["price"] is not None else None
-                    for col in ("percent_change_1h", "percent_change_24h", "percent_change_7d",
-                                "percent_change_30d", "percent_change_60d", "percent_change_90d",
-                                "market_cap", "market_cap_dominance", "fully_diluted_market_cap",
-                                "tvl", "total_supply", "circulating_supply", "max_supply"):
-                        if coin[col] is not None:
-                            coin[col] = float(coin[col])
-                    for col in ("first_historical_data", "price_timestamp", "cmc_last_updated"):
-                        if coin[col] is not None:
-                            coin[col] = coin[col].isoformat()
-                    result.append(coin)
+                    cur.execute("""
+                        SELECT c.coin_id, c.symbol, c.name, c.slug, c.hardness,
+                               c.cmc_rank, c.cmc_id, c.first_historical_data,
+                               c.image_url, c.price, c.price_timestamp, c.decimals,
+                               c.percent_change_1h, c.percent_change_24h, c.percent_change_7d,
+                               c.percent_change_30d, c.percent_change_60d, c.percent_change_90d,
+                               c.market_cap, c.market_cap_dominance, c.fully_diluted_market_cap,
+                               c.tvl, c.total_supply, c.circulating_supply, c.max_supply,
+                               c.cmc_last_updated
+                        FROM coin c
+                        WHERE c.coin_id = ANY(%s)
+                        ORDER BY c.coin_id
+                    """, (matched_coin_ids,))
+                    coins = cur.fetchall()
+
+                    coin_cols = [
+                        "coin_id", "symbol", "name", "slug", "hardness",
+                        "cmc_rank", "cmc_id", "first_historical_data",
+                        "image_url", "price", "price_timestamp", "decimals",
+                        "percent_change_1h", "percent_change_24h", "percent_change_7d",
+                        "percent_change_30d", "percent_change_60d", "percent_change_90d",
+                        "market_cap", "market_cap_dominance", "fully_diluted_market_cap",
+                        "tvl", "total_supply", "circulating_supply", "max_supply",
+                        "cmc_last_updated"
+                    ]
+
+                    result = []
+                    for row in coins:
+                        coin = dict(zip(coin_cols, row))
+                        coin["price"] = float(coin["price"]) if coin["price"] is not None else None
+                        for col in ("percent_change_1h", "percent_change_24h", "percent_change_7d",
+                                    "percent_change_30d", "percent_change_60d", "percent_change_90d",
+                                    "market_cap", "market_cap_dominance", "fully_diluted_market_cap",
+                                    "tvl", "total_supply", "circulating_supply", "max_supply"):
+                            if coin[col] is not None:
+                                coin[col] = float(coin[col])
+                        for col in ("first_historical_data", "price_timestamp", "cmc_last_updated"):
+                            if coin[col] is not None:
+                                coin[col] = coin[col].isoformat()
+                        result.append(coin)
+                    return result
+
+        result = await asyncio.to_thread(_query)
 
         include = include if include is not None else "contracts,families"
         return build_coin_documents(
@@ -5382,47 +5590,50 @@ async def list_pools(
 ):
     """List liquidity pools with latest stats, ordered by TVL descending."""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                query = """
-                SELECT
-                    p.id, ch.name AS network, pr.name AS protocol, p.pool_name,
-                    CASE WHEN p.fee_bps IS NULL THEN 'Dynamic' ELSE (p.fee_bps / 100.0)::text || '%%' END AS fee_tier,
-                    p.pool_address,
-                    h.tvl_usd, h.volume_usd, h.tx_count, c0.symbol, c1.symbol
-                FROM liquidity_pool p
-                JOIN chain ch ON p.chain_id = ch.id
-                JOIN protocol pr ON p.protocol_id = pr.id
-                JOIN coin c0 ON p.coin0_id = c0.coin_id
-                JOIN coin c1 ON p.coin1_id = c1.coin_id
-                LEFT JOIN (
-                    SELECT DISTINCT ON (pool_id) pool_id, tvl_usd, volume_usd, tx_count
-                    FROM liquidity_pool_daily_stats
-                    ORDER BY pool_id, day DESC
-                ) h ON p.id = h.pool_id
-                WHERE p.reverted = FALSE OR pr.name IN ('Uniswap V3', 'Uniswap V4', 'PancakeSwap V3', 'PancakeSwap V4')
-                ORDER BY h.tvl_usd DESC NULLS LAST
-                LIMIT %s OFFSET %s
-                """
-                cur.execute(query, (limit, offset))
-                rows = cur.fetchall()
+        def _query():
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    query = """
+                    SELECT
+                        p.id, ch.name AS network, pr.name AS protocol, p.pool_name,
+                        CASE WHEN p.fee_bps IS NULL THEN 'Dynamic' ELSE (p.fee_bps / 100.0)::text || '%%' END AS fee_tier,
+                        p.pool_address,
+                        h.tvl_usd, h.volume_usd, h.tx_count, c0.symbol, c1.symbol
+                    FROM liquidity_pool p
+                    JOIN chain ch ON p.chain_id = ch.id
+                    JOIN protocol pr ON p.protocol_id = pr.id
+                    JOIN coin c0 ON p.coin0_id = c0.coin_id
+                    JOIN coin c1 ON p.coin1_id = c1.coin_id
+                    LEFT JOIN (
+                        SELECT DISTINCT ON (pool_id) pool_id, tvl_usd, volume_usd, tx_count
+                        FROM liquidity_pool_daily_stats
+                        ORDER BY pool_id, day DESC
+                    ) h ON p.id = h.pool_id
+                    WHERE p.reverted = FALSE OR pr.name IN ('Uniswap V3', 'Uniswap V4', 'PancakeSwap V3', 'PancakeSwap V4')
+                    ORDER BY h.tvl_usd DESC NULLS LAST
+                    LIMIT %s OFFSET %s
+                    """
+                    cur.execute(query, (limit, offset))
+                    rows = cur.fetchall()
                 
-                pools = []
-                for r in rows:
-                    pools.append({
-                        "id": r[0],
-                        "network": r[1],
-                        "protocol": r[2],
-                        "pool_name": r[3],
-                        "fee_tier": r[4],
-                        "pool_address": r[5],
-                        "tvl_usd": float(r[6]) if r[6] else 0.0,
-                        "volume_24h": float(r[7]) if r[7] else 0.0,
-                        "tx_count": r[8] if r[8] else 0,
-                        "tokens": [r[9], r[10]]
-                    })
+                    pools = []
+                    for r in rows:
+                        pools.append({
+                            "id": r[0],
+                            "network": r[1],
+                            "protocol": r[2],
+                            "pool_name": r[3],
+                            "fee_tier": r[4],
+                            "pool_address": r[5],
+                            "tvl_usd": float(r[6]) if r[6] else 0.0,
+                            "volume_24h": float(r[7]) if r[7] else 0.0,
+                            "tx_count": r[8] if r[8] else 0,
+                            "tokens": [r[9], r[10]]
+                        })
                     
-                return pools
+                    return pools
+
+        return await asyncio.to_thread(_query)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -5686,12 +5897,15 @@ async def sps_find(
     cross_family: bool = Query(False, description="Include cross-family analysis (e.g. USD×EUR)"),
     min_volume: float = Query(10000, description="Minimum divertable volume (USD)"),
     tvl_targets: Optional[str] = Query(None, description="Comma-separated TVL targets for APR projection (e.g. 100000,500000,1000000)"),
+    mode: str = Query("aggregate", pattern="^(aggregate|raw)$",
+                      description="Route source: aggregate (route_daily_stats rollups, default) or raw (full swap scan, for verification)"),
 ):
     """Find stable-pair shortcut opportunities.
 
     Scans multi-hop routes between correlated token families and identifies
     where volume flows through volatile intermediaries like WETH. Returns
-    ranked opportunities with projected revenue and APR.
+    ranked opportunities with projected revenue and APR. Route flows come
+    from the route aggregates unless mode=raw.
     """
     try:
         from datetime import datetime as dt
@@ -5720,6 +5934,8 @@ async def sps_find(
                 min_volume=min_volume,
                 tvl_targets=tvl_list,
                 verbose=False,
+                swap_cache=swap_set_cache.get_cache(),
+                mode=mode,
             )
             opportunities = finder.find(start_dt, end_dt)
             period_days = (end_dt - start_dt).total_seconds() / 86400
@@ -5751,7 +5967,8 @@ async def sps_find(
         pool_stats = {}
         if pools_to_fetch:
             fetcher = PostgresFetcher(verbose=False)
-            latest_prices = fetcher.fetch_latest_prices()
+            latest_prices = await fetcher.afetch_latest_prices(
+                statement_timeout=async_db.statement_timeout_ms("sps"))
             try:
                 aprs = await to_thread.run_sync(
                     fetcher.fetch_pool_stats, list(pools_to_fetch), start_dt, end_dt,
@@ -5782,7 +5999,7 @@ async def sps_find(
                 
                 missing_symbols = [sym for sym in token_symbols if sym not in token_addresses[target_network]]
                 if missing_symbols:
-                    try:
+                    def _lookup_addresses(target_network, missing_symbols):
                         with get_conn() as conn:
                             cur = conn.cursor()
                             db_chain = 'bsc' if target_network.lower() == 'bnb' else target_network.lower()
@@ -5794,11 +6011,16 @@ async def sps_find(
                                 WHERE (LOWER(ch.name) = %s OR (LOWER(ch.name) = 'bnb' AND %s = 'bsc'))
                                   AND UPPER(c.symbol) = ANY(%s)
                             """, (db_chain, db_chain, missing_symbols))
-                            for row in cur.fetchall():
-                                if row[1]:
-                                    token_addresses[target_network][row[0]] = row[1]
-                                    TOKEN_ADDRESS_CACHE[target_network][row[0]] = row[1]
+                            rows = cur.fetchall()
                             cur.close()
+                            return rows
+
+                    try:
+                        rows = await to_thread.run_sync(_lookup_addresses, target_network, missing_symbols)
+                        for row in rows:
+                            if row[1]:
+                                token_addresses[target_network][row[0]] = row[1]
+                                TOKEN_ADDRESS_CACHE[target_network][row[0]] = row[1]
                     except Exception as e:
                         print(f"Error fetching token addresses in SPS: {e}")
 
@@ -5960,7 +6182,9 @@ async def sps_find(
                 v4_batch = await to_thread.run_sync(_lookup_v4_pool_ids)
                 pool_addresses.update(v4_batch)
 
-            for (t0, t1, fee) in pools_to_fetch:
+            # Enrich every pool concurrently: the DexScreener fallbacks go out
+            # as one batched fan-out under the client deadline.
+            async def _pool_stat(t0, t1, fee):
                 t0_norm = t0.upper()
                 t1_norm = t1.upper()
                 if 'v4' in fee.lower():
@@ -5991,7 +6215,7 @@ async def sps_find(
                 apr_str = format_apr(apr_val)
                 defillama_uuid = get_defillama_pool_uuid(pool_addr)
                 pool_protocol = fee_parts[1].strip() if len(fee_parts) >= 2 else "Uniswap V3"
-                pool_stats[f"{t0}-{t1}-{fee}"] = {
+                return f"{t0}-{t1}-{fee}", {
                     'apr': apr_val if apr_val is not None else 0.0,
                     'apr_str': apr_str,
                     'pool_address': pool_addr,
@@ -6000,6 +6224,8 @@ async def sps_find(
                     'links': build_pool_links(pool_addr, None, pool_protocol, pool_network, defillama_uuid),
                 }
 
+            pool_stats.update(await asyncio.gather(*[_pool_stat(t0, t1, fee) for (t0, t1, fee) in pools_to_fetch]))
+
         return {
             'period': {
                 'start': start_date,
@@ -6011,6 +6237,7 @@ async def sps_find(
                 'cross_family': cross_family,
                 'min_volume': min_volume,
                 'tvl_targets': tvl_list,
+                'mode': mode,
             },
             'opportunities': results,
             'pool_stats': pool_stats,
@@ -6030,714 +6257,19 @@ async def read_index():
 async def read_routing():
     return FileResponse(os.path.join(STATIC_DIR, 'routing.html'))
 
-_health_data_cache: Dict[int, tuple] = {}  # lookback_days -> (data, timestamp)
-_health_data_lock = threading.Lock()
-_HEALTH_DATA_TTL = 120  # seconds — health data changes slowly (per ingestion run)
-
 def build_all_tables_health(lookback_days: int = 7):
-    """Build the table-freshness report. Cached for _HEALTH_DATA_TTL seconds.
-
-    Thread-safety: a non-blocking lock ensures only ONE caller runs the (slow)
-    full-swap-scan build; concurrent callers serve the stale cache instead of
-    all piling onto the same 45M-row scan and wedging the DB / event loop.
-    Callers MUST run this off the event loop (asyncio.to_thread) — the swaps
-    aggregation alone can take tens of seconds on a cold cache.
+    """Build the table-freshness report from the incrementally maintained
+    table-health metrics (include/table_health.py) -- the fact tables'
+    triggers keep them current, so this reads small tables only and needs no
+    cache. Callers run it off the event loop (asyncio.to_thread).
     """
-    import time, urllib.parse
-    from datetime import datetime, timezone, timedelta
-
-    now_ts = time.time()
-    cache_entry = _health_data_cache.get(lookback_days)
-    cached = cache_entry[0] if cache_entry else None
-    cached_ts = cache_entry[1] if cache_entry else 0
-    if cached is not None and (now_ts - cached_ts) < _HEALTH_DATA_TTL:
-        return cached
-
-    # Block (up to 60s) waiting for an in-progress builder rather than piling
-    # a second full-swap-scan onto the DB. The acquirer builds; waiters wake
-    # and read the freshly-populated cache.
-    acquired = _health_data_lock.acquire(blocking=True, timeout=60)
-    if not acquired:
-        # Timed out waiting for the builder — serve stale if we have it,
-        # otherwise report degraded so the caller isn't wedged indefinitely.
-        if cached is not None:
-            return cached
-        return (True, {"error": "health check build in progress"})
-    try:
-        # Double-check after acquiring — another builder may have just
-        # finished and refreshed the cache while we waited.
-        cache_entry = _health_data_cache.get(lookback_days)
-        cached = cache_entry[0] if cache_entry else None
-        cached_ts = cache_entry[1] if cache_entry else 0
-        if cached is not None and (time.time() - cached_ts) < _HEALTH_DATA_TTL:
-            _health_data_lock.release()
-            return cached
-    except Exception:
-        _health_data_lock.release()
-        raise
-    # We hold the lock and the cache is stale/empty — build. The lock is
-    # released at the end (and in the double-check's exception path above).
-
-    now = datetime.now(timezone.utc)
-    overall_degraded = False
-    data_dict = {}
-
+    from include.table_health import build_report
     try:
-        conn = psycopg2.connect(DATA_WAREHOUSE_DB, connect_timeout=10)
-        cur = conn.cursor()
-        cur.execute("SET LOCAL statement_timeout = '600s'")
-
-        # 1. swaps (from liquidity_pool_daily_stats — 28MB vs 19GB swaps partition)
-        volume_thresholds = [0, 1000, 100000, 10000000]
-
-        # Single scan of history: get per-chain/protocol cnt/min/max for each volume threshold
-        filter_cols = []
-        for min_vol in volume_thresholds:
-            vol_filter = "" if min_vol == 0 else f"AND v.vol_7d >= {min_vol}"
-            filter_cols.append(f"""
-                COALESCE(SUM(lph.tx_count) FILTER (WHERE 1=1 {vol_filter}), 0) as cnt_{min_vol},
-                MIN(lph.day) FILTER (WHERE 1=1 {vol_filter}) as min_date_{min_vol},
-                MAX(lph.day) FILTER (WHERE 1=1 {vol_filter}) as max_date_{min_vol}
-            """)
-        filter_sql = ','.join(filter_cols)
-
-        cur.execute(f"""
-            SELECT ch.name, pr.name,
-                   {filter_sql}
-            FROM liquidity_pool_daily_stats lph
-            JOIN liquidity_pool lp ON lph.pool_id = lp.id
-            JOIN chain ch ON lp.chain_id = ch.id
-            JOIN protocol pr ON lp.protocol_id = pr.id
-            LEFT JOIN (
-                SELECT pool_id, COALESCE(SUM(volume_usd), 0) as vol_7d
-                FROM liquidity_pool_daily_stats
-                WHERE day >= CURRENT_DATE - INTERVAL '7 days' AND day < CURRENT_DATE
-                GROUP BY pool_id
-            ) v ON lp.id = v.pool_id
-            WHERE lph.day >= CURRENT_DATE - INTERVAL '7 days'
-              AND lph.day < CURRENT_DATE
-            GROUP BY ch.name, pr.name
-            ORDER BY ch.name, pr.name
-        """)
-
-        lph_rows = cur.fetchall()
-
-        # Also get overall earliest swap data and total estimate
-        cur.execute("SELECT MIN(day), MAX(day) FROM liquidity_pool_daily_stats")
-        lph_earliest, lph_latest = cur.fetchone()
-        # Route coverage is derived from the pre-aggregated route tables (the
-        # raw swaps tables are no longer read by the API). Routed swap-log
-        # volume comes from route_daily_stats; pending/unclassified txs come
-        # from the classification queue.
-        cur.execute("""
-            SELECT COALESCE(SUM(swap_count), 0)::bigint
-            FROM route_daily_stats
-        """)
-        routed_log_count = cur.fetchone()[0]
-        cur.execute("""
-            SELECT COUNT(*) FROM route_classification_queue
-            WHERE status <> 'complete'
-        """)
-        unclassified_pending_count = cur.fetchone()[0]
-        swaps_log_count = routed_log_count + unclassified_pending_count
-        swaps_assigned_route_count = routed_log_count
-        swaps_unassigned_route_count = unclassified_pending_count
-        swaps_route_assignment_pct = round(
-            swaps_assigned_route_count / swaps_log_count * 100, 2
-        ) if swaps_log_count else 0
-        swaps_total_estimate = routed_log_count
-
-        swap_matrix_filters = {}
-        for i, min_vol in enumerate(volume_thresholds):
-            swap_chains = {}
-            total_swaps = 0
-            any_swap_stale = False
-            swaps_daily_pass = True
-
-            # Each threshold: 3 cols at positions 2 + i*3 in the row
-            col_offset = 2 + i * 3
-
-            for row in lph_rows:
-                chain = row[0]
-                protocol = row[1]
-                count = row[col_offset] or 0
-                earliest = row[col_offset + 1]
-                latest = row[col_offset + 2]
-
-                if chain not in swap_chains:
-                    swap_chains[chain] = {"status": "fresh", "protocols": {}}
-
-                stale = False
-                if latest:
-                    ft = datetime(latest.year, latest.month, latest.day, tzinfo=timezone.utc)
-                    stale = ft < now - timedelta(hours=3)
-                    if stale and min_vol == 0:
-                        overall_degraded = True
-                    any_swap_stale = stale or any_swap_stale
-                    if ft < now - timedelta(days=2):
-                        swaps_daily_pass = False
-                else:
-                    stale = True
-
-                if stale:
-                    swap_chains[chain]["status"] = "stale"
-
-                swap_chains[chain]["protocols"][protocol] = {
-                    "count": int(count),
-                    "earliest": earliest.isoformat() if earliest else None,
-                    "latest": latest.isoformat() if latest else None,
-                    "checks": {
-                        "has_data_every_day": "pass" if latest and ft >= now - timedelta(days=2) else "fail",
-                        "is_fresher_than_3_hours": "pass" if not stale else "fail"
-                    }
-                }
-                total_swaps += int(count)
-
-            swap_matrix_filters[str(min_vol)] = {
-                "freshness_requirement": "Latest pool history date for each protocol on a chain must be within the last 3 hours",
-                "count": total_swaps,
-                "chains": swap_chains,
-                "checks": {
-                    "has_data_every_day": "pass" if swaps_daily_pass else "fail",
-                    "is_fresher_than_3_hours": "pass" if not any_swap_stale else "fail"
-                }
-            }
-
-        data_dict["swaps"] = {k: v for k, v in swap_matrix_filters["0"].items()}
-        data_dict["swaps"]["volume_filters"] = {k: {x: y for x, y in v.items()} for k, v in swap_matrix_filters.items()}
-        data_dict["swaps"]["earliest_all_time"] = lph_earliest.isoformat() if lph_earliest else None
-        data_dict["swaps"]["total_estimate"] = swaps_total_estimate
-        data_dict["swaps"]["route_assignment"] = {
-            "assigned_count": swaps_assigned_route_count,
-            "unassigned_count": swaps_unassigned_route_count,
-            "total_count": swaps_log_count,
-            "assigned_percentage": swaps_route_assignment_pct
-        }
-
-        # 2. coin
-        cur.execute("SELECT COUNT(*) FROM coin")
-        total_coins = cur.fetchone()[0]
-
-        # Calculate coverage percentages
-        cur.execute("SELECT COUNT(DISTINCT coin_id) FROM coin_contract")
-        coins_with_any_contract = cur.fetchone()[0]
-
-        cur.execute("""
-            SELECT ch.name, COUNT(DISTINCT cc.coin_id)
-            FROM coin_contract cc
-            JOIN chain ch ON cc.chain_id = ch.id
-            WHERE ch.name IN ('Ethereum', 'BNB', 'Arbitrum', 'Base')
-            GROUP BY ch.name
-        """)
-        chain_counts = {row[0]: row[1] for row in cur.fetchall()}
-
-        pct_any = (coins_with_any_contract / total_coins * 100) if total_coins > 0 else 0
-        pct_eth = (chain_counts.get('Ethereum', 0) / total_coins * 100) if total_coins > 0 else 0
-        pct_bnb = (chain_counts.get('BNB', 0) / total_coins * 100) if total_coins > 0 else 0
-        pct_arb = (chain_counts.get('Arbitrum', 0) / total_coins * 100) if total_coins > 0 else 0
-        pct_base = (chain_counts.get('Base', 0) / total_coins * 100) if total_coins > 0 else 0
-
-        coverage_data = {
-            "any_chain_percentage": round(pct_any, 2),
-            "ethereum_percentage": round(pct_eth, 2),
-            "bnb_percentage": round(pct_bnb, 2),
-            "arbitrum_percentage": round(pct_arb, 2),
-            "base_percentage": round(pct_base, 2)
-        }
-
-        cur.execute("""
-            SELECT symbol, cmc_last_updated FROM coin
-            WHERE cmc_last_updated IS NOT NULL ORDER BY cmc_last_updated ASC
-        """)
-        coin_rows = cur.fetchall()
-        if coin_rows:
-            old_sym, old_ts = coin_rows[0]
-            new_sym, new_ts = coin_rows[-1]
-            ft = new_ts if new_ts.tzinfo else new_ts.replace(tzinfo=timezone.utc)
-            coin_stale = ft < now - timedelta(days=2)
-            if coin_stale: overall_degraded = True
-            data_dict["coin"] = {
-                "count": total_coins,
-                "contract_coverage": coverage_data,
-                "oldest": {"symbol": old_sym, "last_updated": old_ts.isoformat() if old_ts else None},
-                "latest": {"symbol": new_sym, "last_updated": new_ts.isoformat() if new_ts else None},
-                "checks": {
-                    "is_fresher_than_2_days": "fail" if coin_stale else "pass"
-                }
-            }
-        else:
-            data_dict["coin"] = {
-                "count": total_coins,
-                "contract_coverage": coverage_data,
-                "checks": {
-                    "is_fresher_than_2_days": "fail"
-                }
-            }
-
-        # 3. coin_price_history
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT coin_id),
-                COUNT(DISTINCT CASE WHEN latest_ts >= (CURRENT_DATE - INTERVAL '1 day') THEN coin_id END)
-            FROM (
-                SELECT coin_id, MAX(timestamp) AS latest_ts FROM coin_price_history GROUP BY coin_id
-            ) sub
-        """)
-        cph_covered_coins, cph_fresh_coins = cur.fetchone()
-        cph_covered_pct = round(cph_covered_coins / total_coins * 100, 2) if total_coins > 0 else 0
-        cph_fresh_pct = round(cph_fresh_coins / total_coins * 100, 2) if total_coins > 0 else 0
-
-        cur.execute("SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM coin_price_history")
-        ph_min, ph_max, ph_count = cur.fetchone()
-        ph_stale = False
-        if ph_max:
-            ft = ph_max if ph_max.tzinfo else ph_max.replace(tzinfo=timezone.utc)
-            ph_stale = ft < now - timedelta(days=2)
-            if ph_stale: overall_degraded = True
-        else:
-            ph_stale = True
-        data_dict["coin_price_history"] = {
-            "freshness_requirement": "Latest price history timestamp must be within the last 2 days",
-            "count": ph_count,
-            "earliest": ph_min.isoformat() if ph_min else None,
-            "latest": ph_max.isoformat() if ph_max else None,
-            "covered_coins": {
-                "count": cph_covered_coins,
-                "percentage": cph_covered_pct,
-                "fresh_count": cph_fresh_coins,
-                "fresh_percentage": cph_fresh_pct
-            },
-            "checks": {
-                "is_fresher_than_2_days": "fail" if ph_stale else "pass"
-            }
-        }
-
-        # 4. liquidity_pool & volume filters matrix (0, 1k, 100k, 10M USD)
-        volume_thresholds = [0, 1000, 100000, 10000000]
-        matrix_filters = {}
-
-        for min_vol in volume_thresholds:
-            cur.execute("""
-                SELECT ch.name, pr.name,
-                       COUNT(lp.id) as total_pools,
-                       COUNT(lp_stats.pool_id) as covered_pools,
-                       COUNT(lp_stats.pool_id) FILTER (WHERE lp_stats.has_tvl = true) as tvl_covered_pools,
-                       COUNT(lp_stats.pool_id) FILTER (WHERE lp_stats.last_history_date >= CURRENT_DATE - INTERVAL '2 days') as fresh_pools,
-                       MAX(lp_stats.last_history_date) as latest_history_date
-                FROM liquidity_pool lp
-                JOIN chain ch ON lp.chain_id = ch.id
-                JOIN protocol pr ON lp.protocol_id = pr.id
-                LEFT JOIN (
-                    SELECT pool_id, 
-                           MAX(day) as last_history_date, 
-                           bool_or(tvl_usd IS NOT NULL AND tvl_usd > 0) as has_tvl,
-                           SUM(CASE WHEN day >= CURRENT_DATE - INTERVAL '7 days' THEN volume_usd ELSE 0 END) as vol_7d
-                    FROM liquidity_pool_daily_stats
-                    GROUP BY pool_id
-                ) lp_stats ON lp.id = lp_stats.pool_id
-                WHERE (%s = 0 OR COALESCE(lp_stats.vol_7d, 0) >= %s)
-                GROUP BY ch.name, pr.name
-                ORDER BY ch.name, pr.name
-            """, (min_vol, min_vol))
-            
-            lp_chains = {}
-            tot_pools = 0
-            tot_covered = 0
-            tot_tvl_covered = 0
-            tot_fresh = 0
-            for chain, protocol, count, covered, tvl_covered, fresh, latest_ts in cur.fetchall():
-                if chain not in lp_chains:
-                    lp_chains[chain] = {"protocols": {}}
-                coverage_pct = round((covered / count * 100)) if count > 0 else 0
-                tvl_coverage_pct = round((tvl_covered / count * 100)) if count > 0 else 0
-                fresh_pct = round((fresh / count * 100)) if count > 0 else 0
-                lp_chains[chain]["protocols"][protocol] = {
-                    "count": count,
-                    "covered_count": covered,
-                    "tvl_covered_count": tvl_covered,
-                    "fresh_count": fresh,
-                    "coverage_percentage": coverage_pct,
-                    "tvl_coverage_percentage": tvl_coverage_pct,
-                    "fresh_percentage": fresh_pct,
-                    "latest_history_date": latest_ts.isoformat() if latest_ts else None
-                }
-                tot_pools += count
-                tot_covered += covered
-                tot_tvl_covered += tvl_covered
-                tot_fresh += fresh
-            
-            ov_coverage_pct = round((tot_covered / tot_pools * 100)) if tot_pools > 0 else 0
-            ov_tvl_coverage_pct = round((tot_tvl_covered / tot_pools * 100)) if tot_pools > 0 else 0
-            ov_fresh_pct = round((tot_fresh / tot_pools * 100)) if tot_pools > 0 else 0
-
-            matrix_filters[str(min_vol)] = {
-                "min_volume": min_vol,
-                "count": tot_pools,
-                "chains": lp_chains,
-                "covered_pools": {
-                    "count": tot_covered,
-                    "percentage": ov_coverage_pct,
-                    "tvl_covered_count": tot_tvl_covered,
-                    "tvl_coverage_percentage": ov_tvl_coverage_pct,
-                    "fresh_count": tot_fresh,
-                    "fresh_percentage": ov_fresh_pct
-                }
-            }
-
-        data_dict["liquidity_pool"] = {k: v for k, v in matrix_filters["0"].items()}
-        data_dict["liquidity_pool"]["volume_filters"] = {k: {x: y for x, y in v.items()} for k, v in matrix_filters.items()}
-
-        # 5. coin_contract
-        cur.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE tracked = true) FROM coin_contract")
-        cc_total, cc_tracked = cur.fetchone()
-
-        cur.execute("""
-            SELECT ch.name, COUNT(*), COUNT(*) FILTER (WHERE cc.tracked = true)
-            FROM coin_contract cc
-            JOIN chain ch ON cc.chain_id = ch.id
-            GROUP BY ch.name
-            ORDER BY ch.name
-        """)
-        cc_chains = {}
-        for chain, chain_total, chain_tracked in cur.fetchall():
-            cc_chains[chain] = {
-                "count": chain_total,
-                "tracked_count": chain_tracked,
-                "untracked_count": chain_total - chain_tracked
-            }
-
-        data_dict["coin_contract"] = {
-            "count": cc_total,
-            "tracked_count": cc_tracked,
-            "untracked_count": cc_total - cc_tracked,
-            "chains": cc_chains
-        }
-
-        # 6. route taxonomy: endpoint pairs, routes, and daily route stats
-        cur.execute("""
-            SELECT ch.name, COUNT(*)
-            FROM origin_destination_pair odp
-            JOIN chain ch ON odp.chain_id = ch.id
-            GROUP BY ch.name
-        """)
-        pair_chains = dict(cur.fetchall())
-        cur.execute("""
-            SELECT ch.name, COUNT(*)
-            FROM route r
-            JOIN chain ch ON r.chain_id = ch.id
-            GROUP BY ch.name
-        """)
-        route_chains = dict(cur.fetchall())
-        cur.execute("""
-            SELECT ch.name, COUNT(DISTINCT r.route_id)
-            FROM route_daily_stats rds
-            JOIN route r ON r.route_id = rds.route_id
-            JOIN chain ch ON r.chain_id = ch.id
-            GROUP BY ch.name
-        """)
-        stats_chains = dict(cur.fetchall())
-        cur.execute("""
-            SELECT ch.name, COUNT(DISTINCT r.route_id)
-            FROM route_daily_stats_bucket rdb
-            JOIN route r ON r.route_id = rdb.route_id
-            JOIN chain ch ON r.chain_id = ch.id
-            GROUP BY ch.name
-        """)
-        bucket_chains = dict(cur.fetchall())
-        cur.execute("""
-            SELECT ch.name, COUNT(DISTINCT r.route_id)
-            FROM route_hop rh
-            JOIN route r ON r.route_id = rh.route_id
-            JOIN chain ch ON r.chain_id = ch.id
-            GROUP BY ch.name
-        """)
-        hop_chains = dict(cur.fetchall())
-        taxonomy_chains = {
-            chain: {
-                "pairs": pair_chains.get(chain, 0),
-                "routes": route_chains.get(chain, 0),
-                "daily_stats": stats_chains.get(chain, 0),
-                "route_daily_stats_bucket": bucket_chains.get(chain, 0),
-                "route_hop": hop_chains.get(chain, 0)
-            }
-            for chain in sorted(set(pair_chains) | set(route_chains) | set(stats_chains) | set(bucket_chains) | set(hop_chains))
-        }
-        cur.execute("SELECT COUNT(*) FROM origin_destination_pair")
-        pair_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM route")
-        route_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(DISTINCT route_id) FROM route_daily_stats")
-        daily_stats_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(DISTINCT route_id) FROM route_daily_stats_bucket")
-        bucket_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(DISTINCT route_id) FROM route_hop")
-        hop_count = cur.fetchone()[0]
-        data_dict["route_taxonomy"] = {
-            "count": route_count,
-            "pairs_count": pair_count,
-            "routes_count": route_count,
-            "daily_stats_count": daily_stats_count,
-            "route_daily_stats_bucket_count": bucket_count,
-            "route_hop_count": hop_count,
-            "chains": taxonomy_chains
-        }
-
-        # 7. coin_family
-        cur.execute("SELECT COUNT(*) FROM coin_family")
-        cf_count = cur.fetchone()[0]
-        data_dict["coin_family"] = {
-            "count": cf_count
-        }
-
-        # 9. chain
-        cur.execute("SELECT name FROM chain ORDER BY id")
-        chain_names = [r[0] for r in cur.fetchall()]
-        data_dict["chain"] = {
-            "count": len(chain_names),
-            "chains": chain_names
-        }
-
-        # 10. protocol
-        cur.execute("SELECT name FROM protocol ORDER BY id")
-        proto_names = [r[0] for r in cur.fetchall()]
-        data_dict["protocol"] = {
-            "count": len(proto_names),
-            "protocols": proto_names
-        }
-
-        # 11. liquidity_pool_daily_stats
-        cur.execute("SELECT COUNT(*) FROM liquidity_pool")
-        total_pools = cur.fetchone()[0]
-
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT pool_id),
-                COUNT(DISTINCT CASE WHEN latest_date >= (CURRENT_DATE - INTERVAL '1 day') THEN pool_id END)
-            FROM (
-                SELECT pool_id, MAX(day) AS latest_date FROM liquidity_pool_daily_stats GROUP BY pool_id
-            ) sub
-        """)
-        lph_covered_pools, lph_fresh_pools = cur.fetchone()
-        lph_covered_pct = round(lph_covered_pools / total_pools * 100, 2) if total_pools > 0 else 0
-        lph_fresh_pct = round(lph_fresh_pools / total_pools * 100, 2) if total_pools > 0 else 0
-
-        cur.execute("SELECT MIN(day), MAX(day), COUNT(*) FROM liquidity_pool_daily_stats")
-        lph_min, lph_max, lph_count = cur.fetchone()
-        lph_stale = False
-        if lph_max:
-            if isinstance(lph_max, datetime):
-                ft = lph_max if lph_max.tzinfo else lph_max.replace(tzinfo=timezone.utc)
-                lph_stale = ft < now - timedelta(days=2)
-            else:
-                lph_stale = lph_max < (now.date() - timedelta(days=2))
-            if lph_stale: overall_degraded = True
-        else:
-            lph_stale = True
-        data_dict["liquidity_pool_daily_stats"] = {
-            "freshness_requirement": "Latest pool history timestamp must be within the last 2 days",
-            "count": lph_count,
-            "earliest": lph_min.isoformat() if lph_min else None,
-            "latest": lph_max.isoformat() if lph_max else None,
-            "covered_pools": {
-                "count": lph_covered_pools,
-                "percentage": lph_covered_pct,
-                "fresh_count": lph_fresh_pools,
-                "fresh_percentage": lph_fresh_pct
-            },
-            "checks": {
-                "is_fresher_than_2_days": "fail" if lph_stale else "pass"
-            }
-        }
-
-        # Per-chain/protocol pool-level passing metric for liquidity_pool_daily_stats matrix
-        # A pool passes if it has TVL > 0 for every day in the lookback window.
-        # Dormant pools (0 tx, 0 vol) with healthy TVL are considered passing.
-        lookback_interval = f'{lookback_days} days'
-        cur.execute("""
-            SELECT ch.name, pr.name,
-                   COUNT(lp.id) as total_pools,
-                   COUNT(*) FILTER (WHERE sub.valid_days >= %s) as passing_pools,
-                   MIN(sub.earliest_valid) as earliest_valid,
-                   MAX(sub.latest_valid) as latest_valid
-            FROM liquidity_pool lp
-            JOIN chain ch ON lp.chain_id = ch.id
-            JOIN protocol pr ON lp.protocol_id = pr.id
-            LEFT JOIN (
-                SELECT lph.pool_id,
-                       COUNT(*) FILTER (WHERE lph.tvl_usd > 0) as valid_days,
-                       MIN(lph.day) FILTER (WHERE lph.tvl_usd > 0) as earliest_valid,
-                       MAX(lph.day) FILTER (WHERE lph.tvl_usd > 0) as latest_valid
-                FROM liquidity_pool_daily_stats lph
-                WHERE lph.day >= CURRENT_DATE - %s::interval
-                  AND lph.day < CURRENT_DATE
-                GROUP BY lph.pool_id
-            ) sub ON lp.id = sub.pool_id
-            GROUP BY ch.name, pr.name
-            ORDER BY ch.name, pr.name
-        """, (lookback_days, lookback_interval))
-
-        lph_chains = {}
-        for chain, protocol, total_pools, passing_pools, earliest, latest in cur.fetchall():
-            if chain not in lph_chains:
-                lph_chains[chain] = {"protocols": {}}
-
-            is_fresh = False
-            if latest:
-                if isinstance(latest, datetime):
-                    ft = latest if latest.tzinfo else latest.replace(tzinfo=timezone.utc)
-                    is_fresh = ft >= now - timedelta(days=2)
-                else:
-                    is_fresh = latest >= (now.date() - timedelta(days=2))
-
-            passing_pct = round(passing_pools / total_pools * 100, 1) if total_pools > 0 else 0.0
-
-            lph_chains[chain]["protocols"][protocol] = {
-                "total_pools": total_pools,
-                "passing_pools": passing_pools,
-                "passing_pct": passing_pct,
-                "lookback_days": lookback_days,
-                "earliest": earliest.isoformat() if earliest else None,
-                "latest": latest.isoformat() if latest else None,
-                "checks": {
-                    "is_fresher_than_2_days": "pass" if is_fresh else "fail"
-                }
-            }
-
-        data_dict["liquidity_pool_daily_stats"]["lookback_days"] = lookback_days
-        data_dict["liquidity_pool_daily_stats"]["chains"] = lph_chains
-
-        # Per-volume-threshold passing metrics for liquidity_pool_daily_stats
-        lph_volume_filters = {}
-        for min_vol in volume_thresholds:
-            cur.execute("""
-                SELECT ch.name, pr.name,
-                       COUNT(lp.id) as total_pools,
-                       COUNT(*) FILTER (WHERE sub.valid_days >= %s) as passing_pools,
-                       MIN(sub.earliest_valid) as earliest,
-                       MAX(sub.latest_valid) as latest
-                FROM liquidity_pool lp
-                JOIN chain ch ON lp.chain_id = ch.id
-                JOIN protocol pr ON lp.protocol_id = pr.id
-                LEFT JOIN (
-                    SELECT lph.pool_id,
-                           COUNT(*) FILTER (WHERE lph.tvl_usd > 0) as valid_days,
-MIN(lph.day) FILTER (WHERE lph.tvl_usd > 0) as earliest_valid,
-                       MAX(lph.day) FILTER (WHERE lph.tvl_usd > 0) as latest_valid,
-                            SUM(CASE WHEN day >= CURRENT_DATE - %s::interval THEN volume_usd ELSE 0 END) as vol_window
-                    FROM liquidity_pool_daily_stats lph
-                    WHERE lph.day >= CURRENT_DATE - %s::interval
-                      AND lph.day < CURRENT_DATE
-                    GROUP BY lph.pool_id
-                ) sub ON lp.id = sub.pool_id
-                WHERE (%s = 0 OR COALESCE(sub.vol_window, 0) >= %s)
-                GROUP BY ch.name, pr.name
-                ORDER BY ch.name, pr.name
-            """, (lookback_days, lookback_interval, lookback_interval, min_vol, min_vol))
-
-            lph_threshold_chains = {}
-            tot_pools = 0
-            tot_passing = 0
-            for chain, protocol, total_pools, passing_pools, earliest, latest in cur.fetchall():
-                if chain not in lph_threshold_chains:
-                    lph_threshold_chains[chain] = {"protocols": {}}
-
-                passing_pct = round(passing_pools / total_pools * 100, 1) if total_pools > 0 else 0.0
-
-                lph_threshold_chains[chain]["protocols"][protocol] = {
-                    "total_pools": total_pools,
-                    "passing_pools": passing_pools,
-                    "passing_pct": passing_pct,
-                    "earliest": earliest.isoformat() if earliest else None,
-                    "latest": latest.isoformat() if latest else None,
-                }
-                tot_pools += total_pools
-                tot_passing += passing_pools
-
-            lph_volume_filters[str(min_vol)] = {
-                "chains": lph_threshold_chains,
-                "count": tot_pools,
-                "covered_pools": {
-                    "count": tot_passing,
-                    "percentage": round(tot_passing / tot_pools * 100, 2) if tot_pools > 0 else 0,
-                }
-            }
-
-        data_dict["liquidity_pool_daily_stats"]["volume_filters"] = lph_volume_filters
-
-        # 12. liquidity_pool_position
-        cur.execute("SELECT COUNT(*) FROM liquidity_pool_position")
-        lpp_count = cur.fetchone()[0]
-
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT position_id),
-                COUNT(DISTINCT CASE WHEN latest_ts >= (CURRENT_DATE - INTERVAL '1 day') THEN position_id END)
-            FROM (
-                SELECT position_id, MAX(timestamp) AS latest_ts FROM liquidity_pool_position_snapshot GROUP BY position_id
-            ) sub
-        """)
-        lpps_covered_pos, lpps_fresh_pos = cur.fetchone()
-        lpps_covered_pct = round(lpps_covered_pos / lpp_count * 100, 2) if lpp_count > 0 else 0
-        lpps_fresh_pct = round(lpps_fresh_pos / lpp_count * 100, 2) if lpp_count > 0 else 0
-
-        data_dict["liquidity_pool_position"] = {
-            "count": lpp_count,
-            "snapshot_coverage": {
-                "covered_positions_count": lpps_covered_pos,
-                "covered_positions_percentage": lpps_covered_pct,
-                "fresh_positions_count": lpps_fresh_pos,
-                "fresh_positions_percentage": lpps_fresh_pct
-            }
-        }
-
-        # 13. liquidity_pool_position_event
-        cur.execute("SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM liquidity_pool_position_event")
-        lppe_min, lppe_max, lppe_count = cur.fetchone()
-        data_dict["liquidity_pool_position_event"] = {
-            "count": lppe_count,
-            "earliest": lppe_min.isoformat() if lppe_min else None,
-            "latest": lppe_max.isoformat() if lppe_max else None
-        }
-
-        # 14. liquidity_pool_position_snapshot
-        cur.execute("SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM liquidity_pool_position_snapshot")
-        lpps_min, lpps_max, lpps_count = cur.fetchone()
-        lpps_stale = False
-        if lpps_max:
-            ft = lpps_max if lpps_max.tzinfo else lpps_max.replace(tzinfo=timezone.utc)
-            lpps_stale = ft < now - timedelta(days=2)
-            if lpps_stale: overall_degraded = True
-        else:
-            lpps_stale = True
-        data_dict["liquidity_pool_position_snapshot"] = {
-            "freshness_requirement": "Latest pool position snapshot timestamp must be within the last 2 days",
-            "count": lpps_count,
-            "earliest": lpps_min.isoformat() if lpps_min else None,
-            "latest": lpps_max.isoformat() if lpps_max else None,
-            "covered_positions": {
-                "count": lpps_covered_pos,
-                "percentage": lpps_covered_pct,
-                "fresh_count": lpps_fresh_pos,
-                "fresh_percentage": lpps_fresh_pct
-            },
-            "checks": {
-                "has_data_every_day": "pass" if lpps_max else "fail",
-                "is_fresher_than_2_days": "fail" if lpps_stale else "pass"
-            }
-        }
-
-        cur.close()
-        conn.close()
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                return build_report(cur, lookback_days)
     except Exception as e:
-        overall_degraded = True
-        data_dict["error"] = str(e)
-
-    res_tuple = (overall_degraded, data_dict)
-    _health_data_cache[lookback_days] = (res_tuple, time.time())
-
-    if acquired:
-        _health_data_lock.release()
-    return res_tuple
+        return (True, {"error": str(e)})
 
 
 def navigate_health_data(data_obj, path_str: str):
@@ -6809,6 +6341,45 @@ async def health_check(lph_lookback: int = Query(7, ge=1, le=365)):
     }
 
 
+@app.get("/health/db/pool", tags=["System"])
+async def health_db_pool():
+    """Connection-pool saturation: connections in use / waiting, wait times and
+    acquire timeouts for the sync (thread-offloaded) and async pools."""
+    return async_db.pool_stats()
+
+
+@app.get("/health/cache", tags=["System"])
+async def health_cache():
+    """In-process caches: the route response cache (hits, stale hits,
+    coalesced requests, watermark invalidations), the prepared swap-set
+    cache of the counterfactual tools and the DexScreener enrichment client
+    (hits, negative hits, batched requests, deadline timeouts)."""
+    return {
+        "response_cache": dict(response_cache.get_cache().stats(),
+                               watermark=_ROUTE_STATS_WATERMARK["version"]),
+        "swap_set_cache": swap_set_cache.get_cache().stats(),
+        "enrichment_client": enrichment_client.get_client().stats(),
+    }
+
+
+def _classification_health(runs: int) -> dict:
+    from include.route_queue_consumer import classification_health
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            return classification_health(cur, runs=runs)
+
+
+@app.get("/health/classification", tags=["System"])
+async def health_classification(runs: int = Query(10, ge=1, le=100)):
+    """Route classification queue: live depth (pending / ready / processing,
+    oldest pending age) and the latest consumer runs (batches, legs/sec,
+    per-batch latency p50/p95/max)."""
+    try:
+        return await asyncio.to_thread(_classification_health, runs)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"classification health error: {e}")
+
+
 @app.get("/health/db/table", tags=["System"])
 @app.get("/health/db/table/{subpath:path}", tags=["System"])
 async def health_table_subpath(subpath: str = ""):
@@ -0,0 +1,155 @@
+"""Async Postgres access for the FastAPI event loop.
+
+postgres_fetcher.get_conn() is synchronous (psycopg2): endpoints must wrap it
+in asyncio.to_thread, and every call holds a worker thread for the length of
+the query. This module keeps a psycopg 3 AsyncConnectionPool so hot endpoints
+can await their queries on the loop instead.
+
+  - Pool sizing from DB_ASYNC_POOL_MIN / DB_ASYNC_POOL_MAX (default 2 / 20),
+    acquire timeout from DB_POOL_ACQUIRE_TIMEOUT (shared with the sync pool).
+  - Per-endpoint statement timeouts: statement_timeout_ms("undercut") reads
+    DB_STATEMENT_TIMEOUT_MS_UNDERCUT, falling back to DB_STATEMENT_TIMEOUT_MS
+    (default 30000). The timeout is transaction-local, so it never leaks into
+    the next borrower.
+  - Saturation metrics (in use / waiting / wait times) for both pools via
+    pool_stats(), served at /health/db/pool.
+
+psycopg 3 and psycopg_pool are optional. Without them (or before
+open_pool() ran) fetch_all()/fetch_one() run the same SQL on the sync pool in
+a worker thread, so callers never need to know which path served them. The
+SQL is shared with postgres_fetcher: both drivers use %s placeholders and
+adapt Python lists to arrays.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import DATA_WAREHOUSE_DB
+from postgres_fetcher import DB_POOL_ACQUIRE_TIMEOUT, SYNC_POOL_METRICS, PoolMetrics, get_conn
+
+try:
+    from psycopg_pool import AsyncConnectionPool, PoolTimeout
+except ImportError:  # async driver is optional; fall back to the sync pool in a thread
+    AsyncConnectionPool = PoolTimeout = None
+
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "2"))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "20"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+ASYNC_POOL_METRICS = PoolMetrics(DB_ASYNC_POOL_MAX)
+
+_POOL = None
+
+
+def statement_timeout_ms(endpoint: Optional[str] = None) -> int:
+    """Statement timeout for an endpoint: DB_STATEMENT_TIMEOUT_MS_<ENDPOINT>
+    when set, else DB_STATEMENT_TIMEOUT_MS. 0 means the server default."""
+    if endpoint:
+        val = os.getenv(f"DB_STATEMENT_TIMEOUT_MS_{endpoint.upper()}")
+        if val:
+            return int(val)
+    return DB_STATEMENT_TIMEOUT_MS
+
+
+async def open_pool() -> None:
+    """Create and open the async pool (app startup). A no-op without
+    psycopg_pool. Does not wait for the first connection, so the app still
+    boots while the database is unreachable."""
+    global _POOL
+    if AsyncConnectionPool is None or _POOL is not None:
+        return
+    pool = AsyncConnectionPool(DATA_WAREHOUSE_DB, min_size=DB_ASYNC_POOL_MIN,
+                               max_size=DB_ASYNC_POOL_MAX, timeout=DB_POOL_ACQUIRE_TIMEOUT,
+                               open=False, name="api-async")
+    await pool.open(wait=False)
+    _POOL = pool
+
+
+async def close_pool() -> None:
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None:
+        await pool.close()
+
+
+def is_async() -> bool:
+    """True when queries run on the async pool rather than a worker thread."""
+    return _POOL is not None
+
+
+@asynccontextmanager
+async def aget_conn(statement_timeout: Optional[int] = None):
+    """Borrow an async connection; the transaction is rolled back on exit.
+
+    Raises RuntimeError when the async pool is not open (use fetch_all /
+    fetch_one for transparent fallback)."""
+    pool = _POOL
+    if pool is None:
+        raise RuntimeError("async connection pool is not open")
+    t0 = time.monotonic()
+    ASYNC_POOL_METRICS.begin_wait()
+    try:
+        conn = await pool.getconn()
+    except Exception as e:
+        ASYNC_POOL_METRICS.gave_up(timeout=isinstance(e, PoolTimeout))
+        raise
+    ASYNC_POOL_METRICS.acquired(time.monotonic() - t0)
+    try:
+        if statement_timeout:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT set_config('statement_timeout', %s, true)",
+                                  (f"{int(statement_timeout)}ms",))
+        yield conn
+    finally:
+        try:
+            await conn.rollback()
+        except Exception:
+            pass
+        await pool.putconn(conn)
+        ASYNC_POOL_METRICS.released()
+
+
+def _fetch_sync(sql: str, params: Optional[Sequence[Any]], statement_timeout: Optional[int],
+                one: bool):
+    with get_conn(statement_timeout) as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchone() if one else cur.fetchall()
+        cur.close()
+    return rows
+
+
+async def fetch_all(sql: str, params: Optional[Sequence[Any]] = None,
+                    statement_timeout: Optional[int] = None) -> List[tuple]:
+    """Run a read-only query and return all rows as tuples, without blocking
+    the event loop."""
+    if _POOL is None:
+        return await asyncio.to_thread(_fetch_sync, sql, params, statement_timeout, False)
+    async with aget_conn(statement_timeout) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchall()
+
+
+async def fetch_one(sql: str, params: Optional[Sequence[Any]] = None,
+                    statement_timeout: Optional[int] = None) -> Optional[tuple]:
+    """Like fetch_all() for a single row (None when the query returns none)."""
+    if _POOL is None:
+        return await asyncio.to_thread(_fetch_sync, sql, params, statement_timeout, True)
+    async with aget_conn(statement_timeout) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchone()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Saturation metrics for the sync (psycopg2) and async pools."""
+    out = {"sync": SYNC_POOL_METRICS.snapshot(),
+           "async": dict(ASYNC_POOL_METRICS.snapshot(), enabled=_POOL is not None,
+                         driver_installed=AsyncConnectionPool is not None)}
+    if _POOL is not None:
+        out["async"]["pool"] = _POOL.get_stats()
+    return out
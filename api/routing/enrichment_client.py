@@ -0,0 +1,284 @@
+"""Async client for the external pool enrichment APIs (DexScreener, DeFi Llama).
+
+get_enriched_pool_stat falls back to DexScreener for the TVL of pools whose
+warehouse TVL is missing or implausible. It used to issue one blocking
+requests.get per pool (3s timeout, no connection reuse) and cached only
+successes, so a pool DexScreener does not know was re-requested on every
+call, and the undercut/SPS loops awaited those lookups one pool at a time.
+
+This module replaces that with:
+
+  - Keep-alive pooling: one aiohttp ClientSession per event loop, capped at
+    ENRICH_MAX_CONNECTIONS. Without aiohttp, a pooled requests.Session runs
+    the same requests in worker threads, so callers never need to know which
+    path served them.
+  - Batching: lookups requested in the same loop iteration are grouped per
+    chain and sent as /latest/dex/pairs/{chain}/{a,b,...} with up to
+    DEXSCREENER_BATCH pair addresses each. A lookup already in flight is
+    shared instead of requested again.
+  - TTL and negative caching: a TVL is kept for ENRICH_TTL_S. A pair that
+    DexScreener does not return is cached as None for ENRICH_NEGATIVE_TTL_S,
+    and a failed request (timeout, 429, 5xx) for ENRICH_ERROR_TTL_S.
+  - Deadlines: each caller waits at most `deadline_s` and then gets None (the
+    caller keeps the warehouse TVL). The request keeps running, and its result
+    still lands in the cache for the next caller.
+
+The base URLs come from DEXSCREENER_URL / DEFILLAMA_YIELDS_URL, so tests
+(and staging) can point the client at a local stub server.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # async transport is optional; fall back to a pooled requests.Session
+    aiohttp = None
+
+DEXSCREENER_URL = os.getenv("DEXSCREENER_URL", "https://api.dexscreener.com").rstrip("/")
+DEFILLAMA_YIELDS_URL = os.getenv("DEFILLAMA_YIELDS_URL", "https://yields.llama.fi").rstrip("/")
+
+ENRICH_HTTP_TIMEOUT_S = float(os.getenv("ENRICH_HTTP_TIMEOUT_S", "3"))
+ENRICH_DEADLINE_S = float(os.getenv("ENRICH_DEADLINE_S", "4"))
+ENRICH_TTL_S = float(os.getenv("ENRICH_TTL_S", "600"))
+ENRICH_NEGATIVE_TTL_S = float(os.getenv("ENRICH_NEGATIVE_TTL_S", "1800"))
+ENRICH_ERROR_TTL_S = float(os.getenv("ENRICH_ERROR_TTL_S", "60"))
+ENRICH_MAX_CONNECTIONS = int(os.getenv("ENRICH_MAX_CONNECTIONS", "16"))
+ENRICH_CACHE_MAX_ENTRIES = int(os.getenv("ENRICH_CACHE_MAX_ENTRIES", "50000"))
+# DexScreener accepts at most 30 comma-separated pair addresses per request.
+DEXSCREENER_BATCH = 30
+
+# Portal network name (lowercase) -> DexScreener chainId.
+DEXSCREENER_CHAINS = {
+    'ethereum': 'ethereum',
+    'arbitrum': 'arbitrum',
+    'base': 'base',
+    'bnb': 'bsc',
+    'bsc': 'bsc',
+}
+
+
+class TTLCache:
+    """Bounded map whose entries expire; None is a valid (negative) value."""
+
+    def __init__(self, max_entries: int = ENRICH_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> (value, expires_at)
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key) -> Tuple[bool, Any]:
+        """(found, value); expired entries are dropped."""
+        ent = self._data.get(key)
+        if ent is None:
+            return False, None
+        if ent[1] <= self._clock():
+            del self._data[key]
+            return False, None
+        return True, ent[0]
+
+    def put(self, key, value, ttl_s: float) -> None:
+        if ttl_s <= 0 or self.max_entries <= 0:
+            return
+        self._data.pop(key, None)
+        self._data[key] = (value, self._clock() + ttl_s)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EnrichmentClient:
+    """Batched, cached DexScreener TVL lookups over a pooled HTTP session."""
+
+    def __init__(self, dexscreener_url: str = DEXSCREENER_URL,
+                 timeout_s: float = ENRICH_HTTP_TIMEOUT_S,
+                 ttl_s: float = ENRICH_TTL_S,
+                 negative_ttl_s: float = ENRICH_NEGATIVE_TTL_S,
+                 error_ttl_s: float = ENRICH_ERROR_TTL_S,
+                 max_connections: int = ENRICH_MAX_CONNECTIONS,
+                 batch_size: int = DEXSCREENER_BATCH,
+                 max_entries: int = ENRICH_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic,
+                 use_aiohttp: bool = True):
+        self.dexscreener_url = dexscreener_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.error_ttl_s = error_ttl_s
+        self.max_connections = max_connections
+        self.batch_size = max(1, min(batch_size, DEXSCREENER_BATCH))
+        self.use_aiohttp = use_aiohttp and aiohttp is not None
+        self._cache = TTLCache(max_entries, clock)
+        # (chain, address) -> future shared by every caller waiting on it
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        # chain -> addresses to send in the next flush
+        self._queued: Dict[str, List[str]] = {}
+        self._flush_scheduled = False
+        self._tasks: set = set()
+        self._session = None
+        self._session_loop = None
+        self._requests: Optional[requests.Session] = None
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0,
+                       "requests": 0, "errors": 0, "timeouts": 0}
+
+    # -- public API -----------------------------------------------------
+
+    async def dexscreener_tvl(self, network: Optional[str], pool_addr: Optional[str],
+                              deadline_s: Optional[float] = ENRICH_DEADLINE_S) -> Optional[float]:
+        """DexScreener liquidity (USD) of one pair, or None when unknown,
+        unsupported, failed or not answered within deadline_s."""
+        chain = DEXSCREENER_CHAINS.get((network or '').lower())
+        if not chain or not pool_addr:
+            return None
+        key = (chain, pool_addr.lower())
+        found, value = self._cache.get(key)
+        if found:
+            self._stats["hits" if value is not None else "negative_hits"] += 1
+            return value
+
+        fut = self._pending.get(key)
+        if fut is None:
+            self._stats["misses"] += 1
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._pending[key] = fut
+            self._queued.setdefault(chain, []).append(key[1])
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_soon(self._flush)
+        else:
+            self._stats["coalesced"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), deadline_s)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            return None
+
+    async def dexscreener_tvls(self, pools: Iterable[Tuple[Optional[str], Optional[str]]],
+                               deadline_s: Optional[float] = ENRICH_DEADLINE_S
+                               ) -> Dict[Tuple[str, str], Optional[float]]:
+        """Fan out dexscreener_tvl over (network, address) pairs under one
+        deadline; keyed by (network, address) as passed in."""
+        pools = list(dict.fromkeys(pools))
+        values = await asyncio.gather(*[self.dexscreener_tvl(n, a, deadline_s) for n, a in pools])
+        return dict(zip(pools, values))
+
+    async def close(self) -> None:
+        session, self._session, self._session_loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+        if self._requests is not None:
+            self._requests.close()
+            self._requests = None
+
+    def stats(self) -> dict:
+        return dict(self._stats, entries=len(self._cache), in_flight=len(self._pending),
+                    transport="aiohttp" if self.use_aiohttp else "requests")
+
+    # -- internals ------------------------------------------------------
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        queued, self._queued = self._queued, {}
+        for chain, addrs in queued.items():
+            for i in range(0, len(addrs), self.batch_size):
+                task = asyncio.ensure_future(self._fetch_batch(chain, addrs[i:i + self.batch_size]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_batch(self, chain: str, addrs: List[str]) -> None:
+        url = f"{self.dexscreener_url}/latest/dex/pairs/{chain}/{','.join(addrs)}"
+        found: Dict[str, float] = {}
+        ttl_missing = self.negative_ttl_s
+        try:
+            self._stats["requests"] += 1
+            status, data = await self._get_json(url)
+            if status == 200 and isinstance(data, dict):
+                pairs = data.get('pairs') or ([data['pair']] if data.get('pair') else [])
+                for pair in pairs:
+                    liq = (pair.get('liquidity') or {}).get('usd')
+                    addr = (pair.get('pairAddress') or '').lower()
+                    if liq is not None and addr:
+                        found[addr] = float(liq)
+            elif status != 404:
+                self._stats["errors"] += 1
+                ttl_missing = self.error_ttl_s
+                print(f"[enrichment] DexScreener {chain} batch of {len(addrs)}: HTTP {status}")
+        except Exception as e:
+            self._stats["errors"] += 1
+            ttl_missing = self.error_ttl_s
+            print(f"[enrichment] DexScreener {chain} batch of {len(addrs)} failed: {e!r}")
+        finally:
+            for addr in addrs:
+                key = (chain, addr)
+                value = found.get(addr)
+                self._cache.put(key, value, self.ttl_s if value is not None else ttl_missing)
+                fut = self._pending.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_result(value)
+
+    async def _get_json(self, url: str) -> Tuple[int, Any]:
+        if self.use_aiohttp:
+            async with self._aiohttp_session().get(url) as resp:
+                if resp.status != 200:
+                    return resp.status, None
+                return resp.status, await resp.json(content_type=None)
+        return await asyncio.to_thread(self._get_json_sync, url)
+
+    def _aiohttp_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout_s),
+                headers={"Accept": "application/json"})
+            self._session_loop = loop
+        return self._session
+
+    def _get_json_sync(self, url: str) -> Tuple[int, Any]:
+        resp = self._requests_session().get(url, timeout=self.timeout_s)
+        return resp.status_code, (resp.json() if resp.status_code == 200 else None)
+
+    def _requests_session(self) -> requests.Session:
+        if self._requests is None:
+            self._requests = pooled_session(self.max_connections)
+        return self._requests
+
+
+def pooled_session(max_connections: int = ENRICH_MAX_CONNECTIONS) -> requests.Session:
+    """requests.Session with a keep-alive pool of max_connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept"] = "application/json"
+    return session
+
+
+_CLIENT: Optional[EnrichmentClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> EnrichmentClient:
+    """Process-wide client configured from the ENRICH_* / DEXSCREENER_URL
+    environment variables."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = EnrichmentClient()
+        return _CLIENT
+
+
+async def close_client() -> None:
+    if _CLIENT is not None:
+        await _CLIENT.close()
@@ -12,6 +12,7 @@ Usage:
     python find_shortcuts.py --days 30 --format json
     python find_shortcuts.py --days 30 --tvl-targets 100000 500000 1000000
     python find_shortcuts.py --days 30 --min-volume 5000
+    python find_shortcuts.py --days 30 --mode raw
 """
 
 import argparse
@@ -19,7 +20,7 @@ import json
 import sys
 from datetime import datetime, timedelta
 
-from shortcut_finder import ShortcutFinder, DEFAULT_TVL_TARGETS, DEFAULT_MIN_VOLUME
+from shortcut_finder import ShortcutFinder, DEFAULT_TVL_TARGETS, DEFAULT_MIN_VOLUME, FINDER_MODES
 
 
 def parse_date(date_str: str) -> datetime:
@@ -50,6 +51,9 @@ Examples:
   # Lower minimum volume threshold to catch smaller opportunities
   python find_shortcuts.py --days 30 --min-volume 1000
 
+  # Verify against a full raw-swap scan instead of the route aggregates
+  python find_shortcuts.py --days 30 --mode raw
+
   # JSON output for programmatic use
   python find_shortcuts.py --days 30 --format json
 
@@ -85,6 +89,12 @@ Examples:
         help='TVL targets for APR projections (default: 100000 500000 1000000)'
     )
 
+    # Route source
+    parser.add_argument(
+        '--mode', choices=FINDER_MODES, default='aggregate',
+        help='Route source: aggregate (route_daily_stats rollups, default) or raw (full swap scan, for verification)'
+    )
+
     # Output
     parser.add_argument(
         '--format', choices=['table', 'json'], default='table',
@@ -115,6 +125,7 @@ Examples:
         min_volume=args.min_volume,
         tvl_targets=args.tvl_targets,
         verbose=args.verbose,
+        mode=args.mode,
     )
 
     # Run analysis
@@ -133,6 +144,7 @@ Examples:
                 'cross_family': args.cross_family,
                 'min_volume': args.min_volume,
                 'tvl_targets': args.tvl_targets,
+                'mode': args.mode,
             },
             'opportunities': finder.to_json(opportunities, period_days),
         }
@@ -6,16 +6,20 @@ for specified tokens within a given time range.
 """
 
 import os
+import threading
+import time
+import uuid
 import psycopg2
-from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from eth_hash.auto import keccak
 from config import (
     DATA_WAREHOUSE_DB,
     ADDRESS_TO_SYMBOL
 )
+from include.route_classifier import route_path_tokens
 
 try:
     import yaml
@@ -193,7 +197,71 @@ def _derive_canonical_address(proto: str, net: str, fee_bps: Optional[float],
 # caller that borrows get_conn()). Eliminates per-call TCP+auth handshake.
 # ---------------------------------------------------------------------------
 _POOL: Optional[ThreadedConnectionPool] = None
-_POOL_MAXCONN = 8
+_POOL_MAXCONN = int(os.getenv("DB_POOL_MAXCONN", "8"))
+# Seconds a caller waits for a free connection before PoolError. psycopg2's
+# pool raises immediately when exhausted; the semaphore makes callers queue.
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+_POOL_SLOTS = threading.BoundedSemaphore(_POOL_MAXCONN)
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters for one connection pool.
+
+    Tracks connections in use, callers waiting for one, and wait times, so
+    /health/db/pool can show how close the pool is to saturation."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._in_use = self._peak_in_use = 0
+        self._waiting = self._peak_waiting = 0
+        self._acquired = self._timeouts = self._errors = 0
+        self._wait_total = self._wait_max = 0.0
+
+    def begin_wait(self) -> None:
+        with self._lock:
+            self._waiting += 1
+            self._peak_waiting = max(self._peak_waiting, self._waiting)
+
+    def acquired(self, waited: float) -> None:
+        with self._lock:
+            self._waiting -= 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def gave_up(self, timeout: bool) -> None:
+        with self._lock:
+            self._waiting -= 1
+            if timeout:
+                self._timeouts += 1
+            else:
+                self._errors += 1
+
+    def released(self) -> None:
+        with self._lock:
+            self._in_use -= 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "waiting": self._waiting,
+                "peak_waiting": self._peak_waiting,
+                "saturation": self._in_use / self.max_size if self.max_size else 0.0,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+                "avg_wait_ms": 1000.0 * self._wait_total / self._acquired if self._acquired else 0.0,
+                "max_wait_ms": 1000.0 * self._wait_max,
+            }
+
+
+SYNC_POOL_METRICS = PoolMetrics(_POOL_MAXCONN)
 
 
 def _get_pool() -> ThreadedConnectionPool:
@@ -205,16 +273,64 @@ def _get_pool() -> ThreadedConnectionPool:
     return _POOL
 
 
+def _checkout():
+    """Take a connection from the pool, waiting up to DB_POOL_ACQUIRE_TIMEOUT
+    for one to free up. Pair with _checkin()."""
+    t0 = time.monotonic()
+    SYNC_POOL_METRICS.begin_wait()
+    if not _POOL_SLOTS.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT):
+        SYNC_POOL_METRICS.gave_up(timeout=True)
+        raise PoolError(f"connection pool exhausted (waited {DB_POOL_ACQUIRE_TIMEOUT:g}s)")
+    try:
+        conn = _get_pool().getconn()
+    except Exception:
+        _POOL_SLOTS.release()
+        SYNC_POOL_METRICS.gave_up(timeout=False)
+        raise
+    SYNC_POOL_METRICS.acquired(time.monotonic() - t0)
+    return conn
+
+
+def _checkin(conn) -> None:
+    try:
+        _get_pool().putconn(conn)
+    finally:
+        _POOL_SLOTS.release()
+        SYNC_POOL_METRICS.released()
+
+
+def set_statement_timeout(cur, statement_timeout_ms: int) -> None:
+    """Transaction-local statement_timeout (reset when the transaction ends)."""
+    cur.execute("SELECT set_config('statement_timeout', %s, true)",
+                (f"{int(statement_timeout_ms)}ms",))
+
+
+# Rows per round trip for iter_swaps()' server-side cursor: large enough to
+# amortize the fetch, small enough that one batch is a few MB of dicts.
+SWAP_ITERSIZE = int(os.getenv("SWAP_ITERSIZE", "20000"))
+
+
+def _swap_columns(batch: List[Dict]) -> Dict[str, list]:
+    """Transpose a batch of fetch_swaps() row dicts into {field: [values]}."""
+    if not batch:
+        return {}
+    return {k: [r[k] for r in batch] for k in batch[0]}
+
+
 @contextmanager
-def get_conn():
+def get_conn(statement_timeout_ms: Optional[int] = None):
     """Borrow a pooled connection and return it to the pool on exit.
 
     Read-only queries are rolled back (snapshot released) on success;
     errors are rolled back and re-raised so the connection returns clean.
+    `statement_timeout_ms` caps every statement of the borrowed transaction.
     """
-    pool = _get_pool()
-    conn = pool.getconn()
+    conn = _checkout()
     try:
+        if statement_timeout_ms:
+            cur = conn.cursor()
+            set_statement_timeout(cur, statement_timeout_ms)
+            cur.close()
         yield conn
         conn.rollback()
     except Exception:
@@ -224,7 +340,23 @@ def get_conn():
             pass
         raise
     finally:
-        pool.putconn(conn)
+        _checkin(conn)
+
+
+# pair_daily_stats / route_path (create_pair_daily_stats.sql) availability,
+# re-checked every _ROLLUP_CHECK_SECS so a migration applied later is picked up.
+_ROLLUP_CHECK_SECS = 300.0
+_ROLLUP_STATE = {'ready': None, 'checked_at': 0.0}
+
+
+def _rollup_ready(cur) -> bool:
+    now = time.monotonic()
+    if _ROLLUP_STATE['ready'] is None or now - _ROLLUP_STATE['checked_at'] > _ROLLUP_CHECK_SECS:
+        cur.execute("SELECT to_regclass('pair_daily_stats') IS NOT NULL "
+                    "AND to_regclass('route_path') IS NOT NULL")
+        _ROLLUP_STATE['ready'] = bool(cur.fetchone()[0])
+        _ROLLUP_STATE['checked_at'] = now
+    return _ROLLUP_STATE['ready']
 
 
 class PostgresFetcher:
@@ -326,8 +458,39 @@ class PostgresFetcher:
         so multi-hop routes (which traverse intermediate tokens not on the queried
         pair) can be reconstructed. Use only for route analysis; pool-stats callers
         keep the strict direct-pair filter.
+
+        Materializes the whole window; large windows should stream with
+        iter_swaps() instead.
+        """
+        swaps = []
+        for batch in self.iter_swaps(start_date, end_date, token_filter=token_filter,
+                                     network=network, start_tokens=start_tokens,
+                                     end_tokens=end_tokens, broad=broad):
+            swaps.extend(batch)
+        self._log(f"Fetch complete. Total swaps from DB: {len(swaps)}")
+        return swaps
+
+    def iter_swaps(self, start_date: datetime, end_date: datetime,
+                   token_filter: Optional[List[str]] = None,
+                   network: Optional[str] = None,
+                   start_tokens: Optional[List[str]] = None,
+                   end_tokens: Optional[List[str]] = None,
+                   broad: bool = False,
+                   batch_size: int = SWAP_ITERSIZE,
+                   columnar: bool = False) -> Iterator:
+        """
+        Stream fetch_swaps() rows in batches from a named server-side cursor.
+
+        Yields lists of the same row dicts fetch_swaps() returns (or, with
+        `columnar`, one {field: [values]} dict per batch), at most `batch_size`
+        rows at a time, so only one batch is resident in the API process. Rows
+        keep the (tx_hash, log_index) order, so a transaction's legs are
+        always contiguous — callers can group per tx in a single pass.
+
+        The pooled connection is held until the generator is exhausted or
+        closed; close it (or let it go out of scope) when stopping early.
         """
-        self._log(f"Fetching swaps from {start_date} to {end_date} (network={network}, tokens={token_filter}, start={start_tokens}, end={end_tokens}, broad={broad})")
+        self._log(f"Streaming swaps from {start_date} to {end_date} (network={network}, tokens={token_filter}, start={start_tokens}, end={end_tokens}, broad={broad}, batch={batch_size})")
 
         try:
             with get_conn() as conn:
@@ -360,10 +523,10 @@ class PostgresFetcher:
                 cur.execute(pool_query, pool_params)
                 pool_rows = cur.fetchall()
 
+                cur.close()
                 if not pool_rows:
-                    cur.close()
                     self._log("Fetch complete. No matching pools found.")
-                    return []
+                    return
 
                 pool_meta = {}
                 pool_ids = []
@@ -381,7 +544,10 @@ class PostgresFetcher:
                         'pool_id': p_pool_id or p_addr or '',
                     }
 
-                # 2. Query swaps table
+                # 2. Stream the swaps table through a named (server-side)
+                # cursor so the result set stays in Postgres until consumed.
+                cur = conn.cursor(name=f"iter_swaps_{uuid.uuid4().hex}")
+                cur.itersize = batch_size
                 if broad and start_tokens and end_tokens and '*' not in start_tokens and '*' not in end_tokens:
                     start_upper = set(s.upper() for s in start_tokens)
                     end_upper = set(e.upper() for e in end_tokens)
@@ -436,45 +602,55 @@ class PostgresFetcher:
                         ORDER BY s.tx_hash, s.log_index
                     """
                     cur.execute(swaps_query, [pool_ids, start_date, end_date])
-                rows = cur.fetchall()
 
-                swaps = []
-                for row in rows:
-                    tx_hash = row[0]
-                    log_index = row[1]
-                    pid = row[3]
-                    pm = pool_meta.get(pid)
-                    if not pm:
-                        continue
-                    swaps.append({
-                        'id': f"{tx_hash}#{log_index}",
-                        'timestamp': int(row[2].timestamp()),
-                        'tx_hash': tx_hash,
-                        'token0_symbol': pm['symbol0'],
-                        'token1_symbol': pm['symbol1'],
-                        'amount0': float(row[4]) if row[4] is not None else 0.0,
-                        'amount1': float(row[5]) if row[5] is not None else 0.0,
-                        'amountUSD': float(row[6]) if row[6] is not None else 0.0,
-                        'amount_usd': float(row[6]) if row[6] is not None else 0.0,
-                        'fee_tier': pm['fee_display'],
-                        'fee_bps': pm['fee_bps'],
-                        'protocol': pm['protocol'],
-                        'network': pm['network'],
-                        'cid': pid,
-                        'pool_address': pm['pool_address'],
-                        'pool_id': pm['pool_id'],
-                        'log_index': log_index,
-                    })
-
-                cur.close()
-
-            self._log(f"Fetch complete. Total swaps from DB: {len(swaps)}")
-            return swaps
+                try:
+                    while True:
+                        rows = cur.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        batch = self._swap_rows(rows, pool_meta)
+                        if batch:
+                            yield _swap_columns(batch) if columnar else batch
+                finally:
+                    cur.close()
 
         except Exception as e:
             self._log(f"Database query failed: {e}")
             raise
 
+    @staticmethod
+    def _swap_rows(rows, pool_meta: Dict) -> List[Dict]:
+        """Shape raw (tx_hash, log_index, ts, pool_id, amount0, amount1,
+        amount_usd) rows into fetch_swaps() dicts."""
+        swaps = []
+        for row in rows:
+            tx_hash = row[0]
+            log_index = row[1]
+            pid = row[3]
+            pm = pool_meta.get(pid)
+            if not pm:
+                continue
+            swaps.append({
+                'id': f"{tx_hash}#{log_index}",
+                'timestamp': int(row[2].timestamp()),
+                'tx_hash': tx_hash,
+                'token0_symbol': pm['symbol0'],
+                'token1_symbol': pm['symbol1'],
+                'amount0': float(row[4]) if row[4] is not None else 0.0,
+                'amount1': float(row[5]) if row[5] is not None else 0.0,
+                'amountUSD': float(row[6]) if row[6] is not None else 0.0,
+                'amount_usd': float(row[6]) if row[6] is not None else 0.0,
+                'fee_tier': pm['fee_display'],
+                'fee_bps': pm['fee_bps'],
+                'protocol': pm['protocol'],
+                'network': pm['network'],
+                'cid': pid,
+                'pool_address': pm['pool_address'],
+                'pool_id': pm['pool_id'],
+                'log_index': log_index,
+            })
+        return swaps
+
     def fetch_route_stats(self, start_date: datetime, end_date: datetime,
                           start_tokens: Optional[List[str]] = None,
                           end_tokens: Optional[List[str]] = None,
@@ -499,6 +675,11 @@ class PostgresFetcher:
         Because stats are summed per (route_id, day), this replaces the
         ~100k-swap-per-day fetch + Python topology pass for long windows with a
         handful of summed rows per route (measured ~100-1000x speedup).
+
+        With explicit tokens on both sides the sums come from pair_daily_stats
+        and the paths from route_path: two index-only lookups, whatever the
+        window length. Wildcards, and databases without those tables, use the
+        route_daily_stats join and rebuild paths from route_hop.
         """
         self._log(f"Route stats {start_date} -> {end_date} (start={start_tokens}, end={end_tokens}, network={network}, dir={direction})")
 
@@ -516,145 +697,51 @@ class PostgresFetcher:
                 return "(1=1)", []
             return f"UPPER({col}) = ANY(%s)", [syms]
 
-        fwd_a, fwd_p1 = _side_pred('pair.origin_symbol', start_syms, start_wild)
-        fwd_b, fwd_p2 = _side_pred('pair.dest_symbol', end_syms, end_wild)
-        pair_sql = f"({fwd_a} AND {fwd_b})"
-        pair_params = fwd_p1 + fwd_p2
-
         try:
             with get_conn() as conn:
                 cur = conn.cursor()
-
-                sql_params: List = [start_date, end_date] + pair_params
-                query = f"""
-                    SELECT
-                        r.route_id,
-                        pair.id AS pair_id,
-                        pair.origin_symbol,
-                        pair.dest_symbol,
-                        r.hops,
-                        SUM(rs.tx_count)   AS tx_count,
-                        SUM(rs.swap_count) AS swap_count,
-                        SUM(rs.volume_usd) AS volume_usd,
-                        MAX(rs.day)        AS last_day
-                    FROM route_daily_stats rs
-                    JOIN route r ON rs.route_id = r.route_id
-                    JOIN origin_destination_pair pair ON r.pair_id = pair.id
-                    JOIN chain ch ON r.chain_id = ch.id
-                    WHERE rs.day >= %s::date AND rs.day <= %s::date
-                      AND {pair_sql}
-                """
-                if network and network.lower() != 'all':
-                    query += " AND LOWER(ch.name) = LOWER(%s)"
-                    sql_params.append(network)
-                query += """
-                    GROUP BY r.route_id, pair.id, pair.origin_symbol, pair.dest_symbol, r.hops
-                    ORDER BY volume_usd DESC
-                """
-                cur.execute(query, sql_params)
-                agg_rows = cur.fetchall()
-
-                # Build per-route aggregates.
-                route_records = []
-                for (route_id, pair_id, origin_sym, dest_sym, hops,
-                     tx_count, swap_count, volume_usd, last_day) in agg_rows:
-                    route_records.append({
-                        'route_id': route_id,
-                        'pair_id': pair_id,
-                        'origin_symbol': (origin_sym or '').upper(),
-                        'dest_symbol': (dest_sym or '').upper(),
-                        'hops': int(hops or 0),
-                        'tx_count': int(tx_count or 0),
-                        'swap_count': int(swap_count or 0),
-                        'volume_usd': float(volume_usd or 0),
-                        'last_day': last_day,
-                    })
-
-                # Fetch hop topology for the matched routes to rebuild
-                # path_tokens ([Token, fee|protocol|network, Token, ...]).
-                hops_by_route: Dict[int, List] = {}
-                if route_records:
-                    route_ids = [r['route_id'] for r in route_records]
-                    cur.execute(
-                        """
-                        SELECT
-                            h.route_id,
-                            h.seq,
-                            UPPER(ci.symbol) AS token_in_sym,
-                            UPPER(co.symbol) AS token_out_sym,
-                            CASE WHEN lp.fee_bps IS NULL THEN 'Dynamic'
-                                 ELSE (lp.fee_bps / 100.0)::text || '%%' END AS fee_display,
-                            pr.name AS protocol,
-                            ch.name AS network
-                        FROM route_hop h
-                        JOIN liquidity_pool lp ON h.pool_id = lp.id
-                        JOIN protocol pr ON lp.protocol_id = pr.id
-                        JOIN chain ch ON lp.chain_id = ch.id
-                        LEFT JOIN coin_contract cic ON LOWER(cic.contract_address) = LOWER(h.token_in) AND cic.chain_id = lp.chain_id
-                        LEFT JOIN coin ci ON cic.coin_id = ci.coin_id
-                        LEFT JOIN coin_contract coc ON LOWER(coc.contract_address) = LOWER(h.token_out) AND coc.chain_id = lp.chain_id
-                        LEFT JOIN coin co ON coc.coin_id = co.coin_id
-                        WHERE h.route_id = ANY(%s)
-                        ORDER BY h.route_id, h.seq
-                        """,
-                        (route_ids,),
-                    )
-                    for (route_id, seq, token_in_sym, token_out_sym, fee_display,
-                         protocol, network) in cur.fetchall():
-                        hops_by_route.setdefault(route_id, []).append({
-                            'seq': seq,
-                            'token_in_sym': token_in_sym,
-                            'token_out_sym': token_out_sym,
-                            'fee': fee_display,
-                            'protocol': protocol,
-                            'network': network,
-                        })
+                use_rollup = (start_syms and end_syms and not start_wild and not end_wild
+                              and _rollup_ready(cur))
+                if use_rollup:
+                    route_records = self._route_records_from_rollup(
+                        cur, start_date, end_date, start_syms, end_syms, network)
+                else:
+                    fwd_a, fwd_p1 = _side_pred('pair.origin_symbol', start_syms, start_wild)
+                    fwd_b, fwd_p2 = _side_pred('pair.dest_symbol', end_syms, end_wild)
+                    route_records = self._route_records_from_daily(
+                        cur, start_date, end_date, f"({fwd_a} AND {fwd_b})", fwd_p1 + fwd_p2, network)
+
+                # path_tokens ([Token, fee|protocol|network, Token, ...]) and
+                # cumulative fee per route: precomputed in route_path, rebuilt
+                # from route_hop for routes that have no row there yet.
+                paths: Dict[int, dict] = {}
+                if route_records and use_rollup:
+                    paths = self._cached_route_paths(cur, [r['route_id'] for r in route_records])
+                missing = [r for r in route_records if r['route_id'] not in paths]
+                if missing:
+                    paths.update(self._route_paths_from_hops(cur, missing))
 
                 results = []
                 total_volume = sum(r['volume_usd'] for r in route_records)
                 for rec in route_records:
-                    ordered = sorted(hops_by_route.get(rec['route_id'], []),
-                                     key=lambda hp: hp['seq'])
-                    # Rebuild [Token, Fee, Token, Fee, ...]: hop i connects
-                    # token_in -> token_out over its pool. Because chains are
-                    # contiguous, hop i+1's token_in equals hop i's token_out,
-                    # so each hop contributes its fee node + the output token.
-                    path_tokens = []
-                    for i, hp in enumerate(ordered):
-                        if i == 0:
-                            path_tokens.append(hp['token_in_sym'] or rec['origin_symbol'] or '')
-                        path_tokens.append(f"{hp['fee']}|{hp['protocol']}|{hp['network']}")
-                        path_tokens.append(hp['token_out_sym'] or rec['dest_symbol'] or '')
-                    if not path_tokens:
-                        path_tokens = [rec['origin_symbol'] or '', rec['dest_symbol'] or '']
-
-                    cum_fee = 0.0
-                    for i in range(1, len(path_tokens), 2):
-                        fee_str = path_tokens[i]
-                        try:
-                            fee_raw = fee_str.split('|')[0].strip().replace('%', '')
-                            if fee_raw.lower() == 'dynamic':
-                                cum_fee += 0.0002
-                            elif fee_raw:
-                                val = float(fee_raw)
-                                cum_fee += (val / 1_000_000.0 if val > 5 else val / 100.0)
-                        except (ValueError, AttributeError):
-                            pass
-
+                    meta = paths.get(rec['route_id'])
+                    if meta is None:
+                        continue
+                    path_tokens, cum_fee = meta['path_tokens'], meta['cum_fee']
                     vol = rec['volume_usd']
                     tc = rec['tx_count']
                     results.append({
                         'path': ' --> '.join(path_tokens),
                         'path_tokens': path_tokens,
                         'route_id': rec['route_id'],
-                        'pair_id': rec['pair_id'],
+                        'pair_id': meta['pair_id'],
                         'count': tc,
                         'swaps': rec['swap_count'],
                         'volume': vol,
                         'market_size': vol * cum_fee,
                         'avg_volume': vol / tc if tc else 0,
                         'pct_volume': (vol / total_volume * 100) if total_volume else 0,
-                        'hops': rec['hops'],
+                        'hops': meta['hops'],
                         'last_activity': rec['last_day'].isoformat() if rec['last_day'] else None,
                         'direction': direction,
                     })
@@ -671,6 +758,134 @@ class PostgresFetcher:
             self._log(f"Route stats query failed: {e}")
             raise
 
+    @staticmethod
+    def _route_records_from_rollup(cur, start_date, end_date, start_syms: List[str],
+                                   end_syms: List[str], network: Optional[str]) -> List[Dict]:
+        """Per-route sums for a token pair from pair_daily_stats (index-only
+        range scan on (origin_coin_id, dest_coin_id, chain_id, day))."""
+        sql_params: List = [start_syms, end_syms, start_date, end_date]
+        query = """
+            SELECT ps.route_id,
+                   SUM(ps.tx_count)   AS tx_count,
+                   SUM(ps.swap_count) AS swap_count,
+                   SUM(ps.volume_usd) AS volume_usd,
+                   MAX(ps.day)        AS last_day
+            FROM pair_daily_stats ps
+            WHERE ps.origin_coin_id = ANY(ARRAY(SELECT coin_id FROM coin WHERE UPPER(symbol) = ANY(%s)))
+              AND ps.dest_coin_id = ANY(ARRAY(SELECT coin_id FROM coin WHERE UPPER(symbol) = ANY(%s)))
+              AND ps.day >= %s::date AND ps.day <= %s::date
+        """
+        if network and network.lower() != 'all':
+            query += " AND ps.chain_id = ANY(ARRAY(SELECT id FROM chain WHERE LOWER(name) = LOWER(%s)))"
+            sql_params.append(network)
+        query += " GROUP BY ps.route_id ORDER BY volume_usd DESC"
+        cur.execute(query, sql_params)
+        return [{
+            'route_id': route_id,
+            'tx_count': int(tx_count or 0),
+            'swap_count': int(swap_count or 0),
+            'volume_usd': float(volume_usd or 0),
+            'last_day': last_day,
+        } for route_id, tx_count, swap_count, volume_usd, last_day in cur.fetchall()]
+
+    @staticmethod
+    def _route_records_from_daily(cur, start_date, end_date, pair_sql: str, pair_params: List,
+                                  network: Optional[str]) -> List[Dict]:
+        """Per-route sums from route_daily_stats joined to route/pair/chain
+        (wildcard sides, or before pair_daily_stats exists)."""
+        sql_params: List = [start_date, end_date] + pair_params
+        query = f"""
+            SELECT
+                r.route_id,
+                SUM(rs.tx_count)   AS tx_count,
+                SUM(rs.swap_count) AS swap_count,
+                SUM(rs.volume_usd) AS volume_usd,
+                MAX(rs.day)        AS last_day
+            FROM route_daily_stats rs
+            JOIN route r ON rs.route_id = r.route_id
+            JOIN origin_destination_pair pair ON r.pair_id = pair.id
+            JOIN chain ch ON r.chain_id = ch.id
+            WHERE rs.day >= %s::date AND rs.day <= %s::date
+              AND {pair_sql}
+        """
+        if network and network.lower() != 'all':
+            query += " AND LOWER(ch.name) = LOWER(%s)"
+            sql_params.append(network)
+        query += """
+            GROUP BY r.route_id
+            ORDER BY volume_usd DESC
+        """
+        cur.execute(query, sql_params)
+        return [{
+            'route_id': route_id,
+            'tx_count': int(tx_count or 0),
+            'swap_count': int(swap_count or 0),
+            'volume_usd': float(volume_usd or 0),
+            'last_day': last_day,
+        } for route_id, tx_count, swap_count, volume_usd, last_day in cur.fetchall()]
+
+    @staticmethod
+    def _cached_route_paths(cur, route_ids: List[int]) -> Dict[int, dict]:
+        """route_path rows for route_ids (index-only on its covering index)."""
+        cur.execute("""
+            SELECT route_id, pair_id, hops, path_tokens, cum_fee
+            FROM route_path
+            WHERE route_id = ANY(%s)
+        """, (route_ids,))
+        return {route_id: {'pair_id': pair_id, 'hops': int(hops or 0),
+                           'path_tokens': list(path_tokens), 'cum_fee': float(cum_fee or 0)}
+                for route_id, pair_id, hops, path_tokens, cum_fee in cur.fetchall()}
+
+    @staticmethod
+    def _route_paths_from_hops(cur, route_records: List[Dict]) -> Dict[int, dict]:
+        """Rebuild path_tokens and cumulative fee from route_hop for routes
+        without a route_path row (route_classifier.route_path_tokens)."""
+        route_ids = [r['route_id'] for r in route_records]
+        cur.execute("""
+            SELECT r.route_id, r.pair_id, r.hops, UPPER(pair.origin_symbol), UPPER(pair.dest_symbol)
+            FROM route r
+            JOIN origin_destination_pair pair ON r.pair_id = pair.id
+            WHERE r.route_id = ANY(%s)
+        """, (route_ids,))
+        routes = cur.fetchall()
+        cur.execute(
+            """
+            SELECT
+                h.route_id,
+                h.seq,
+                UPPER(ci.symbol) AS token_in_sym,
+                UPPER(co.symbol) AS token_out_sym,
+                CASE WHEN lp.fee_bps IS NULL THEN 'Dynamic'
+                     ELSE (lp.fee_bps / 100.0)::text || '%%' END AS fee_display,
+                pr.name AS protocol,
+                ch.name AS network
+            FROM route_hop h
+            JOIN liquidity_pool lp ON h.pool_id = lp.id
+            JOIN protocol pr ON lp.protocol_id = pr.id
+            JOIN chain ch ON lp.chain_id = ch.id
+            LEFT JOIN coin_contract cic ON LOWER(cic.contract_address) = LOWER(h.token_in) AND cic.chain_id = lp.chain_id
+            LEFT JOIN coin ci ON cic.coin_id = ci.coin_id
+            LEFT JOIN coin_contract coc ON LOWER(coc.contract_address) = LOWER(h.token_out) AND coc.chain_id = lp.chain_id
+            LEFT JOIN coin co ON coc.coin_id = co.coin_id
+            WHERE h.route_id = ANY(%s)
+            ORDER BY h.route_id, h.seq
+            """,
+            (route_ids,),
+        )
+        hops_by_route: Dict[int, List] = {}
+        for (route_id, seq, token_in_sym, token_out_sym, fee_display,
+             protocol, network) in cur.fetchall():
+            hops_by_route.setdefault(route_id, []).append(
+                (seq, token_in_sym, token_out_sym, fee_display, protocol, network))
+
+        paths: Dict[int, dict] = {}
+        for route_id, pair_id, hops, origin_sym, dest_sym in routes:
+            ordered = sorted(hops_by_route.get(route_id, []), key=lambda hp: hp[0])
+            path_tokens, cum_fee = route_path_tokens([hp[1:] for hp in ordered], origin_sym, dest_sym)
+            paths[route_id] = {'pair_id': pair_id, 'hops': int(hops or 0),
+                               'path_tokens': path_tokens, 'cum_fee': cum_fee}
+        return paths
+
     def fetch_pool_stats(self, pools: List[List[str]], start_date: datetime, end_date: datetime, prices: Optional[Dict[str, float]] = None, tvl_mode: str = 'avg', use_swaps_fallback: bool = False) -> Dict[str, Dict[str, float]]:
         """
         Fetch stats (APR) for a list of pools [(t0, t1, fee), ...] within date range.
@@ -702,8 +917,9 @@ class PostgresFetcher:
         if not pools:
             return {}
 
+        conn = None
         try:
-            conn = _get_pool().getconn()
+            conn = _checkout()
             cur = conn.cursor()
 
             results = {}
@@ -992,21 +1208,47 @@ class PostgresFetcher:
                 conn.rollback()
             except Exception:
                 pass
-            _get_pool().putconn(conn)
+            done, conn = conn, None
+            _checkin(done)
             return results
 
         except Exception as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-            try:
-                _get_pool().putconn(conn)
-            except Exception:
-                pass
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                try:
+                    _checkin(conn)
+                except Exception:
+                    pass
             self._log(f"APR fetch failed: {e}")
             return {}
 
+    @staticmethod
+    def _latest_prices_query(symbols: Optional[List[str]]) -> Tuple[str, tuple]:
+        if symbols:
+            return """
+                SELECT DISTINCT ON (c.symbol) c.symbol, h.price
+                FROM coin_price_history h
+                JOIN coin c ON h.coin_id = c.coin_id
+                WHERE c.symbol = ANY(%s)
+                ORDER BY c.symbol, h.timestamp DESC
+            """, ([s.upper() for s in symbols],)
+        return """
+            SELECT DISTINCT ON (c.symbol) c.symbol, h.price
+            FROM coin_price_history h
+            JOIN coin c ON h.coin_id = c.coin_id
+            ORDER BY c.symbol, h.timestamp DESC
+        """, ()
+
+    @staticmethod
+    def _watermark_query(network: Optional[str]) -> Tuple[str, tuple]:
+        if network:
+            return ("SELECT MAX(updated_at) FROM ingestion_state WHERE LOWER(network) = LOWER(%s)",
+                    (network,))
+        return "SELECT MAX(updated_at) FROM ingestion_state", ()
+
     def fetch_latest_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
         """
         Fetch the most recent price per symbol from coin_price_history.
@@ -1019,35 +1261,78 @@ class PostgresFetcher:
         try:
             with get_conn() as conn:
                 cur = conn.cursor()
-
-                if symbols:
-                    upper_symbols = [s.upper() for s in symbols]
-                    query = """
-                        SELECT DISTINCT ON (c.symbol) c.symbol, h.price
-                        FROM coin_price_history h
-                        JOIN coin c ON h.coin_id = c.coin_id
-                        WHERE c.symbol = ANY(%s)
-                        ORDER BY c.symbol, h.timestamp DESC
-                    """
-                    cur.execute(query, (upper_symbols,))
-                else:
-                    query = """
-                        SELECT DISTINCT ON (c.symbol) c.symbol, h.price
-                        FROM coin_price_history h
-                        JOIN coin c ON h.coin_id = c.coin_id
-                        ORDER BY c.symbol, h.timestamp DESC
-                    """
-                    cur.execute(query)
+                cur.execute(*self._latest_prices_query(symbols))
                 rows = cur.fetchall()
-
-                prices = {row[0].upper(): float(row[1]) for row in rows if row[1] is not None}
-
                 cur.close()
-            return prices
+            return {row[0].upper(): float(row[1]) for row in rows if row[1] is not None}
+        except Exception as e:
+            self._log(f"Latest price fetch failed: {e}")
+            return {}
+
+    async def afetch_latest_prices(self, symbols: Optional[List[str]] = None,
+                                   statement_timeout: Optional[int] = None) -> Dict[str, float]:
+        """fetch_latest_prices() for the event loop (see async_db)."""
+        import async_db
+        try:
+            rows = await async_db.fetch_all(*self._latest_prices_query(symbols),
+                                            statement_timeout=statement_timeout)
+            return {row[0].upper(): float(row[1]) for row in rows if row[1] is not None}
         except Exception as e:
             self._log(f"Latest price fetch failed: {e}")
             return {}
 
+    def fetch_ingestion_watermark(self, network: Optional[str] = None) -> Optional[datetime]:
+        """
+        Latest ingestion_state.updated_at (for one network, or across all).
+
+        Every ingestion run upserts ingestion_state, so this moves whenever
+        new swaps land; swap_set_cache uses it to invalidate prepared swap
+        sets. Returns None when the table is empty or unreadable.
+        """
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(*self._watermark_query(network))
+                row = cur.fetchone()
+                cur.close()
+            return row[0] if row else None
+        except Exception as e:
+            self._log(f"Ingestion watermark fetch failed: {e}")
+            return None
+
+    async def afetch_ingestion_watermark(self, network: Optional[str] = None,
+                                         statement_timeout: Optional[int] = None) -> Optional[datetime]:
+        """fetch_ingestion_watermark() for the event loop (see async_db)."""
+        import async_db
+        try:
+            row = await async_db.fetch_one(*self._watermark_query(network),
+                                           statement_timeout=statement_timeout)
+            return row[0] if row else None
+        except Exception as e:
+            self._log(f"Ingestion watermark fetch failed: {e}")
+            return None
+
+    _MATERIALIZATION_WATERMARK_SQL = "SELECT version FROM materialization_watermark WHERE name = %s"
+
+    async def afetch_materialization_watermark(self, name: str = 'route_stats',
+                                               statement_timeout: Optional[int] = None) -> Optional[int]:
+        """
+        Current materialization_watermark version for `name`.
+
+        dirty_day_materializer and route_daily_stats_rollup bump the
+        'route_stats' row with every committed recompute; response_cache uses
+        it to invalidate cached route/time-series/distribution results.
+        Returns None when the table or row is missing or unreadable.
+        """
+        import async_db
+        try:
+            row = await async_db.fetch_one(self._MATERIALIZATION_WATERMARK_SQL, (name,),
+                                           statement_timeout=statement_timeout)
+            return row[0] if row else None
+        except Exception as e:
+            self._log(f"Materialization watermark fetch failed: {e}")
+            return None
+
     def fetch_pool_explorer_data(self, start_date: datetime, end_date: datetime,
                                   start_tokens: Optional[List[str]] = None,
                                   end_tokens: Optional[List[str]] = None,
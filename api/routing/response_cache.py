@@ -0,0 +1,231 @@
+"""Shared, request-coalescing result cache for the route read endpoints.
+
+The portal re-issues identical /api/routes/analyze, /api/swap-time-series and
+/api/swap-distribution queries (tab switches, several dashboards on the same
+popular pairs), and every request recomputed route stats, APR enrichment and
+pool address derivation. This module keeps the computed results in an
+in-process LRU and coalesces concurrent identical requests (single flight):
+the first request for a key starts the computation as a detached task, later
+ones await that same task. Streamed endpoints replay its progress events, so a
+request that joins late still sees the progress so far. A client that
+disconnects does not cancel the computation; its result is still cached.
+
+Keys come from cache_key(): resolved token families (order- and
+case-insensitive within each side), the window floored to the buckets the
+queries read (align_window), network and the parameters that shape the
+result.
+
+Entries are stamped with the `route_stats` materialization_watermark version
+they were computed under (bumped by dirty_day_materializer and
+route_daily_stats_rollup with each committed recompute):
+
+  - same version, younger than ttl_s: served.
+  - same version, older than ttl_s but within ttl_s + stale_s: served stale
+    while one background task revalidates it (enrichment such as APR/TVL
+    drifts without a recompute), like the goal-state report cache.
+  - another version, or older than that: recomputed (coalesced) before
+    responding.
+
+Without a watermark (migration not applied, database unreachable) requests
+are still coalesced but nothing is stored. Cached results are shared between
+requests — treat them as read-only.
+
+Everything runs on the event loop; no locking beyond get_cache().
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "300"))
+DEFAULT_STALE_S = float(os.getenv("RESPONSE_CACHE_STALE_S", "1800"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# compute(emit) -> result; emit(event) publishes a progress event to every
+# request waiting on the computation.
+Emit = Callable[[dict], None]
+Compute = Callable[[Emit], Awaitable[Any]]
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+_DONE = object()
+
+
+def align_window(start: datetime, end: datetime, interval: str = "day") -> Tuple[Any, Any]:
+    """Floor both bounds to the bucket the aggregate queries read: dates for
+    the daily tables (they compare `day` against `%s::date`), whole hours for
+    route_hourly_stats."""
+    if interval == "hour":
+        return (start.replace(minute=0, second=0, microsecond=0),
+                end.replace(minute=0, second=0, microsecond=0))
+    return start.date(), end.date()
+
+
+def _param(v):
+    if isinstance(v, (list, set, frozenset)):
+        return tuple(sorted(v))
+    return v
+
+
+def cache_key(endpoint: str, families, network: Optional[str],
+              start, end, **params) -> tuple:
+    """Normalized key: token families are order- and case-insensitive within
+    each side, the network is case-insensitive, list/set parameters are
+    order-insensitive. `start`/`end` should come from align_window()."""
+    fam = tuple(tuple(sorted({t.upper() for t in side})) for side in families)
+    bounds = tuple(b.isoformat() if isinstance(b, (date, datetime)) else b for b in (start, end))
+    return (endpoint, fam, (network or "").lower()) + bounds + \
+        tuple(sorted((k, _param(v)) for k, v in params.items()))
+
+
+class _Flight:
+    """One in-progress computation and the requests listening to it."""
+
+    __slots__ = ("task", "events", "listeners")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.events: List[dict] = []
+        self.listeners: List[asyncio.Queue] = []
+
+    def emit(self, event: dict) -> None:
+        self.events.append(event)
+        for q in self.listeners:
+            q.put_nowait(event)
+
+
+class ResponseCache:
+    """LRU of endpoint results with single-flight computation and
+    stale-while-revalidate."""
+
+    def __init__(self, ttl_s: float = DEFAULT_TTL_S, stale_s: float = DEFAULT_STALE_S,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> (watermark, value, stored_at)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # (key, watermark) -> _Flight
+        self._flights: Dict[tuple, _Flight] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "invalidations": 0, "evictions": 0, "revalidations": 0, "errors": 0}
+
+    # -- public API -----------------------------------------------------
+
+    async def get(self, key: tuple, watermark, compute: Compute) -> Any:
+        """Cached result for key, or the result of compute() — shared with
+        every concurrent request for the same key and watermark."""
+        async for kind, value in self.stream(key, watermark, compute):
+            if kind == "result":
+                return value
+
+    async def stream(self, key: tuple, watermark,
+                     compute: Compute) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("progress", event) for each event the computation emits
+        (none on a cache hit), then ("result", value). Raises what compute()
+        raised."""
+        state, value = self._lookup(key, watermark)
+        if state != MISS:
+            if state == STALE:
+                self._flight(key, watermark, compute, revalidate=True)
+            yield "result", value
+            return
+
+        flight = self._flight(key, watermark, compute)
+        q: asyncio.Queue = asyncio.Queue()
+        for event in flight.events:
+            q.put_nowait(event)
+        if flight.task.done():
+            q.put_nowait(_DONE)
+        flight.listeners.append(q)
+        try:
+            while True:
+                event = await q.get()
+                if event is _DONE:
+                    break
+                yield "progress", event
+        finally:
+            if q in flight.listeners:
+                flight.listeners.remove(q)
+        yield "result", flight.task.result()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return dict(self._stats, entries=len(self._entries), in_flight=len(self._flights),
+                    max_entries=self.max_entries, ttl_s=self.ttl_s, stale_s=self.stale_s)
+
+    # -- internals ------------------------------------------------------
+
+    def _lookup(self, key: tuple, watermark) -> Tuple[str, Any]:
+        ent = self._entries.get(key)
+        if ent is not None:
+            if watermark is not None and ent[0] == watermark:
+                age = self._clock() - ent[2]
+                if age < self.ttl_s + self.stale_s:
+                    self._entries.move_to_end(key)
+                    fresh = age < self.ttl_s
+                    self._stats["hits" if fresh else "stale_hits"] += 1
+                    return (FRESH if fresh else STALE), ent[1]
+            else:
+                self._stats["invalidations"] += 1
+            del self._entries[key]
+        self._stats["misses"] += 1
+        return MISS, None
+
+    def _flight(self, key: tuple, watermark, compute: Compute, revalidate: bool = False) -> _Flight:
+        """The running computation for (key, watermark), started if absent."""
+        fkey = (key, watermark)
+        flight = self._flights.get(fkey)
+        if flight is not None:
+            if not revalidate:
+                self._stats["coalesced"] += 1
+            return flight
+        if revalidate:
+            self._stats["revalidations"] += 1
+        flight = _Flight()
+        flight.task = asyncio.ensure_future(self._run(key, watermark, flight, compute))
+        flight.task.add_done_callback(lambda task: self._finish(fkey, flight, task))
+        self._flights[fkey] = flight
+        return flight
+
+    async def _run(self, key: tuple, watermark, flight: _Flight, compute: Compute) -> Any:
+        value = await compute(flight.emit)
+        if watermark is not None and self.ttl_s > 0 and self.max_entries > 0:
+            self._entries[key] = (watermark, value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
+
+    def _finish(self, fkey: tuple, flight: _Flight, task: asyncio.Task) -> None:
+        if self._flights.get(fkey) is flight:
+            del self._flights[fkey]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+            print(f"[response_cache] computation failed for {fkey[0][0]}: {task.exception()}")
+        for q in flight.listeners:
+            q.put_nowait(_DONE)
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Process-wide cache configured from RESPONSE_CACHE_TTL_S,
+    RESPONSE_CACHE_STALE_S and RESPONSE_CACHE_MAX_ENTRIES (0 disables
+    storage; identical requests are still coalesced)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        return _CACHE
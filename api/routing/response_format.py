@@ -0,0 +1,164 @@
+"""Response encodings for the heavy analytics endpoints.
+
+/api/routes/analyze, /api/swap-time-series and /api/swap-distribution return
+large, mostly numeric payloads. This module negotiates their encoding from
+the Accept header:
+
+  - application/json (default): serialized with orjson when installed
+    (several times faster than json.dumps on float arrays, NumPy arrays pass
+    through natively), else compact json.dumps.
+  - application/vnd.apache.arrow.stream: an Arrow IPC stream holding the
+    payload's main table (routes, time-series points, per-route histograms);
+    the remaining fields travel as JSON in the schema metadata under b"meta".
+    Requires pyarrow. Columns Arrow cannot type (mixed or nested values) are
+    sent as JSON strings and listed in b"json_columns"; string columns with
+    many repeats are dictionary-encoded.
+
+Both libraries are optional; negotiate() only offers what is installed.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are optional
+    pa = None
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+_JSON_RANGES = (JSON, "application/*", "*/*", "application/x-ndjson")
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Pick "arrow" or "json" for an Accept header (highest q wins, ties go
+    to the earlier entry). Returns None only when Arrow is explicitly required
+    (no JSON alternative) and pyarrow is not installed; any other header
+    falls back to JSON."""
+    if not accept:
+        return "json"
+    best, best_q, arrow_requested = None, 0.0, False
+    for part in accept.split(","):
+        fields = part.strip().split(";")
+        mtype = fields[0].strip().lower()
+        q = 1.0
+        for param in fields[1:]:
+            key, _, val = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        if mtype == ARROW_STREAM:
+            arrow_requested = arrow_requested or q > 0
+            fmt = "arrow" if pa is not None else None
+        elif mtype in _JSON_RANGES:
+            fmt = "json"
+        else:
+            fmt = None
+        if fmt and q > best_q:
+            best, best_q = fmt, q
+    if best is None:
+        return None if arrow_requested else "json"
+    return best
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "tolist"):  # NumPy arrays / scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Serialize to JSON bytes (orjson when available). NaN/inf become null
+    under orjson; ints wider than 64 bits fall back to json.dumps."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:  # orjson.JSONEncodeError, e.g. an int > 64 bits
+            pass
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+
+# ---------------------------------------------------------------------------
+# Table shapes
+# ---------------------------------------------------------------------------
+
+def split_table(payload: Optional[dict], key: str) -> Tuple[List[dict], dict]:
+    """(payload[key], every other field): the row list becomes the Arrow
+    table, the rest its metadata."""
+    payload = payload or {}
+    return list(payload.get(key) or []), {k: v for k, v in payload.items() if k != key}
+
+
+def time_series_table(payload: Optional[dict]) -> Tuple[List[dict], dict]:
+    """Long-format rows (timestamp, group, volume, fees, count) from a
+    /api/swap-time-series result; totals and labels stay in the metadata."""
+    payload = payload or {}
+    stamps = payload.get("timestamps") or []
+    rows = []
+    for group in payload.get("groups") or []:
+        s = payload["series"][group]
+        rows.extend({"timestamp": ts, "group": group, "volume": v, "fees": f, "count": c}
+                    for ts, v, f, c in zip(stamps, s["volume"], s["fees"], s["count"]))
+    return rows, {k: v for k, v in payload.items() if k != "series"}
+
+
+# ---------------------------------------------------------------------------
+# Arrow IPC
+# ---------------------------------------------------------------------------
+
+def to_arrow(rows: List[dict], meta: Optional[dict] = None) -> bytes:
+    """Encode rows (flat dicts; list-valued columns become Arrow lists) as
+    one Arrow IPC stream, with `meta` as JSON schema metadata."""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    names: Dict[str, None] = {}
+    for r in rows:
+        names.update(dict.fromkeys(r))
+    arrays, json_cols = {}, []
+    for name in names:
+        values = [r.get(name) for r in rows]
+        try:
+            arr = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            arr = pa.array([None if v is None else dumps(v).decode() for v in values],
+                           type=pa.string())
+            json_cols.append(name)
+        else:
+            if pa.types.is_string(arr.type) and 2 * len(set(values)) <= len(values):
+                arr = arr.dictionary_encode()  # repeated labels (groups, dates)
+        arrays[name] = arr
+    table = pa.table(arrays) if arrays else pa.table({})
+    table = table.replace_schema_metadata({b"meta": dumps(meta or {}),
+                                           b"json_columns": dumps(json_cols)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_arrow(buf: bytes) -> Tuple[List[dict], dict]:
+    """Inverse of to_arrow(): (rows, meta), JSON-encoded columns decoded."""
+    table = pa.ipc.open_stream(buf).read_all()
+    md = table.schema.metadata or {}
+    json_cols = json.loads(md.get(b"json_columns", b"[]"))
+    rows = table.to_pylist()
+    for r in rows:
+        for c in json_cols:
+            if r[c] is not None:
+                r[c] = json.loads(r[c])
+    return rows, json.loads(md.get(b"meta", b"{}"))
@@ -216,78 +216,7 @@ class RouteAnalyzer:
         """
         Finalize and return the analysis results.
         """
-        # Convert to list for sorting
-        results = []
-        
-        total_vol = self.total_volume # Use aggregated total
-        if total_vol == 0:
-             # Calculate from stats just in case
-             total_vol = sum(r['volume_usd'] for r in self.stats.values())
-
-        for path_str, data in self.stats.items():
-            # Calculate cumulative fee for the route
-            cumulative_fee = 0.0
-            path_list = data['path']
-            # Path format: [Token, Fee, Token, Fee, Token]
-            # Fees are at odd indices: 1, 3, 5...
-            for i in range(1, len(path_list), 2):
-                fee_node = path_list[i]
-                if isinstance(fee_node, str):
-                    # fee_node is formatted as "fee_tier|protocol" (e.g. "0.05%|v3", "500|v3", "Dynamic|v4")
-                    fee_val = fee_node.split('|')[0].strip()
-                    if fee_val.lower() == 'dynamic':
-                        cumulative_fee += 0.0002  # 0.02% conservative estimate for dynamic-fee pools
-                    elif fee_val.endswith('%'):
-                        try:
-                            cumulative_fee += float(fee_val.strip('%')) / 100.0
-                        except ValueError:
-                            pass
-                    else:
-                        try:
-                            val = float(fee_val)
-                            if val > 5:
-                                # Stored as basis points (e.g. 500 or 3000)
-                                cumulative_fee += val / 1_000_000.0
-                            else:
-                                # Stored as raw percentage
-                                cumulative_fee += val / 100.0
-                        except ValueError:
-                            pass
-                elif isinstance(fee_node, (int, float)):
-                    # Fallback in case raw numbers are passed
-                    if fee_node > 5:
-                        cumulative_fee += fee_node / 1_000_000.0
-                    else:
-                        cumulative_fee += fee_node / 100.0
-            
-            market_size = data['volume_usd'] * cumulative_fee
-
-            last_activity = None
-            if data.get('last_ts'):
-                last_activity = datetime.fromtimestamp(data['last_ts'], tz=timezone.utc).isoformat()
-
-            results.append({
-                'path': path_str,
-                'path_tokens': data['path'],
-                'count': data['tx_count'],
-                'swaps': data['swap_count'],
-                'volume': data['volume_usd'],
-                'market_size': market_size,
-                'avg_volume': data['volume_usd'] / data['tx_count'] if data['tx_count'] > 0 else 0,
-                'pct_volume': (data['volume_usd'] / total_vol * 100) if total_vol > 0 else 0,
-                'hops': len(data['path']) // 2,
-                'last_activity': last_activity
-            })
-            
-        # Sort by volume descending and limit
-        results.sort(key=lambda x: x['volume'], reverse=True)
-        results = results[:200]  # Limit to top 200 routes
-        
-        return {
-            'routes': results,
-            'total_tx': self.total_tx_count,
-            'total_volume': total_vol
-        }
+        return _summarize_routes(self.stats, self.total_tx_count, self.total_volume)
 
     def analyze_routes(self, swaps: List[Dict], start_tokens: List[str], end_tokens: List[str]) -> Dict:
         """
@@ -296,3 +225,353 @@ class RouteAnalyzer:
         self.reset()
         self.process_batch(swaps, start_tokens, end_tokens)
         return self.get_results()
+
+
+def _summarize_routes(stats: Dict, total_tx: int, total_volume: float) -> Dict:
+    """
+    Turn per-path accumulators ({path_str: {tx_count, swap_count, volume_usd,
+    path, last_ts}}) into the route list returned by RouteAnalyzer.get_results.
+    """
+    # Convert to list for sorting
+    results = []
+    
+    total_vol = total_volume # Use aggregated total
+    if total_vol == 0:
+         # Calculate from stats just in case
+         total_vol = sum(r['volume_usd'] for r in stats.values())
+
+    for path_str, data in stats.items():
+        # Calculate cumulative fee for the route
+        cumulative_fee = 0.0
+        path_list = data['path']
+        # Path format: [Token, Fee, Token, Fee, Token]
+        # Fees are at odd indices: 1, 3, 5...
+        for i in range(1, len(path_list), 2):
+            fee_node = path_list[i]
+            if isinstance(fee_node, str):
+                # fee_node is formatted as "fee_tier|protocol" (e.g. "0.05%|v3", "500|v3", "Dynamic|v4")
+                fee_val = fee_node.split('|')[0].strip()
+                if fee_val.lower() == 'dynamic':
+                    cumulative_fee += 0.0002  # 0.02% conservative estimate for dynamic-fee pools
+                elif fee_val.endswith('%'):
+                    try:
+                        cumulative_fee += float(fee_val.strip('%')) / 100.0
+                    except ValueError:
+                        pass
+                else:
+                    try:
+                        val = float(fee_val)
+                        if val > 5:
+                            # Stored as basis points (e.g. 500 or 3000)
+                            cumulative_fee += val / 1_000_000.0
+                        else:
+                            # Stored as raw percentage
+                            cumulative_fee += val / 100.0
+                    except ValueError:
+                        pass
+            elif isinstance(fee_node, (int, float)):
+                # Fallback in case raw numbers are passed
+                if fee_node > 5:
+                    cumulative_fee += fee_node / 1_000_000.0
+                else:
+                    cumulative_fee += fee_node / 100.0
+        
+        market_size = data['volume_usd'] * cumulative_fee
+
+        last_activity = None
+        if data.get('last_ts'):
+            last_activity = datetime.fromtimestamp(data['last_ts'], tz=timezone.utc).isoformat()
+
+        results.append({
+            'path': path_str,
+            'path_tokens': data['path'],
+            'count': data['tx_count'],
+            'swaps': data['swap_count'],
+            'volume': data['volume_usd'],
+            'market_size': market_size,
+            'avg_volume': data['volume_usd'] / data['tx_count'] if data['tx_count'] > 0 else 0,
+            'pct_volume': (data['volume_usd'] / total_vol * 100) if total_vol > 0 else 0,
+            'hops': len(data['path']) // 2,
+            'last_activity': last_activity
+        })
+        
+    # Sort by volume descending and limit
+    results.sort(key=lambda x: x['volume'], reverse=True)
+    results = results[:200]  # Limit to top 200 routes
+    
+    return {
+        'routes': results,
+        'total_tx': total_tx,
+        'total_volume': total_vol
+    }
+
+
+class RouteIndex:
+    """
+    Multi-pair route index over one swap list.
+
+    RouteAnalyzer regroups the swaps and rebuilds every path for each
+    (start_tokens, end_tokens) query. RouteIndex reconstructs each
+    transaction's chain once: symbols and fee|protocol|network labels are
+    interned to integer codes, paths to tuples of codes, and every
+    (origin, dest) a transaction can be counted under is indexed up front.
+    analyze() then answers any number of queries from the compiled table and
+    returns exactly what RouteAnalyzer(prices=prices).analyze_routes() would.
+    """
+
+    def __init__(self, swaps: List[Dict], prices: Optional[Dict[str, float]] = None):
+        self.prices = prices or {}
+        self._codes = {}       # upper-cased symbol -> code
+        self._raw_codes = {}   # raw symbol -> code (one .upper() per distinct string)
+        self._symbols = []     # code -> upper-cased symbol
+        self._fee_keys = {}    # (fee_tier type, fee_tier, protocol, network) -> fee code
+        self._fee_codes = {}   # fee label -> fee code
+        self._fee_labels = []  # fee code -> "fee_tier|protocol|network"
+        self._path_ids = {}    # (token, fee, token, ...) codes -> path id
+        self._paths = []       # path id -> codes
+        self._path_strs = []   # path id -> formatted path string
+
+        # Leg columns in (tx, log_index) order; tx i spans [_tx_lo[i], _tx_lo[i+1])
+        self._t0 = []
+        self._t1 = []
+        self._dir = []         # bit 1: amount0 > 0, bit 2: amount1 > 0
+        self._fee = []
+        self._usd = []         # parsed amountUSD, None when unparseable
+        self._tx_lo = []
+        self._tx_last_ts = []
+        # Per tx: ((start, chain path id, volume), ...), one per possible start token
+        self._tx_starts = []
+        # (origin, dest) -> [(tx, path id, volume)] in tx order
+        self._index = defaultdict(list)
+
+        self._build(swaps)
+
+    @property
+    def tx_count(self) -> int:
+        return len(self._tx_starts)
+
+    def _symbol_code(self, raw: str) -> int:
+        sym = raw.upper()
+        code = self._codes.get(sym)
+        if code is None:
+            code = self._codes[sym] = len(self._symbols)
+            self._symbols.append(sym)
+        self._raw_codes[raw] = code
+        return code
+
+    def _fee_code(self, key: Tuple) -> int:
+        label = f"{key[1]}|{key[2]}|{key[3]}"
+        code = self._fee_codes.get(label)
+        if code is None:
+            code = self._fee_codes[label] = len(self._fee_labels)
+            self._fee_labels.append(label)
+        self._fee_keys[key] = code
+        return code
+
+    def _path_id(self, path: Tuple[int, ...]) -> int:
+        pid = self._path_ids.get(path)
+        if pid is None:
+            pid = self._path_ids[path] = len(self._paths)
+            self._paths.append(path)
+            self._path_strs.append(' '.join(
+                self._symbols[c] if i % 2 == 0 else f"-- {self._fee_labels[c]} -->"
+                for i, c in enumerate(path)))
+        return pid
+
+    def _path_list(self, pid: int) -> List[str]:
+        return [self._symbols[c] if i % 2 == 0 else self._fee_labels[c]
+                for i, c in enumerate(self._paths[pid])]
+
+    def _build(self, swaps: List[Dict]):
+        tx_swaps = defaultdict(list)
+        for swap in swaps:
+            tx_swaps[swap['tx_hash']].append(swap)
+
+        raw_codes, fee_keys = self._raw_codes, self._fee_keys
+        t0s, t1s, dirs, fees, usds = self._t0, self._t1, self._dir, self._fee, self._usd
+        for tx, tx_events in enumerate(tx_swaps.values()):
+            tx_events.sort(key=lambda sw: sw.get('log_index', 0))
+            lo = len(t0s)
+            self._tx_lo.append(lo)
+            last_ts = None
+            for sw in tx_events:
+                sym = sw['token0_symbol']
+                t0 = raw_codes.get(sym)
+                if t0 is None:
+                    t0 = self._symbol_code(sym)
+                sym = sw['token1_symbol']
+                t1 = raw_codes.get(sym)
+                if t1 is None:
+                    t1 = self._symbol_code(sym)
+                fee_tier = sw['fee_tier']
+                key = (fee_tier.__class__, fee_tier, sw.get('protocol', 'v3'), sw.get('network', 'Ethereum'))
+                fee = fee_keys.get(key)
+                if fee is None:
+                    fee = self._fee_code(key)
+                try:
+                    usd = float(sw.get('amountUSD', sw.get('amount_usd', 0.0)) or 0.0)
+                except (TypeError, ValueError):
+                    usd = None
+                t0s.append(t0)
+                t1s.append(t1)
+                dirs.append(((sw.get('amount0', 0) or 0) > 0) | (((sw.get('amount1', 0) or 0) > 0) << 1))
+                fees.append(fee)
+                usds.append(usd)
+                ts = sw.get('timestamp')
+                if ts and (last_ts is None or ts > last_ts):
+                    last_ts = ts
+            self._tx_last_ts.append(last_ts)
+            self._index_tx(tx, lo, len(t0s), tx_events[0])
+        self._tx_lo.append(len(t0s))
+
+    def _index_tx(self, tx: int, lo: int, hi: int, first_swap: Dict):
+        t0s, t1s, dirs, fees = self._t0, self._t1, self._dir, self._fee
+        d = dirs[lo]
+        # Start candidates in RouteAnalyzer's precedence: token0 when it was
+        # sold into the first pool, then token1.
+        heads = []
+        if d & 1:
+            heads.append((t0s[lo], t1s[lo]))
+        if d & 2 and not (d & 1 and t1s[lo] == t0s[lo]):
+            heads.append((t1s[lo], t0s[lo]))
+
+        starts = []
+        for start, current in heads:
+            path = [start, fees[lo], current]
+            for i in range(lo + 1, hi):
+                if t0s[i] == current and dirs[i] & 1:
+                    current = t1s[i]
+                elif t1s[i] == current and dirs[i] & 2:
+                    current = t0s[i]
+                else:
+                    continue
+                path.append(fees[i])
+                path.append(current)
+            pid = self._path_id(tuple(path))
+            volume = self._volume(lo, hi, start, first_swap)
+            starts.append((start, pid, volume))
+
+            self._index[(start, current)].append((tx, pid, volume))
+            # Direct start -> dest legs let the tx count for a dest its chain
+            # does not end at (router splits, round trips); first leg wins.
+            seen = {current}
+            for i in range(lo, hi):
+                if dirs[i] & 1 and t0s[i] == start and t1s[i] not in seen:
+                    seen.add(t1s[i])
+                    self._index[(start, t1s[i])].append(
+                        (tx, self._path_id((start, fees[i], t1s[i])), volume))
+                if dirs[i] & 2 and t1s[i] == start and t0s[i] not in seen:
+                    seen.add(t0s[i])
+                    self._index[(start, t0s[i])].append(
+                        (tx, self._path_id((start, fees[i], t0s[i])), volume))
+        self._tx_starts.append(tuple(starts))
+
+    def _volume(self, lo: int, hi: int, start: int, first_swap: Dict) -> float:
+        """USD value of the tx's input when it starts at `start` (RouteAnalyzer rules)."""
+        t0s, t1s, dirs, usds = self._t0, self._t1, self._dir, self._usd
+        single = hi - lo == 1
+        volume = 0.0
+        for i in range(lo, hi):
+            if (t0s[i] if dirs[i] & 1 else t1s[i]) == start or single:
+                if usds[i] is not None:
+                    volume += usds[i]
+
+        # Volume Fallback for low-liquidity pairs or missing price data
+        if volume < 0.01:
+            for i in range(lo, hi):
+                if usds[i] is not None and usds[i] > 0:
+                    volume += usds[i]
+                    break
+
+        if volume < 0.01:
+            t0_sym = self._symbols[t0s[lo]]
+            t1_sym = self._symbols[t1s[lo]]
+            p0 = self.prices.get(t0_sym)
+            p1 = self.prices.get(t1_sym)
+            if p0 is None and any(x in t0_sym for x in ['USD', 'EUR']): p0 = 1.0
+            if p1 is None and any(x in t1_sym for x in ['USD', 'EUR']): p1 = 1.0
+
+            a0_norm = abs(first_swap.get('amount0', 0) or 0)
+            if a0_norm > 1e12: a0_norm /= 1e18
+            a1_norm = abs(first_swap.get('amount1', 0) or 0)
+            if a1_norm > 1e12: a1_norm /= 1e18
+
+            if p0 is not None:
+                volume = a0_norm * p0
+            elif p1 is not None:
+                volume = a1_norm * p1
+        return volume
+
+    def _codes_for(self, tokens) -> Optional[frozenset]:
+        """Query tokens as a set of codes; None for the '*' wildcard."""
+        if isinstance(tokens, str): tokens = [tokens]
+        tokens = [t.upper() for t in tokens]
+        if '*' in tokens:
+            return None
+        return frozenset(self._codes[t] for t in tokens if t in self._codes)
+
+    def _scan(self, starts: Optional[frozenset], ends: Optional[frozenset]):
+        """Evaluate a set/wildcard query tx by tx over the compiled table."""
+        t0s, t1s, dirs, fees, tx_lo = self._t0, self._t1, self._dir, self._fee, self._tx_lo
+        for tx, heads in enumerate(self._tx_starts):
+            if not heads:
+                continue
+            if starts is None:
+                start, pid, volume = heads[0]
+            else:
+                for start, pid, volume in heads:
+                    if start in starts:
+                        break
+                else:
+                    continue
+            if ends is None or self._paths[pid][-1] in ends:
+                yield tx, pid, volume
+                continue
+            if starts is None:
+                continue  # a wildcard origin never matches a direct leg
+            for i in range(tx_lo[tx], tx_lo[tx + 1]):
+                if dirs[i] & 1 and t0s[i] in starts and t1s[i] in ends:
+                    yield tx, self._path_id((t0s[i], fees[i], t1s[i])), volume
+                    break
+                if dirs[i] & 2 and t1s[i] in starts and t0s[i] in ends:
+                    yield tx, self._path_id((t1s[i], fees[i], t0s[i])), volume
+                    break
+
+    def analyze(self, start_tokens: List[str], end_tokens: List[str]) -> Dict:
+        """
+        Routes from start_tokens to end_tokens, in RouteAnalyzer.get_results shape.
+        A single token on each side is a direct index lookup.
+        """
+        starts = self._codes_for(start_tokens)
+        ends = self._codes_for(end_tokens)
+        if starts == frozenset() or ends == frozenset():
+            entries = ()  # no swap touches any of the tokens on one side
+        elif starts is not None and ends is not None and len(starts) == 1 and len(ends) == 1:
+            entries = self._index.get((next(iter(starts)), next(iter(ends))), ())
+        else:
+            entries = self._scan(starts, ends)
+
+        tx_lo, tx_last_ts, path_strs = self._tx_lo, self._tx_last_ts, self._path_strs
+        stats = {}
+        total_tx = 0
+        total_volume = 0.0
+        for tx, pid, volume in entries:
+            path_str = path_strs[pid]
+            st = stats.get(path_str)
+            if st is None:
+                st = stats[path_str] = {
+                    'tx_count': 0,
+                    'swap_count': 0,
+                    'volume_usd': 0.0,
+                    'path': self._path_list(pid),
+                    'last_ts': None
+                }
+            st['tx_count'] += 1
+            st['swap_count'] += tx_lo[tx + 1] - tx_lo[tx]
+            st['volume_usd'] += volume
+            ts = tx_last_ts[tx]
+            if ts is not None and (st['last_ts'] is None or ts > st['last_ts']):
+                st['last_ts'] = ts
+            total_tx += 1
+            total_volume += volume
+        return _summarize_routes(stats, total_tx, total_volume)
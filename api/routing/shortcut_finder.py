@@ -5,6 +5,20 @@ Scans multi-hop DEX routes between correlated token families to identify
 opportunities for direct stable-pair pools that can undercut multi-hop fees
 while remaining lucrative for LPs.
 
+Two modes:
+  aggregate (default) -- route flows between family tokens come from the
+      route aggregates (pair_daily_stats / route_daily_stats + route_path /
+      route_hop, see PostgresFetcher.fetch_route_stats) in one read; no raw
+      swaps are touched and the cost grows with the number of routes.
+  raw -- every swap in the window is streamed once into a RouteIndex
+      (route_analyzer) and each candidate pair is answered from it; kept to
+      verify the aggregate mode.
+
+The modes agree except on a tx that splits its input across a direct pool
+and a multi-hop chain: the classifier records each contiguous chain as its
+own route, while raw mode follows one chain per tx from its first leg and
+books the whole input there (TestModeParity in test_shortcut_finder.py).
+
 Concept: docs/concepts/stable-pair-shortcut.md
 """
 
@@ -12,7 +26,7 @@ import os
 import sys
 import logging
 from itertools import combinations
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Tuple, Optional, Set
 from collections import defaultdict
 
@@ -28,7 +42,8 @@ if INCLUDE_DIR not in sys.path:
     sys.path.insert(0, INCLUDE_DIR)
 
 from postgres_fetcher import PostgresFetcher
-from route_analyzer import RouteAnalyzer
+from route_analyzer import RouteIndex
+import swap_set_cache
 from coin_family_resolver import CoinFamilyResolver
 from config import DATA_WAREHOUSE_DB
 
@@ -43,6 +58,14 @@ DEFAULT_TVL_TARGETS = [100_000, 500_000, 1_000_000]
 # Minimum divertable volume (USD) to consider a shortcut worth listing
 DEFAULT_MIN_VOLUME = 10_000
 
+# Where route flows come from: route aggregates, or raw swaps (verification)
+FINDER_MODES = ('aggregate', 'raw')
+
+
+def _epoch(dt: datetime) -> float:
+    """Unix time of dt; naive datetimes are taken as UTC (as in day_window)."""
+    return (dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt).timestamp()
+
 
 class ShortcutOpportunity:
     """Represents a single stable-pair shortcut opportunity."""
@@ -100,7 +123,8 @@ class ShortcutFinder:
 
     Workflow:
     1. Load coin families and generate candidate pairs
-    2. For each pair, run route analysis to find multi-hop routes
+    2. For each pair, collect its routes (from the route aggregates, or by
+       running route analysis over raw swaps in raw mode)
     3. Identify routes with volatile intermediaries
     4. Calculate shortcut economics
     5. Rank and return opportunities
@@ -113,12 +137,19 @@ class ShortcutFinder:
         min_volume: float = DEFAULT_MIN_VOLUME,
         tvl_targets: Optional[List[float]] = None,
         verbose: bool = False,
+        swap_cache=None,
+        mode: str = 'aggregate',
     ):
+        if mode not in FINDER_MODES:
+            raise ValueError(f"mode must be one of {FINDER_MODES}, got {mode!r}")
         self.families = families  # None = all correlated families
         self.cross_family = cross_family
         self.min_volume = min_volume
         self.tvl_targets = tvl_targets or DEFAULT_TVL_TARGETS
         self.verbose = verbose
+        # Optional swap_set_cache.SwapSetCache shared across requests (raw mode)
+        self.swap_cache = swap_cache
+        self.mode = mode
 
         config_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(ROUTING_DIR)), 'config', 'coin-families.yml'))
         self.family_resolver = CoinFamilyResolver(config_path, DATA_WAREHOUSE_DB)
@@ -284,23 +315,43 @@ class ShortcutFinder:
         family_b: str,
         swaps: List[Dict],
         period_days: float,
+        index: Optional[RouteIndex] = None,
+    ) -> Optional[ShortcutOpportunity]:
+        """
+        Analyze a single token pair for shortcut opportunities (raw mode).
+        Pass the RouteIndex built once over `swaps` when analyzing many pairs.
+        """
+        # Run route analysis A -> B
+        if index is None:
+            index = RouteIndex(swaps, prices=self.prices)
+        analysis = index.analyze([token_a], [token_b])
+        return self._opportunity_from_routes(
+            token_a, token_b, family_a, family_b,
+            analysis.get('routes', []), period_days
+        )
+
+    def _opportunity_from_routes(
+        self,
+        token_a: str,
+        token_b: str,
+        family_a: str,
+        family_b: str,
+        routes: List[Dict],
+        period_days: float,
     ) -> Optional[ShortcutOpportunity]:
         """
-        Analyze a single token pair for shortcut opportunities.
+        Build the opportunity for A -> B from its routes (RouteAnalyzer shape:
+        path, path_tokens, hops, volume, count), or None if too little volume
+        flows through volatile intermediaries.
         """
+        if not routes:
+            return None
+
         # Build set of all tokens in both families (these are "non-volatile" for this pair)
         family_a_tokens = self._get_family_tokens(family_a)
         family_b_tokens = self._get_family_tokens(family_b)
         family_tokens_combined = family_a_tokens | family_b_tokens
 
-        # Run route analysis A -> B
-        analyzer = RouteAnalyzer(verbose=False, prices=self.prices)
-        analysis = analyzer.analyze_routes(swaps, [token_a], [token_b])
-
-        routes = analysis.get('routes', [])
-        if not routes:
-            return None
-
         opp = ShortcutOpportunity(token_a, token_b, family_a, family_b)
 
         # Classify routes
@@ -382,6 +433,111 @@ class ShortcutFinder:
 
         return opp
 
+    @staticmethod
+    def _format_path(path_tokens: List[str]) -> str:
+        """Path string in RouteAnalyzer's format: A -- fee|protocol|network --> B ..."""
+        return ' '.join(t if i % 2 == 0 else f"-- {t} -->" for i, t in enumerate(path_tokens))
+
+    def _load_route_flows(self, start_date: datetime, end_date: datetime,
+                          target_tokens: Set[str]) -> Optional[Dict[Tuple[str, str], List[Dict]]]:
+        """Routes between target tokens keyed by (origin, dest) symbol, or None
+        on a DB error.
+
+        One aggregate read covers every candidate pair: per-route sums from
+        pair_daily_stats (route_daily_stats before the rollup exists) and
+        paths from route_path / route_hop. Days are whole UTC days; the
+        window end is exclusive, as in raw mode.
+        """
+        tokens = sorted(t.upper() for t in target_tokens)
+        try:
+            stats = self.fetcher.fetch_route_stats(
+                start_date, end_date - timedelta(microseconds=1),
+                start_tokens=tokens, end_tokens=tokens,
+            )
+        except Exception as e:
+            self._log(f"ERROR: Could not load route aggregates from database: {e}")
+            return None
+
+        flows: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        for route in stats.get('routes', []):
+            path_tokens = route.get('path_tokens') or []
+            if len(path_tokens) < 2:
+                continue
+            origin, dest = path_tokens[0].upper(), path_tokens[-1].upper()
+            if origin != dest:
+                flows[(origin, dest)].append({**route, 'path': self._format_path(path_tokens)})
+        self._log(f"Loaded {len(stats.get('routes', []))} aggregated routes over {len(flows)} token pairs")
+        return flows
+
+    def _load_relevant_swaps(self, start_date: datetime, end_date: datetime,
+                             target_tokens: Set[str]) -> Optional[List[Dict]]:
+        """Swap legs of every tx touching a target token, or None on a DB error.
+
+        With self.swap_cache the legs are loaded for the whole UTC days around
+        the window (so rolling windows share an entry), cached until the
+        ingestion watermark moves, and trimmed to the exact bounds.
+        """
+        if self.swap_cache is None:
+            return self._fetch_relevant_swaps(start_date, end_date, target_tokens)
+
+        day_lo, day_hi = swap_set_cache.day_window(start_date, end_date)
+        cache_key = swap_set_cache.cache_key("sps", (target_tokens,), None, day_lo, day_hi)
+        watermark = self.fetcher.fetch_ingestion_watermark()
+        cached = self.swap_cache.get(cache_key, watermark)
+        if cached is not None:
+            self._log(f"Loaded {len(cached['swaps'])} relevant swap events (cached)")
+        else:
+            cached = {'swaps': self._fetch_relevant_swaps(
+                day_lo, day_hi - timedelta(microseconds=1), target_tokens)}
+            if cached['swaps'] is None:
+                return None
+            self.swap_cache.put(cache_key, watermark, cached)
+        lo, hi = _epoch(start_date), _epoch(end_date)
+        return [s for s in cached['swaps'] if lo <= s['timestamp'] <= hi]
+
+    def _fetch_relevant_swaps(self, start_date: datetime, end_date: datetime,
+                              target_tokens: Set[str]) -> Optional[List[Dict]]:
+        """Stream [start_date, end_date] and keep the target-token txs."""
+
+        # Stream swap data in 5-day windows, keeping only transactions that
+        # involve at least one target token. Rows arrive ordered by
+        # (tx_hash, log_index), so each tx's legs are contiguous: buffer one
+        # tx, keep ALL its legs if any touches a target token (we need the
+        # full tx to reconstruct multi-hop paths), then move on. Only the
+        # relevant legs are ever held in memory.
+        self._log("Fetching swap data...")
+        BATCH_DAYS = 5
+        all_swaps = []
+        total_fetched = 0
+        current_start = start_date
+        try:
+            while current_start < end_date:
+                chunk_end = min(current_start + timedelta(days=BATCH_DAYS), end_date)
+                tx_hash, tx_legs, relevant = None, [], False
+                for batch in self.fetcher.iter_swaps(current_start, chunk_end):
+                    total_fetched += len(batch)
+                    for swap in batch:
+                        if swap['tx_hash'] != tx_hash:
+                            if relevant:
+                                all_swaps.extend(tx_legs)
+                            tx_hash, tx_legs, relevant = swap['tx_hash'], [], False
+                        tx_legs.append(swap)
+                        if not relevant:
+                            t0 = (swap.get('token0_symbol') or '').upper()
+                            t1 = (swap.get('token1_symbol') or '').upper()
+                            relevant = t0 in target_tokens or t1 in target_tokens
+                if relevant:
+                    all_swaps.extend(tx_legs)
+
+                current_start = chunk_end + timedelta(microseconds=1)
+        except Exception as e:
+            self._log(f"ERROR: Could not fetch swap data from database: {e}")
+            self._log("Make sure the database is running (docker-compose up -d)")
+            return None
+
+        self._log(f"Loaded {len(all_swaps)} relevant swap events (from {total_fetched:,} total)")
+        return all_swaps
+
     def find(
         self,
         start_date: datetime,
@@ -423,45 +579,31 @@ class ShortcutFinder:
             target_tokens |= self._get_family_tokens(family_b)
         self._log(f"Pre-filter token set ({len(target_tokens)}): {sorted(target_tokens)[:20]}{'...' if len(target_tokens) > 20 else ''}")
 
-        # Fetch swap data in batches, keeping only transactions that involve
-        # at least one target token (this massively reduces memory for large ranges)
-        self._log("Fetching swap data...")
-        BATCH_DAYS = 5
-        all_swaps = []
-        total_fetched = 0
-        current_start = start_date
-        try:
-            while current_start < end_date:
-                chunk_end = min(current_start + timedelta(days=BATCH_DAYS), end_date)
-                batch = self.fetcher.fetch_swaps(current_start, chunk_end)
-                total_fetched += len(batch) if batch else 0
-
-                if batch:
-                    # First pass: find tx_hashes that involve a target token
-                    relevant_tx_hashes = set()
-                    for swap in batch:
-                        t0 = (swap.get('token0_symbol') or '').upper()
-                        t1 = (swap.get('token1_symbol') or '').upper()
-                        if t0 in target_tokens or t1 in target_tokens:
-                            relevant_tx_hashes.add(swap['tx_hash'])
+        if self.mode == 'aggregate':
+            flows = self._load_route_flows(start_date, end_date, target_tokens)
+            if not flows:
+                self._log("No route data found")
+                return []
 
-                    # Second pass: keep ALL swaps in relevant transactions
-                    # (we need the full tx to reconstruct multi-hop paths)
-                    for swap in batch:
-                        if swap['tx_hash'] in relevant_tx_hashes:
-                            all_swaps.append(swap)
+            def analyze(token_a, token_b, family_a, family_b):
+                routes = flows.get((token_a.upper(), token_b.upper()), [])
+                return self._opportunity_from_routes(
+                    token_a, token_b, family_a, family_b, routes, period_days)
+        else:
+            all_swaps = self._load_relevant_swaps(start_date, end_date, target_tokens)
+            if all_swaps is None:
+                return []
 
-                current_start = chunk_end + timedelta(microseconds=1)
-        except Exception as e:
-            self._log(f"ERROR: Could not fetch swap data from database: {e}")
-            self._log("Make sure the database is running (docker-compose up -d)")
-            return []
+            if not all_swaps:
+                self._log("No swap data found")
+                return []
 
-        self._log(f"Loaded {len(all_swaps)} relevant swap events (from {total_fetched:,} total)")
+            index = RouteIndex(all_swaps, prices=self.prices)
+            self._log(f"Indexed {index.tx_count:,} transactions")
 
-        if not all_swaps:
-            self._log("No swap data found")
-            return []
+            def analyze(token_a, token_b, family_a, family_b):
+                return self._analyze_pair(
+                    token_a, token_b, family_a, family_b, all_swaps, period_days, index=index)
 
         # Analyze each candidate pair
         opportunities = []
@@ -470,10 +612,7 @@ class ShortcutFinder:
         for idx, (token_a, token_b, family_a, family_b) in enumerate(candidates):
             self._log(f"  [{idx+1}/{total}] Analyzing {token_a}/{token_b} ({family_a}{'×'+family_b if family_a != family_b else ''})...")
 
-            opp = self._analyze_pair(
-                token_a, token_b, family_a, family_b,
-                all_swaps, period_days
-            )
+            opp = analyze(token_a, token_b, family_a, family_b)
 
             if opp:
                 self._log(f"    → FOUND: ${opp.total_divertable_volume:,.0f} divertable via {len(opp.multihop_routes)} multi-hop routes")
@@ -492,10 +631,7 @@ class ShortcutFinder:
 
             self._log(f"  [Rev {idx+1}/{total}] Analyzing {token_a}/{token_b}...")
 
-            opp = self._analyze_pair(
-                token_a, token_b, family_a, family_b,
-                all_swaps, period_days
-            )
+            opp = analyze(token_a, token_b, family_a, family_b)
 
             if opp:
                 if existing:
@@ -0,0 +1,280 @@
+"""Prepared swap-set cache for the counterfactual tools.
+
+/api/routes/undercut (plus its sweep) and /api/sps/find are the only
+endpoints that read raw `swaps`, and a backtest re-reads the same
+multi-hundred-thousand-row window on every request. This module keeps the
+prepared event lists those tools build (normalized legs, already split by
+first-leg direction) in an in-process LRU bounded by an estimated byte
+budget, so repeated backtests over the same pair skip the database.
+
+Entries are keyed by tool, resolved token families, network and a
+day-aligned window (callers trim to their exact bounds), and stamped with the
+`ingestion_state` watermark (MAX(updated_at)) they were built under: any
+ingestion run for the network moves the watermark and invalidates the entry
+on its next lookup. Without a watermark nothing is cached.
+
+Entries evicted from memory can spill to Parquet when pyarrow is installed
+and SWAP_SET_CACHE_SPILL_DIR is set. Spilled rows keep only scalar columns
+that fit Parquet; derived values (Q64.96 prices) are rebuilt by the
+`rehydrate` hook passed to put(). Cached rows are shared between requests — treat them as read-only.
+
+Pure-python apart from the optional pyarrow import.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # spill is optional; the in-memory LRU works without it
+    pa = pq = None
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("SWAP_SET_CACHE_MB", "512")) * 1024 * 1024)
+DEFAULT_SPILL_MAX_BYTES = int(float(os.getenv("SWAP_SET_CACHE_SPILL_MB", "4096")) * 1024 * 1024)
+
+# Rows sampled per part when estimating its footprint.
+_SIZE_SAMPLE = 64
+
+_SPILL_TYPES = (str, int, float, bool, datetime, type(None))
+_INT64 = 1 << 63
+
+
+def _spillable(v) -> bool:
+    # Parquet ints are 64-bit; wider ints (Q64.96 prices) are rebuilt instead.
+    if isinstance(v, int) and not isinstance(v, bool):
+        return -_INT64 <= v < _INT64
+    return isinstance(v, _SPILL_TYPES)
+
+Parts = Dict[str, List[dict]]
+
+
+def day_window(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """Widen [start, end] to whole UTC days: (start's midnight, the midnight
+    after end). Naive datetimes are taken as UTC."""
+    def utc(dt):
+        return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+    lo = datetime.combine(utc(start).date(), time(0), tzinfo=timezone.utc)
+    e = utc(end)
+    hi = datetime.combine(e.date(), time(0), tzinfo=timezone.utc)
+    if hi < e:
+        hi += timedelta(days=1)
+    return lo, hi
+
+
+def cache_key(tool: str, families, network: Optional[str],
+              start: datetime, end: datetime) -> tuple:
+    """Normalized key: token families are order- and case-insensitive within
+    each side, the network is case-insensitive."""
+    fam = tuple(tuple(sorted({t.upper() for t in side})) for side in families)
+    return (tool, fam, (network or "").lower(), start.isoformat(), end.isoformat())
+
+
+def _value_bytes(v) -> int:
+    n = sys.getsizeof(v)
+    if isinstance(v, Fraction):
+        n += sys.getsizeof(v.numerator) + sys.getsizeof(v.denominator)
+    return n
+
+
+def estimate_rows_bytes(rows: List[dict]) -> int:
+    """Approximate deep size of a list of flat dict rows, from a sample."""
+    if not rows:
+        return sys.getsizeof(rows)
+    step = max(1, len(rows) // _SIZE_SAMPLE)
+    sample = rows[::step][:_SIZE_SAMPLE]
+    per_row = sum(sys.getsizeof(r) + sum(_value_bytes(v) for v in r.values())
+                  for r in sample) / len(sample)
+    return sys.getsizeof(rows) + int(per_row * len(rows))
+
+
+def estimate_parts_bytes(parts: Parts) -> int:
+    return sum(estimate_rows_bytes(rows) for rows in parts.values())
+
+
+class SwapSetCache:
+    """LRU of prepared swap sets bounded by an estimated byte budget."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 spill_dir: Optional[str] = None,
+                 spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir if (spill_dir and pq is not None) else None
+        self.spill_max_bytes = spill_max_bytes
+        self._lock = threading.Lock()
+        # key -> (watermark, parts, nbytes, rehydrate)
+        self._mem: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # key -> (watermark, {part: path}, file_bytes, rehydrate)
+        self._spilled: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._spill_bytes = 0
+        self._stats = {"hits": 0, "spill_hits": 0, "misses": 0,
+                       "invalidations": 0, "evictions": 0, "spills": 0}
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    # -- public API -----------------------------------------------------
+
+    def get(self, key: tuple, watermark) -> Optional[Parts]:
+        """Cached parts for key, or None when absent or built under a
+        different ingestion watermark (stale entries are dropped)."""
+        if watermark is None or self.max_bytes <= 0:
+            return None
+        with self._lock:
+            ent = self._mem.get(key)
+            if ent is not None:
+                if ent[0] == watermark:
+                    self._mem.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return ent[1]
+                self._drop_mem(key)
+                self._stats["invalidations"] += 1
+            spilled = self._spilled.pop(key, None)
+            if spilled is not None:
+                self._spill_bytes -= spilled[2]
+            if spilled is None or spilled[0] != watermark:
+                if spilled is not None:
+                    self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+        if spilled is None or spilled[0] != watermark:
+            if spilled is not None:
+                _remove_files(spilled[1])
+            return None
+
+        parts = self._read_spill(spilled[1], spilled[3])
+        _remove_files(spilled[1])
+        if parts is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["spill_hits"] += 1
+        self.put(key, watermark, parts, rehydrate=spilled[3])
+        return parts
+
+    def put(self, key: tuple, watermark, parts: Parts,
+            rehydrate: Optional[Callable[[str, List[dict]], None]] = None) -> None:
+        """Store parts (name -> list of row dicts) built under watermark.
+
+        `rehydrate(name, rows)` restores non-scalar fields after a spill
+        read; it must mutate the rows in place."""
+        if watermark is None or self.max_bytes <= 0:
+            return
+        nbytes = estimate_parts_bytes(parts)
+        evicted, stale = [], None
+        with self._lock:
+            if key in self._mem:
+                self._drop_mem(key)
+            stale = self._spilled.pop(key, None)
+            if stale is not None:
+                self._spill_bytes -= stale[2]
+            if nbytes > self.max_bytes:
+                evicted.append((key, (watermark, parts, nbytes, rehydrate)))
+            else:
+                self._mem[key] = (watermark, parts, nbytes, rehydrate)
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes:
+                    old_key, old = self._mem.popitem(last=False)
+                    self._bytes -= old[2]
+                    self._stats["evictions"] += 1
+                    evicted.append((old_key, old))
+        if stale is not None:
+            _remove_files(stale[1])
+        for old_key, old in evicted:
+            self._spill(old_key, old)
+
+    def clear(self) -> None:
+        with self._lock:
+            spilled = list(self._spilled.values())
+            self._mem.clear()
+            self._spilled.clear()
+            self._bytes = self._spill_bytes = 0
+        for ent in spilled:
+            _remove_files(ent[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._mem), bytes=self._bytes,
+                        max_bytes=self.max_bytes, spilled_entries=len(self._spilled),
+                        spill_bytes=self._spill_bytes, spill_enabled=bool(self.spill_dir))
+
+    # -- internals ------------------------------------------------------
+
+    def _drop_mem(self, key):
+        ent = self._mem.pop(key)
+        self._bytes -= ent[2]
+
+    def _spill(self, key, ent):
+        if not self.spill_dir:
+            return
+        watermark, parts, _, rehydrate = ent
+        stem = hashlib.sha1(repr(key).encode()).hexdigest()
+        paths, size = {}, 0
+        try:
+            for name, rows in parts.items():
+                path = os.path.join(self.spill_dir, f"{stem}.{name}.parquet")
+                cols = [c for c in (rows[0] if rows else {})
+                        if all(_spillable(r.get(c)) for r in rows)]
+                table = pa.Table.from_pylist([{c: r.get(c) for c in cols} for r in rows])
+                pq.write_table(table, path)
+                paths[name] = path
+                size += os.path.getsize(path)
+        except Exception as e:
+            print(f"[swap_set_cache] spill failed for {key}: {e}")
+            _remove_files(paths)
+            return
+        stale = []
+        with self._lock:
+            prev = self._spilled.pop(key, None)
+            if prev is not None:
+                self._spill_bytes -= prev[2]
+            self._spilled[key] = (watermark, paths, size, rehydrate)
+            self._spill_bytes += size
+            self._stats["spills"] += 1
+            while self._spill_bytes > self.spill_max_bytes and len(self._spilled) > 1:
+                _, old = self._spilled.popitem(last=False)
+                self._spill_bytes -= old[2]
+                stale.append(old[1])
+        for old_paths in stale:
+            _remove_files(old_paths)
+
+    @staticmethod
+    def _read_spill(paths, rehydrate) -> Optional[Parts]:
+        try:
+            parts = {name: pq.read_table(path).to_pylist() for name, path in paths.items()}
+        except Exception as e:
+            print(f"[swap_set_cache] spill read failed: {e}")
+            return None
+        if rehydrate is not None:
+            for name, rows in parts.items():
+                rehydrate(name, rows)
+        return parts
+
+
+def _remove_files(paths):
+    for path in paths.values():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_CACHE: Optional[SwapSetCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> SwapSetCache:
+    """Process-wide cache configured from SWAP_SET_CACHE_MB (0 disables),
+    SWAP_SET_CACHE_SPILL_DIR and SWAP_SET_CACHE_SPILL_MB."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SwapSetCache(spill_dir=os.getenv("SWAP_SET_CACHE_SPILL_DIR") or None)
+        return _CACHE
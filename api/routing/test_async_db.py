@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import async_db
+from postgres_fetcher import PoolMetrics
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def test_saturation_and_waits(self):
+        m = PoolMetrics(4)
+        for _ in range(3):
+            m.begin_wait()
+            m.acquired(0.01)
+        m.begin_wait()
+        m.gave_up(timeout=True)
+        m.released()
+        snap = m.snapshot()
+        self.assertEqual((snap["in_use"], snap["peak_in_use"], snap["waiting"]), (2, 3, 0))
+        self.assertEqual((snap["acquired"], snap["timeouts"], snap["errors"]), (3, 1, 0))
+        self.assertAlmostEqual(snap["saturation"], 0.5)
+        self.assertAlmostEqual(snap["avg_wait_ms"], 10.0)
+
+    def test_thread_safe_counts(self):
+        m = PoolMetrics(8)
+
+        def worker():
+            for _ in range(1000):
+                m.begin_wait()
+                m.acquired(0.0)
+                m.released()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        snap = m.snapshot()
+        self.assertEqual((snap["acquired"], snap["in_use"], snap["waiting"]), (8000, 0, 0))
+
+
+class TestStatementTimeout(unittest.TestCase):
+    def test_endpoint_override_falls_back_to_default(self):
+        with patch.dict(os.environ, {"DB_STATEMENT_TIMEOUT_MS_UNDERCUT": "120000"}):
+            self.assertEqual(async_db.statement_timeout_ms("undercut"), 120000)
+            self.assertEqual(async_db.statement_timeout_ms("analyze"), async_db.DB_STATEMENT_TIMEOUT_MS)
+        self.assertEqual(async_db.statement_timeout_ms(), async_db.DB_STATEMENT_TIMEOUT_MS)
+
+
+class TestSyncFallback(unittest.TestCase):
+    def test_fetch_runs_on_sync_pool_without_async_pool(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [("USDC",), ("USDT",)]
+        conn = MagicMock()
+        conn.cursor.return_value = cur
+        get_conn = MagicMock()
+        get_conn.return_value.__enter__.return_value = conn
+        with patch.object(async_db, "_POOL", None), patch.object(async_db, "get_conn", get_conn):
+            rows = asyncio.run(async_db.fetch_all("SELECT 1 WHERE %s", ("USD",), statement_timeout=5000))
+        self.assertEqual(rows, [("USDC",), ("USDT",)])
+        get_conn.assert_called_once_with(5000)
+        cur.execute.assert_called_once_with("SELECT 1 WHERE %s", ("USD",))
+        self.assertFalse(async_db.is_async())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import enrichment_client as ec
+
+LIQUIDITY = {'0xaaa': 1500.0, '0xbbb': 2.5}
+LIQUIDITY.update({f'0x{i:03x}': float(i) for i in range(0x100, 0x100 + 40)})
+
+
+class StubDexScreener(BaseHTTPRequestHandler):
+    """/latest/dex/pairs/{chain}/{a,b,...}: known addresses come back with
+    checksum-ish casing; `status` and `delay` are set per test."""
+
+    requests = []
+    status = 200
+    delay = 0.0
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        if self.delay:
+            time.sleep(self.delay)
+        parts = self.path.strip('/').split('/')
+        addrs = parts[-1].split(',') if len(parts) == 5 else []
+        if self.status != 200:
+            body = b'{}'
+        else:
+            pairs = [{'chainId': parts[3], 'pairAddress': a.upper().replace('0X', '0x'),
+                      'liquidity': {'usd': LIQUIDITY[a]}}
+                     for a in addrs if a in LIQUIDITY]
+            body = json.dumps({'schemaVersion': '1.0.0', 'pairs': pairs or None}).encode()
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class EnrichmentClientTests:
+    use_aiohttp = True
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubDexScreener)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubDexScreener.requests = []
+        StubDexScreener.status = 200
+        StubDexScreener.delay = 0.0
+        self.clock = Clock()
+        self.client = ec.EnrichmentClient(self.url, timeout_s=2.0, ttl_s=60, negative_ttl_s=300,
+                                          error_ttl_s=10, clock=self.clock,
+                                          use_aiohttp=self.use_aiohttp)
+
+    def run_async(self, coro):
+        async def scenario():
+            try:
+                return await coro
+            finally:
+                await self.client.close()
+        return asyncio.run(scenario())
+
+    def test_concurrent_lookups_are_batched_per_chain(self):
+        pools = [('Ethereum', f'0x{i:03x}') for i in range(0x100, 0x100 + 35)]
+        pools += [('BNB', '0xaaa'), ('bsc', '0xaaa'), ('Solana', '0xaaa'), ('Base', None)]
+        values = self.run_async(self.client.dexscreener_tvls(pools))
+        self.assertEqual(values[('Ethereum', '0x100')], 256.0)
+        self.assertEqual(values[('BNB', '0xaaa')], 1500.0)
+        self.assertEqual(values[('bsc', '0xaaa')], 1500.0)
+        self.assertIsNone(values[('Solana', '0xaaa')])
+        self.assertIsNone(values[('Base', None)])
+        eth = [r for r in StubDexScreener.requests if '/ethereum/' in r]
+        self.assertEqual(sorted(len(r.rsplit('/', 1)[1].split(',')) for r in eth), [5, 30])
+        self.assertEqual(sum('/bsc/' in r for r in StubDexScreener.requests), 1)
+        self.assertEqual(self.client.stats()['coalesced'], 1)
+
+    def test_hits_and_negative_hits_skip_the_network(self):
+        async def scenario():
+            first = await self.client.dexscreener_tvls([('Ethereum', '0xAAA'), ('Ethereum', '0xfff')])
+            second = await self.client.dexscreener_tvls([('ethereum', '0xaaa'), ('Ethereum', '0xFFF')])
+            return first, second
+
+        first, second = self.run_async(scenario())
+        self.assertEqual(list(first.values()), [1500.0, None])
+        self.assertEqual(list(second.values()), [1500.0, None])
+        self.assertEqual(len(StubDexScreener.requests), 1)
+        stats = self.client.stats()
+        self.assertEqual((stats['hits'], stats['negative_hits']), (1, 1))
+
+    def test_entries_expire(self):
+        async def scenario():
+            await self.client.dexscreener_tvl('Ethereum', '0xaaa')
+            await self.client.dexscreener_tvl('Ethereum', '0xfff')
+            self.clock.now += 61  # past the positive TTL only
+            await self.client.dexscreener_tvl('Ethereum', '0xaaa')
+            await self.client.dexscreener_tvl('Ethereum', '0xfff')
+            self.clock.now += 300
+            await self.client.dexscreener_tvl('Ethereum', '0xfff')
+
+        self.run_async(scenario())
+        self.assertEqual([r.rsplit('/', 1)[1] for r in StubDexScreener.requests],
+                         ['0xaaa', '0xfff', '0xaaa', '0xfff'])
+
+    def test_errors_are_cached_briefly(self):
+        StubDexScreener.status = 503
+
+        async def scenario():
+            a = await self.client.dexscreener_tvl('Ethereum', '0xaaa')
+            b = await self.client.dexscreener_tvl('Ethereum', '0xaaa')
+            StubDexScreener.status = 200
+            self.clock.now += 11
+            c = await self.client.dexscreener_tvl('Ethereum', '0xaaa')
+            return a, b, c
+
+        self.assertEqual(self.run_async(scenario()), (None, None, 1500.0))
+        self.assertEqual(len(StubDexScreener.requests), 2)
+        self.assertEqual(self.client.stats()['errors'], 1)
+
+    def test_deadline_returns_early_and_late_result_is_cached(self):
+        StubDexScreener.delay = 0.5
+
+        async def scenario():
+            t0 = time.perf_counter()
+            early = await self.client.dexscreener_tvl('Ethereum', '0xaaa', deadline_s=0.05)
+            waited = time.perf_counter() - t0
+            while self.client.stats()['in_flight']:
+                await asyncio.sleep(0.02)
+            late = await self.client.dexscreener_tvl('Ethereum', '0xaaa', deadline_s=0.05)
+            return early, waited, late
+
+        early, waited, late = self.run_async(scenario())
+        self.assertIsNone(early)
+        self.assertLess(waited, 0.4)
+        self.assertEqual(late, 1500.0)
+        self.assertEqual(len(StubDexScreener.requests), 1)
+        self.assertEqual(self.client.stats()['timeouts'], 1)
+
+
+@unittest.skipIf(ec.aiohttp is None, "aiohttp is not installed")
+class TestAiohttpTransport(EnrichmentClientTests, unittest.TestCase):
+    use_aiohttp = True
+
+
+class TestRequestsTransport(EnrichmentClientTests, unittest.TestCase):
+    use_aiohttp = False
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_bounded_and_expiring(self):
+        clock = Clock()
+        cache = ec.TTLCache(max_entries=2, clock=clock)
+        cache.put('a', None, 10)
+        cache.put('b', 1.0, 5)
+        cache.put('c', 2.0, 10)
+        self.assertEqual(cache.get('a'), (False, None))  # evicted
+        self.assertEqual(cache.get('b'), (True, 1.0))
+        clock.now += 5
+        self.assertEqual(cache.get('b'), (False, None))  # expired
+        self.assertEqual(cache.get('c'), (True, 2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
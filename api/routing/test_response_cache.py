@@ -0,0 +1,171 @@
+import asyncio
+import unittest
+from datetime import date, datetime
+
+import response_cache as rc
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Compute:
+    """Counts calls; each call waits for `gate` (when set) and returns the next value."""
+
+    def __init__(self, gate=None, fail=False):
+        self.calls, self.gate, self.fail = 0, gate, fail
+
+    async def __call__(self, emit):
+        self.calls += 1
+        emit({"pct": 10.0})
+        if self.gate is not None:
+            await self.gate.wait()
+        emit({"pct": 100.0})
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"n": self.calls}
+
+
+async def _collect(cache, key, watermark, compute):
+    return [item async for item in cache.stream(key, watermark, compute)]
+
+
+class TestKeys(unittest.TestCase):
+    def test_families_network_and_lists_are_normalized(self):
+        a = rc.cache_key("analyze", (["usdc", "USDT"], ["WETH"]), "Ethereum",
+                         date(2026, 3, 1), date(2026, 3, 7), exclude=["base", "bsc"], max_hops=None)
+        b = rc.cache_key("analyze", (["USDT", "USDC"], ["weth"]), "ethereum",
+                         date(2026, 3, 1), date(2026, 3, 7), max_hops=None, exclude=["bsc", "base"])
+        self.assertEqual(a, b)
+        c = rc.cache_key("analyze", (["WETH"], ["USDC", "USDT"]), "ethereum",
+                         date(2026, 3, 1), date(2026, 3, 7), exclude=["base", "bsc"], max_hops=None)
+        self.assertNotEqual(a, c)
+
+    def test_align_window(self):
+        s, e = datetime(2026, 3, 1, 10, 17, 5), datetime(2026, 3, 2, 9, 59, 59)
+        self.assertEqual(rc.align_window(s, e), (date(2026, 3, 1), date(2026, 3, 2)))
+        self.assertEqual(rc.align_window(s, e, "hour"),
+                         (datetime(2026, 3, 1, 10), datetime(2026, 3, 2, 9)))
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = rc.ResponseCache(ttl_s=60, stale_s=600, max_entries=2, clock=self.clock)
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_concurrent_requests_share_one_computation(self):
+        async def scenario():
+            gate = asyncio.Event()
+            compute = Compute(gate)
+            first = asyncio.ensure_future(_collect(self.cache, ("k",), 1, compute))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(_collect(self.cache, ("k",), 1, compute))
+            third = asyncio.ensure_future(self.cache.get(("k",), 1, compute))
+            await asyncio.sleep(0)
+            gate.set()
+            return compute, await first, await second, await third
+
+        compute, first, second, third = self.run_async(scenario())
+        self.assertEqual(compute.calls, 1)
+        expected = [("progress", {"pct": 10.0}), ("progress", {"pct": 100.0}), ("result", {"n": 1})]
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)  # joined late: the earlier event is replayed
+        self.assertEqual(third, {"n": 1})
+        self.assertEqual(self.cache.stats()["coalesced"], 2)
+        self.assertEqual(self.cache.stats()["in_flight"], 0)
+
+    def test_hit_then_watermark_invalidates(self):
+        async def scenario():
+            compute = Compute()
+            a = await self.cache.get(("k",), 1, compute)
+            hit = await _collect(self.cache, ("k",), 1, compute)
+            b = await self.cache.get(("k",), 2, compute)
+            return compute, a, hit, b
+
+        compute, a, hit, b = self.run_async(scenario())
+        self.assertEqual(hit, [("result", {"n": 1})])
+        self.assertEqual((a, b, compute.calls), ({"n": 1}, {"n": 2}, 2))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["invalidations"]), (1, 1))
+
+    def test_expired_entry_is_served_stale_and_revalidated(self):
+        async def scenario():
+            compute = Compute()
+            await self.cache.get(("k",), 1, compute)
+            self.clock.now = 100  # past ttl, inside the stale window
+            stale = await self.cache.get(("k",), 1, compute)
+            again = await self.cache.get(("k",), 1, compute)  # revalidation still running
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            fresh = await self.cache.get(("k",), 1, compute)
+            self.clock.now = 100 + 60 + 600  # past the stale window: recomputed inline
+            late = await self.cache.get(("k",), 1, compute)
+            return compute, stale, again, fresh, late
+
+        compute, stale, again, fresh, late = self.run_async(scenario())
+        self.assertEqual((stale, again, fresh, late), ({"n": 1}, {"n": 1}, {"n": 2}, {"n": 3}))
+        self.assertEqual(compute.calls, 3)
+        stats = self.cache.stats()
+        self.assertEqual((stats["stale_hits"], stats["revalidations"]), (2, 1))
+
+    def test_without_watermark_nothing_is_stored(self):
+        async def scenario():
+            compute = Compute()
+            await self.cache.get(("k",), None, compute)
+            await self.cache.get(("k",), None, compute)
+            return compute
+
+        self.assertEqual(self.run_async(scenario()).calls, 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_failures_reach_every_waiter_and_are_not_cached(self):
+        async def scenario():
+            gate = asyncio.Event()
+            compute = Compute(gate, fail=True)
+            waiters = [asyncio.ensure_future(self.cache.get(("k",), 1, compute)) for _ in range(3)]
+            await asyncio.sleep(0)
+            gate.set()
+            results = await asyncio.gather(*waiters, return_exceptions=True)
+            return compute, results
+
+        compute, results = self.run_async(scenario())
+        self.assertEqual(compute.calls, 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual((self.cache.stats()["entries"], self.cache.stats()["errors"]), (0, 1))
+
+    def test_disconnected_client_does_not_cancel_the_computation(self):
+        async def scenario():
+            gate = asyncio.Event()
+            compute = Compute(gate)
+            stream = self.cache.stream(("k",), 1, compute)
+            self.assertEqual(await stream.__anext__(), ("progress", {"pct": 10.0}))
+            await stream.aclose()
+            gate.set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return compute, await self.cache.get(("k",), 1, compute)
+
+        compute, value = self.run_async(scenario())
+        self.assertEqual((compute.calls, value), (1, {"n": 1}))
+
+    def test_lru_eviction(self):
+        async def scenario():
+            compute = Compute()
+            for key in ("a", "b", "a", "c"):
+                await self.cache.get((key,), 1, compute)
+            return compute
+
+        self.run_async(scenario())
+        self.assertEqual(list(self.cache._entries), [("a",), ("c",)])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import response_format as rf
+
+
+def _time_series():
+    return {"interval": "day", "timestamps": ["2025-01-01", "2025-01-02"],
+            "groups": ["Ethereum", "Base"],
+            "series": {"Ethereum": {"volume": [10.5, 20.25], "fees": [0.1, 0.2], "count": [3, 4]},
+                       "Base": {"volume": [1.0, 0.0], "fees": [0.01, 0.0], "count": [1, 0]}},
+            "totals": {"volume": [11.5, 20.25], "fees": [0.11, 0.2], "count": [4, 4]},
+            "grand_totals": {"volume": 31.75, "fees": 0.31, "count": 8}}
+
+
+class TestNegotiate(unittest.TestCase):
+    def test_defaults_to_json(self):
+        for accept in (None, "", "*/*", "application/json", "text/html,*/*;q=0.8", "text/csv"):
+            self.assertEqual(rf.negotiate(accept), "json", accept)
+
+    @unittest.skipIf(rf.pa is None, "pyarrow not installed")
+    def test_arrow_by_quality(self):
+        self.assertEqual(rf.negotiate(rf.ARROW_STREAM), "arrow")
+        self.assertEqual(rf.negotiate(f"application/json;q=0.5, {rf.ARROW_STREAM}"), "arrow")
+        self.assertEqual(rf.negotiate(f"{rf.ARROW_STREAM};q=0.2, application/json"), "json")
+        self.assertEqual(rf.negotiate(f"{rf.ARROW_STREAM};q=0"), "json")
+
+    def test_arrow_without_pyarrow(self):
+        with patch.object(rf, "pa", None):
+            self.assertIsNone(rf.negotiate(rf.ARROW_STREAM))
+            self.assertEqual(rf.negotiate(f"{rf.ARROW_STREAM}, application/json;q=0.1"), "json")
+
+
+class TestDumps(unittest.TestCase):
+    def test_matches_stdlib_json(self):
+        payload = {"data": dict(_time_series(), start_date=datetime(2025, 1, 1).isoformat())}
+        self.assertEqual(json.loads(rf.dumps(payload)), payload)
+
+    def test_datetimes_and_wide_ints(self):
+        out = json.loads(rf.dumps({"ts": datetime(2025, 1, 2, 3, 4, 5), "L": 1 << 100}))
+        self.assertEqual(out, {"ts": "2025-01-02T03:04:05", "L": 1 << 100})
+
+    def test_stdlib_fallback(self):
+        with patch.object(rf, "orjson", None):
+            self.assertEqual(rf.dumps({"a": [1, 2.5]}), b'{"a":[1,2.5]}')
+
+
+class TestTables(unittest.TestCase):
+    def test_time_series_long_format(self):
+        rows, meta = rf.time_series_table(_time_series())
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1], {"timestamp": "2025-01-02", "group": "Ethereum",
+                                   "volume": 20.25, "fees": 0.2, "count": 4})
+        self.assertNotIn("series", meta)
+        self.assertEqual(meta["grand_totals"]["count"], 8)
+
+    def test_split_table(self):
+        rows, meta = rf.split_table({"routes": [{"a": 1}], "total_tx": 3}, "routes")
+        self.assertEqual((rows, meta), ([{"a": 1}], {"total_tx": 3}))
+        self.assertEqual(rf.split_table(None, "routes"), ([], {}))
+
+
+@unittest.skipIf(rf.pa is None, "pyarrow not installed")
+class TestArrow(unittest.TestCase):
+    def test_round_trip_with_mixed_columns(self):
+        rows = [{"route": "USDC 0.01%|Uniswap V3|Ethereum DAI", "volume": 10.0,
+                 "path_tokens": ["USDC", {"cid": 1, "fee": "0.01%"}, "DAI"], "counts": [1, 2]},
+                {"route": "USDC DAI", "volume": 2.5, "path_tokens": ["USDC", "DAI"], "counts": []}]
+        back, meta = rf.from_arrow(rf.to_arrow(rows, {"total_tx": 2}))
+        self.assertEqual(back, rows)
+        self.assertEqual(meta, {"total_tx": 2})
+
+    def test_empty_table_keeps_meta(self):
+        back, meta = rf.from_arrow(rf.to_arrow([], {"data": None, "n": 0}))
+        self.assertEqual((back, meta), ([], {"data": None, "n": 0}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 
+import random
 import unittest
-from route_analyzer import RouteAnalyzer
+from route_analyzer import RouteAnalyzer, RouteIndex
 
 class TestRouteAnalyzer(unittest.TestCase):
     def setUp(self):
@@ -236,5 +237,63 @@ class TestRouteAnalyzer(unittest.TestCase):
         self.assertEqual(result['total_tx'], 0)
         self.assertEqual(len(result['routes']), 0)
 
+def _leg(tx, log_index, t0, t1, a0, a1, usd, fee='0.3%', protocol='Uniswap V3', ts=None):
+    return {
+        'id': f'{tx}#{log_index}', 'tx_hash': tx, 'log_index': log_index,
+        'token0_symbol': t0, 'token1_symbol': t1,
+        'amount0': a0, 'amount1': a1, 'amountUSD': usd,
+        'fee_tier': fee, 'protocol': protocol, 'network': 'Ethereum', 'timestamp': ts,
+    }
+
+
+class TestRouteIndex(unittest.TestCase):
+    QUERIES = [
+        ('TOKEN_A', 'TOKEN_C'), ('token_c', 'token_a'), ('TOKEN_A', 'TOKEN_B'),
+        ('TOKEN_B', '*'), ('*', 'TOKEN_B'), ('*', '*'),
+        (['TOKEN_A', 'TOKEN_B'], ['TOKEN_C', 'USDC']), ('TOKEN_A', 'MISSING'),
+    ]
+
+    def assert_matches_analyzer(self, swaps, prices=None):
+        index = RouteIndex([dict(sw) for sw in swaps], prices=prices)
+        for start, end in self.QUERIES:
+            expected = RouteAnalyzer(prices=prices).analyze_routes(
+                [dict(sw) for sw in swaps], start, end)
+            self.assertEqual(index.analyze(start, end), expected, (start, end))
+
+    def test_fixtures_match_analyzer(self):
+        self.assert_matches_analyzer([
+            _leg('tx1', 1, 'TOKEN_A', 'TOKEN_B', 100, -50, 1000, ts=1700000000),
+            _leg('tx1', 2, 'TOKEN_B', 'TOKEN_C', 50, -25, 1000, fee='0.05%', ts=1700000001),
+            _leg('tx2', 2, 'TOKEN_A', 'TOKEN_B', 200, -840, 840, protocol='Uniswap V4'),
+            _leg('tx2', 1, 'TOKEN_A', 'TOKEN_B', 100, -420, 420),
+            _leg('tx3', 1, 'TOKEN_A', 'TOKEN_B', 100, -420, 420),
+            _leg('tx3', 2, 'TOKEN_A', 'TOKEN_B', -420, 100, 420),
+            _leg('tx4', 1, 'TOKEN_C', 'USDC', -10, 0, 0),
+        ], prices={'TOKEN_C': 2.0})
+
+    def test_random_swaps_match_analyzer(self):
+        rng = random.Random(7)
+        tokens = ['TOKEN_A', 'token_a', 'TOKEN_B', 'TOKEN_C', 'USDC']
+        swaps = [
+            _leg(f'tx{rng.randrange(60)}', rng.randrange(4), rng.choice(tokens), rng.choice(tokens),
+                 rng.choice([-5, 0, 3, 2e15]), rng.choice([-2, 0, 4]),
+                 rng.choice([0, 0.001, 12.5, 300.25]), fee=rng.choice(['0.05%', '0.3%', 500, 'Dynamic']),
+                 ts=rng.choice([None, 1700000000 + rng.randrange(100)]))
+            for _ in range(300)
+        ]
+        self.assert_matches_analyzer(swaps, prices={'TOKEN_B': 3.0})
+
+    def test_direct_leg_indexed_under_its_dest(self):
+        # A -> B -> C chain: also counted for A -> B through its first leg.
+        index = RouteIndex([
+            _leg('tx1', 1, 'TOKEN_A', 'TOKEN_B', 100, -50, 1000),
+            _leg('tx1', 2, 'TOKEN_B', 'TOKEN_C', 50, -25, 1000),
+        ])
+        direct = index.analyze(['TOKEN_A'], ['TOKEN_B'])
+        self.assertEqual(direct['routes'][0]['path'], 'TOKEN_A -- 0.3%|Uniswap V3|Ethereum --> TOKEN_B')
+        self.assertEqual((direct['total_tx'], direct['routes'][0]['swaps']), (1, 2))
+        self.assertEqual(index.analyze(['TOKEN_B'], ['TOKEN_C'])['total_tx'], 0)
+        self.assertEqual(index.tx_count, 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+import postgres_fetcher as pf
+from include import route_classifier
+
+SUMS = [(7, 10, 20, 1000.0, date(2026, 3, 5)), (8, 5, 5, 3000.0, date(2026, 3, 4))]
+ROUTES = [(7, 70, 2, 'USDC', 'WBTC'), (8, 70, 1, 'USDC', 'WBTC')]
+HOPS = [(7, 0, 'USDC', 'WETH', '0.05000000000000000000%', 'Uniswap V3', 'Ethereum'),
+        (7, 1, None, 'WBTC', 'Dynamic', 'Uniswap V4', 'Ethereum'),
+        (8, 0, 'USDC', 'WBTC', '0.30000000000000000000%', 'Uniswap V3', 'Ethereum')]
+
+
+class FakeCursor:
+    """Answers the fetch_route_stats queries by the table they read."""
+
+    def __init__(self, rollup=True, cached=None):
+        self.rollup, self.cached, self.sql, self._rows = rollup, cached or [], [], []
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+        if 'to_regclass' in sql:
+            self._rows = [(self.rollup,)]
+        elif 'FROM pair_daily_stats' in sql or 'FROM route_daily_stats' in sql:
+            self._rows = SUMS
+        elif 'FROM route_path' in sql:
+            self._rows = [c for c in self.cached if c[0] in params[0]]
+        elif 'FROM route_hop' in sql:
+            self._rows = [h for h in HOPS if h[0] in params[0]]
+        elif 'FROM route r' in sql:
+            self._rows = [r for r in ROUTES if r[0] in params[0]]
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0]
+
+
+def _route_path_rows():
+    """route_path rows as route_classifier.refresh_route_paths writes them for the fixture."""
+    cur = MagicMock()
+    cur.fetchall.side_effect = [ROUTES, [(h[0],) + h[2:] for h in HOPS]]
+    with patch.object(route_classifier.psycopg2.extras, 'execute_values') as execute_values:
+        route_classifier.refresh_route_paths(cur, [r[0] for r in ROUTES])
+    return [(route_id, pair_id, hops, tokens, cum_fee)
+            for route_id, pair_id, hops, _o, _d, tokens, cum_fee in execute_values.call_args.args[2]]
+
+
+def _fetch(cur, start=('USDC',), end=('WBTC',)):
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+    get_conn = MagicMock()
+    get_conn.return_value.__enter__.return_value = conn
+    with patch.object(pf, 'get_conn', get_conn), \
+            patch.dict(pf._ROLLUP_STATE, {'ready': None, 'checked_at': 0.0}):
+        fetcher = pf.PostgresFetcher.__new__(pf.PostgresFetcher)
+        fetcher._log = lambda *a, **k: None
+        return fetcher.fetch_route_stats(datetime(2026, 1, 1), datetime(2026, 4, 1),
+                                         list(start), list(end))
+
+
+class TestRouteStatsRollup(unittest.TestCase):
+    def test_rollup_matches_daily_join(self):
+        legacy = _fetch(FakeCursor(rollup=False))
+        cur = FakeCursor(rollup=True, cached=_route_path_rows())
+        fast = _fetch(cur)
+        self.assertEqual(fast['total_tx'], legacy['total_tx'])
+        self.assertEqual([r['route_id'] for r in fast['routes']], [8, 7])
+        self.assertEqual(fast['routes'][1]['path_tokens'],
+                         ['USDC', '0.05000000000000000000%|Uniswap V3|Ethereum', 'WETH',
+                          'Dynamic|Uniswap V4|Ethereum', 'WBTC'])
+        for a, b in zip(fast['routes'], legacy['routes']):
+            self.assertEqual(a['path_tokens'], b['path_tokens'])
+            self.assertAlmostEqual(a['market_size'], b['market_size'])
+            self.assertEqual((a['hops'], a['pair_id'], a['last_activity']),
+                             (b['hops'], b['pair_id'], b['last_activity']))
+        self.assertFalse(any('route_hop' in s for s in cur.sql))
+        self.assertFalse(any('route_daily_stats' in s for s in cur.sql))
+
+    def test_legacy_path_tokens(self):
+        routes = {r['route_id']: r for r in _fetch(FakeCursor(rollup=False))['routes']}
+        self.assertEqual(routes[7]['path_tokens'],
+                         ['USDC', '0.05000000000000000000%|Uniswap V3|Ethereum', 'WETH',
+                          'Dynamic|Uniswap V4|Ethereum', 'WBTC'])
+        self.assertAlmostEqual(routes[7]['market_size'], 1000.0 * 0.0007)
+
+    def test_routes_missing_from_route_path_are_rebuilt(self):
+        cur = FakeCursor(rollup=True, cached=[(8, 70, 1, ['USDC', 'x|y|z', 'WBTC'], 0.003)])
+        routes = {r['route_id']: r for r in _fetch(cur)['routes']}
+        self.assertEqual(routes[8]['path_tokens'], ['USDC', 'x|y|z', 'WBTC'])
+        self.assertEqual(routes[7]['path_tokens'][-1], 'WBTC')
+        hop_sql = [s for s in cur.sql if 'FROM route_hop' in s]
+        self.assertEqual(len(hop_sql), 1)
+
+    def test_wildcard_uses_daily_join(self):
+        cur = FakeCursor(rollup=True)
+        _fetch(cur, start=('*',))
+        self.assertTrue(any('FROM route_daily_stats' in s for s in cur.sql))
+        self.assertFalse(any('pair_daily_stats' in s for s in cur.sql))
+
+
+if __name__ == '__main__':
+    unittest.main()
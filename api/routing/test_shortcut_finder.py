@@ -8,7 +8,8 @@ import unittest
 import sys
 import os
 from unittest.mock import patch, MagicMock
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 
 # Ensure routing modules are importable
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -87,6 +88,7 @@ class TestShortcutFinderLogic(unittest.TestCase):
                 'EURC': 1.05, 'EURI': 1.05,
             }
             mock_fetcher.fetch_swaps.return_value = []
+            mock_fetcher.iter_swaps.return_value = []
 
             self.finder = ShortcutFinder(verbose=False)
             self.finder.family_resolver = mock_resolver
@@ -310,6 +312,229 @@ class TestShortcutFinderLogic(unittest.TestCase):
         self.assertIsNone(opp)
 
 
+def _route(path_tokens, volume, count):
+    return {'path': ' --> '.join(path_tokens), 'path_tokens': path_tokens,
+            'hops': len(path_tokens) // 2, 'volume': volume, 'count': count}
+
+
+class TestAggregateMode(unittest.TestCase):
+    """Route flows from the route aggregates instead of raw swaps."""
+
+    def _finder(self, **kwargs):
+        with patch('shortcut_finder.CoinFamilyResolver') as MockResolver, \
+             patch('shortcut_finder.PostgresFetcher') as MockFetcher:
+            resolver = MockResolver.return_value
+            resolver.families = [{'name': 'USD', 'correlated': True}]
+            resolver.resolve_family.side_effect = lambda name: {'USD': {'USDC', 'DAI'}}.get(name, set())
+            fetcher = MockFetcher.return_value
+            fetcher.fetch_latest_prices.return_value = {}
+            fetcher.iter_swaps.return_value = []
+            fetcher.fetch_route_stats.return_value = {'routes': [
+                _route(['USDC', '0.05%|Uniswap V3|Ethereum', 'WETH', '0.3%|Uniswap V3|Ethereum', 'DAI'], 50_000, 40),
+                _route(['USDC', '0.01%|Uniswap V3|Ethereum', 'DAI'], 90_000, 70),
+                _route(['DAI', '0.3%|Uniswap V3|Ethereum', 'WETH', '0.05%|Uniswap V3|Ethereum', 'USDC'], 20_000, 10),
+            ]}
+            finder = ShortcutFinder(verbose=False, **kwargs)
+        return finder
+
+    def test_find_reads_route_aggregates_once(self):
+        finder = self._finder()
+        start, end = datetime(2026, 3, 1), datetime(2026, 3, 31)
+        with patch.object(finder, '_check_existing_pool', return_value=(None, None)):
+            opps = finder.find(start, end)
+
+        finder.fetcher.iter_swaps.assert_not_called()
+        finder.fetcher.fetch_route_stats.assert_called_once_with(
+            start, end - timedelta(microseconds=1),
+            start_tokens=['DAI', 'USDC'], end_tokens=['DAI', 'USDC'])
+        self.assertEqual(len(opps), 1)
+        opp = opps[0]
+        self.assertEqual((opp.token_a, opp.token_b), ('DAI', 'USDC'))
+        self.assertEqual(opp.total_divertable_volume, 70_000)
+        self.assertEqual(opp.total_divertable_txns, 50)
+        self.assertEqual(len(opp.direct_routes), 1)
+        self.assertEqual(opp.dominant_route['intermediaries'], ['WETH'])
+        self.assertAlmostEqual(opp.dominant_route['cumulative_fee_pct'], 0.35)
+        self.assertEqual(opp.dominant_route['path'],
+                         'USDC -- 0.05%|Uniswap V3|Ethereum --> WETH -- 0.3%|Uniswap V3|Ethereum --> DAI')
+
+    def test_raw_mode_scans_swaps(self):
+        finder = self._finder(mode='raw')
+        finder.find(datetime(2026, 3, 1), datetime(2026, 3, 31))
+        finder.fetcher.fetch_route_stats.assert_not_called()
+        finder.fetcher.iter_swaps.assert_called()
+
+    def test_raw_mode_caches_whole_days(self):
+        from swap_set_cache import SwapSetCache
+        finder = self._finder(mode='raw', swap_cache=SwapSetCache(max_bytes=1 << 20))
+        finder.fetcher.fetch_ingestion_watermark.return_value = 7
+        utc = lambda h: int(datetime(2026, 3, 2, h, tzinfo=timezone.utc).timestamp())
+        finder.fetcher.iter_swaps.return_value = [[
+            {'tx_hash': f'0x{h}', 'timestamp': utc(h), 'token0_symbol': 'USDC', 'token1_symbol': 'DAI'}
+            for h in (1, 10, 23)]]
+
+        day = datetime(2026, 3, 2)  # naive windows are UTC
+        got = finder._load_relevant_swaps(day + timedelta(hours=5), day + timedelta(hours=23), {'USDC', 'DAI'})
+        self.assertEqual([s['tx_hash'] for s in got], ['0x10', '0x23'])
+        # a different window over the same days is served from the same entry
+        got = finder._load_relevant_swaps(day, day + timedelta(hours=12), {'DAI', 'USDC'})
+        self.assertEqual([s['tx_hash'] for s in got], ['0x1', '0x10'])
+        finder.fetcher.iter_swaps.assert_called_once()
+        self.assertEqual(finder.fetcher.iter_swaps.call_args[0][0].isoformat(), '2026-03-02T00:00:00+00:00')
+
+    def test_unknown_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            self._finder(mode='sampled')
+
+
+# Shared fixture for the mode parity tests: pool id -> (token0, token1, fee_tier, fee_bps)
+_ADDR = {'USDC': '0xa0', 'DAI': '0x6b', 'WETH': '0xc0'}
+_SYM = {v: k for k, v in _ADDR.items()}
+_POOLS = {1: ('USDC', 'WETH', '0.05%', 5), 2: ('WETH', 'DAI', '0.3%', 30), 3: ('USDC', 'DAI', '0.01%', 1)}
+_T0 = int(datetime(2026, 3, 2, 12, tzinfo=timezone.utc).timestamp())
+
+
+def _leg(tx, log_index, pool_id, sell, usd):
+    t0, t1, fee_tier, _ = _POOLS[pool_id]
+    amount0 = usd if sell == t0 else -usd
+    return {'tx_hash': tx, 'log_index': log_index, 'timestamp': _T0, 'pool_id': pool_id,
+            'token0': _ADDR[t0], 'token1': _ADDR[t1], 'token0_symbol': t0, 'token1_symbol': t1,
+            'amount0': amount0, 'amount1': -amount0, 'amountUSD': usd, 'amount_usd': usd,
+            'fee_tier': fee_tier, 'protocol': 'Uniswap V3', 'network': 'Ethereum'}
+
+
+def _multihop(tx, sell, usd, first_log=0):
+    pools = (1, 2) if sell == 'USDC' else (2, 1)
+    mid = _leg(tx, first_log, pools[0], sell, usd)
+    return [mid, _leg(tx, first_log + 1, pools[1], 'WETH', usd)]
+
+
+_SWAPS = (_multihop('0x1', 'USDC', 60_000) + _multihop('0x2', 'USDC', 30_000)
+          + _multihop('0x3', 'DAI', 20_000) + [_leg('0x4', 0, 3, 'USDC', 90_000)])
+# One tx splitting its input between the direct pool and the WETH route
+_SPLIT = [_leg('0x5', 0, 3, 'USDC', 40_000)] + _multihop('0x5', 'USDC', 25_000, first_log=1)
+
+
+class _AggregateCursor:
+    """route / route_hop / pair_daily_stats rows for swaps, classified the way
+    the route classifier and the daily materializer derive them."""
+
+    def __init__(self, swaps):
+        from include import route_classifier as rc
+        self.routes, self.hops, self.sums = {}, [], {}
+        by_tx = defaultdict(list)
+        for s in swaps:
+            by_tx[s['tx_hash']].append(s)
+        for legs in by_tx.values():
+            for chain in rc.chains_in_tx(legs):
+                origin, dest = _SYM[chain['tokens'][0]], _SYM[chain['tokens'][-1]]
+                pair_id = rc.compute_pair_id(1, chain['tokens'][0], chain['tokens'][-1])
+                route_id = rc.compute_route_id(pair_id, chain['pools'])
+                if route_id not in self.routes:
+                    self.routes[route_id] = (route_id, pair_id, len(chain['pools']), origin, dest)
+                    for seq, leg in enumerate(chain['legs']):
+                        sold = leg['token0'] if leg['amount0'] > 0 else leg['token1']
+                        bought = leg['token1'] if sold == leg['token0'] else leg['token0']
+                        fee_bps = _POOLS[leg['pool_id']][3]
+                        self.hops.append((route_id, seq, _SYM[sold], _SYM[bought],
+                                          f"{fee_bps / 100:.20f}%", leg['protocol'], leg['network']))
+                tx, n, volume, day = self.sums.get(route_id, (0, 0, 0.0, None))
+                self.sums[route_id] = (tx + 1, n + len(chain['legs']),
+                                       volume + rc.route_volume(chain, chain['tokens'][0]),
+                                       datetime.fromtimestamp(_T0, timezone.utc).date())
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        if 'to_regclass' in sql:
+            self._rows = [(True,)]
+        elif 'FROM pair_daily_stats' in sql:
+            starts, ends = params[0], params[1]
+            self._rows = [(rid,) + self.sums[rid] for rid, r in self.routes.items()
+                          if r[3] in starts and r[4] in ends]
+        elif 'FROM route_path' in sql:
+            self._rows = []
+        elif 'FROM route_hop' in sql:
+            self._rows = [h for h in self.hops if h[0] in params[0]]
+        elif 'FROM route r' in sql:
+            self._rows = [r for r in self.routes.values() if r[0] in params[0]]
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0]
+
+
+class TestModeParity(unittest.TestCase):
+    """Raw mode (RouteIndex over the swaps) against aggregate mode (the route
+    aggregates classified from the same swaps)."""
+
+    START, END = datetime(2026, 3, 1), datetime(2026, 3, 4)
+
+    def _finder(self, mode):
+        with patch('shortcut_finder.CoinFamilyResolver') as MockResolver, \
+             patch('shortcut_finder.PostgresFetcher'):
+            resolver = MockResolver.return_value
+            resolver.families = [{'name': 'USD', 'correlated': True}]
+            resolver.resolve_family.side_effect = lambda name: {'USD': {'USDC', 'DAI'}}.get(name, set())
+            return ShortcutFinder(verbose=False, mode=mode)
+
+    def _find(self, swaps):
+        import postgres_fetcher as pf
+        raw = self._finder('raw')
+        raw.fetcher.fetch_latest_prices.return_value = {}
+        raw.fetcher.iter_swaps.return_value = [list(swaps)]
+
+        agg = self._finder('aggregate')
+        agg.fetcher = pf.PostgresFetcher.__new__(pf.PostgresFetcher)
+        agg.fetcher._log = lambda *a, **k: None
+        agg.fetcher.fetch_latest_prices = lambda: {}
+        conn = MagicMock()
+        conn.cursor.return_value = _AggregateCursor(swaps)
+        get_conn = MagicMock()
+        get_conn.return_value.__enter__.return_value = conn
+        with patch.object(raw, '_check_existing_pool', return_value=(None, None)), \
+                patch.object(agg, '_check_existing_pool', return_value=(None, None)), \
+                patch.object(pf, 'get_conn', get_conn), \
+                patch.dict(pf._ROLLUP_STATE, {'ready': None, 'checked_at': 0.0}):
+            return raw.find(self.START, self.END), agg.find(self.START, self.END)
+
+    @staticmethod
+    def _summary(opps):
+        return [{
+            'pair': {o.token_a, o.token_b},
+            'volume': o.total_divertable_volume,
+            'txns': o.total_divertable_txns,
+            'fee': (round(o.current_cumulative_fee, 6), o.proposed_shortcut_fee),
+            'multihop': sorted((r['path_tokens'][0], tuple(r['intermediaries']), r['volume'], r['count'],
+                                round(r['cumulative_fee_pct'], 6)) for r in o.multihop_routes),
+            'direct': sorted((r['path_tokens'][0], r['volume'], r['count']) for r in o.direct_routes),
+        } for o in opps]
+
+    def test_modes_agree_on_shared_swaps(self):
+        raw, agg = self._find(_SWAPS)
+        self.assertEqual(self._summary(agg), self._summary(raw))
+        self.assertEqual(self._summary(raw), [{
+            'pair': {'USDC', 'DAI'}, 'volume': 110_000, 'txns': 3, 'fee': (0.35, 0.30),
+            'multihop': [('DAI', ('WETH',), 20_000, 1, 0.35), ('USDC', ('WETH',), 90_000, 2, 0.35)],
+            'direct': [('USDC', 90_000, 1)],
+        }])
+
+    def test_split_tx_counts_as_multihop_only_in_aggregate_mode(self):
+        # Intentional difference: the classifier splits a tx into its
+        # contiguous chains, so the WETH leg pair of a split tx is its own
+        # USDC -> DAI route and divertable. Raw mode follows one chain per tx
+        # from its first leg -- here the direct pool -- and books the whole
+        # USDC input (both legs) on that direct route.
+        raw, agg = self._find(_SWAPS + _SPLIT)
+        raw, agg = self._summary(raw)[0], self._summary(agg)[0]
+        self.assertEqual((raw['volume'], raw['txns']), (110_000, 3))
+        self.assertEqual(raw['direct'], [('USDC', 155_000, 2)])
+        self.assertEqual((agg['volume'], agg['txns']), (135_000, 4))
+        self.assertIn(('USDC', ('WETH',), 115_000, 3, 0.35), agg['multihop'])
+        self.assertEqual(agg['direct'], [('USDC', 130_000, 2)])
+
+
 class TestOutputFormatting(unittest.TestCase):
     """Test output formatting."""
 
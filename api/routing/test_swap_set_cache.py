@@ -0,0 +1,141 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from fractions import Fraction
+
+import swap_set_cache as ssc
+from swap_set_cache import SwapSetCache, cache_key, day_window, estimate_parts_bytes
+
+UTC = timezone.utc
+W1 = datetime(2025, 3, 1, 12, 0, tzinfo=UTC)
+W2 = W1 + timedelta(hours=1)
+
+
+def _legs(n, seed=0):
+    t0 = datetime(2025, 1, 1, tzinfo=UTC)
+    return {"forward": [{"ts": t0 + timedelta(seconds=i), "t0_in": bool(i % 2),
+                         "input": 100.0 + i + seed, "output": 99.5 + i + seed,
+                         "price": Fraction(100 + i + seed, 99 + i), "cid": i,
+                         "pool_address": "0xpool"} for i in range(n)],
+            "reverse": []}
+
+
+def _key(i):
+    return cache_key("undercut", (["USDC"], ["DAI"]), None,
+                     datetime(2025, 1, 1 + i, tzinfo=UTC), datetime(2025, 1, 2 + i, tzinfo=UTC))
+
+
+class TestKeys(unittest.TestCase):
+    def test_day_window_widens_to_whole_utc_days(self):
+        lo, hi = day_window(datetime(2025, 1, 1, 13, 5, tzinfo=UTC),
+                            datetime(2025, 1, 3, 23, 59, 59, 999999, tzinfo=UTC))
+        self.assertEqual(lo, datetime(2025, 1, 1, tzinfo=UTC))
+        self.assertEqual(hi, datetime(2025, 1, 4, tzinfo=UTC))
+
+    def test_day_window_keeps_midnight_end_and_converts_offsets(self):
+        plus2 = timezone(timedelta(hours=2))
+        lo, hi = day_window(datetime(2025, 1, 2, 1, 0, tzinfo=plus2), datetime(2025, 1, 5))
+        self.assertEqual(lo, datetime(2025, 1, 1, tzinfo=UTC))
+        self.assertEqual(hi, datetime(2025, 1, 5, tzinfo=UTC))
+
+    def test_cache_key_normalizes_families_and_network(self):
+        lo, hi = day_window(W1, W2)
+        a = cache_key("undercut", (["usdc", "USDT"], ["DAI"]), "Base", lo, hi)
+        b = cache_key("undercut", (["USDT", "USDC", "usdc"], ["dai"]), "base", lo, hi)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, cache_key("undercut", (["DAI"], ["USDC", "USDT"]), "base", lo, hi))
+        self.assertNotEqual(a, cache_key("sps", (["usdc", "USDT"], ["DAI"]), "Base", lo, hi))
+
+
+class TestSwapSetCache(unittest.TestCase):
+    def test_hit_returns_same_parts(self):
+        c = SwapSetCache(max_bytes=10 ** 8)
+        legs = _legs(10)
+        c.put(_key(0), W1, legs)
+        self.assertIs(c.get(_key(0), W1), legs)
+        self.assertIsNone(c.get(_key(1), W1))
+        st = c.stats()
+        self.assertEqual((st["hits"], st["misses"], st["entries"]), (1, 1, 1))
+
+    def test_watermark_change_invalidates(self):
+        c = SwapSetCache(max_bytes=10 ** 8)
+        c.put(_key(0), W1, _legs(10))
+        self.assertIsNone(c.get(_key(0), W2))
+        self.assertIsNone(c.get(_key(0), W1))  # the stale entry was dropped
+        st = c.stats()
+        self.assertEqual((st["invalidations"], st["entries"], st["bytes"]), (1, 0, 0))
+
+    def test_no_watermark_means_no_caching(self):
+        c = SwapSetCache(max_bytes=10 ** 8)
+        c.put(_key(0), None, _legs(10))
+        self.assertEqual(c.stats()["entries"], 0)
+        c.put(_key(0), W1, _legs(10))
+        self.assertIsNone(c.get(_key(0), None))
+
+    def test_zero_budget_disables(self):
+        c = SwapSetCache(max_bytes=0)
+        c.put(_key(0), W1, _legs(10))
+        self.assertIsNone(c.get(_key(0), W1))
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        size = estimate_parts_bytes(_legs(200))
+        c = SwapSetCache(max_bytes=int(size * 2.5))
+        c.put(_key(0), W1, _legs(200))
+        c.put(_key(1), W1, _legs(200))
+        self.assertIsNotNone(c.get(_key(0), W1))  # key 1 is now the LRU entry
+        c.put(_key(2), W1, _legs(200))
+        self.assertIsNotNone(c.get(_key(0), W1))
+        self.assertIsNone(c.get(_key(1), W1))
+        self.assertIsNotNone(c.get(_key(2), W1))
+        st = c.stats()
+        self.assertEqual((st["entries"], st["evictions"]), (2, 1))
+        self.assertLessEqual(st["bytes"], c.max_bytes)
+
+    def test_entry_over_budget_is_not_kept(self):
+        c = SwapSetCache(max_bytes=estimate_parts_bytes(_legs(10)))
+        c.put(_key(0), W1, _legs(1000))
+        self.assertEqual(c.stats()["entries"], 0)
+        self.assertIsNone(c.get(_key(0), W1))
+
+    def test_put_replaces_entry(self):
+        c = SwapSetCache(max_bytes=10 ** 8)
+        c.put(_key(0), W1, _legs(10))
+        newer = _legs(20, seed=1)
+        c.put(_key(0), W2, newer)
+        self.assertIs(c.get(_key(0), W2), newer)
+        self.assertEqual(c.stats()["bytes"], estimate_parts_bytes(newer))
+
+    def test_estimate_grows_with_rows(self):
+        small, big = estimate_parts_bytes(_legs(100)), estimate_parts_bytes(_legs(10000))
+        self.assertGreater(big, 50 * small)
+
+
+@unittest.skipIf(ssc.pq is None, "pyarrow not installed")
+class TestSpill(unittest.TestCase):
+    def test_evicted_entry_round_trips_through_parquet(self):
+        def rehydrate(part, rows):
+            for s in rows:
+                s["price"] = Fraction(100 + s["cid"], 99 + s["cid"])
+
+        with tempfile.TemporaryDirectory() as d:
+            size = estimate_parts_bytes(_legs(200))
+            c = SwapSetCache(max_bytes=int(size * 1.5), spill_dir=d)
+            c.put(_key(0), W1, _legs(200), rehydrate=rehydrate)
+            c.put(_key(1), W1, _legs(200))
+            self.assertEqual(c.stats()["spilled_entries"], 1)
+            back = c.get(_key(0), W1)
+            self.assertEqual(back, _legs(200))
+            self.assertEqual(c.stats()["spill_hits"], 1)
+
+    def test_spilled_entry_invalidated_by_watermark(self):
+        with tempfile.TemporaryDirectory() as d:
+            size = estimate_parts_bytes(_legs(200))
+            c = SwapSetCache(max_bytes=int(size * 1.5), spill_dir=d)
+            c.put(_key(0), W1, _legs(200))
+            c.put(_key(1), W1, _legs(200))
+            self.assertIsNone(c.get(_key(0), W2))
+            self.assertEqual(c.stats()["spilled_entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
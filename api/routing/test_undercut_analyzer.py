@@ -1,8 +1,16 @@
+import itertools
+import math
 import random
+import statistics
 import unittest
 from fractions import Fraction
 
-from undercut_analyzer import simulate, build_pool, quote, SCALE, simulate_two_pools, simulate_pools
+from undercut_analyzer import (simulate, build_pool, quote, SCALE, simulate_two_pools, simulate_pools,
+                               simulate_pools_columnar, arena_demand,
+                               simulate_columnar, event_columns, market_prices, RollingMedian,
+                               sweep_grid, sweep_executor, sweep_point, pair_legs, normalize_leg,
+                               leg_price, fee_free_price, fee_fraction_from_bps, fee_free_price_x96,
+                               opening_price_and_usd, price_x96, price_to_float, sqrt_price_x96, Q96)
 
 
 def _swap(ts, inp, out, usd=100.0, fee_bps=30, **kw):
@@ -247,5 +255,443 @@ class TestUndercutDrift(unittest.TestCase):
             self.assertAlmostEqual(final[i]["usd"], rp["usd"])
 
 
+def _market_swaps(n, seed, fee_bps_choices=(1, 5, 30, 100)):
+    # Seeded demand with observed outputs scattered around the clone's quote
+    # (some better, some worse) across several competitor pools, so the
+    # simulation exercises divert, reject, drain and per-pool attribution.
+    rng = random.Random(seed)
+    fwd, rev = [], []
+    for i in range(n):
+        usd = rng.uniform(10.0, 20000.0)
+        fb = rng.choice(fee_bps_choices)
+        sw = {"ts": rng.randint(0, n // 3), "input": usd,
+              "output": usd * rng.uniform(0.990, 1.001), "usd": usd,
+              "fee_bps": fb, "cid": fb, "protocol": "Uniswap V3",
+              "pool_address": "0xPOOL%d" % fb}
+        (fwd if rng.random() < 0.6 else rev).append(sw)
+    return fwd, rev
+
+
+class TestColumnarParity(unittest.TestCase):
+    """simulate() is the reference oracle: simulate_columnar() must return the
+    exact same result (ints, floats, dict contents and insertion order)."""
+
+    def assertParity(self, cap, swaps, reverse_swaps=None, total_usd=1.0, **kw):
+        args = dict(BASE, **kw)
+        ref = simulate(cap, **args, swaps=swaps, total_usd=total_usd,
+                       reverse_swaps=reverse_swaps)
+        fast = simulate_columnar(cap, **args, swaps=swaps, total_usd=total_usd,
+                                 reverse_swaps=reverse_swaps)
+        self.assertEqual(fast, ref)
+        self.assertEqual(list(fast["by_pool"]), list(ref["by_pool"]))
+        self.assertEqual(list(fast["by_fee_bps"]), list(ref["by_fee_bps"]))
+        return ref
+
+    def test_forward_drain(self):
+        swaps = [_swap(i, 100.0, 99.0) for i in range(100)]
+        self.assertParity(1000.0, swaps, total_usd=10000.0)
+
+    def test_reverse_rebalance(self):
+        swaps = [_swap(i, 100.0, 99.0) for i in range(100)]
+        revs = [_swap(i + 0.5, 100.0, 99.0) for i in range(50)]
+        self.assertParity(1000.0, swaps, revs, total_usd=10000.0)
+
+    def test_identical_clone_ties(self):
+        fwd, rev = _identical_clone_swaps(10.0, 5000.0, 3000)
+        res = self.assertParity(5000.0, fwd, rev, total_usd=1000.0, fee_pips=3000)
+        self.assertEqual(res["div_count"], len(fwd) // 2)
+
+    def test_empty_and_zero_liquidity(self):
+        self.assertParity(1000.0, [], [], total_usd=0.0)
+        # p0_usd=None sizes token0 at zero => L == 0 and nothing can be served.
+        swaps = [_swap(i, 10.0, 1.0) for i in range(10)]
+        res = self.assertParity(1000.0, swaps, swaps, total_usd=100.0, p0_usd=None)
+        self.assertEqual(res["L"], 0)
+
+    def test_random_market_grid(self):
+        fwd, rev = _market_swaps(3000, seed=5)
+        total = sum(s["usd"] for s in fwd)
+        served = 0
+        for cap in (2000.0, 50000.0, 1000000.0):
+            for range_pct in (0.5, 10.0):
+                for fee_pips in (100, 500, 3000):
+                    res = self.assertParity(cap, fwd, rev, total_usd=total,
+                                            range_pct=range_pct, fee_pips=fee_pips)
+                    served += res["div_count"] + res["reverse_count"]
+        self.assertGreater(served, 0)
+
+    def test_shared_columns(self):
+        # A prepared event set can be reused across pools (parameter sweeps).
+        fwd, rev = _market_swaps(1000, seed=9)
+        total = sum(s["usd"] for s in fwd)
+        cols = event_columns(fwd, rev)
+        for cap in (5000.0, 200000.0):
+            ref = simulate(cap, **BASE, swaps=fwd, total_usd=total, reverse_swaps=rev)
+            fast = simulate_columnar(cap, **BASE, swaps=None, total_usd=total,
+                                     columns=cols)
+            self.assertEqual(fast, ref)
+
+
+class TestPoolsColumnarParity(unittest.TestCase):
+    """simulate_pools() is the reference oracle for simulate_pools_columnar():
+    same pools, counters, floats and series snapshots."""
+
+    POOLS = [
+        {"name": "a", "cap": 50000.0, "range_pct": 1.0, "fee_pips": 500},
+        {"name": "b", "cap": 250000.0, "range_pct": 1.0, "fee_pips": 500},
+        {"name": "c", "cap": 500000.0, "range_pct": 0.5, "fee_pips": 100},
+        {"name": "d", "cap": 100000.0, "range_pct": 5.0, "fee_pips": 3000},
+    ]
+
+    def assertParity(self, pools, fwd, rev, series_every=None):
+        total = sum(s["usd"] for s in fwd)
+        args = (pools, fwd, BASE["opening_px"], 1.0, 1.0, total)
+        ref = simulate_pools(*args, reverse_swaps=rev, series_every=series_every)
+        fast = simulate_pools_columnar(*args, reverse_swaps=rev, series_every=series_every)
+        self.assertEqual(fast, ref)
+        return ref
+
+    def test_arena_demand_with_series(self):
+        fwd, rev = arena_demand(3000, 42, 100.0, 50000.0, 0.5)
+        res = self.assertParity(self.POOLS, fwd, rev, series_every=30)
+        self.assertTrue(res["series"])
+        self.assertTrue(all(p["count"] + p["reverse_count"] > 0 for p in res["pools"]))
+
+    def test_identical_pools_round_robin(self):
+        # Equal pools tie on every quote; the round-robin pick must match.
+        pools = [dict(self.POOLS[0], name="x%d" % i) for i in range(3)]
+        fwd, rev = arena_demand(600, 3, 10.0, 1000.0, 0.7)
+        res = self.assertParity(pools, fwd, rev, series_every=7)
+        self.assertTrue(all(p["count"] + p["reverse_count"] > 0 for p in res["pools"]))
+
+    def test_one_sided_and_drained(self):
+        # All-forward demand drains the small pools so later swaps go unserved.
+        fwd, rev = arena_demand(2000, 11, 1000.0, 200000.0, 1.0)
+        self.assertEqual(rev, [])
+        self.assertParity(self.POOLS[:2], fwd, rev, series_every=100)
+
+    def test_zero_liquidity_pool(self):
+        pools = [dict(self.POOLS[0], cap=0.0), self.POOLS[3]]
+        fwd, rev = arena_demand(500, 5, 10.0, 5000.0, 0.4)
+        res = self.assertParity(pools, fwd, rev)
+        self.assertEqual(res["pools"][0]["L"], 0)
+        self.assertNotIn("series", res)
+
+    def test_arena_demand_is_seeded(self):
+        self.assertEqual(arena_demand(100, 9, 1.0, 2.0, 0.5), arena_demand(100, 9, 1.0, 2.0, 0.5))
+        self.assertNotEqual(arena_demand(100, 9, 1.0, 2.0, 0.5), arena_demand(100, 10, 1.0, 2.0, 0.5))
+
+
+class TestSweep(unittest.TestCase):
+    def test_grid_order(self):
+        grid = sweep_grid([1, 5], [1000.0], [0.5, 10.0])
+        self.assertEqual([p["index"] for p in grid], [0, 1, 2, 3])
+        self.assertEqual([(p["fee_bps"], p["range_pct"]) for p in grid],
+                         [(1, 0.5), (1, 10.0), (5, 0.5), (5, 10.0)])
+
+    def test_process_pool_matches_simulate(self):
+        fwd, rev = _market_swaps(600, seed=21)
+        total = sum(s["usd"] for s in fwd)
+        grid = sweep_grid([1, 30], [20000.0, 2000000.0], [1.0, 10.0])
+        cols = event_columns(fwd, rev)
+        with sweep_executor(cols, BASE["opening_px"], 1.0, 1.0, total, max_workers=2) as ex:
+            results = list(ex.map(sweep_point, grid))
+        self.assertEqual(len(results), len(grid))
+        for point, res in results:
+            ref = simulate(point["liquidity_usd"] / 2.0, point["range_pct"],
+                           int(round(point["fee_bps"] * 100)), fwd,
+                           BASE["opening_px"], 1.0, 1.0, total, reverse_swaps=rev)
+            self.assertEqual(res, ref)
+
+
+def _reference_market_prices(swaps, window=50):
+    # The original per-swap statistics.median over a freshly sliced window.
+    out = []
+    for i, s in enumerate(swaps):
+        if i == 0:
+            out.append(s.get("fee_free_price", s["price"]))
+            continue
+        lo = max(0, i - window)
+        out.append(statistics.median(x.get("fee_free_price", x["price"]) for x in swaps[lo:i]))
+    return out
+
+
+class TestMarketPrices(unittest.TestCase):
+    def _swaps(self, n, seed):
+        rng = random.Random(seed)
+        # Few distinct prices so the window holds many duplicates.
+        return [{"price": Fraction(rng.randint(9000, 9020), 10000),
+                 "fee_free_price": Fraction(rng.randint(9990, 10010), 10000)
+                 if rng.random() < 0.8 else Fraction(1, 1)} for _ in range(n)]
+
+    def test_exact_matches_statistics_median(self):
+        swaps = self._swaps(500, seed=3)
+        for window in (1, 2, 7, 50):
+            got = market_prices(swaps, window=window)
+            self.assertEqual(got, _reference_market_prices(swaps, window=window))
+            self.assertTrue(all(isinstance(p, Fraction) for p in got))
+
+    def test_price_fallback_without_fee_free(self):
+        swaps = [{"price": Fraction(i % 5 + 1, 3)} for i in range(60)]
+        self.assertEqual(market_prices(swaps, window=4),
+                         _reference_market_prices(swaps, window=4))
+
+    def test_float_mode(self):
+        swaps = self._swaps(300, seed=4)
+        got = market_prices(swaps, exact=False)
+        ref = _reference_market_prices(swaps)
+        self.assertTrue(all(isinstance(p, float) for p in got))
+        for g, r in zip(got, ref):
+            self.assertAlmostEqual(g, float(r), places=12)
+
+    def test_rolling_median_fixed_point(self):
+        rm = RollingMedian(3)
+        with self.assertRaises(ValueError):
+            rm.median()
+        for v, want in [(10, 10), (20, 15), (40, 20), (1, 20), (2, 2)]:
+            rm.push(v)
+            self.assertEqual(rm.median(), want)
+            self.assertIsInstance(rm.median(), int)
+        self.assertEqual(len(rm), 3)
+
+
+def _fetched_rows(n_tx, seed):
+    # fetch_swaps()-shaped rows ordered by (tx_hash, log_index): direct
+    # USDC<->DAI legs, WETH hops, split legs in the same pool, zero-amount
+    # legs and legs without a USD value.
+    rng = random.Random(seed)
+    pools = [(1, "USDC", "DAI", 1.0), (2, "USDC", "DAI", 5.0),
+             (3, "DAI", "WETH", 30.0), (4, "USDC", "WETH", 5.0)]
+    rows = []
+    for t in range(n_tx):
+        tx = "0x%06d" % t
+        for li in range(rng.randint(1, 4)):
+            cid, s0, s1, fee = rng.choice(pools)
+            a0 = rng.uniform(10.0, 5000.0) * rng.choice((1, -1))
+            a1 = -a0 * rng.uniform(0.99, 1.01) * (0.0003 if "WETH" in (s0, s1) else 1.0)
+            if rng.random() < 0.03:
+                a1 = 0.0
+            usd = abs(a0) if rng.random() < 0.9 else 0.0
+            rows.append({"tx_hash": tx, "log_index": li, "timestamp": 1700000000 + t // 3,
+                         "token0_symbol": s0, "token1_symbol": s1,
+                         "amount0": a0, "amount1": a1, "amountUSD": usd, "amount_usd": usd,
+                         "fee_bps": fee, "fee_tier": "", "protocol": "Uniswap V3",
+                         "network": "Ethereum", "cid": cid, "pool_address": "0x%d" % cid,
+                         "pool_id": "0x%d" % cid})
+    return rows
+
+
+def _reference_pair_legs(rows, start, end, prices):
+    # The multi-pass preparation api/main.py used before pair_legs: normalize
+    # everything, index each tx's first leg, filter both directions, then
+    # dedup per (tx, pool) keeping the highest-USD leg.
+    events = []
+    for r in rows:
+        s = normalize_leg(r, prices)
+        if s is not None:
+            a0, a1 = abs(float(r["amount0"])), abs(float(r["amount1"]))
+            s["price"] = Fraction(a1) / Fraction(a0)
+            events.append(s)
+    first = {}
+    for s in events:
+        prev = first.get(s["tx_hash"])
+        if prev is None or s["log_index"] < prev["log_index"]:
+            first[s["tx_hash"]] = s
+
+    def spent(s):
+        return s["s0"] if s["t0_in"] else s["s1"]
+
+    def bought(s):
+        return s["s1"] if s["t0_in"] else s["s0"]
+
+    out = {}
+    for name, a, b in (("forward", start, end), ("reverse", end, start)):
+        legs = [s for s in events if spent(s) in a and bought(s) in b
+                and spent(first[s["tx_hash"]]) in a]
+        counts, seen = {}, {}
+        for s in legs:
+            key = (s["tx_hash"], s["cid"])
+            counts[key] = counts.get(key, 0) + 1
+            if key not in seen or s["usd"] > seen[key]["usd"]:
+                seen[key] = s
+        out[name] = (list(seen.values()), counts)
+    return out
+
+
+class TestPairLegs(unittest.TestCase):
+    START, END = ["USDC", "USDT"], ["DAI"]
+    PRICES = {"WETH": 3000.0}
+
+    def test_matches_multi_pass_reference(self):
+        for seed in range(5):
+            rows = _fetched_rows(400, seed)
+            got = pair_legs(iter(rows), self.START, self.END, self.PRICES)
+            ref = _reference_pair_legs(rows, self.START, self.END, self.PRICES)
+            for name in ("forward", "reverse"):
+                ref_legs, ref_counts = ref[name]
+                self.assertTrue(ref_legs)
+                strip = [{k: v for k, v in s.items() if k not in ("raw_count", "raw_usd")}
+                         for s in got[name]]
+                for s in ref_legs:
+                    s["price"] = (s["price"] * Q96).__floor__()
+                self.assertEqual(strip, ref_legs)
+                self.assertEqual({(s["tx_hash"], s["cid"]): s["raw_count"] for s in got[name]},
+                                 ref_counts)
+
+    def test_raw_usd_sums_every_leg_of_the_pool_in_the_tx(self):
+        rows = [{"tx_hash": "0xa", "log_index": i, "timestamp": 1700000000,
+                 "token0_symbol": "USDC", "token1_symbol": "DAI", "amount0": amt,
+                 "amount1": -amt, "amountUSD": amt, "fee_bps": 1.0, "cid": 1}
+                for i, amt in enumerate((100.0, 300.0, 200.0))]
+        fwd = pair_legs(rows, self.START, self.END)["forward"]
+        self.assertEqual(len(fwd), 1)
+        self.assertEqual((fwd[0]["usd"], fwd[0]["raw_count"], fwd[0]["raw_usd"]), (300.0, 3, 600.0))
+        self.assertEqual(fwd[0]["price"], Q96)
+
+    def test_reverse_first_tx_is_not_forward_demand(self):
+        # Buys USDC with DAI first, then sells USDC for DAI (an arb round trip):
+        # only the first leg's direction counts.
+        legs = [("DAI", 50.0), ("USDC", 60.0)]
+        rows = [{"tx_hash": "0xb", "log_index": i, "timestamp": 1700000000,
+                 "token0_symbol": "USDC", "token1_symbol": "DAI",
+                 "amount0": amt if spend == "USDC" else -amt,
+                 "amount1": -amt if spend == "USDC" else amt,
+                 "amountUSD": amt, "fee_bps": 1.0, "cid": 1} for i, (spend, amt) in enumerate(legs)]
+        out = pair_legs(rows, self.START, self.END)
+        self.assertEqual(out["forward"], [])
+        self.assertEqual([s["usd"] for s in out["reverse"]], [50.0])
+
+
+# Fixtures for the fixed-point regression suite: (start, end, pools, price,
+# amount scale). Prices span stable pairs, LST/ETH, a BTC/ETH cross and a
+# raw-unit 6- vs 18-decimal pair; pools are (cid, fee_bps).
+PRICE_FIXTURES = {
+    "usdc_dai": (["USDC"], ["DAI"], ((1, 1.0), (2, 5.0), (3, 0.5)), 1.0002, 1.0),
+    "steth_eth": (["STETH"], ["ETH", "WETH"], ((4, 1.0), (5, 100.0)), 0.9993, 0.5),
+    "wbtc_weth": (["WBTC"], ["WETH"], ((6, 5.0), (7, 30.0)), 26.41, 0.02),
+    "usdc_weth_raw": (["USDC"], ["WETH"], ((8, 5.0), (9, 30.0)), 2.9e8, 1e6),
+}
+
+
+def _fixture_rows(name, n_tx=600, seed=11):
+    start, end, pools, price, scale = PRICE_FIXTURES[name]
+    rng = random.Random("%s:%d" % (name, seed))
+    rows = []
+    for t in range(n_tx):
+        cid, fee = rng.choice(pools)
+        fwd = rng.random() < 0.6
+        a0 = rng.lognormvariate(6.0, 1.5) * scale
+        px = price * rng.uniform(0.998, 1.002)
+        # Observed output net of the pool fee, like the warehouse amounts.
+        a1 = a0 * px * (1 - fee / 10000.0)
+        if not fwd:
+            a1 = a0 * px
+            a0 = a0 * (1 - fee / 10000.0)
+        rows.append({"tx_hash": "0x%06d" % t, "log_index": 0, "timestamp": 1700000000 + 12 * t,
+                     "token0_symbol": start[0], "token1_symbol": end[-1],
+                     "amount0": a0 if fwd else -a0, "amount1": -a1 if fwd else a1,
+                     "amountUSD": rng.lognormvariate(6.0, 1.5), "fee_bps": fee,
+                     "protocol": "Uniswap V3", "network": "Ethereum", "cid": cid,
+                     "pool_address": "0x%d" % cid})
+    return start, end, rows
+
+
+def _prepared(name, fixed_point):
+    # The /api/routes/undercut preparation, in Q64.96 or with the original
+    # Fraction leg prices and fee_free_price().
+    start, end, rows = _fixture_rows(name)
+    legs = pair_legs(rows, start, end)
+    fwd, rev = legs["forward"], legs["reverse"]
+    for s in fwd:
+        if fixed_point:
+            s["fee_free_price"] = fee_free_price_x96(s["price"], s["t0_in"], s["fee_bps"])
+        else:
+            s["price"] = leg_price(s)
+            s["fee_free_price"] = fee_free_price(s["price"], s["t0_in"],
+                                                 fee_fraction_from_bps(s["fee_bps"]))
+    fwd.sort(key=lambda s: s["ts"])
+    rev.sort(key=lambda s: s["ts"])
+    markets = market_prices(fwd)
+    if fixed_point:
+        center = Fraction(sorted(markets)[len(markets) // 2], Q96)
+    else:
+        center = Fraction(sorted(float(m) for m in markets)[len(markets) // 2])
+    _, p0_usd, p1_usd = opening_price_and_usd(fwd)
+    # Forward legs all spend token0; api/main.py fills the token1 USD price
+    # from the latest prices, here it is implied by the market price.
+    p1_usd = p1_usd or p0_usd / float(center)
+    return fwd, rev, markets, center, p0_usd, p1_usd
+
+
+class TestFixedPointPrices(unittest.TestCase):
+    def test_price_x96_is_floor_of_exact_ratio(self):
+        rng = random.Random(3)
+        for _ in range(2000):
+            a = rng.lognormvariate(0, 12)
+            b = rng.lognormvariate(0, 12)
+            self.assertEqual(price_x96(a, -b), (Fraction(a) / Fraction(b) * Q96).__floor__())
+
+    def test_fee_free_price_within_one_unit_of_exact(self):
+        rng = random.Random(4)
+        for _ in range(2000):
+            p = Fraction(rng.lognormvariate(0, 10))
+            fee_bps = rng.choice((0, 0.5, 1, 5, 30, 100, 123.45))
+            t0_in = rng.random() < 0.5
+            pips = int(round(fee_bps * 100))
+            exact = p / (1 - Fraction(pips, 10 ** 6)) if t0_in else p * (1 - Fraction(pips, 10 ** 6))
+            got = fee_free_price_x96((p * Q96).__floor__(), t0_in, fee_bps)
+            self.assertLessEqual(0, exact * Q96 - got)
+            self.assertLess(exact * Q96 - got, 2)
+
+    def test_market_prices_within_three_units_of_exact(self):
+        fwd, _, markets, _, _, _ = _prepared("usdc_dai", fixed_point=True)
+        exact = []
+        for s in fwd:
+            pips = int(round(s["fee_bps"] * 100))
+            f = 1 - Fraction(pips, 10 ** 6)
+            exact.append(leg_price(s) / f if s["t0_in"] else leg_price(s) * f)
+        ref = [exact[0]] + [statistics.median(exact[max(0, i - 50):i]) for i in range(1, len(exact))]
+        for got, want in zip(markets, ref):
+            self.assertLess(abs(want * Q96 - got), 3)
+
+    def test_price_to_float(self):
+        self.assertEqual(price_to_float(3 * Q96 // 2), 1.5)
+        self.assertEqual(price_to_float(Fraction(3, 2)), 1.5)
+        self.assertEqual(price_to_float(0.25), 0.25)
+
+    def test_opening_price_is_always_q96(self):
+        swaps = [{"price": 3 * Q96 // 2, "usd": 150.0, "input": 100.0, "t0_in": True}]
+        self.assertEqual(opening_price_and_usd(swaps), (3 * Q96 // 2, 1.5, None))
+        swaps = [{"price": Fraction(3, 2), "usd": 150.0, "input": 100.0, "t0_in": True}]
+        self.assertEqual(opening_price_and_usd(swaps)[0], 3 * Q96 // 2)
+        self.assertEqual(opening_price_and_usd([]), (Q96, None, None))
+
+    def test_sqrt_price_of_q96_center(self):
+        for px96 in (Q96, 3 * Q96 // 7, 290000000 * Q96 + 12345, 1 << 40):
+            self.assertEqual(sqrt_price_x96(Fraction(px96, Q96)), math.isqrt(px96 << 96))
+
+    def test_spill_safe_price_round_trip(self):
+        start, end, rows = _fixture_rows("wbtc_weth", n_tx=50)
+        for s in pair_legs(rows, start, end)["forward"]:
+            self.assertEqual(s["price"], (leg_price(s) * Q96).__floor__())
+
+    def test_diversion_counts_match_fraction_pipeline(self):
+        for name in PRICE_FIXTURES:
+            with self.subTest(fixture=name):
+                fx = _prepared(name, fixed_point=True)
+                ref = _prepared(name, fixed_point=False)
+                self.assertAlmostEqual(float(fx[3]), float(ref[3]), delta=float(ref[3]) * 1e-12)
+                total = sum(s["usd"] for s in fx[0])
+                for liq, rng_pct, fee_pips in itertools.product(
+                        (1e4, 1e6, 1e8), (0.05, 0.5, 5.0), (50, 100, 500, 3000)):
+                    args = (liq / 2.0, rng_pct, fee_pips)
+                    a = simulate_columnar(*args, fx[0], fx[3], fx[4], fx[5], total, reverse_swaps=fx[1])
+                    b = simulate_columnar(*args, ref[0], ref[3], ref[4], ref[5], total, reverse_swaps=ref[1])
+                    for key in ("div_count", "reverse_count", "in_range", "by_pool"):
+                        self.assertEqual(a[key] if key != "by_pool" else {k: v[0] for k, v in a[key].items()},
+                                         b[key] if key != "by_pool" else {k: v[0] for k, v in b[key].items()},
+                                         (name, liq, rng_pct, fee_pips, key))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -29,11 +29,14 @@ Model (two-sided inventory / drift — diverges from scratch/tbtc_wbtc_router_sp
 
 Read-only against Postgres (DATA_WAREHOUSE_DB, default localhost:5433).
 """
+import itertools
 import math
-from collections import defaultdict
-from datetime import datetime
+import random
+from bisect import bisect_left, insort
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from fractions import Fraction
-from statistics import median
 from typing import Dict, List, Optional
 
 SCALE = 10 ** 8          # integer token scale for the V3 math port
@@ -164,12 +167,196 @@ def get_next_sqrt_price_from_output(sqrt_px96, liquidity, amount_out, zero_for_o
 
 
 def sqrt_price_x96(price):
-    """sqrt(price) * 2^96 as int, price a Fraction (token1 per token0)."""
+    """sqrt(price) * 2^96 as int, price a Fraction (token1 per token0). For a
+    Q64.96 price p96, sqrt_price_x96(Fraction(p96, PRICE_ONE)) is exactly
+    isqrt(p96 << 96)."""
     if not isinstance(price, Fraction):
         price = Fraction(price)
     return math.isqrt((price.numerator * (1 << 192)) // price.denominator)
 
 
+# ---------------------------------------------------------------------------
+# Fixed-point prices
+# ---------------------------------------------------------------------------
+# Pipeline prices are Q64.96 fixed-point ints (like V3's sqrtPriceX96, but
+# the price itself): price_x96 = floor(p * 2**96), p = token1 per token0.
+#
+# Precision: every step floors, so a Q64.96 value is at most 2**-96
+# (~1.3e-29) below the exact rational, absolute. Relative to p that is
+# < 1.3e-29 / p, i.e. finer than a double (2**-53 ~ 1.1e-16) for any
+# p >= 2**-43 (~1.1e-13); raw-unit prices of 18- vs 6-decimal tokens
+# (~1e-12 .. 1e12) stay within ~1e-17 relative. The fee-free adjustment adds
+# one more floor, and an even-window median floors the midpoint, so a market
+# price is within 3 * 2**-96 of the same computation in exact Fractions.
+# Prices below 2**-96 floor to 0 and are treated as missing. There is no
+# upper bound: Python ints widen, the "Q64" is only the width real prices
+# need. Fraction / float prices are still accepted everywhere (reference
+# implementation and tests); an int price always means Q64.96.
+PRICE_ONE = Q96
+FEE_PIPS_ONE = 1_000_000   # fee denominator in hundredths of a bip
+
+
+def price_x96(num: float, den: float) -> int:
+    """floor(|num| / |den| * 2**96) computed exactly from the float amounts."""
+    n1, d1 = abs(num).as_integer_ratio()
+    n2, d2 = abs(den).as_integer_ratio()
+    return ((n1 * d2) << 96) // (d1 * n2)
+
+
+def price_to_float(p) -> float:
+    """A Q64.96 int, Fraction or float price as a float (correctly rounded)."""
+    return p / PRICE_ONE if isinstance(p, int) else float(p)
+
+
+def fee_free_price_x96(px96: int, t0_in: bool, fee_bps: Optional[float]) -> int:
+    """fee_free_price() in Q64.96: the fee is applied in integer pips
+    (fee_bps * 100, so sub-bip V4 fees keep 1e-6 resolution)."""
+    fee_pips = int(round(fee_bps * 100)) if fee_bps and fee_bps > 0 else 0
+    if fee_pips >= FEE_PIPS_ONE:
+        return px96
+    if t0_in:
+        return px96 * FEE_PIPS_ONE // (FEE_PIPS_ONE - fee_pips)
+    return px96 * (FEE_PIPS_ONE - fee_pips) // FEE_PIPS_ONE
+
+
+# ---------------------------------------------------------------------------
+# Demand preparation (single pass over fetched legs)
+# ---------------------------------------------------------------------------
+def normalize_leg(r: Dict, latest_prices: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """One fetch_swaps() row as an undercut leg, or None for zero/non-finite
+    amounts. A missing USD value is estimated from `latest_prices` (USD/EUR
+    stables default to 1). The price is added later by leg_price_x96()."""
+    a0f, a1f = float(r.get('amount0', 0) or 0), float(r.get('amount1', 0) or 0)
+    if a0f == 0 or a1f == 0 or not (math.isfinite(a0f) and math.isfinite(a1f)):
+        return None
+    usd = float(r.get('amountUSD', r.get('amount_usd', 0)) or 0)
+    t0_in = a0f > 0
+    s0 = (r.get('token0_symbol') or '').upper()
+    s1 = (r.get('token1_symbol') or '').upper()
+
+    if usd <= 0:
+        p0 = latest_prices.get(s0, 0.0) if latest_prices else 0.0
+        p1 = latest_prices.get(s1, 0.0) if latest_prices else 0.0
+        if p0 == 0.0 and any(x in s0 for x in ['USD', 'EUR']): p0 = 1.0
+        if p1 == 0.0 and any(x in s1 for x in ['USD', 'EUR']): p1 = 1.0
+        v0 = abs(a0f)
+        if v0 > 1e12:
+            v0 /= 1e18
+        elif any(b in s0 for b in ['BTC', 'WBTC', 'BTCB']) and v0 > 1e4:
+            v0 /= 1e8
+
+        v1 = abs(a1f)
+        if v1 > 1e12:
+            v1 /= 1e18
+        elif any(b in s1 for b in ['BTC', 'WBTC', 'BTCB']) and v1 > 1e4:
+            v1 /= 1e8
+
+        if p0 > 0:
+            usd = v0 * p0
+        elif p1 > 0:
+            usd = v1 * p1
+
+    return {
+        "ts": datetime.fromtimestamp(r['timestamp'], tz=timezone.utc),
+        "log_index": r.get('log_index') or 0,
+        "fee_bps": float(r.get('fee_bps') or 0),
+        "fee_tier": r.get('fee_tier') or '',
+        "t0_in": t0_in,
+        "input": abs(a0f if t0_in else a1f),
+        "output": abs(a1f if t0_in else a0f),
+        "usd": usd,
+        "protocol": r.get('protocol', 'Uniswap V3'),
+        "network": r.get('network', 'Ethereum'),
+        "cid": r.get('cid'),
+        "pool_address": r.get('pool_address') or '',
+        "pool_id": r.get('pool_id') or '',
+        "s0": s0,
+        "s1": s1,
+        "tx_hash": r.get('tx_hash') or '',
+    }
+
+
+def leg_price(s: Dict) -> Fraction:
+    """Exact observed price token1/token0 of a leg (|amount1| / |amount0|)."""
+    if s["t0_in"]:
+        return Fraction(s["output"]) / Fraction(s["input"])
+    return Fraction(s["input"]) / Fraction(s["output"])
+
+
+def leg_price_x96(s: Dict) -> int:
+    """leg_price() as a Q64.96 int, without building Fractions."""
+    if s["t0_in"]:
+        return price_x96(s["output"], s["input"])
+    return price_x96(s["input"], s["output"])
+
+
+def _dedup_tx_legs(legs: List[Dict]) -> List[Dict]:
+    """Keep one leg per pool for one tx (the highest-USD one, first on ties),
+    annotated with the pool's raw leg count and summed USD in that tx."""
+    best, count, vol = {}, {}, {}
+    for s in legs:
+        k = s["cid"]
+        if k not in best:
+            best[k], count[k], vol[k] = s, 1, s["usd"]
+            continue
+        count[k] += 1
+        vol[k] += s["usd"]
+        if s["usd"] > best[k]["usd"]:
+            best[k] = s
+    out = []
+    for k, s in best.items():
+        s = dict(s, raw_count=count[k], raw_usd=vol[k])
+        s["price"] = leg_price_x96(s)
+        out.append(s)
+    return out
+
+
+def pair_legs(rows, start_tokens: List[str], end_tokens: List[str],
+              latest_prices: Optional[Dict[str, float]] = None) -> Dict[str, List[Dict]]:
+    """Split a pair's fetched legs into deduplicated forward/reverse demand.
+
+    Consumes `rows` (fetch_swaps() dicts, any iterable) in one pass. Rows must
+    be ordered by (tx_hash, log_index) as PostgresFetcher returns them, so each
+    tx's legs are contiguous and only one tx is buffered at a time.
+
+    A tx's FIRST log entry decides its direction (the top routes table's
+    rule): its start->end legs are forward demand only if that entry spends a
+    start token, its end->start legs are reverse demand only if it spends an
+    end token. Each side keeps one leg per (tx, pool) — the highest-USD one —
+    with `raw_count` / `raw_usd` holding the pool's pre-dedup legs and volume
+    in that tx, and `price` as a Q64.96 int (leg_price_x96).
+    """
+    forward, reverse = [], []
+
+    def flush(legs):
+        if not legs:
+            return
+        first = min(legs, key=lambda s: s["log_index"])
+        first_spent = first["s0"] if first["t0_in"] else first["s1"]
+        if first_spent in start_tokens:
+            fwd = [s for s in legs
+                   if (s["s0"] if s["t0_in"] else s["s1"]) in start_tokens
+                   and (s["s1"] if s["t0_in"] else s["s0"]) in end_tokens]
+            forward.extend(_dedup_tx_legs(fwd))
+        if first_spent in end_tokens:
+            rev = [s for s in legs
+                   if (s["s1"] if s["t0_in"] else s["s0"]) in start_tokens
+                   and (s["s0"] if s["t0_in"] else s["s1"]) in end_tokens]
+            reverse.extend(_dedup_tx_legs(rev))
+
+    tx, legs = None, []
+    for r in rows:
+        s = normalize_leg(r, latest_prices)
+        if s is None:
+            continue
+        if s["tx_hash"] != tx:
+            flush(legs)
+            tx, legs = s["tx_hash"], []
+        legs.append(s)
+    flush(legs)
+    return {"forward": forward, "reverse": reverse}
+
+
 # ---------------------------------------------------------------------------
 # Market price estimation
 # ---------------------------------------------------------------------------
@@ -188,25 +375,72 @@ def fee_free_price(price: Fraction, t0_in: bool, fee_frac: float) -> Fraction:
     return price / (1 - fee_frac) if t0_in else price * (1 - fee_frac)
 
 
-def market_prices(swaps: List[Dict], window: int = 50) -> List[Fraction]:
+class RollingMedian:
+    """Median of the last `window` pushed values.
+
+    Keeps the window both in arrival order (to know what expires) and sorted
+    (to read the median), so each push costs O(log w) comparisons instead of
+    re-sorting the window. Values only need to be comparable: floats, scaled
+    ints or exact Fractions all work. Matches statistics.median: the mean of
+    the two middle values for an even count, except that int (fixed-point)
+    values stay ints, rounding down."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._fifo = deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def push(self, value):
+        self._fifo.append(value)
+        insort(self._sorted, value)
+        if len(self._fifo) > self.window:
+            old = self._fifo.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+
+    def median(self):
+        n = len(self._sorted)
+        if not n:
+            raise ValueError("median of empty window")
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        lo, hi = self._sorted[mid - 1], self._sorted[mid]
+        if isinstance(lo, int) and isinstance(hi, int):
+            return (lo + hi) // 2
+        return (lo + hi) / 2
+
+
+def market_prices(swaps: List[Dict], window: int = 50, exact: bool = True) -> List:
     """Estimate the marginal (arbitraged) market price per swap as the median of
     the last `window` fee-free executed prices. Slippage is roughly symmetric
-    per direction, so the median cancels it."""
-    out: List[Fraction] = []
+    per direction, so the median cancels it.
+
+    `exact=True` keeps the prices' own representation: Q64.96 ints (even
+    windows floor the midpoint) or Fractions (same values as a
+    statistics.median over each window). `exact=False` converts every price to
+    float once and returns floats, which is enough when the caller only needs a
+    float estimate. Either way the window is maintained incrementally."""
+    out: List = []
+    rolling = RollingMedian(window)
     for i, s in enumerate(swaps):
         ff_price = s.get("fee_free_price", s["price"])
-        if i == 0:
-            out.append(ff_price)
-            continue
-        lo = max(0, i - window)
-        out.append(median(s.get("fee_free_price", s["price"]) for s in swaps[lo:i]))
+        if not exact:
+            ff_price = price_to_float(ff_price)
+        out.append(ff_price if i == 0 else rolling.median())
+        rolling.push(ff_price)
     return out
 
 
 def opening_price_and_usd(swaps: List[Dict], n: int = 50):
-    """Market price + implied USD per token from the first `n` swaps."""
+    """Market price as a Q64.96 int (PRICE_ONE when no swap is priced) +
+    implied USD per token from the first `n` swaps."""
     px = [s.get("fee_free_price", s["price"]) for s in swaps[:n] if s.get("fee_free_price") or s.get("price")]
-    med_px = sorted(px)[len(px) // 2] if px else Fraction(1, 1)
+    med_px = sorted(px)[len(px) // 2] if px else PRICE_ONE
+    if not isinstance(med_px, int):
+        med_px = math.floor(Fraction(med_px) * PRICE_ONE)
     usd_t0 = [s["usd"] / s["input"] for s in swaps[:n] if s["t0_in"]]
     usd_t1 = [s["usd"] / s["input"] for s in swaps[:n] if not s["t0_in"]]
     p0_usd = sorted(usd_t0)[len(usd_t0) // 2] if usd_t0 else None
@@ -334,6 +568,203 @@ def simulate(cap, range_pct, fee_pips, swaps, opening_px, p0_usd, p1_usd,
     return res
 
 
+# ---------------------------------------------------------------------------
+# Columnar fast path
+# ---------------------------------------------------------------------------
+def pool_key(s):
+    """Competitor-pool key a swap is attributed to in `by_pool`."""
+    return (s.get("cid"), s["fee_bps"], s.get("protocol", "Uniswap V3"), s.get("pool_address", ""))
+
+
+def event_columns(swaps, reverse_swaps=None):
+    """Merge forward + reverse demand chronologically into parallel columns.
+
+    The per-event work that does not depend on the hypothetical pool (SCALE
+    conversion of input/output, the event sort, pool-key hashing) is done once
+    here, so a grid of pools can be simulated over the same columns without
+    repeating it. Event order is identical to simulate(): a stable sort on ts
+    of forward swaps followed by reverse swaps.
+
+    Returns a dict of equal-length lists: `forward` (bool), `amount_in` /
+    `amount_out` (SCALE ints), `usd`, `fee_bps` / `pool` (int codes into
+    `fee_keys` / `pool_keys`)."""
+    merged = list(swaps) + list(reverse_swaps or [])
+    n_fwd = len(swaps)
+    ts = [s["ts"] for s in merged]
+    order = sorted(range(len(merged)), key=ts.__getitem__)   # stable, like simulate()
+
+    fee_codes: Dict = {}
+    pool_codes: Dict = {}
+    cols = {"forward": [], "amount_in": [], "amount_out": [], "usd": [],
+            "fee_bps": [], "pool": []}
+    for i in order:
+        s = merged[i]
+        forward = i < n_fwd
+        cols["forward"].append(forward)
+        cols["amount_in"].append(int(round(s["input"] * SCALE)))
+        cols["amount_out"].append(int(round(s["output"] * SCALE)))
+        cols["usd"].append(s["usd"])
+        # Only forward events feed by_fee_bps/by_pool, and only forward events
+        # are guaranteed to carry the attribution fields.
+        if forward:
+            cols["fee_bps"].append(fee_codes.setdefault(s["fee_bps"], len(fee_codes)))
+            cols["pool"].append(pool_codes.setdefault(pool_key(s), len(pool_codes)))
+        else:
+            cols["fee_bps"].append(-1)
+            cols["pool"].append(-1)
+    cols["fee_keys"] = list(fee_codes)
+    cols["pool_keys"] = list(pool_codes)
+    return cols
+
+
+def simulate_columnar(cap, range_pct, fee_pips, swaps, opening_px, p0_usd, p1_usd,
+                      total_usd, reverse_swaps=None, columns=None):
+    """Drop-in replacement for simulate() over event_columns().
+
+    Same model and same result (bit-identical ints and floats, same dict
+    shapes): simulate() is the reference oracle and test_undercut_analyzer.py
+    checks parity. The loop inlines quote() -> compute_swap_step() for the
+    exact-in case the simulator actually uses (ceil_div written inline as
+    -(-a // b)), works on local ints instead of the pool dict, and accumulates per-fee-tier / per-pool diversion into
+    code-indexed lists that are turned back into dicts once at the end.
+
+    Most observed swaps are not competitive, so before the bigint math each
+    event is checked against a float upper bound of the quote (a V3 fill never
+    beats the spot price: out <= in*P token0->1, out <= in/P token1->0). Only
+    events whose bound, padded well beyond float error, reaches the recorded
+    output run the exact math; a rejected event leaves no state behind, so the
+    filter cannot change the result.
+
+    Pass `columns` (from event_columns) to reuse a prepared event set across
+    many pools; `swaps` / `reverse_swaps` are then ignored."""
+    if columns is None:
+        columns = event_columns(swaps, reverse_swaps)
+    pool = build_pool(cap, range_pct, fee_pips, opening_px, p0_usd, p1_usd)
+    L, sa, sb = pool["L"], pool["sa"], pool["sb"]
+    L96 = L << 96
+    fee_keep = 1_000_000 - fee_pips
+    s_cur = pool["s_open"]
+    spot = (s_cur / Q96) ** 2
+    tie_flip = False
+
+    div_count = reverse_count = in_range = 0
+    div_usd = fee_usd = reverse_usd = reverse_fee_usd = 0.0
+    n_fee, n_pool = len(columns["fee_keys"]), len(columns["pool_keys"])
+    fee_cnt, fee_vol = [0] * n_fee, [0.0] * n_fee
+    pool_cnt, pool_vol = [0] * n_pool, [0.0] * n_pool
+    fee_order, pool_order = [], []
+
+    for forward, gross, recorded, usd, fee_code, pool_code in zip(
+            columns["forward"], columns["amount_in"], columns["amount_out"],
+            columns["usd"], columns["fee_bps"], columns["pool"]):
+        if sa < s_cur < sb:
+            in_range += 1
+        less_fee = gross * fee_keep // 1_000_000
+        bound = less_fee * spot if forward else (less_fee / spot if spot else math.inf)
+        if bound * 1.000001 + 1.0 < recorded:
+            continue
+        if forward:
+            # token0 in, price moves down toward sa (pool pays out token1).
+            if s_cur <= sa:
+                continue
+            if less_fee >= -(-(-(-L96 * (s_cur - sa) // s_cur)) // sa):
+                continue
+            sq_next = -(-L96 * s_cur // (L96 + less_fee * s_cur)) if less_fee else s_cur
+            if sq_next == sa:
+                continue
+            out_q = L * (s_cur - sq_next) // Q96
+        else:
+            # token1 in, price moves up toward sb (pool pays out token0).
+            if s_cur >= sb:
+                continue
+            if less_fee >= -(-L * (sb - s_cur) // Q96):
+                continue
+            sq_next = s_cur + less_fee * Q96 // L
+            if sq_next == sb:
+                continue
+            out_q = (L96 * (sq_next - s_cur) // sq_next) // s_cur
+        if out_q < recorded:
+            continue
+        if out_q == recorded:
+            # Exact tie: deterministic alternation, as in simulate().
+            tie_flip = not tie_flip
+            if not tie_flip:
+                continue
+        s_cur = sq_next
+        spot = (s_cur / Q96) ** 2
+        fee = usd * fee_pips / 1_000_000
+        fee_usd += fee
+        if forward:
+            div_count += 1
+            div_usd += usd
+            if not fee_cnt[fee_code]:
+                fee_order.append(fee_code)
+            fee_cnt[fee_code] += 1
+            fee_vol[fee_code] += usd
+            if not pool_cnt[pool_code]:
+                pool_order.append(pool_code)
+            pool_cnt[pool_code] += 1
+            pool_vol[pool_code] += usd
+        else:
+            reverse_count += 1
+            reverse_usd += usd
+            reverse_fee_usd += fee
+
+    by_fee_bps = defaultdict(lambda: [0, 0.0])
+    for c in fee_order:
+        by_fee_bps[columns["fee_keys"][c]] = [fee_cnt[c], fee_vol[c]]
+    by_pool = defaultdict(lambda: [0, 0.0])
+    for c in pool_order:
+        by_pool[columns["pool_keys"][c]] = [pool_cnt[c], pool_vol[c]]
+    return {"L": L, "div_count": div_count, "div_usd": div_usd, "fee_usd": fee_usd,
+            "reverse_count": reverse_count, "reverse_usd": reverse_usd,
+            "reverse_fee_usd": reverse_fee_usd, "in_range": in_range,
+            "by_fee_bps": by_fee_bps, "by_pool": by_pool,
+            "pct": 100 * div_usd / total_usd if total_usd else 0.0}
+
+
+# ---------------------------------------------------------------------------
+# Parameter sweeps
+# ---------------------------------------------------------------------------
+_SWEEP_STATE: Dict = {}
+
+
+def sweep_grid(fee_bps_values, liquidity_usd_values, range_pct_values) -> List[Dict]:
+    """Cartesian grid of hypothetical pools, fee-major, as dicts with an
+    `index` giving each point's position in the grid."""
+    return [{"index": i, "fee_bps": f, "liquidity_usd": liq, "range_pct": r}
+            for i, (f, liq, r) in enumerate(itertools.product(
+                fee_bps_values, liquidity_usd_values, range_pct_values))]
+
+
+def _init_sweep_worker(columns, opening_px, p0_usd, p1_usd, total_usd):
+    _SWEEP_STATE.update(columns=columns, opening_px=opening_px,
+                        p0_usd=p0_usd, p1_usd=p1_usd, total_usd=total_usd)
+
+
+def sweep_point(point: Dict):
+    """Simulate one sweep_grid() point against the event set the worker was
+    initialised with. Returns (point, result) with plain-dict `by_*` maps so
+    the result pickles back to the parent process."""
+    st = _SWEEP_STATE
+    res = simulate_columnar(point["liquidity_usd"] / 2.0, point["range_pct"],
+                            int(round(point["fee_bps"] * 100)), None,
+                            st["opening_px"], st["p0_usd"], st["p1_usd"],
+                            st["total_usd"], columns=st["columns"])
+    res["by_fee_bps"] = dict(res["by_fee_bps"])
+    res["by_pool"] = dict(res["by_pool"])
+    return point, res
+
+
+def sweep_executor(columns, opening_px, p0_usd, p1_usd, total_usd,
+                   max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool whose workers each hold one copy of a prepared event set
+    (from event_columns), so submitting sweep_point() only ships the grid
+    point, not the demand."""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                               initargs=(columns, opening_px, p0_usd, p1_usd, total_usd))
+
+
 def simulate_pools(pools, swaps, opening_px, p0_usd, p1_usd,
                    total_usd, reverse_swaps=None, series_every=None):
     """General N-pool coupled simulation. Every pool is modeled with the same
@@ -415,6 +846,130 @@ def simulate_pools(pools, swaps, opening_px, p0_usd, p1_usd,
     return out
 
 
+def simulate_pools_columnar(pools, swaps, opening_px, p0_usd, p1_usd,
+                            total_usd, reverse_swaps=None, series_every=None, columns=None):
+    """Drop-in replacement for simulate_pools() over event_columns().
+
+    Same model and same result (bit-identical ints, floats, series and dict
+    shapes; simulate_pools() is the reference oracle). Pool state — L, the
+    band bounds, the current sqrt price and the fee — lives in parallel lists
+    indexed by pool, and each event is quoted against all pools in one inlined
+    pass of the exact-in swap step (as in simulate_columnar), tracking the best
+    output and the pools tied on it as it goes. The SCALE conversion of every
+    input is done once per event instead of once per pool, and no per-event
+    quote lists or tuples are built.
+
+    Pass `columns` (from event_columns) to reuse a prepared event set;
+    `swaps` / `reverse_swaps` are then ignored."""
+    if columns is None:
+        columns = event_columns(swaps, reverse_swaps)
+    built = [build_pool(p["cap"], p["range_pct"], p["fee_pips"], opening_px, p0_usd, p1_usd)
+             for p in pools]
+    n = len(built)
+    Ls = [b["L"] for b in built]
+    L96s = [L << 96 for L in Ls]
+    sas = [b["sa"] for b in built]
+    sbs = [b["sb"] for b in built]
+    curs = [b["s_open"] for b in built]
+    fee_pips = [p["fee_pips"] for p in pools]
+    keeps = [1_000_000 - f for f in fee_pips]
+
+    count, usd_fwd, fee_usd = [0] * n, [0.0] * n, [0.0] * n
+    rev_count, rev_usd, rev_fee_usd = [0] * n, [0.0] * n, [0.0] * n
+    in_range = [0] * n
+    series = []
+    tie_flip = 0
+    pool_idx = range(n)
+
+    for idx, (forward, gross, usd) in enumerate(zip(
+            columns["forward"], columns["amount_in"], columns["usd"])):
+        best = -1
+        best_i = best_sq = tied = None
+        for i in pool_idx:
+            s_cur, sa, sb = curs[i], sas[i], sbs[i]
+            if sa < s_cur < sb:
+                in_range[i] += 1
+            less_fee = gross * keeps[i] // 1_000_000
+            L = Ls[i]
+            if forward:
+                # token0 in, price moves down toward sa (pool pays out token1).
+                if s_cur <= sa:
+                    continue
+                L96 = L96s[i]
+                if less_fee >= -(-(-(-L96 * (s_cur - sa) // s_cur)) // sa):
+                    continue
+                sq = -(-L96 * s_cur // (L96 + less_fee * s_cur)) if less_fee else s_cur
+                if sq == sa:
+                    continue
+                out = L * (s_cur - sq) // Q96
+            else:
+                # token1 in, price moves up toward sb (pool pays out token0).
+                if s_cur >= sb:
+                    continue
+                if less_fee >= -(-L * (sb - s_cur) // Q96):
+                    continue
+                sq = s_cur + less_fee * Q96 // L
+                if sq == sb:
+                    continue
+                out = (L96s[i] * (sq - s_cur) // sq) // s_cur
+            if out > best:
+                best, best_i, best_sq, tied = out, i, sq, None
+            elif out == best:
+                if tied is None:
+                    tied = [(best_i, best_sq)]
+                tied.append((i, sq))
+        if best_i is None:
+            continue
+        if tied is not None:
+            # Deterministic round-robin among equally-good pools.
+            best_i, best_sq = tied[tie_flip % len(tied)]
+            tie_flip += 1
+
+        curs[best_i] = best_sq
+        fee = usd * fee_pips[best_i] / 1_000_000
+        fee_usd[best_i] += fee
+        if forward:
+            count[best_i] += 1
+            usd_fwd[best_i] += usd
+        else:
+            rev_count[best_i] += 1
+            rev_usd[best_i] += usd
+            rev_fee_usd[best_i] += fee
+
+        if series_every and (idx + 1) % series_every == 0:
+            series.append({"step": idx + 1, "pools": [
+                {"count": count[i], "usd": usd_fwd[i], "fee_usd": fee_usd[i],
+                 "reverse_count": rev_count[i], "reverse_usd": rev_usd[i],
+                 "reverse_fee_usd": rev_fee_usd[i]} for i in pool_idx]})
+
+    res = [{"name": p.get("name", f"pool{i}"), "L": Ls[i],
+            "count": count[i], "usd": usd_fwd[i], "fee_usd": fee_usd[i],
+            "reverse_count": rev_count[i], "reverse_usd": rev_usd[i],
+            "reverse_fee_usd": rev_fee_usd[i], "in_range": in_range[i],
+            "pct": 100 * usd_fwd[i] / total_usd if total_usd else 0.0}
+           for i, p in enumerate(pools)]
+    out = {"pools": res}
+    if series_every:
+        out["series"] = series
+    return out
+
+
+def arena_demand(count: int, seed: int, vol_min: float, vol_max: float,
+                 direction_bias: float):
+    """Seeded random demand for /api/pool-arena/simulate: `count` swaps with a
+    uniform USD size in [vol_min, vol_max], forward with probability
+    `direction_bias`. Returns (forward, reverse) swap lists; the same seed
+    always yields the same demand."""
+    rng = random.Random(seed)
+    fwd, rev = [], []
+    for i in range(count):
+        usd = rng.uniform(vol_min, vol_max)
+        sw = {"ts": i, "input": usd, "output": usd, "usd": usd, "fee_bps": 30,
+              "cid": 1, "protocol": "Arena", "pool_address": "0xARENA"}
+        (fwd if rng.random() < direction_bias else rev).append(sw)
+    return fwd, rev
+
+
 def simulate_two_pools(comp_cap, comp_range_pct, comp_fee_pips,
                        hyp_cap, hyp_range_pct, hyp_fee_pips,
                        swaps, opening_px, p0_usd, p1_usd,
@@ -71,5 +71,13 @@ MAX_RESULTS_PER_QUERY = 1000
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 
+# Concurrent swap ingestion (common.utils.subgraph_ingest): subgraph requests
+# in flight, request rate ceiling, time-shard width and normalized pages
+# buffered ahead of the storage writer.
+SUBGRAPH_CONCURRENCY = int(os.getenv('SUBGRAPH_CONCURRENCY', '6'))
+SUBGRAPH_MAX_RPS = float(os.getenv('SUBGRAPH_MAX_RPS', '10'))
+SUBGRAPH_SHARD_SECS = int(os.getenv('SUBGRAPH_SHARD_SECS', str(6 * 3600)))
+SUBGRAPH_QUEUE_PAGES = int(os.getenv('SUBGRAPH_QUEUE_PAGES', '8'))
+
 TOKEN_ADDRESSES = [token['address'].lower() for token in TOKENS.values()]
 ADDRESS_TO_SYMBOL = {token['address'].lower(): symbol for symbol, token in TOKENS.items()}
@@ -0,0 +1,218 @@
+"""Concurrent, cursor-paginated swap ingestion from The Graph.
+
+UniswapV3Fetcher.fetch_swaps used to run the token0_in and token1_in scans
+back to back. Each scan paged serially on a timestamp_gte cursor that
+re-fetched the last second of every page, stepped over seconds holding more
+than a page of swaps (the +1s stall workaround), and deduplicated through an
+unbounded seen-id set. SubgraphSwapEngine replaces that loop:
+
+  - The window is split into time shards (SUBGRAPH_SHARD_SECS). Every
+    (shard, scan) pair pages independently; at most SUBGRAPH_CONCURRENCY
+    requests are in flight, started no faster than SUBGRAPH_MAX_RPS.
+  - Within a shard, pages are ordered by timestamp. When a full page ends
+    inside second T, the rows before T are emitted and T itself is drained
+    with id_gt keyset pages (where timestamp: T, orderBy id) before the
+    cursor moves to T + 1. No second is skipped and no row is fetched twice
+    apart from the partial second at the end of a full page.
+  - The two scans are disjoint (the fetcher's _side_filter excludes tracked
+    token0s from the token1 scan), so no seen-id set is needed.
+  - Normalized pages go through a bounded queue (SUBGRAPH_QUEUE_PAGES) to a
+    single consumer that calls on_batch in a worker thread. A slow writer
+    therefore throttles the fetchers, and PostgresStorage is never used from
+    two threads at once.
+  - Shards finish out of order, so a batch's own max timestamp is not a safe
+    resume point. The consumer tracks which shards have been fully written
+    and calls on_watermark with the latest swap timestamp of the contiguous
+    completed prefix only; a run that dies mid-way resumes before any hole.
+
+Requests go through the fetcher's own _execute_query in worker threads, so
+retry semantics stay per fetcher: V3 raises after MAX_RETRIES, V4 logs and
+returns nothing. A skipped page would leave a hole in its shard, so it fails
+the whole run (SkippedQueryError) instead of ending that one scan.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import (
+    MAX_RESULTS_PER_QUERY,
+    SUBGRAPH_CONCURRENCY,
+    SUBGRAPH_MAX_RPS,
+    SUBGRAPH_QUEUE_PAGES,
+    SUBGRAPH_SHARD_SECS,
+)
+
+# The two disjoint token scans (see UniswapV3Fetcher._side_filter).
+SIDES = (0, 1)
+
+_DONE = object()
+
+
+class SkippedQueryError(RuntimeError):
+    """The fetcher gave up on a page; the run cannot cover its window."""
+
+
+def time_shards(start_ts: int, end_ts: int, shard_secs: int) -> List[Tuple[int, int]]:
+    """Half-open [lo, hi) shards covering [start_ts, end_ts] inclusive."""
+    stop = end_ts + 1
+    step = max(1, int(shard_secs))
+    return [(lo, min(lo + step, stop)) for lo in range(start_ts, stop, step)]
+
+
+class _RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart (rate <= 0: off)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SubgraphSwapEngine:
+    """Fetches the swaps of one (network, protocol) fetcher concurrently.
+
+    The fetcher supplies _page_query(where, order_by, first),
+    _side_filter(side, addresses), _normalize_swap(raw, addr_to_sym),
+    _execute_query(query) and _log(msg).
+    """
+
+    def __init__(self, fetcher, concurrency: int = SUBGRAPH_CONCURRENCY,
+                 max_rps: float = SUBGRAPH_MAX_RPS, shard_secs: int = SUBGRAPH_SHARD_SECS,
+                 queue_pages: int = SUBGRAPH_QUEUE_PAGES, page_size: int = MAX_RESULTS_PER_QUERY):
+        self.fetcher = fetcher
+        self.concurrency = max(1, concurrency)
+        self.max_rps = max_rps
+        self.shard_secs = shard_secs
+        self.queue_pages = max(1, queue_pages)
+        self.page_size = page_size
+        self.stats = {"shards": 0, "pages": 0, "keyset_pages": 0, "swaps": 0}
+
+    def run(self, start_ts: int, end_ts: int, addresses: List[str],
+            on_batch: Optional[Callable[[List[Dict]], None]] = None,
+            collect: bool = True,
+            on_watermark: Optional[Callable[[int], None]] = None) -> Tuple[int, List[Dict]]:
+        """(number of swaps fetched, the swaps when collect else []).
+
+        on_watermark(ts) is called after on_batch has returned for every swap
+        at or before ts, ts being the latest swap timestamp of the completed
+        shard prefix (never called when that prefix holds no swaps).
+        """
+        return asyncio.run(self._run(start_ts, end_ts, addresses, on_batch, collect, on_watermark))
+
+    async def _run(self, start_ts, end_ts, addresses, on_batch, collect, on_watermark):
+        addr_to_sym = {addr.lower(): sym for sym, addr in self.fetcher.token_addresses.items()}
+        shards = time_shards(start_ts, end_ts, self.shard_secs)
+        self.stats["shards"] = len(shards)
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._limiter = _RateLimiter(self.max_rps)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_pages)
+        collected: List[Dict] = []
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                consumer = tg.create_task(self._consume(queue, len(shards), on_batch, collect,
+                                                        collected, on_watermark))
+                scans = [tg.create_task(self._scan(shard, lo, hi,
+                                                   self.fetcher._side_filter(side, addresses),
+                                                   addr_to_sym, queue))
+                         for shard, (lo, hi) in enumerate(shards) for side in SIDES]
+                await asyncio.gather(*scans)
+                await queue.put(_DONE)
+                await consumer
+        except ExceptionGroup as eg:
+            # Surface the first failure (a query or a write) like the serial loop did.
+            exc = eg
+            while isinstance(exc, ExceptionGroup):
+                exc = exc.exceptions[0]
+            raise exc
+        return self.stats["swaps"], collected
+
+    async def _consume(self, queue, n_shards, on_batch, collect, collected, on_watermark):
+        # Items are (shard, batch); a None batch marks one scan of the shard done.
+        pending = [len(SIDES)] * n_shards
+        shard_max: List[Optional[int]] = [None] * n_shards
+        head = 0
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            shard, batch = item
+            if batch is not None:
+                self.stats["swaps"] += len(batch)
+                if collect:
+                    collected.extend(batch)
+                if on_batch:
+                    await asyncio.to_thread(on_batch, batch)
+                top = max(s['timestamp'] for s in batch)
+                if shard_max[shard] is None or top > shard_max[shard]:
+                    shard_max[shard] = top
+                continue
+
+            pending[shard] -= 1
+            mark = None
+            while head < n_shards and not pending[head]:
+                if shard_max[head] is not None:
+                    mark = shard_max[head]
+                head += 1
+            if mark is not None and on_watermark:
+                await asyncio.to_thread(on_watermark, mark)
+
+    async def _query(self, where: str, order_by: str) -> Optional[List[Dict]]:
+        """One page of raw swaps, or None when the fetcher skipped a failed query."""
+        query = self.fetcher._page_query(where, order_by, self.page_size)
+        async with self._sem:
+            await self._limiter.wait()
+            result = await asyncio.to_thread(self.fetcher._execute_query, query)
+        self.stats["pages"] += 1
+        if not result or 'data' not in result:
+            return None
+        return result['data'].get('swaps') or []
+
+    async def _emit(self, queue, shard, rows, addr_to_sym):
+        if rows:
+            await queue.put((shard, [self.fetcher._normalize_swap(r, addr_to_sym) for r in rows]))
+
+    async def _scan(self, shard: int, lo: int, hi: int, side_filter: str, addr_to_sym, queue):
+        await self._scan_pages(shard, lo, hi, side_filter, addr_to_sym, queue)
+        await queue.put((shard, None))
+
+    async def _scan_pages(self, shard, lo, hi, side_filter, addr_to_sym, queue):
+        cursor = lo
+        while cursor < hi:
+            rows = await self._query(f"timestamp_gte: {cursor} timestamp_lt: {hi} {side_filter}",
+                                     "timestamp")
+            if rows is None:
+                raise SkippedQueryError(f"Subgraph page skipped in shard [{lo}, {hi}) at {cursor}")
+            if len(rows) < self.page_size:
+                await self._emit(queue, shard, rows, addr_to_sym)
+                return
+
+            # Full page: everything before its last second is complete.
+            last_ts = int(rows[-1]['timestamp'])
+            await self._emit(queue, shard, [r for r in rows if int(r['timestamp']) < last_ts], addr_to_sym)
+
+            # Drain that second by id, then continue after it.
+            last_id = None
+            while True:
+                id_clause = f'id_gt: "{last_id}"' if last_id else ""
+                rows = await self._query(f"timestamp: {last_ts} {id_clause} {side_filter}", "id")
+                if rows is None:
+                    raise SkippedQueryError(f"Subgraph page skipped in shard [{lo}, {hi}) at {last_ts}")
+                self.stats["keyset_pages"] += 1
+                await self._emit(queue, shard, rows, addr_to_sym)
+                if len(rows) < self.page_size:
+                    break
+                last_id = rows[-1]['id']
+            cursor = last_ts + 1
+            self.fetcher._log(f"Shard [{lo}, {hi}) advanced to {cursor}")
@@ -1,8 +1,12 @@
+import io
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import logging
+import re
 import psycopg2
+from collections import defaultdict
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
 
@@ -23,8 +27,10 @@ from .config import (
     MAX_RESULTS_PER_QUERY,
     REQUEST_TIMEOUT,
     MAX_RETRIES,
+    SUBGRAPH_CONCURRENCY,
     DATA_WAREHOUSE_DB
 )
+from .subgraph_ingest import SubgraphSwapEngine
 
 def load_token_addresses_for_chain(chain: str) -> Dict[str, str]:
     """Load symbol → contract_address mapping for a given chain from DB."""
@@ -89,6 +95,8 @@ class UniswapV3Fetcher:
         self.network = network
         self.protocol = protocol
         self.session = requests.Session()
+        # One pooled connection per concurrent subgraph page.
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=max(10, SUBGRAPH_CONCURRENCY)))
 
         # Build network-aware V3 and V4 URLs
         import os
@@ -143,67 +151,61 @@ class UniswapV3Fetcher:
         if self.verbose:
             print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] {message}")
     
-    def _build_swap_query(self, start_timestamp: int, end_timestamp: int, filter_field: str, filter_values: List[str]) -> str:
-        addr_list = str(filter_values).replace("'", '"')
+    def _swap_fields(self) -> str:
         if self.protocol == "PancakeSwap V3":
-            messari_field = "tokenIn_in" if filter_field == "token0_in" else "tokenOut_in"
-            query = f"""
-            {{
-              swaps(
-                first: {MAX_RESULTS_PER_QUERY}
-                orderBy: timestamp
-                orderDirection: asc
-                where: {{
-                  timestamp_gte: {start_timestamp}
-                  timestamp_lte: {end_timestamp}
-                  {messari_field}: {addr_list}
-                }}
-              ) {{
+            return """
                 id
                 hash
                 timestamp
-                tokenIn {{ id symbol decimals }}
-                tokenOut {{ id symbol decimals }}
+                tokenIn { id symbol decimals }
+                tokenOut { id symbol decimals }
                 amountIn
                 amountOut
                 amountInUSD
-                pool {{
+                pool {
                   id
                   name
-                  inputTokens {{ id symbol decimals }}
-                  fees {{ feePercentage }}
-                }}
-              }}
-            }}
+                  inputTokens { id symbol decimals }
+                  fees { feePercentage }
+                }
             """
-            return query
-
-        query = f"""
-        {{
-          swaps(
-            first: {MAX_RESULTS_PER_QUERY}
-            orderBy: timestamp
-            orderDirection: asc
-            where: {{
-              timestamp_gte: {start_timestamp}
-              timestamp_lte: {end_timestamp}
-              {filter_field}: {addr_list}
-            }}
-          ) {{
+        return """
             id
             timestamp
-            transaction {{ id }}
-            token0 {{ id symbol decimals }}
-            token1 {{ id symbol decimals }}
+            transaction { id }
+            token0 { id symbol decimals }
+            token1 { id symbol decimals }
             amount0
             amount1
             amountUSD
-            pool {{ id feeTier }}
-          }}
+            pool { id feeTier }
+        """
+
+    def _side_filter(self, side: int, filter_values: List[str]) -> str:
+        """Token filter for one of the two scans. Side 0 takes swaps whose
+        token0 is tracked; side 1 those whose token1 is tracked but token0 is
+        not, so the scans are disjoint and need no cross-scan dedup."""
+        addr_list = str(filter_values).replace("'", '"')
+        if self.protocol == "PancakeSwap V3":
+            first, second = "tokenIn", "tokenOut"
+        else:
+            first, second = "token0", "token1"
+        if side == 0:
+            return f"{first}_in: {addr_list}"
+        return f"{second}_in: {addr_list} {first}_not_in: {addr_list}"
+
+    def _page_query(self, where: str, order_by: str, first: int = MAX_RESULTS_PER_QUERY) -> str:
+        return f"""
+        {{
+          swaps(
+            first: {first}
+            orderBy: {order_by}
+            orderDirection: asc
+            where: {{ {where} }}
+          ) {{{self._swap_fields()}}}
         }}
         """
-        return query
-    
+
     def _execute_query(self, query: str) -> Optional[Dict]:
         for attempt in range(MAX_RETRIES):
             try:
@@ -226,160 +228,123 @@ class UniswapV3Fetcher:
                 else:
                     raise RuntimeError(f"Max retries reached for {self.network} {self.protocol} query: {e}") from e
     
-    def _fetch_swaps_with_filter(self, start_timestamp: int, end_timestamp: int, filter_field: str, filter_addresses: List[str], on_batch_callback: Optional[callable] = None, collect_results: bool = True) -> List:
-        found_results = []
-        seen_ids = set()
-        current_start_time = start_timestamp
+    def _normalize_swap(self, swap: Dict, addr_to_sym: Dict[str, str]) -> Dict:
+        """One raw subgraph swap in the dict shape PostgresStorage.save_swaps expects."""
+        to_float = lambda x: float(x) if x is not None else 0.0
+        to_int = lambda x: int(x) if x is not None else 0
 
-        addr_to_sym = {addr.lower(): sym for sym, addr in self.token_addresses.items()}
-
-        while True:
-            query = self._build_swap_query(current_start_time, end_timestamp, filter_field, filter_addresses)
-            result = self._execute_query(query)
-            if not result or 'data' not in result:
-                break
-            swaps = result['data'].get('swaps', [])
-            if not swaps:
-                break
-
-            to_float = lambda x: float(x) if x is not None else 0.0
-            to_int = lambda x: int(x) if x is not None else 0
-
-            batch_swaps = []
-            last_timestamp = 0
-            for swap in swaps:
-                swap_id = swap.get('id', 'unknown')
-                if swap_id in seen_ids:
-                    continue
-                seen_ids.add(swap_id)
-
-                if self.protocol == "PancakeSwap V3":
-                    token0 = swap.get('tokenIn') or {}
-                    token1 = swap.get('tokenOut') or {}
-                    tx_hash = swap.get('hash', 'unknown')
-                    t0_addr = token0.get('id', '').lower()
-                    t1_addr = token1.get('id', '').lower()
-                    
-                    pool = swap.get('pool') or {}
-                    pool_name = pool.get('name', '')
-                    fee_tier_str = "0.25%"
-                    import re
-                    match = re.search(r'(\d+(?:\.\d+)?%)', pool_name)
-                    if match:
-                        fee_tier_str = match.group(1)
-                    else:
-                        fees_list = pool.get('fees', [])
-                        if fees_list:
-                            try:
-                                fee_pct = float(fees_list[-1].get('feePercentage', 0))
-                                fee_tier_str = f"{fee_pct:g}%"
-                            except: pass
-                    
-                    pool_tokens = pool.get('inputTokens', [])
-                    if len(pool_tokens) >= 2:
-                        p0_addr = pool_tokens[0].get('id', '').lower()
-                        p1_addr = pool_tokens[1].get('id', '').lower()
-                    else:
-                        p0_addr = t0_addr
-                        p1_addr = t1_addr
-
-                    amount_in_val = to_float(swap.get('amountIn'))
-                    amount_out_val = to_float(swap.get('amountOut'))
-
-                    p0_dec = to_int(pool_tokens[0].get('decimals')) if len(pool_tokens) >= 1 else None
-                    if p0_dec is None:
-                        p0_dec = to_int(token0.get('decimals')) if t0_addr == p0_addr else to_int(token1.get('decimals'))
-                    p1_dec = to_int(pool_tokens[1].get('decimals')) if len(pool_tokens) >= 2 else None
-                    if p1_dec is None:
-                        p1_dec = to_int(token1.get('decimals')) if t1_addr == p1_addr else to_int(token0.get('decimals'))
-
-                    normalized = {
-                        'id': swap_id,
-                        'timestamp': to_int(swap.get('timestamp')),
-                        'tx_hash': tx_hash,
-                        'token0_address': p0_addr,
-                        'token1_address': p1_addr,
-                        'token0_symbol': addr_to_sym.get(p0_addr, pool_tokens[0].get('symbol') if len(pool_tokens) >= 1 else 'UNKNOWN').upper(),
-                        'token1_symbol': addr_to_sym.get(p1_addr, pool_tokens[1].get('symbol') if len(pool_tokens) >= 2 else 'UNKNOWN').upper(),
-                        'token0_decimals': p0_dec or 18,
-                        'token1_decimals': p1_dec or 18,
-                        'amount0': amount_in_val if t0_addr == p0_addr else -amount_out_val,
-                        'amount1': amount_out_val if t1_addr == p1_addr else -amount_in_val,
-                        'amountUSD': to_float(swap.get('amountInUSD')),
-                        'fee_tier': fee_tier_str,
-                        'pool': {'id': pool.get('id')}
-                    }
-                else:
-                    token0 = swap.get('token0') or {}
-                    token1 = swap.get('token1') or {}
-                    transaction = swap.get('transaction') or {}
-                    t0_addr = token0.get('id', '').lower()
-                    t1_addr = token1.get('id', '').lower()
-
-                    fee_tier_val = to_int((swap.get('pool') or {}).get('feeTier'))
-                    if fee_tier_val & 0x800000:
-                        fee_tier_str = "Dynamic"
-                    else:
-                        fee_tier_str = f"{to_float(fee_tier_val) / 10000}%"
-
-                    normalized = {
-                        'id': swap_id,
-                        'timestamp': to_int(swap.get('timestamp')),
-                        'tx_hash': transaction.get('id', 'unknown'),
-                        'token0_address': t0_addr,
-                        'token1_address': t1_addr,
-                        'token0_symbol': addr_to_sym.get(t0_addr, token0.get('symbol') or 'UNKNOWN').upper(),
-                        'token1_symbol': addr_to_sym.get(t1_addr, token1.get('symbol') or 'UNKNOWN').upper(),
-                        'token0_decimals': to_int(token0.get('decimals')) or 18,
-                        'token1_decimals': to_int(token1.get('decimals')) or 18,
-                        'amount0': to_float(swap.get('amount0')),
-                        'amount1': to_float(swap.get('amount1')),
-                        'amountUSD': to_float(swap.get('amountUSD')),
-                        'fee_tier': fee_tier_str,
-                        'pool': {'id': (swap.get('pool') or {}).get('id')}
-                    }
-                batch_swaps.append(normalized)
-            
-            # The last element's timestamp in the original batch
-            last_timestamp = to_int(swaps[-1].get('timestamp'))
-
-            if collect_results:
-                found_results.extend(batch_swaps)
+        swap_id = swap.get('id', 'unknown')
+        if self.protocol == "PancakeSwap V3":
+            token0 = swap.get('tokenIn') or {}
+            token1 = swap.get('tokenOut') or {}
+            tx_hash = swap.get('hash', 'unknown')
+            t0_addr = token0.get('id', '').lower()
+            t1_addr = token1.get('id', '').lower()
+
+            pool = swap.get('pool') or {}
+            pool_name = pool.get('name', '')
+            fee_tier_str = "0.25%"
+            match = re.search(r'(\d+(?:\.\d+)?%)', pool_name)
+            if match:
+                fee_tier_str = match.group(1)
             else:
-                found_results.extend([s['id'] for s in batch_swaps])
-
-            self._log(f"Fetched {len(batch_swaps)} new swaps from {filter_field} (Total: {len(found_results)})")
-
-            if on_batch_callback and batch_swaps:
-                on_batch_callback(batch_swaps)
-
-            if len(swaps) < MAX_RESULTS_PER_QUERY:
-                break
-            
-            # Advance to the last timestamp. If we got stuck (e.g. >1000 swaps exactly on this second), push forward by 1s
-            if last_timestamp == current_start_time:
-                current_start_time += 1
+                fees_list = pool.get('fees', [])
+                if fees_list:
+                    try:
+                        fee_pct = float(fees_list[-1].get('feePercentage', 0))
+                        fee_tier_str = f"{fee_pct:g}%"
+                    except: pass
+
+            pool_tokens = pool.get('inputTokens', [])
+            if len(pool_tokens) >= 2:
+                p0_addr = pool_tokens[0].get('id', '').lower()
+                p1_addr = pool_tokens[1].get('id', '').lower()
             else:
-                current_start_time = last_timestamp
-
-        return found_results
-
-    def fetch_swaps(self, start_date: datetime, end_date: datetime, on_batch_callback: Optional[callable] = None, collect_results: bool = True):
+                p0_addr = t0_addr
+                p1_addr = t1_addr
+
+            amount_in_val = to_float(swap.get('amountIn'))
+            amount_out_val = to_float(swap.get('amountOut'))
+
+            p0_dec = to_int(pool_tokens[0].get('decimals')) if len(pool_tokens) >= 1 else None
+            if p0_dec is None:
+                p0_dec = to_int(token0.get('decimals')) if t0_addr == p0_addr else to_int(token1.get('decimals'))
+            p1_dec = to_int(pool_tokens[1].get('decimals')) if len(pool_tokens) >= 2 else None
+            if p1_dec is None:
+                p1_dec = to_int(token1.get('decimals')) if t1_addr == p1_addr else to_int(token0.get('decimals'))
+
+            normalized = {
+                'id': swap_id,
+                'timestamp': to_int(swap.get('timestamp')),
+                'tx_hash': tx_hash,
+                'token0_address': p0_addr,
+                'token1_address': p1_addr,
+                'token0_symbol': addr_to_sym.get(p0_addr, pool_tokens[0].get('symbol') if len(pool_tokens) >= 1 else 'UNKNOWN').upper(),
+                'token1_symbol': addr_to_sym.get(p1_addr, pool_tokens[1].get('symbol') if len(pool_tokens) >= 2 else 'UNKNOWN').upper(),
+                'token0_decimals': p0_dec or 18,
+                'token1_decimals': p1_dec or 18,
+                'amount0': amount_in_val if t0_addr == p0_addr else -amount_out_val,
+                'amount1': amount_out_val if t1_addr == p1_addr else -amount_in_val,
+                'amountUSD': to_float(swap.get('amountInUSD')),
+                'fee_tier': fee_tier_str,
+                'pool': {'id': pool.get('id')}
+            }
+        else:
+            token0 = swap.get('token0') or {}
+            token1 = swap.get('token1') or {}
+            transaction = swap.get('transaction') or {}
+            t0_addr = token0.get('id', '').lower()
+            t1_addr = token1.get('id', '').lower()
+
+            fee_tier_val = to_int((swap.get('pool') or {}).get('feeTier'))
+            if fee_tier_val & 0x800000:
+                fee_tier_str = "Dynamic"
+            else:
+                fee_tier_str = f"{to_float(fee_tier_val) / 10000}%"
+
+            normalized = {
+                'id': swap_id,
+                'timestamp': to_int(swap.get('timestamp')),
+                'tx_hash': transaction.get('id', 'unknown'),
+                'token0_address': t0_addr,
+                'token1_address': t1_addr,
+                'token0_symbol': addr_to_sym.get(t0_addr, token0.get('symbol') or 'UNKNOWN').upper(),
+                'token1_symbol': addr_to_sym.get(t1_addr, token1.get('symbol') or 'UNKNOWN').upper(),
+                'token0_decimals': to_int(token0.get('decimals')) or 18,
+                'token1_decimals': to_int(token1.get('decimals')) or 18,
+                'amount0': to_float(swap.get('amount0')),
+                'amount1': to_float(swap.get('amount1')),
+                'amountUSD': to_float(swap.get('amountUSD')),
+                'fee_tier': fee_tier_str,
+                'pool': {'id': (swap.get('pool') or {}).get('id')}
+            }
+        return normalized
+
+    def fetch_swaps(self, start_date: datetime, end_date: datetime, on_batch_callback: Optional[callable] = None, collect_results: bool = True,
+                    on_watermark_callback: Optional[callable] = None):
+        """Fetch every swap in [start_date, end_date] touching a tracked token.
+
+        Pages run concurrently through SubgraphSwapEngine (time shards x the
+        two disjoint token scans); each normalized page is handed to
+        on_batch_callback from a single consumer thread. Batches arrive out
+        of time order, so the resume point is reported separately:
+        on_watermark_callback(ts) once every swap up to ts has been handed
+        over (see PostgresStorage.advance_watermark). Returns the swaps
+        sorted by timestamp, or just their count when collect_results is
+        False.
+        """
         start_ts = int(start_date.timestamp())
         end_ts = int(end_date.timestamp())
-        
+
         addresses = [addr.lower() for addr in self.token_addresses.values()]
-            
-        swaps_token0 = self._fetch_swaps_with_filter(start_ts, end_ts, "token0_in", addresses, on_batch_callback, collect_results=collect_results)
-        swaps_token1 = self._fetch_swaps_with_filter(start_ts, end_ts, "token1_in", addresses, on_batch_callback, collect_results=collect_results)
-        
+        engine = SubgraphSwapEngine(self)
+        count, swaps = engine.run(start_ts, end_ts, addresses, on_batch_callback, collect_results,
+                                  on_watermark_callback)
+        self._log(f"Fetched {count} swaps for {self.network} {self.protocol} "
+                  f"({engine.stats['pages']} pages, {engine.stats['shards']} shards)")
         if collect_results:
-            unique = {s['id']: s for s in swaps_token0 + swaps_token1}
-            return sorted(unique.values(), key=lambda x: x['timestamp'])
-        else:
-            # Just count unique IDs to save memory
-            unique_ids = set(swaps_token0 + swaps_token1)
-            return len(unique_ids)
+            return sorted(swaps, key=lambda x: x['timestamp'])
+        return count
 
     def fetch_pool_daily_data(self, token0_addr: str, token1_addr: str, fee_tier_bips: int, start_date: datetime) -> List[Dict]:
         """
@@ -694,268 +659,431 @@ def get_last_ingestion_ts(pg_hook, network: str, protocol: str) -> Optional[date
         return row[0]
     return None
 
+# Seconds between full reloads of PostgresStorage's dimension caches. In
+# between, liquidity_pool is topped up incrementally (ids above the highest
+# one seen) on every batch.
+STORAGE_DIM_REFRESH_SECS = float(os.getenv('STORAGE_DIM_REFRESH_SECS', '900'))
+
+_SWAP_BATCH_COLUMNS = ('tx_hash', 'log_index', 'ts', 'network', 'protocol', 'pool_id',
+                       'amount0', 'amount1', 'amount_usd')
+_SWAP_LEGACY_COLUMNS = ('tx_hash', 'log_index', 'ts', 'pool_id', 'amount0', 'amount1', 'amount_usd')
+
+
+def _parse_log_index(swap_id: str) -> Optional[int]:
+    """Log index from a subgraph swap id ('<tx>#<n>' or '<tx>-<n>'), else None."""
+    if '#' in swap_id:
+        parts = swap_id.split('#')
+    elif '-' in swap_id:
+        parts = swap_id.rsplit('-', 1)
+    else:
+        return None
+    if len(parts) > 1 and parts[1]:
+        try:
+            return int(parts[1])
+        except ValueError:
+            pass
+    return None
+
+
+def _copy_value(v) -> str:
+    """One field in COPY text format."""
+    if v is None:
+        return '\\N'
+    if isinstance(v, datetime):
+        return v.isoformat()
+    text = repr(v) if isinstance(v, float) else str(v)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy_buffer(rows) -> io.StringIO:
+    """Rows as a COPY ... FROM STDIN text-format buffer."""
+    buf = io.StringIO()
+    buf.writelines('\t'.join(map(_copy_value, row)) + '\n' for row in rows)
+    buf.seek(0)
+    return buf
+
+
 class PostgresStorage:
-    def __init__(self):
-        self.conn_str = DATA_WAREHOUSE_DB
+    """Writes subgraph swap pages into the raw store.
+
+    One instance owns a long-lived connection (reopened if it drops) and
+    caches the dimension lookups save_swaps needs: chain / protocol ids, the
+    liquidity_pool maps and each chain's coin_contract map. The caches are
+    versioned: fully reloaded every STORAGE_DIM_REFRESH_SECS and after a
+    failed batch, while liquidity_pool is topped up with new rows on every
+    batch. Pools that save_swaps creates go straight into the maps. The
+    coin_contract maps are small and decide which swaps are kept, so they
+    are re-read on every batch: a contract that becomes tracked is picked up
+    before the watermark moves past its swaps.
+
+    Rows are COPYed into a session temp table, then moved into
+    SWAP_RAW_TABLE (and the legacy mirror) with one INSERT ... SELECT each.
+    """
 
-    def save_swaps(self, swaps: List[Dict], network: str = "Ethereum", protocol: str = "Uniswap V3"):
+    def __init__(self, conn_str: Optional[str] = None):
+        self.conn_str = conn_str or DATA_WAREHOUSE_DB
+        self._conn = None
+        self._batch_table_ready = False
+        self.dims_version = 0
+        self._dims_loaded_at: Optional[float] = None
+        self._chain_map: Dict[str, int] = {}
+        self._protocol_map: Dict[str, int] = {}
+        self._pool_id_map: Dict[str, int] = {}
+        self._pool_tokens_map: Dict[tuple, int] = {}
+        self._pool_has_identity: Dict[int, bool] = {}
+        self._max_pool_id = 0
+        self._contract_maps: Dict[int, Dict[str, dict]] = {}
+
+    # -- connection -------------------------------------------------------
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self.conn_str)
+            self._batch_table_ready = False
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _abort(self):
+        """Roll back after a failed batch and force a full dimension reload:
+        pools created in the rolled-back transaction are in the maps. The
+        rollback also undoes a _swap_batch created in that transaction."""
+        self._dims_loaded_at = None
+        self._batch_table_ready = False
+        if self._conn is not None and not self._conn.closed:
+            try:
+                self._conn.rollback()
+            except Exception:
+                self.close()
+
+    # -- dimension caches -------------------------------------------------
+
+    def _merge_pools(self, rows):
+        for lid, pid, cid, prid, c0, c1, fbps, paddr in rows:
+            if pid:
+                self._pool_id_map[pid.lower()] = lid
+            if paddr:
+                self._pool_id_map[paddr.lower()] = lid
+            self._pool_has_identity[lid] = bool(pid or paddr)
+            key = (cid, prid, frozenset({c0, c1}), fbps)
+            # If multiple pools collide on (chain, protocol, tokens, fee),
+            # prefer the canonical one that carries an on-chain address
+            # or pool_id over a phantom row with neither.
+            existing = self._pool_tokens_map.get(key)
+            if existing is None or ((pid or paddr) and not self._pool_has_identity.get(existing)):
+                self._pool_tokens_map[key] = lid
+            if lid > self._max_pool_id:
+                self._max_pool_id = lid
+
+    def _load_chains_protocols(self, cur):
+        cur.execute("SELECT id, name FROM chain")
+        self._chain_map = {row[1].lower(): row[0] for row in cur.fetchall()}
+        cur.execute("SELECT id, name FROM protocol")
+        self._protocol_map = {row[1].lower(): row[0] for row in cur.fetchall()}
+
+    def _refresh_dims(self, cur):
+        now = time.monotonic()
+        if self._dims_loaded_at is None or now - self._dims_loaded_at >= STORAGE_DIM_REFRESH_SECS:
+            self._load_chains_protocols(cur)
+            self._pool_id_map, self._pool_tokens_map, self._pool_has_identity = {}, {}, {}
+            self._max_pool_id = 0
+            self._contract_maps = {}
+            cur.execute("""
+                SELECT id, pool_id, chain_id, protocol_id, coin0_id, coin1_id, fee_bps, pool_address
+                FROM liquidity_pool
+                ORDER BY id
+            """)
+            self._merge_pools(cur.fetchall())
+            self._dims_loaded_at = now
+            self.dims_version += 1
+        else:
+            self._contract_maps = {}
+            cur.execute("""
+                SELECT id, pool_id, chain_id, protocol_id, coin0_id, coin1_id, fee_bps, pool_address
+                FROM liquidity_pool
+                WHERE id > %s
+                ORDER BY id
+            """, (self._max_pool_id,))
+            self._merge_pools(cur.fetchall())
+
+    def _contract_map(self, cur, chain_id: int) -> Dict[str, dict]:
+        """LOWER(contract_address) -> {coin_id, symbol, tracked} for a chain."""
+        cmap = self._contract_maps.get(chain_id)
+        if cmap is None:
+            cur.execute("""
+                SELECT LOWER(cc.contract_address), cc.coin_id, c.symbol, cc.tracked
+                FROM coin_contract cc
+                JOIN coin c ON cc.coin_id = c.coin_id
+                WHERE cc.chain_id = %s
+            """, (chain_id,))
+            cmap = {r[0]: {'coin_id': r[1], 'symbol': r[2], 'tracked': r[3]} for r in cur.fetchall()}
+            self._contract_maps[chain_id] = cmap
+        return cmap
+
+    # -- writes -----------------------------------------------------------
+
+    def _ensure_batch_table(self, cur):
+        if not self._batch_table_ready:
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS _swap_batch (
+                    tx_hash    VARCHAR(80),
+                    log_index  INT,
+                    ts         TIMESTAMPTZ,
+                    network    VARCHAR(20),
+                    protocol   VARCHAR(50),
+                    pool_id    INTEGER,
+                    amount0    DOUBLE PRECISION,
+                    amount1    DOUBLE PRECISION,
+                    amount_usd DOUBLE PRECISION
+                ) ON COMMIT DELETE ROWS
+            """)
+            self._batch_table_ready = True
+
+    def _resolve_pool(self, cur, s, network, protocol, chain_id, protocol_id,
+                      t0_addr, t1_addr, t0_info, t1_info, fbps) -> int:
+        t0_id = t0_info['coin_id']
+        t1_id = t1_info['coin_id']
+
+        # 1. Match by on-chain pool ID or pool address (authoritative)
+        sg_pool_id = (s.get('pool') or {}).get('id')
+        pool_id = None
+        if sg_pool_id:
+            pool_id = self._pool_id_map.get(sg_pool_id.lower())
+
+        # 2. Token/fee fallback is ONLY allowed when the swap carries
+        #    no subgraph pool identity at all. When sg_pool_id exists
+        #    but isn't found in pool_id_map, the pool row is simply
+        #    missing from the DB — fuzzy token+fee matching here is
+        #    what historically bulk-assigned lower-fee swaps to the
+        #    wrong same-pair pool (e.g. 0.05% WETH-USDC swaps into the
+        #    1% WETH-USDC pool). In that case we create the pool from
+        #    subgraph truth below instead of guessing.
+        if pool_id is None and not sg_pool_id:
+            pool_id = self._pool_tokens_map.get((chain_id, protocol_id, frozenset({t0_id, t1_id}), fbps))
+        if pool_id is not None:
+            return pool_id
+
+        # 3. Create pool on-the-spot if it does not exist
+        fee_tier_str = s.get('fee_tier') or (f"{fbps / 10000}%" if fbps is not None else "")
+        pool_name = f"{t0_info['symbol']}-{t1_info['symbol']} {fee_tier_str}".strip()
+        pool_address_val = sg_pool_id.lower() if sg_pool_id else None
+        pool_id_val = sg_pool_id.lower() if (sg_pool_id and len(sg_pool_id) == 66) else None
+
+        if not pool_address_val and not pool_id_val:
+            _, derived_id = derive_pool_identifiers(
+                protocol, network, t0_addr, t1_addr, fbps, getattr(self, 'dex_config', {})
+            )
+            pool_id_val = derived_id
+
+        if not pool_address_val and not pool_id_val:
+            from eth_hash.auto import keccak
+            seed = f"v4-fallback-{t0_id}-{t1_id}-{fbps}"
+            pool_id_val = "0x" + keccak(seed.encode('utf-8')).hex()
+
+        # Conflict on the pool's own address (V3) or pool_id (V4)
+        # — NOT on name+fee. Keying the ON CONFLICT on name+fee
+        # caused a genuinely distinct new pool to be absorbed into
+        # an existing same-name pool, silently misattributing every
+        # swap written under the absorbed row. The savepoint keeps the
+        # batch transaction usable for the lookup fallback.
+        cur.execute("SAVEPOINT new_pool")
+        try:
+            if pool_address_val:
+                conflict_clause = "(pool_address) WHERE pool_address IS NOT NULL"
+            elif pool_id_val:
+                conflict_clause = "(pool_id) WHERE pool_id IS NOT NULL"
+            else:
+                conflict_clause = "(chain_id, protocol_id, pool_name, fee_bps, (COALESCE(pool_id, '')))"
+            cur.execute(f"""
+                INSERT INTO liquidity_pool (chain_id, protocol_id, pool_name, fee_bps, coin0_id, coin1_id, pool_address, pool_id, reverted)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, false)
+                ON CONFLICT {conflict_clause} DO UPDATE
+                SET pool_address = COALESCE(liquidity_pool.pool_address, EXCLUDED.pool_address),
+                    pool_id = COALESCE(liquidity_pool.pool_id, EXCLUDED.pool_id)
+                RETURNING id
+            """, (chain_id, protocol_id, pool_name, fbps, t0_id, t1_id, pool_address_val, pool_id_val))
+            pool_id = cur.fetchone()[0]
+            cur.execute("RELEASE SAVEPOINT new_pool")
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT new_pool")
+            cur.execute("""
+                SELECT id FROM liquidity_pool
+                WHERE (pool_address = %s AND %s IS NOT NULL) OR (pool_id = %s AND %s IS NOT NULL)
+                LIMIT 1
+            """, (pool_address_val, pool_address_val, pool_id_val, pool_id_val))
+            res = cur.fetchone()
+            if res:
+                pool_id = res[0]
+            else:
+                raise
+
+        # Cache it in the maps for the rest of this batch and later ones
+        if pool_address_val:
+            self._pool_id_map[pool_address_val] = pool_id
+        if pool_id_val:
+            self._pool_id_map[pool_id_val] = pool_id
+        self._pool_has_identity[pool_id] = True
+        self._pool_tokens_map[(chain_id, protocol_id, frozenset({t0_id, t1_id}), fbps)] = pool_id
+        return pool_id
+
+    def _swap_rows(self, cur, swaps, network, protocol, chain_id, protocol_id, contract_map):
+        data = []
+        tx_hash_counters = defaultdict(int)
+        for s in swaps:
+            t0_addr = s.get('token0_address', '').lower()
+            t1_addr = s.get('token1_address', '').lower()
+
+            t0_info = contract_map.get(t0_addr)
+            t1_info = contract_map.get(t1_addr)
+
+            # 1. If we do not have both token contract (not symbol) found then skip
+            if t0_info is None or t1_info is None:
+                continue
+
+            # 2. If either of the coin contract is untracked then we should skip
+            if not t0_info['tracked'] or not t1_info['tracked']:
+                continue
+
+            # Extract log_index from the subgraph id
+            swap_id = s.get('id', '')
+            if not swap_id:
+                continue  # skip swaps with no id
+
+            log_index = _parse_log_index(swap_id)
+            if log_index is None:
+                tx_hash = s.get('tx_hash') or 'unknown'
+                log_index = tx_hash_counters[tx_hash]
+                tx_hash_counters[tx_hash] += 1
+
+            ts_val = datetime.fromtimestamp(s['timestamp'], timezone.utc)
+            fbps = _compute_fee_bps(s.get('fee_tier'))
+            pool_id = self._resolve_pool(cur, s, network, protocol, chain_id, protocol_id,
+                                         t0_addr, t1_addr, t0_info, t1_info, fbps)
+
+            data.append((
+                s['tx_hash'],
+                log_index,
+                ts_val,
+                network,
+                protocol,
+                pool_id,
+                s.get('amount0'),
+                s.get('amount1'),
+                s.get('amountUSD'),
+            ))
+        return data
+
+    def save_swaps(self, swaps: List[Dict], network: str = "Ethereum", protocol: str = "Uniswap V3",
+                   update_watermark: bool = True):
+        """Insert a batch of normalized swaps. With update_watermark the
+        ingestion_state watermark moves to the batch's latest swap, which is
+        only safe when batches arrive in time order; out-of-order writers pass
+        False and call advance_watermark themselves."""
         if not swaps:
             return
 
-        with psycopg2.connect(self.conn_str) as conn:
+        conn = self._connection()
+        data = []
+        try:
             with conn.cursor() as cur:
-                cur.execute("SELECT id, name FROM chain")
-                chain_map = {row[1].lower(): row[0] for row in cur.fetchall()}
-                cur.execute("SELECT id, name FROM protocol")
-                protocol_map = {row[1].lower(): row[0] for row in cur.fetchall()}
-                
-                chain_id = chain_map.get(network.lower())
-                protocol_id = protocol_map.get(protocol.lower())
+                self._refresh_dims(cur)
+                if network.lower() not in self._chain_map or protocol.lower() not in self._protocol_map:
+                    self._load_chains_protocols(cur)
+                chain_id = self._chain_map.get(network.lower())
+                protocol_id = self._protocol_map.get(protocol.lower())
                 if chain_id is None or protocol_id is None:
                     raise ValueError(f"Invalid network ({network}) or protocol ({protocol}) for lookup mappings")
 
-                # Load pool lookup maps
-                cur.execute("""
-                    SELECT id, pool_id, chain_id, protocol_id, coin0_id, coin1_id, fee_bps, pool_address
-                    FROM liquidity_pool
-                """)
-                rows = cur.fetchall()
-                pool_id_map = {}
-                for row in rows:
-                    lid, pid, cid, prid, c0, c1, fbps, paddr = row
-                    if pid:
-                        pool_id_map[pid.lower()] = lid
-                    if paddr:
-                        pool_id_map[paddr.lower()] = lid
-                pool_tokens_map = {}
-                lid_to_row = {row[0]: row for row in rows}
-                for row in rows:
-                    lid, pid, cid, prid, c0, c1, fbps_row, paddr = row
-                    key = (cid, prid, frozenset({c0, c1}), fbps_row)
-                    # If multiple pools collide on (chain, protocol, tokens, fee),
-                    # prefer the canonical one that carries an on-chain address
-                    # or pool_id over a phantom row with neither.
-                    existing = pool_tokens_map.get(key)
-                    if existing is not None:
-                        e_pid, e_paddr = lid_to_row[existing][1], lid_to_row[existing][7]
-                        if (pid or paddr) and not (e_pid or e_paddr):
-                            pool_tokens_map[key] = lid
-                        continue
-                    pool_tokens_map[key] = lid
-
-                # Load contract addresses for this chain, mapping LOWER(contract_address) -> {coin_id, symbol, tracked}
-                cur.execute("""
-                    SELECT LOWER(cc.contract_address), cc.coin_id, c.symbol, cc.tracked
-                    FROM coin_contract cc
-                    JOIN coin c ON cc.coin_id = c.coin_id
-                    WHERE cc.chain_id = %s
-                """, (chain_id,))
-                contract_rows = cur.fetchall()
-                contract_map = {r[0]: {'coin_id': r[1], 'symbol': r[2], 'tracked': r[3]} for r in contract_rows}
-
-                insert_query = f"""
-                INSERT INTO {SWAP_RAW_TABLE} (
-                    tx_hash, log_index, ts, network, protocol, pool_id,
-                    amount0, amount1, amount_usd
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ts, tx_hash, log_index) DO NOTHING;
-                """
-                if SWAP_LEGACY_MIRROR:
-                    insert_query_legacy = """
-                    INSERT INTO swaps (
-                        tx_hash, log_index, ts, pool_id,
-                        amount0, amount1, amount_usd
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (ts, tx_hash, log_index) DO NOTHING;
-                    """
-                
-                data = []
-                from collections import defaultdict
-                tx_hash_counters = defaultdict(int)
-                for s in swaps:
-                    t0_addr = s.get('token0_address', '').lower()
-                    t1_addr = s.get('token1_address', '').lower()
-
-                    t0_info = contract_map.get(t0_addr)
-                    t1_info = contract_map.get(t1_addr)
-
-                    # 1. If we do not have both token contract (not symbol) found then skip
-                    if t0_info is None or t1_info is None:
-                        continue
-
-                    # 2. If either of the coin contract is untracked then we should skip
-                    if not t0_info['tracked'] or not t1_info['tracked']:
-                        continue
-
-                    t0_id = t0_info['coin_id']
-                    t1_id = t1_info['coin_id']
-
-                    # Extract log_index from the subgraph id
-                    swap_id = s.get('id', '')
-                    if not swap_id:
-                        continue  # skip swaps with no id
-
-                    log_index = None
-                    if '#' in swap_id:
-                        parts = swap_id.split('#')
-                        if len(parts) > 1 and parts[1]:
-                            try:
-                                log_index = int(parts[1])
-                            except ValueError:
-                                pass
-                    elif '-' in swap_id:
-                        parts = swap_id.rsplit('-', 1)
-                        if len(parts) > 1 and parts[1]:
-                            try:
-                                log_index = int(parts[1])
-                            except ValueError:
-                                pass
-                    
-                    if log_index is None:
-                        tx_hash = s.get('tx_hash') or 'unknown'
-                        log_index = tx_hash_counters[tx_hash]
-                        tx_hash_counters[tx_hash] += 1
-
-                    ts_val = datetime.fromtimestamp(s['timestamp'], timezone.utc)
-
-                    fbps = _compute_fee_bps(s.get('fee_tier'))
-                    
-                    # 1. Match by on-chain pool ID or pool address (authoritative)
-                    sg_pool_id = (s.get('pool') or {}).get('id')
-                    pool_id = None
-                    if sg_pool_id:
-                        pool_id = pool_id_map.get(sg_pool_id.lower())
-
-                    # 2. Token/fee fallback is ONLY allowed when the swap carries
-                    #    no subgraph pool identity at all. When sg_pool_id exists
-                    #    but isn't found in pool_id_map, the pool row is simply
-                    #    missing from the DB — fuzzy token+fee matching here is
-                    #    what historically bulk-assigned lower-fee swaps to the
-                    #    wrong same-pair pool (e.g. 0.05% WETH-USDC swaps into the
-                    #    1% WETH-USDC pool). In that case we create the pool from
-                    #    subgraph truth below instead of guessing.
-                    if pool_id is None and not sg_pool_id:
-                        pool_id = pool_tokens_map.get((chain_id, protocol_id, frozenset({t0_id, t1_id}), fbps))
-
-                    # 3. Create pool on-the-spot if it does not exist
-                    if pool_id is None:
-                        fee_tier_str = s.get('fee_tier') or (f"{fbps / 10000}%" if fbps is not None else "")
-                        pool_name = f"{t0_info['symbol']}-{t1_info['symbol']} {fee_tier_str}".strip()
-                        pool_address_val = sg_pool_id.lower() if sg_pool_id else None
-                        pool_id_val = sg_pool_id.lower() if (sg_pool_id and len(sg_pool_id) == 66) else None
-
-                        if not pool_address_val and not pool_id_val:
-                            _, derived_id = derive_pool_identifiers(
-                                protocol, network, t0_addr, t1_addr, fbps, getattr(self, 'dex_config', {})
-                            )
-                            pool_id_val = derived_id
-
-                        if not pool_address_val and not pool_id_val:
-                            from eth_hash.auto import keccak
-                            seed = f"v4-fallback-{t0_id}-{t1_id}-{fbps}"
-                            pool_id_val = "0x" + keccak(seed.encode('utf-8')).hex()
-
-                        # Conflict on the pool's own address (V3) or pool_id (V4)
-                        # — NOT on name+fee. Keying the ON CONFLICT on name+fee
-                        # caused a genuinely distinct new pool to be absorbed into
-                        # an existing same-name pool, silently misattributing every
-                        # swap written under the absorbed row.
-                        try:
-                            if pool_address_val:
-                                conflict_clause = "(pool_address) WHERE pool_address IS NOT NULL"
-                            elif pool_id_val:
-                                conflict_clause = "(pool_id) WHERE pool_id IS NOT NULL"
-                            else:
-                                conflict_clause = "(chain_id, protocol_id, pool_name, fee_bps, (COALESCE(pool_id, '')))"
-                            cur.execute(f"""
-                                INSERT INTO liquidity_pool (chain_id, protocol_id, pool_name, fee_bps, coin0_id, coin1_id, pool_address, pool_id, reverted)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, false)
-                                ON CONFLICT {conflict_clause} DO UPDATE
-                                SET pool_address = COALESCE(liquidity_pool.pool_address, EXCLUDED.pool_address),
-                                    pool_id = COALESCE(liquidity_pool.pool_id, EXCLUDED.pool_id)
-                                RETURNING id
-                            """, (chain_id, protocol_id, pool_name, fbps, t0_id, t1_id, pool_address_val, pool_id_val))
-                            pool_id = cur.fetchone()[0]
-                        except Exception:
-                            cur.execute("""
-                                SELECT id FROM liquidity_pool
-                                WHERE (pool_address = %s AND %s IS NOT NULL) OR (pool_id = %s AND %s IS NOT NULL)
-                                LIMIT 1
-                            """, (pool_address_val, pool_address_val, pool_id_val, pool_id_val))
-                            res = cur.fetchone()
-                            if res:
-                                pool_id = res[0]
-                            else:
-                                raise
-
-                        # Cache it in maps for the rest of this batch
-                        if pool_address_val:
-                            pool_id_map[pool_address_val] = pool_id
-                        if pool_id_val:
-                            pool_id_map[pool_id_val] = pool_id
-                        pool_tokens_map[(chain_id, protocol_id, frozenset({t0_id, t1_id}), fbps)] = pool_id
-
-                    data.append((
-                        s['tx_hash'],
-                        log_index,
-                        ts_val,
-                        network,
-                        protocol,
-                        pool_id,
-                        s.get('amount0'),
-                        s.get('amount1'),
-                        s.get('amountUSD'),
-                    ))
-
-                tx_hashes = []
+                data = self._swap_rows(cur, swaps, network, protocol, chain_id, protocol_id,
+                                       self._contract_map(cur, chain_id))
                 if data:
-                    for d in data:
-                        if d[0] not in tx_hashes:
-                            tx_hashes.append(d[0])
-                    cur.executemany(insert_query, data)
+                    self._ensure_batch_table(cur)
+                    cols = ', '.join(_SWAP_BATCH_COLUMNS)
+                    cur.copy_expert(f"COPY _swap_batch ({cols}) FROM STDIN", _copy_buffer(data))
+                    cur.execute(f"""
+                        INSERT INTO {SWAP_RAW_TABLE} ({cols})
+                        SELECT {cols} FROM _swap_batch
+                        ON CONFLICT (ts, tx_hash, log_index) DO NOTHING
+                    """)
                     if SWAP_LEGACY_MIRROR:
-                        legacy_rows = [(t[0], t[1], t[2], t[5], t[6], t[7], t[8]) for t in data]
-                        cur.executemany(insert_query_legacy, legacy_rows)
-                    # Advance the ingestion watermark for (network, protocol).
-                    cur.execute(
-                        """
-                        INSERT INTO ingestion_state (network, protocol, last_ts, updated_at)
-                        VALUES (%s, %s, %s, NOW())
-                        ON CONFLICT (network, protocol) DO UPDATE SET
-                            last_ts = GREATEST(ingestion_state.last_ts, EXCLUDED.last_ts),
-                            updated_at = NOW()
-                        """,
-                        (network, protocol, max(d[2] for d in data)),
-                    )
+                        legacy_cols = ', '.join(_SWAP_LEGACY_COLUMNS)
+                        cur.execute(f"""
+                            INSERT INTO swaps ({legacy_cols})
+                            SELECT {legacy_cols} FROM _swap_batch
+                            ON CONFLICT (ts, tx_hash, log_index) DO NOTHING
+                        """)
+                    if update_watermark:
+                        self._set_watermark(cur, network, protocol, max(d[2] for d in data))
             conn.commit()
+        except Exception:
+            self._abort()
+            raise
+
+        # Queue route classification after the swap batch commits. Route
+        # reconstruction is deliberately asynchronous so ingestion does
+        # not wait on route-dimension upserts or contend with historical
+        # backfills. A later batch can requeue the same tx when late legs
+        # arrive from another protocol.
+        tx_hashes = list(dict.fromkeys(d[0] for d in data))
+        if tx_hashes:
+            try:
+                with conn.cursor() as cur2:
+                    cur2.execute("""
+                        INSERT INTO route_classification_queue
+                            (tx_hash, status, generation, available_at, updated_at)
+                        SELECT h, 'pending', 0, NOW(), NOW()
+                        FROM unnest(%s::text[]) AS t(h)
+                        ON CONFLICT (tx_hash) DO UPDATE SET
+                            status = 'pending',
+                            generation = route_classification_queue.generation + 1,
+                            available_at = NOW(),
+                            claimed_at = NULL,
+                            last_error = NULL,
+                            updated_at = NOW()
+                    """, (tx_hashes,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Warning: route classification queue failed for {len(tx_hashes)} txs: {e}", flush=True)
 
-            # Queue route classification after the swap batch commits. Route
-            # reconstruction is deliberately asynchronous so ingestion does
-            # not wait on route-dimension upserts or contend with historical
-            # backfills. A later batch can requeue the same tx when late legs
-            # arrive from another protocol.
-            if tx_hashes:
-                try:
-                    with conn.cursor() as cur2:
-                        cur2.executemany("""
-                            INSERT INTO route_classification_queue
-                                (tx_hash, status, generation, available_at, updated_at)
-                            VALUES (%s, 'pending', 0, NOW(), NOW())
-                            ON CONFLICT (tx_hash) DO UPDATE SET
-                                status = 'pending',
-                                generation = route_classification_queue.generation + 1,
-                                available_at = NOW(),
-                                claimed_at = NULL,
-                                last_error = NULL,
-                                updated_at = NOW()
-                        """, [(tx_hash,) for tx_hash in tx_hashes])
-                    conn.commit()
-                except Exception as e:
-                    conn.rollback()
-                    print(f"Warning: route classification queue failed for {len(tx_hashes)} txs: {e}", flush=True)
+    @staticmethod
+    def _set_watermark(cur, network: str, protocol: str, last_ts: datetime):
+        # Advance the ingestion watermark for (network, protocol); never moves back.
+        cur.execute(
+            """
+            INSERT INTO ingestion_state (network, protocol, last_ts, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON CONFLICT (network, protocol) DO UPDATE SET
+                last_ts = GREATEST(ingestion_state.last_ts, EXCLUDED.last_ts),
+                updated_at = NOW()
+            """,
+            (network, protocol, last_ts),
+        )
+
+    def advance_watermark(self, ts: int, network: str = "Ethereum", protocol: str = "Uniswap V3"):
+        """Move the ingestion watermark to ts (epoch seconds), the
+        on_watermark_callback of fetch_swaps."""
+        conn = self._connection()
+        try:
+            with conn.cursor() as cur:
+                self._set_watermark(cur, network, protocol, datetime.fromtimestamp(ts, timezone.utc))
+            conn.commit()
+        except Exception:
+            self._abort()
+            raise
 
     def get_last_swap_timestamp(self, network: str = "Ethereum", protocol: str = "Uniswap V3") -> Optional[int]:
-        with psycopg2.connect(self.conn_str) as conn:
+        conn = self._connection()
+        try:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT last_ts FROM ingestion_state
@@ -982,7 +1110,9 @@ class PostgresStorage:
                 res = cur.fetchone()
                 if res and res[0]:
                     return int(res[0].timestamp())
-        return None
+            return None
+        finally:
+            conn.rollback()
 
 class PostgresStorageV4(PostgresStorage):
     """V4 storage — targets the same unified swaps table.
@@ -991,8 +1121,13 @@ class PostgresStorageV4(PostgresStorage):
     defaults to 'Uniswap V3', which would mislabel V4 ingestion). Callers that
     pass an explicit protocol (e.g. PancakeSwap V4) override this default.
     """
-    def save_swaps(self, swaps: List[Dict], network: str = "Ethereum", protocol: str = "Uniswap V4"):
-        return super().save_swaps(swaps, network=network, protocol=protocol)
+    def save_swaps(self, swaps: List[Dict], network: str = "Ethereum", protocol: str = "Uniswap V4",
+                   update_watermark: bool = True):
+        return super().save_swaps(swaps, network=network, protocol=protocol,
+                                  update_watermark=update_watermark)
+
+    def advance_watermark(self, ts: int, network: str = "Ethereum", protocol: str = "Uniswap V4"):
+        return super().advance_watermark(ts, network=network, protocol=protocol)
 
 
 def to_checksum_address(address: str) -> str:
@@ -1,22 +1,34 @@
 """Dirty-day fact materializer.
 
 Consumes the fine-grained dirty work rows written by the route classifier
-(``dirty_route_day`` / ``dirty_pool_day``) and recomputes exactly those days,
-incrementally and idempotently — instead of the old broad contiguous-range
-recompute that the classifier used to run at end of run.
-
-Per run:
-  1. Collect the distinct ``day`` values from dirty_route_day UNION dirty_pool_day.
-  2. Delete those days from the dirty tables (mark as claimed).
-  3. Recompute route_daily_stats, route_daily_stats_bucket, and
-     liquidity_pool_daily_stats_bucket for exactly those days (chunked).
-  4. Any dirty row added concurrently during recompute survives (it was deleted
-     before the delete, then re-inserted) and is picked up by the next run, so
-     nothing is lost (at-least-once).
-
-This runs often but with a bounded, exact day set, so steady-state cost is low.
+(``dirty_route_day`` / ``dirty_pool_day``) and recomputes exactly those
+``(route_id, day)`` / ``(pool_id, day)`` keys, incrementally and idempotently —
+instead of the old broad contiguous-range recompute that the classifier used
+to run at end of run.
+
+Per run (one transaction):
+  1. Pick the oldest ``max_days_per_run`` distinct dirty days.
+  2. Claim their keys: ``DELETE ... RETURNING`` from both dirty tables.
+  3. Days with more than ``max_keys_per_day`` dirty routes or pools are rebuilt
+     whole (route_daily_stats, route_daily_stats_bucket,
+     liquidity_pool_daily_stats_bucket); one range scan beats the key join
+     there. Every other key is recomputed through a temp-table join, so a late
+     leg on one route only rewrites that route's rows.
+  4. Bump the ``route_stats`` materialization_watermark, which invalidates the
+     API response cache once this transaction is visible.
+  5. Commit. A failure rolls the claim back with the recompute, and a dirty row
+     the classifier adds concurrently waits on the claimed row and lands after
+     commit, so the next run picks it up (at-least-once).
+
+The recomputes also rebuild route_hourly_stats for days inside
+ROUTE_HOURLY_RETENTION_DAYS; every run deletes the hours that fell out of it.
+
+Each run logs and returns rows scanned (source legs aggregated) against rows
+rewritten (aggregate rows deleted + inserted).
 """
 import logging
+import os
+import time
 from datetime import timedelta
 
 from airflow import DAG
@@ -26,14 +38,21 @@ import psycopg2
 
 from common.utils.config import DATA_WAREHOUSE_DB
 from include.route_classifier import (
+    bump_materialization_watermark,
+    plan_dirty_recompute,
+    purge_hourly_stats,
     recompute_daily_stats,
     recompute_distribution_buckets,
     recompute_pool_distribution_buckets,
+    recompute_pool_days,
+    recompute_route_days,
     RAW_SWAP_TABLE,
 )
 
 CHUNK_DAYS = 7
 MAX_DAYS_PER_RUN = 90  # guard against an enormous backlog retrying forever
+# Above this many dirty routes (or pools) on one day, rebuild the whole day.
+MAX_KEYS_PER_DAY = int(os.getenv('DIRTY_MAX_KEYS_PER_DAY', '5000'))
 
 
 def connect():
@@ -43,9 +62,14 @@ def connect():
 
 
 @task
-def materialize_dirty_days():
+def materialize_dirty_days(**context):
+    params = context.get('params', {})
+    max_days = int(params.get('max_days_per_run', MAX_DAYS_PER_RUN))
+    max_keys = int(params.get('max_keys_per_day', MAX_KEYS_PER_DAY))
+
     conn = connect()
-    processed = 0
+    t0 = time.time()
+    stats = {'rows_scanned': 0, 'rows_deleted': 0, 'rows_inserted': 0}
     try:
         with conn.cursor() as cur:
             cur.execute("""
@@ -56,30 +80,56 @@ def materialize_dirty_days():
                 ) d
                 ORDER BY day
                 LIMIT %s
-            """, (MAX_DAYS_PER_RUN,))
-            days = [str(r[0]) for r in cur.fetchall()]
+            """, (max_days,))
+            days = [r[0] for r in cur.fetchall()]
 
+            stats['hourly_rows_purged'] = purge_hourly_stats(cur)
             if not days:
-                logging.info("no dirty days to materialize")
-                return 0
-
-            # Claim: remove these days from the dirty tables before recompute.
-            cur.execute("DELETE FROM dirty_route_day WHERE day = ANY(%s::date[])", (days,))
-            cur.execute("DELETE FROM dirty_pool_day WHERE day = ANY(%s::date[])", (days,))
-            conn.commit()
-
-            # Recompute exact days (chunked internally).
-            recompute_daily_stats(cur, days, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE)
-            recompute_distribution_buckets(cur, days, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE)
-            recompute_pool_distribution_buckets(cur, days, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE)
-            conn.commit()
-
-            processed = len(days)
-            logging.info("Materialized %d dirty days: %s .. %s",
-                         processed, days[0], days[-1])
+                conn.commit()
+                logging.info("no dirty days to materialize (%d expired hourly rows purged)",
+                             stats['hourly_rows_purged'])
+                return stats
+
+            # Claim: take the keys of these days out of the dirty tables.
+            cur.execute("DELETE FROM dirty_route_day WHERE day = ANY(%s::date[]) RETURNING route_id, day",
+                        (days,))
+            route_days = cur.fetchall()
+            cur.execute("DELETE FROM dirty_pool_day WHERE day = ANY(%s::date[]) RETURNING pool_id, day",
+                        (days,))
+            pool_days = cur.fetchall()
+
+            full_days, route_keys, pool_keys = plan_dirty_recompute(route_days, pool_days, max_keys)
+            if full_days:
+                full = sorted(full_days)
+                recompute_daily_stats(cur, full, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE, stats=stats)
+                recompute_distribution_buckets(cur, full, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE,
+                                               stats=stats)
+                recompute_pool_distribution_buckets(cur, full, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE,
+                                                    stats=stats)
+            recompute_route_days(cur, route_keys, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE, stats=stats)
+            recompute_pool_days(cur, pool_keys, chunk_days=CHUNK_DAYS, table_name=RAW_SWAP_TABLE, stats=stats)
+            stats['watermark'] = bump_materialization_watermark(cur)
+        conn.commit()
+
+        stats.update({
+            'days': len(days),
+            'full_days': len(full_days),
+            'route_keys': len(route_keys),
+            'pool_keys': len(pool_keys),
+            'rows_rewritten': stats['rows_deleted'] + stats['rows_inserted'],
+            'elapsed_s': round(time.time() - t0, 2),
+        })
+        logging.info("Materialized %d dirty days %s .. %s (%d whole-day, %d route keys, %d pool keys): "
+                     "%d rows scanned, %d rows rewritten (%d deleted, %d inserted) in %.2fs, watermark %d",
+                     stats['days'], days[0], days[-1], stats['full_days'], stats['route_keys'],
+                     stats['pool_keys'], stats['rows_scanned'], stats['rows_rewritten'],
+                     stats['rows_deleted'], stats['rows_inserted'], stats['elapsed_s'], stats['watermark'])
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
-    return processed
+    return stats
 
 
 with DAG(
@@ -102,6 +152,9 @@ with DAG(
         'max_days_per_run': Param(
             default=MAX_DAYS_PER_RUN, type='integer',
             description='Max distinct days to materialize per run (backlog guard).'),
+        'max_keys_per_day': Param(
+            default=MAX_KEYS_PER_DAY, type='integer',
+            description='Dirty routes or pools on one day above which the whole day is rebuilt.'),
     },
 ) as dag:
-    materialize_dirty_days()
\ No newline at end of file
+    materialize_dirty_days()
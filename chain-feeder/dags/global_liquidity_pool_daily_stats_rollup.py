@@ -115,6 +115,21 @@ def run_global_volume_rollup(days_back: int = 14, table_name: str = None) -> int
     except Exception as e:
         logging.warning(f"Automatic TVL fallback skipped: {e}")
 
+    # Roll the /health 7-day pool windows forward: the table-health triggers
+    # only recompute the pools written above.
+    try:
+        from include.table_health import refresh_windows
+        windows_conn = get_db_connection()
+        try:
+            with windows_conn.cursor() as cur:
+                refreshed = refresh_windows(cur)
+            windows_conn.commit()
+        finally:
+            windows_conn.close()
+        logging.info(f"Refreshed {refreshed} table-health pool windows.")
+    except Exception as e:
+        logging.warning(f"Table-health window refresh skipped: {e}")
+
     return updated_rows
 
 # Airflow DAG definition block
@@ -46,7 +46,9 @@ with DAG(
         logging.info(f"Fetching {network} {protocol} swaps from {start_date} to {end_date}")
         fetcher = UniswapV3Fetcher(network=network, protocol=protocol)
         storage = PostgresStorage()
-        def save_batch(batch): storage.save_swaps(batch, network=network, protocol=protocol)
-        num_swaps = fetcher.fetch_swaps(start_date=start_date, end_date=end_date, on_batch_callback=save_batch, collect_results=False)
+        def save_batch(batch): storage.save_swaps(batch, network=network, protocol=protocol, update_watermark=False)
+        def advance(ts): storage.advance_watermark(ts, network=network, protocol=protocol)
+        num_swaps = fetcher.fetch_swaps(start_date=start_date, end_date=end_date, on_batch_callback=save_batch, collect_results=False,
+                                        on_watermark_callback=advance)
         logging.info(f"Fetched and saved {num_swaps} unique swaps for {network} {protocol}")
     fetch_and_store_swaps()
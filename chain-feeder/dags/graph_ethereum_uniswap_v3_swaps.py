@@ -3,7 +3,7 @@ from airflow.sdk import task
 import pendulum
 from datetime import datetime, timedelta, timezone
 import logging
-from common.utils.uniswap_utils import UniswapV3Fetcher, PostgresStorage
+from common.utils.uniswap_utils import UniswapV3Fetcher, PostgresStorage, get_last_ingestion_ts
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 
 default_args = {
@@ -36,17 +36,7 @@ with DAG(
         network = 'Ethereum'
         protocol = 'Uniswap V3'
         pg_hook = PostgresHook(postgres_conn_id='postgres_default')
-        last_ts_row = pg_hook.get_first(
-            """
-            SELECT MAX(s.ts) 
-            FROM swaps s
-            JOIN liquidity_pool lp ON s.pool_id = lp.id
-            JOIN chain ch ON lp.chain_id = ch.id
-            JOIN protocol pr ON lp.protocol_id = pr.id
-            WHERE ch.name = %s AND pr.name = %s
-            """,
-            parameters=(network, protocol))
-        last_ts = last_ts_row[0] if last_ts_row and last_ts_row[0] else None
+        last_ts = get_last_ingestion_ts(pg_hook, network, protocol)
         end_date = datetime.now(timezone.utc)
         if last_ts is not None and not force_backfill:
             if last_ts.tzinfo is None: last_ts = last_ts.replace(tzinfo=timezone.utc)
@@ -56,7 +46,9 @@ with DAG(
         logging.info(f"Fetching {network} {protocol} swaps from {start_date} to {end_date}")
         fetcher = UniswapV3Fetcher(network=network, protocol=protocol)
         storage = PostgresStorage()
-        def save_batch(batch): storage.save_swaps(batch, network=network, protocol=protocol)
-        num_swaps = fetcher.fetch_swaps(start_date=start_date, end_date=end_date, on_batch_callback=save_batch, collect_results=False)
+        def save_batch(batch): storage.save_swaps(batch, network=network, protocol=protocol, update_watermark=False)
+        def advance(ts): storage.advance_watermark(ts, network=network, protocol=protocol)
+        num_swaps = fetcher.fetch_swaps(start_date=start_date, end_date=end_date, on_batch_callback=save_batch, collect_results=False,
+                                        on_watermark_callback=advance)
         logging.info(f"Fetched and saved {num_swaps} unique swaps for {network} {protocol}")
     fetch_and_store_swaps()
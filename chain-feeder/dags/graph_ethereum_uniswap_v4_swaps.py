@@ -47,7 +47,8 @@ with DAG(
         fetcher = UniswapV4Fetcher(network=network, protocol=protocol, verbose=True)
         storage = PostgresStorageV4()
         count = fetcher.fetch_swaps(start_date, end_date,
-            on_batch_callback=lambda s, net=network: storage.save_swaps(s, network=net, protocol=protocol),
+            on_batch_callback=lambda s, net=network: storage.save_swaps(s, network=net, protocol=protocol, update_watermark=False),
+            on_watermark_callback=lambda ts, net=network: storage.advance_watermark(ts, network=net, protocol=protocol),
             collect_results=False)
         logging.info(f"{network} {protocol} fetch complete. Processed {count} unique swaps.")
     fetch_and_store_swaps()
@@ -7,7 +7,10 @@ for unclassified raw swaps (replacing the old ``config_global_swap_retention``
 network/protocol mechanism).
 
 Param ``dry_run`` (default true, the safe setting) only reports; set it to
-``false`` in the UI / CLI to actually delete. Param ``backfill`` (default true)
+``false`` in the UI / CLI to actually delete. Partitioned layers are pruned
+per partition (drop / rewrite / batched delete, see
+``include/od_retention_planner.py``); the plan with its estimated I/O is
+logged in both modes. Param ``backfill`` (default true)
 recomputes route_daily_stats/-buckets for any days reported as missing first.
 """
 from airflow import DAG
@@ -18,6 +21,7 @@ import logging
 from datetime import timedelta
 
 from common.utils.config import DATA_WAREHOUSE_DB
+from include.od_retention_planner import REWRITE_THRESHOLD, SAMPLE_ROWS, format_plan
 from include.od_retention import (
     load_goal_state,
     run_checks,
@@ -94,16 +98,26 @@ def enforce_goal_state(**context):
     if isinstance(dry_run, str):
         dry_run = dry_run.lower() in ('true', '1', 'yes')
     batch = params.get('batch', BATCH_SIZE)
+    rewrite_threshold = float(params.get('rewrite_threshold', REWRITE_THRESHOLD))
 
     goal = load_goal_state()
     conn = connect()
     try:
         def progress(msg):
             logging.info(msg)
-        result = prune(conn, goal, dry_run=dry_run, batch=batch, progress=progress)
+        result = prune(conn, goal, dry_run=dry_run, batch=batch, progress=progress,
+                       rewrite_threshold=rewrite_threshold, sample_rows=SAMPLE_ROWS)
     finally:
         conn.close()
 
+    for line in format_plan(result['plan']):
+        logging.info("plan: %s", line)
+    for strategy, s in result['plan_summary'].items():
+        logging.info("plan %-12s %d partitions, %d expired rows, est. read %.0f MB write %.0f MB freed %.0f MB",
+                     strategy, s['partitions'], s['expired'],
+                     s['read'] / 1048576, s['write'] / 1048576, s['freed'] / 1048576)
+    context['task_instance'].xcom_push(key='plan_summary', value=result['plan_summary'])
+
     counts = result['rows']
     logging.info("%s rows per layer: %s", 'DRY-RUN estimate' if dry_run else 'DELETED', counts)
 
@@ -113,7 +127,7 @@ def enforce_goal_state(**context):
         conn.autocommit = True
         cur = conn.cursor()
         try:
-            for table in ('swaps', 'route_daily_stats', 'route_daily_stats_bucket',
+            for table in ('swaps', 'route_daily_stats', 'pair_daily_stats', 'route_daily_stats_bucket',
                           'liquidity_pool_daily_stats', 'liquidity_pool_position_snapshot'):
                 cur.execute(f"VACUUM ANALYZE {table}")
         finally:
@@ -153,6 +167,12 @@ with DAG(
             type='integer',
             description='Rows processed per batched DELETE.'
         ),
+        'rewrite_threshold': Param(
+            default=REWRITE_THRESHOLD,
+            type='number',
+            description='Expired share at which a swaps/snapshot partition is rewritten (copy retained rows, '
+                        'swap in) instead of deleted from. Fully expired partitions are always dropped.'
+        ),
     },
 ) as dag:
 
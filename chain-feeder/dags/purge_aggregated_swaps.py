@@ -12,17 +12,22 @@ Cleans up:
     may be dropped.
   - legacy `swaps`, only as long as SWAP_LEGACY_MIRROR is on; once the mirror is
     off the permanent table should be retired via DROP.
+
+The coverage ledger's `swaps` layer follows the raw store, so the purged days
+are refreshed from it afterwards (bulk deletes fire no ledger triggers).
 """
 
 import logging
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import pendulum
 from airflow import DAG
 from airflow.sdk import task
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 
+from include.coverage_ledger import refresh_before
+
 
 def _purge_table(cur, target_table, retention_days, batch_size):
     cur.execute(
@@ -67,6 +72,7 @@ def purge() -> int:
     hook = PostgresHook(postgres_conn_id='postgres_default')
     conn = hook.get_conn()
     deleted = 0
+    raw_deleted = 0
     targets = [raw_table]
     if mirror_legacy:
         targets.append('swaps')
@@ -77,9 +83,16 @@ def purge() -> int:
                     count = _purge_table(cur, target, retention_days, batch_size)
                     conn.commit()
                     deleted += count
+                    if target == raw_table:
+                        raw_deleted += count
                     if count == 0:
                         break
                     logging.info('Deleted %d raw swap rows from %s so far.', deleted, target)
+            if raw_deleted:
+                cutoff = date.today() - timedelta(days=retention_days)
+                keys = refresh_before(cur, 'swaps', cutoff)
+                conn.commit()
+                logging.info('Refreshed coverage ledger before %s (%d pairs).', cutoff, keys)
         # Drop empty monthly staging partitions fully older than the retention
         # window; they can never be needed again once aggregates have been built.
         with conn.cursor() as cur:
@@ -4,6 +4,7 @@ Materializes `route_daily_stats` (route_id, day, tx_count, swap_count,
 volume_usd) from the classified `swaps` table. The table is derived, so each
 run deletes and recomputes the recent window (never increments), which keeps it
 consistent even when a late mixed-protocol leg reclassifies a tx's route.
+Each run bumps the `route_stats` materialization_watermark with its commit.
 """
 from airflow import DAG
 from airflow.sdk import task, Param
@@ -13,6 +14,7 @@ from datetime import timedelta
 import logging
 
 from include.route_classifier import (
+    bump_materialization_watermark,
     recompute_daily_stats,
     recompute_distribution_buckets,
     recompute_pool_distribution_buckets,
@@ -28,6 +30,7 @@ def _rollup_days(pg_hook, days: list):
             recompute_daily_stats(cur, days)
             recompute_distribution_buckets(cur, days)
             recompute_pool_distribution_buckets(cur, days)
+            bump_materialization_watermark(cur)
         conn.commit()
     finally:
         conn.close()
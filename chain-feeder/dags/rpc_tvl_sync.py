@@ -5,16 +5,24 @@ reserves for each pool, computes USD TVL from token prices, and upserts into
 liquidity_pool_daily_stats. This bypasses The Graph, which often reports 0 TVL for
 stablecoin pools and other high-liquidity pairs.
 
-- V3 pools: pool address derived via CREATE2, then slot0() + liquidity() called
-  directly on the pool contract.
-- V4 pools: PoolManager storage read (same as backfill_v4_tvl.py / sync_tvl_from_onchain).
+- V3 pools: pool address derived via CREATE2, then slot0() + liquidity() for
+  BATCH_SIZE calls at a time through one Multicall3 aggregate3 eth_call.
+- V4 pools: PoolManager storage read (same as backfill_v4_tvl.py /
+  sync_tvl_from_onchain), BATCH_SIZE eth_getStorageAt calls per JSON-RPC batch.
+
+Token prices come from one DeFiLlama request per PRICE_CHUNK tokens per
+chain. Networks are fetched concurrently (TVL_SYNC_NETWORK_WORKERS threads);
+each network's TVL rows and the forward-fill are written by a single
+statement.
 
 Runs daily at 3 AM. Only touches today's date + forward-fills past 90 days.
 """
 import sys
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from functools import lru_cache
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DAGS_DIR = os.path.join(ROOT_DIR, 'dags')
@@ -24,8 +32,12 @@ if DAGS_DIR not in sys.path:
 logger = logging.getLogger(__name__)
 
 MAX_TVL = 5_000_000_000
+# Calls per Multicall3 aggregate3 / eth_getStorageAt JSON-RPC batch.
 BATCH_SIZE = 100
+# Tokens per DeFiLlama price request.
+PRICE_CHUNK = 100
 FORWARD_FILL_DAYS = 90
+NETWORK_WORKERS = int(os.environ.get("TVL_SYNC_NETWORK_WORKERS", "6"))
 
 POOL_MANAGERS = {
     "Ethereum": "0x000000000004444c5dc75cb358380d2e3de08a90",
@@ -38,6 +50,8 @@ MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
 
 SIG_SLOT0 = "0x3850c7bd"
 SIG_LIQUIDITY = "0x1a686502"
+# aggregate3((address target, bool allowFailure, bytes callData)[])
+SIG_AGGREGATE3 = "0x82ad56cb"
 
 _SEL_DECIMALS = "0x313ce567"
 
@@ -116,6 +130,8 @@ def call_rpc(method, params, network="Ethereum", retries=3):
 
 
 def call_rpc_batch(calls, network="Ethereum", retries=2):
+    """Send a JSON-RPC batch; results are returned in call order (matched by
+    id, since servers may answer a batch out of order)."""
     import requests
     urls = _rpc_urls(network)
     for url in urls:
@@ -124,7 +140,8 @@ def call_rpc_batch(calls, network="Ethereum", retries=2):
             if resp.status_code == 200:
                 results = resp.json()
                 if isinstance(results, list):
-                    return [r.get("result") for r in results]
+                    by_id = {r.get("id"): r.get("result") for r in results if isinstance(r, dict)}
+                    return [by_id.get(c.get("id")) for c in calls]
                 if "result" in results:
                     return [results.get("result")]
         except Exception:
@@ -132,6 +149,52 @@ def call_rpc_batch(calls, network="Ethereum", retries=2):
     return [None] * len(calls)
 
 
+def encode_aggregate3(calls):
+    """Calldata for Multicall3.aggregate3 over (target, calldata_hex) pairs,
+    every call allowed to fail."""
+    from eth_abi import encode
+    args = [(target, True, bytes.fromhex(data.removeprefix("0x"))) for target, data in calls]
+    return SIG_AGGREGATE3 + encode(["(address,bool,bytes)[]"], [args]).hex()
+
+
+def decode_aggregate3(hex_val):
+    """aggregate3 return data -> list of returnData hex (None where the call failed)."""
+    from eth_abi import decode
+    (results,) = decode(["(bool,bytes)[]"], bytes.fromhex(hex_val.removeprefix("0x")))
+    return ["0x" + data.hex() if ok and data else None for ok, data in results]
+
+
+def multicall(calls, network="Ethereum"):
+    """Run (target, calldata_hex) eth_calls through Multicall3, BATCH_SIZE
+    per aggregate3. Returns returnData hex per call, None where it failed."""
+    out = []
+    for i in range(0, len(calls), BATCH_SIZE):
+        chunk = calls[i:i + BATCH_SIZE]
+        res = call_rpc("eth_call", [{"to": MULTICALL3, "data": encode_aggregate3(chunk)}, "latest"],
+                       network=network)
+        decoded = None
+        if res and res != "0x":
+            try:
+                decoded = decode_aggregate3(res)
+            except Exception as e:
+                logger.warning(f"Undecodable aggregate3 result on {network}: {e}")
+        out.extend(decoded if decoded and len(decoded) == len(chunk) else [None] * len(chunk))
+    return out
+
+
+def storage_reads(reads, network="Ethereum"):
+    """Batched eth_getStorageAt over (address, slot) pairs, BATCH_SIZE per
+    JSON-RPC batch. Returns the slot hex per read, None where it failed."""
+    out = []
+    for i in range(0, len(reads), BATCH_SIZE):
+        chunk = reads[i:i + BATCH_SIZE]
+        calls = [{"jsonrpc": "2.0", "method": "eth_getStorageAt",
+                  "params": [addr, hex(slot), "latest"], "id": n}
+                 for n, (addr, slot) in enumerate(chunk)]
+        out.extend(call_rpc_batch(calls, network=network))
+    return out
+
+
 def fetch_decimals(addr, network="Ethereum"):
     addr_lower = addr.lower()
     if addr_lower in _KOWN_DECIMALS:
@@ -145,24 +208,39 @@ def fetch_decimals(addr, network="Ethereum"):
     return 18
 
 
-def fetch_token_prices_defillama(network, addr0, addr1):
+_LLAMA_CHAINS = {
+    "Ethereum": "ethereum", "Arbitrum": "arbitrum", "Base": "base",
+    "Optimism": "optimism", "Polygon": "polygon", "BNB": "bsc",
+}
+
+
+def fetch_token_prices_bulk(network, addrs):
+    """{address: USD price} from DeFiLlama, PRICE_CHUNK tokens per request.
+    Tokens without a price are absent."""
     import requests
-    chain_map = {
-        "Ethereum": "ethereum", "Arbitrum": "arbitrum", "Base": "base",
-        "Optimism": "optimism", "Polygon": "polygon", "BNB": "bsc",
-    }
-    chain = chain_map.get(network, "ethereum")
-    url = f"https://coins.llama.fi/prices/current/{chain}:{addr0},{chain}:{addr1}"
-    try:
-        resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
-        if resp.status_code == 200:
-            coins = resp.json().get("coins", {})
-            p0 = coins.get(f"{chain}:{addr0}", {}).get("price", 0)
-            p1 = coins.get(f"{chain}:{addr1}", {}).get("price", 0)
-            return p0, p1
-    except Exception as e:
-        logger.warning(f"DeFiLlama price fetch failed: {e}")
-    return 0, 0
+    chain = _LLAMA_CHAINS.get(network, "ethereum")
+    addrs = list(dict.fromkeys(a.lower() for a in addrs))
+    prices = {}
+    for i in range(0, len(addrs), PRICE_CHUNK):
+        chunk = addrs[i:i + PRICE_CHUNK]
+        url = "https://coins.llama.fi/prices/current/" + ",".join(f"{chain}:{a}" for a in chunk)
+        try:
+            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
+            if resp.status_code != 200:
+                logger.warning(f"DeFiLlama price fetch failed: HTTP {resp.status_code}")
+                continue
+            for key, coin in resp.json().get("coins", {}).items():
+                price = coin.get("price") or 0
+                if price:
+                    prices[key.split(":", 1)[1].lower()] = price
+        except Exception as e:
+            logger.warning(f"DeFiLlama price fetch failed: {e}")
+    return prices
+
+
+def fetch_token_prices_defillama(network, addr0, addr1):
+    prices = fetch_token_prices_bulk(network, [addr0, addr1])
+    return prices.get(addr0.lower(), 0), prices.get(addr1.lower(), 0)
 
 
 def _pools_storage_slot(pool_id_hex):
@@ -182,6 +260,20 @@ def _decode_slot0(hex_val):
     return sqrt_price_x96, tick
 
 
+def _decode_slot0_call(hex_val):
+    """(sqrtPriceX96, tick) from the ABI-encoded return of a V3 pool's
+    slot0(): word 0 is sqrtPriceX96, word 1 the int24 tick sign-extended to
+    256 bits. (_decode_slot0 is for the packed V4 storage slot.)"""
+    if not hex_val or len(hex_val) < 2 + 128:
+        return 0, 0
+    body = hex_val.removeprefix("0x")
+    sqrt_price_x96 = int(body[:64], 16) & ((1 << 160) - 1)
+    tick = int(body[64:128], 16)
+    if tick >= 1 << 255:
+        tick -= 1 << 256
+    return sqrt_price_x96, tick
+
+
 def _decode_liquidity(hex_val):
     if not hex_val or hex_val == "0x":
         return 0
@@ -197,6 +289,7 @@ def _derive_v3_address(t0_bytes, t1_bytes, fee_val, factory_hex, init_hash_hex):
     return '0x' + keccak(b'\xff' + f_bytes + salt + ih_bytes)[12:].hex()
 
 
+@lru_cache(maxsize=None)
 def _resolve_dex_config(protocol_name, network):
     """Map a protocol name + network to (factory_address, init_hash) from dex-config.yaml."""
     import yaml
@@ -252,63 +345,6 @@ def load_pools(conn):
     return rows
 
 
-def fetch_v3_pool_data(network, pool_address, c0_addr, c1_addr, d0, d1, p0, p1):
-    """Fetch slot0 + liquidity from a V3 pool contract and compute TVL."""
-    calls = [
-        {"jsonrpc": "2.0", "method": "eth_call", "params": [{"to": pool_address, "data": SIG_SLOT0}, "latest"], "id": 0},
-        {"jsonrpc": "2.0", "method": "eth_call", "params": [{"to": pool_address, "data": SIG_LIQUIDITY}, "latest"], "id": 1},
-    ]
-    results = call_rpc_batch(calls, network=network)
-    if not results or len(results) < 2:
-        return None
-
-    slot0_hex = results[0]
-    liq_hex = results[1]
-    if not slot0_hex or slot0_hex in ("0x", "0x" + "0" * 64):
-        return None
-
-    sqrt_price_x96, tick = _decode_slot0(slot0_hex)
-    liquidity = _decode_liquidity(liq_hex)
-    if sqrt_price_x96 == 0:
-        return None
-
-    if liquidity == 0:
-        return 0.0
-
-    return compute_tvl(sqrt_price_x96, liquidity, d0, d1, p0, p1, tick)
-
-
-def fetch_v4_pool_data(network, pool_id_hex, d0, d1, p0, p1):
-    """Fetch PoolManager storage slot for a V4 pool and compute TVL."""
-    pool_manager = POOL_MANAGERS.get(network)
-    if not pool_manager:
-        logger.debug(f"No PoolManager address configured for {network}")
-        return None
-    base_slot = _pools_storage_slot(pool_id_hex)
-    calls = [
-        {"jsonrpc": "2.0", "method": "eth_getStorageAt", "params": [pool_manager, hex(base_slot), "latest"], "id": 0},
-        {"jsonrpc": "2.0", "method": "eth_getStorageAt", "params": [pool_manager, hex(base_slot + 3), "latest"], "id": 1},
-    ]
-    results = call_rpc_batch(calls, network=network)
-    if not results or len(results) < 2:
-        return None
-
-    slot0_hex = results[0]
-    liq_hex = results[1]
-    if not slot0_hex or slot0_hex in ("0x", "0x" + "0" * 64):
-        return None
-
-    sqrt_price_x96, tick = _decode_slot0(slot0_hex)
-    liquidity = _decode_liquidity(liq_hex)
-    if sqrt_price_x96 == 0:
-        return None
-
-    if liquidity == 0:
-        return 0.0
-
-    return compute_tvl(sqrt_price_x96, liquidity, d0, d1, p0, p1, tick)
-
-
 def compute_tvl(sqrt_price_x96, liquidity, d0, d1, p0, p1, tick=None):
     if tick is not None and abs(tick) > 500000:
         logger.info(f"    Skipping pool: tick={tick} (out of range)")
@@ -356,107 +392,138 @@ def group_pools_by_network(pools):
     return by_network
 
 
-def upsert_tvl(conn, pool_db_id, date_val, tvl_usd):
-    cur = conn.cursor()
-    cur.execute(
-        """INSERT INTO liquidity_pool_daily_stats (pool_id, day, tvl_usd)
-           VALUES (%s, %s, %s)
-           ON CONFLICT (pool_id, day) DO UPDATE
-           SET tvl_usd = CASE
-               WHEN EXCLUDED.tvl_usd IS NOT NULL AND EXCLUDED.tvl_usd > 1.0 THEN EXCLUDED.tvl_usd
-               WHEN liquidity_pool_daily_stats.tvl_usd IS NOT NULL AND liquidity_pool_daily_stats.tvl_usd > 0 THEN liquidity_pool_daily_stats.tvl_usd
-               ELSE GREATEST(0, COALESCE(EXCLUDED.tvl_usd, 0))
-           END""",
-        (pool_db_id, date_val, tvl_usd),
-    )
-    cur.close()
-    conn.commit()
-
-
-def forward_fill_tvl(conn, pool_db_id, max_days=90):
-    cur = conn.cursor()
-    cur.execute(
-        """UPDATE liquidity_pool_daily_stats lph
-           SET tvl_usd = (
-               SELECT lph2.tvl_usd
-               FROM liquidity_pool_daily_stats lph2
-               WHERE lph2.pool_id = %s
-                 AND lph2.day = CURRENT_DATE
-                 AND lph2.tvl_usd IS NOT NULL
-                 AND lph2.tvl_usd > 0
-               LIMIT 1
-           )
-           WHERE lph.pool_id = %s
-             AND lph.day >= CURRENT_DATE - INTERVAL '%s days'
-             AND lph.day < CURRENT_DATE
-             AND (lph.tvl_usd IS NULL OR lph.tvl_usd <= 0)""",
-        (pool_db_id, pool_db_id, max_days),
-    )
-    filled = cur.rowcount
-    cur.close()
-    conn.commit()
-    return filled
-
-
-def process_v3_pool(entry, network, conn, today):
-    """Process a single V3 pool: derive address, fetch on-chain data, upsert."""
+def _v3_address(entry, network):
+    """The pool's address: stored, else CREATE2-derived. Pools of protocols
+    without a dex-config.yaml entry are skipped."""
     factory, init_hash = _resolve_dex_config(entry["protocol"], network)
     if not factory or not init_hash:
         logger.debug(f"No dex config for {entry['protocol']}/{network}, skipping pool {entry['pool_db_id']}")
         return None
-
+    if entry["pool_address"]:
+        return entry["pool_address"]
     fee_val = int(float(entry["fee_bps"]) * 100) if entry["fee_bps"] else 3000
+    t0_bytes = bytes.fromhex(entry["c0_addr"].removeprefix("0x").zfill(64))
+    t1_bytes = bytes.fromhex(entry["c1_addr"].removeprefix("0x").zfill(64))
+    return _derive_v3_address(t0_bytes[:20], t1_bytes[:20], fee_val, factory, init_hash)
 
-    pool_address = entry["pool_address"]
-    if not pool_address:
-        t0_bytes = bytes.fromhex(entry["c0_addr"].removeprefix("0x").zfill(64))
-        t1_bytes = bytes.fromhex(entry["c1_addr"].removeprefix("0x").zfill(64))
-        pool_address = _derive_v3_address(t0_bytes[:20], t1_bytes[:20], fee_val, factory, init_hash)
 
-    c0_addr = entry["c0_addr"]
-    c1_addr = entry["c1_addr"]
-
-    d0 = entry["c0_dec"] or fetch_decimals(c0_addr, network)
-    d1 = entry["c1_dec"] or fetch_decimals(c1_addr, network)
-    p0, p1 = fetch_token_prices_defillama(network, c0_addr, c1_addr)
-    if p0 == 0 or p1 == 0:
+def _tvl_from_state(sqrt_price_x96, liquidity, entry, prices, tick):
+    if sqrt_price_x96 == 0:
         return None
+    if liquidity == 0:
+        return 0.0
+    return compute_tvl(sqrt_price_x96, liquidity, entry["c0_dec"], entry["c1_dec"],
+                       prices[entry["c0_addr"]], prices[entry["c1_addr"]], tick)
+
+
+def fetch_v3_tvls(network, entries, prices):
+    """[(pool_db_id, tvl)] for V3 pools via Multicall3 (slot0 + liquidity)."""
+    targets = [(e, _v3_address(e, network)) for e in entries]
+    targets = [(e, addr) for e, addr in targets if addr]
+    calls = []
+    for _, addr in targets:
+        calls.append((addr, SIG_SLOT0))
+        calls.append((addr, SIG_LIQUIDITY))
+    results = multicall(calls, network=network)
+    out = []
+    for n, (entry, _) in enumerate(targets):
+        slot0_hex, liq_hex = results[2 * n], results[2 * n + 1]
+        if not slot0_hex or int(slot0_hex, 16) == 0:
+            continue
+        sqrt_price_x96, tick = _decode_slot0_call(slot0_hex)
+        tvl = _tvl_from_state(sqrt_price_x96, _decode_liquidity(liq_hex), entry, prices, tick)
+        if tvl is not None:
+            out.append((entry["pool_db_id"], tvl))
+    return out
 
-    tvl = fetch_v3_pool_data(network, pool_address, c0_addr, c1_addr, d0, d1, p0, p1)
-    if tvl is None:
-        return None
 
-    upsert_tvl(conn, entry["pool_db_id"], today, tvl)
-    filled = forward_fill_tvl(conn, entry["pool_db_id"], FORWARD_FILL_DAYS) if tvl > 0 else 0
-    return tvl, filled
+def fetch_v4_tvls(network, entries, prices):
+    """[(pool_db_id, tvl)] for V4 pools via batched PoolManager storage reads."""
+    pool_manager = POOL_MANAGERS.get(network)
+    if not pool_manager:
+        logger.debug(f"No PoolManager address configured for {network}")
+        return []
+    reads = []
+    for e in entries:
+        base_slot = _pools_storage_slot(e["pool_id"])
+        reads.append((pool_manager, base_slot))
+        reads.append((pool_manager, base_slot + 3))
+    results = storage_reads(reads, network=network)
+    out = []
+    for n, entry in enumerate(entries):
+        slot0_hex, liq_hex = results[2 * n], results[2 * n + 1]
+        if not slot0_hex or slot0_hex in ("0x", "0x" + "0" * 64):
+            continue
+        sqrt_price_x96, tick = _decode_slot0(slot0_hex)
+        tvl = _tvl_from_state(sqrt_price_x96, _decode_liquidity(liq_hex), entry, prices, tick)
+        if tvl is not None:
+            out.append((entry["pool_db_id"], tvl))
+    return out
 
 
-def process_v4_pool(entry, network, conn, today):
-    """Process a single V4 pool: read PoolManager storage, compute TVL, upsert."""
-    pool_id_hex = entry["pool_id"]
-    if not pool_id_hex:
-        return None
+def fetch_network_tvls(network, net_pools):
+    """Every pool's TVL on one network: [(pool_db_id, tvl)]. RPC and HTTP
+    only, safe to run concurrently with other networks."""
+    v3_pools = [p for p in net_pools if "V4" not in p["protocol"]]
+    v4_pools = [p for p in net_pools if "V4" in p["protocol"] and p["pool_id"]]
+    logger.info(f"  {network}: {len(v3_pools)} V3 pools, {len(v4_pools)} V4 pools")
 
-    c0_addr = entry["c0_addr"]
-    c1_addr = entry["c1_addr"]
+    pools = v3_pools + v4_pools
+    tokens = list(dict.fromkeys(a for p in pools for a in (p["c0_addr"], p["c1_addr"])))
+    prices = fetch_token_prices_bulk(network, tokens)
 
-    d0 = entry["c0_dec"] or fetch_decimals(c0_addr, network)
-    d1 = entry["c1_dec"] or fetch_decimals(c1_addr, network)
-    p0, p1 = fetch_token_prices_defillama(network, c0_addr, c1_addr)
-    if p0 == 0 or p1 == 0:
-        return None
+    def priced(entries):
+        return [p for p in entries if prices.get(p["c0_addr"]) and prices.get(p["c1_addr"])]
 
-    tvl = fetch_v4_pool_data(network, pool_id_hex, d0, d1, p0, p1)
-    if tvl is None:
-        return None
+    return fetch_v3_tvls(network, priced(v3_pools), prices) + fetch_v4_tvls(network, priced(v4_pools), prices)
+
+
+def write_network_tvls(conn, rows, today, max_days=FORWARD_FILL_DAYS):
+    """Upsert today's TVL for every (pool_db_id, tvl) row and forward-fill
+    the previous max_days of missing/zero TVL from it, in one statement.
 
-    upsert_tvl(conn, entry["pool_db_id"], today, tvl)
-    filled = forward_fill_tvl(conn, entry["pool_db_id"], FORWARD_FILL_DAYS) if tvl > 0 else 0
-    return tvl, filled
+    The upsert keeps an existing positive TVL when the new one is <= $1. The
+    fill only uses pools whose fresh TVL and stored TVL are both positive.
+    Returns (rows upserted, days forward-filled)."""
+    if not rows:
+        return 0, 0
+    cur = conn.cursor()
+    cur.execute(
+        """WITH v(pool_id, tvl_usd) AS (
+               SELECT * FROM unnest(%(ids)s::bigint[], %(tvls)s::float8[])
+           ),
+           up AS (
+               INSERT INTO liquidity_pool_daily_stats (pool_id, day, tvl_usd)
+               SELECT pool_id, %(today)s, tvl_usd FROM v
+               ON CONFLICT (pool_id, day) DO UPDATE
+               SET tvl_usd = CASE
+                   WHEN EXCLUDED.tvl_usd IS NOT NULL AND EXCLUDED.tvl_usd > 1.0 THEN EXCLUDED.tvl_usd
+                   WHEN liquidity_pool_daily_stats.tvl_usd IS NOT NULL AND liquidity_pool_daily_stats.tvl_usd > 0 THEN liquidity_pool_daily_stats.tvl_usd
+                   ELSE GREATEST(0, COALESCE(EXCLUDED.tvl_usd, 0))
+               END
+               RETURNING pool_id, tvl_usd
+           )
+           UPDATE liquidity_pool_daily_stats lph
+           SET tvl_usd = up.tvl_usd
+           FROM up
+           JOIN v ON v.pool_id = up.pool_id
+           WHERE lph.pool_id = up.pool_id
+             AND v.tvl_usd > 0
+             AND up.tvl_usd > 0
+             AND lph.day >= %(today)s::date - %(days)s
+             AND lph.day < %(today)s
+             AND (lph.tvl_usd IS NULL OR lph.tvl_usd <= 0)""",
+        {"ids": [r[0] for r in rows], "tvls": [r[1] for r in rows], "today": today, "days": max_days},
+    )
+    filled = cur.rowcount
+    cur.close()
+    conn.commit()
+    return len(rows), filled
 
 
 def run_rpc_tvl_sync():
-    """Main entry point: load pools, group by network, process each."""
+    """Main entry point: load pools, fetch every network concurrently, write
+    each network's rows as it completes."""
     conn = get_db_connection()
     try:
         pools = load_pools(conn)
@@ -470,26 +537,21 @@ def run_rpc_tvl_sync():
         total_processed = 0
         total_filled = 0
 
-        for network, net_pools in by_network.items():
-            v3_pools = [p for p in net_pools if "V4" not in p["protocol"]]
-            v4_pools = [p for p in net_pools if "V4" in p["protocol"] and p["pool_id"]]
-            logger.info(f"  {network}: {len(v3_pools)} V3 pools, {len(v4_pools)} V4 pools")
-
-            for pool_entry in v3_pools:
-                result = process_v3_pool(pool_entry, network, conn, today)
-                if result:
-                    tvl, filled = result
-                    logger.info(f"    V3 pool {pool_entry['pool_db_id']} ({pool_entry['c0_sym']}/{pool_entry['c1_sym']}): ${tvl:,.2f} TVL, fwd-filled {filled} days")
-                    total_processed += 1
-                    total_filled += filled
-
-            for pool_entry in v4_pools:
-                result = process_v4_pool(pool_entry, network, conn, today)
-                if result:
-                    tvl, filled = result
-                    logger.info(f"    V4 pool {pool_entry['pool_db_id']} ({pool_entry['c0_sym']}/{pool_entry['c1_sym']}): ${tvl:,.2f} TVL, fwd-filled {filled} days")
-                    total_processed += 1
-                    total_filled += filled
+        with ThreadPoolExecutor(max_workers=max(1, NETWORK_WORKERS)) as pool:
+            futures = {pool.submit(fetch_network_tvls, network, net_pools): network
+                       for network, net_pools in by_network.items()}
+            for fut in as_completed(futures):
+                network = futures[fut]
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    logger.warning(f"  {network}: TVL fetch failed: {e}")
+                    continue
+                processed, filled = write_network_tvls(conn, rows, today)
+                logger.info(f"  {network}: {processed} pools with TVL "
+                            f"(${sum(r[1] for r in rows):,.0f} total), fwd-filled {filled} days")
+                total_processed += processed
+                total_filled += filled
 
         logger.info(f"RPC TVL sync complete. Processed: {total_processed}, Fwd-filled days: {total_filled}")
     finally:
@@ -0,0 +1,273 @@
+"""Per-(layer, pair / pool) day coverage ledger.
+
+``coverage_ledger`` keeps, for every goal-state layer, the set of UTC days
+each origin/destination pair (route layers) or liquidity pool (LP layers) has
+data for, as one ``datemultirange`` per key (see
+``sql/create_coverage_ledger.sql``). Goal-state checks, the reconciliation
+planner and gap export read it instead of running ``SELECT DISTINCT day``
+over the swap and aggregate tables.
+
+Who keeps it current:
+
+* statement-level triggers on ``route_daily_stats``,
+  ``route_daily_stats_bucket``, ``liquidity_pool_daily_stats``,
+  ``liquidity_pool_daily_stats_bucket`` and
+  ``liquidity_pool_position_snapshot`` (inserts; deletes too for the day
+  tables), in the writer's transaction;
+* ``mark_route_days`` for the raw ``swaps`` layer, called by the classifier
+  from ``route_classifier.record_dirty_keys``;
+* ``trim`` after the goal-state retention prune and ``refresh`` after the raw
+  purge, whose partition drops and bulk deletes fire no triggers.
+
+A layer is only read from the ledger once ``backfill`` has rebuilt it from its
+table (``coverage_ledger_layer.backfilled_at``); ``ready_layers`` reports which.
+"""
+import logging
+import os
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+LAYERS = ('swaps', 'route_daily_stats', 'route_daily_stats_bucket',
+          'liquidity_pool', 'liquidity_pool_daily_stats', 'liquidity_pool_daily_stats_bucket')
+ROUTE_LAYERS = ('swaps', 'route_daily_stats', 'route_daily_stats_bucket')
+
+# The classifier attributes routes on the raw store (see route_classifier);
+# goal-state checks and retention read the ``swaps`` layer from it too.
+RAW_SWAP_TABLE = os.getenv('SWAP_RAW_TABLE', 'swaps_staging').strip()
+
+_UPSERT = """
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = coverage_ledger.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT coverage_ledger.days @> EXCLUDED.days
+"""
+
+
+def _source(layer: str) -> Tuple[str, str]:
+    """(rows, bounds) SQL for a layer's table.
+
+    ``rows`` yields ``(key_id, chain_id, day)`` for ``%(start)s <= day <
+    %(end)s``; ``bounds`` yields the first and last day present.
+    """
+    if layer == 'swaps':
+        return (f"SELECT r.pair_id, r.chain_id, s.ts::date FROM {RAW_SWAP_TABLE} s "
+                f"JOIN route r ON r.route_id = s.route_id "
+                f"WHERE s.ts >= %(start)s AND s.ts < %(end)s",
+                f"SELECT MIN(ts)::date, MAX(ts)::date FROM {RAW_SWAP_TABLE}")
+    if layer in ROUTE_LAYERS:
+        return (f"SELECT r.pair_id, r.chain_id, t.day FROM {layer} t "
+                f"JOIN route r ON r.route_id = t.route_id "
+                f"WHERE t.day >= %(start)s AND t.day < %(end)s",
+                f"SELECT MIN(day), MAX(day) FROM {layer}")
+    if layer == 'liquidity_pool':
+        return ("SELECT p.pool_id, lp.chain_id, ps.timestamp::date FROM liquidity_pool_position_snapshot ps "
+                "JOIN liquidity_pool_position p ON p.id = ps.position_id "
+                "LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id "
+                "WHERE ps.timestamp >= %(start)s AND ps.timestamp < %(end)s AND p.pool_id IS NOT NULL",
+                "SELECT MIN(timestamp)::date, MAX(timestamp)::date FROM liquidity_pool_position_snapshot")
+    if layer in LAYERS:
+        return (f"SELECT t.pool_id, lp.chain_id, t.day FROM {layer} t "
+                f"LEFT JOIN liquidity_pool lp ON lp.id = t.pool_id "
+                f"WHERE t.day >= %(start)s AND t.day < %(end)s",
+                f"SELECT MIN(day), MAX(day) FROM {layer}")
+    raise ValueError(f"unknown coverage layer {layer!r}")
+
+
+# --------------------------------------------------------------------------
+# Range helpers (pure)
+# --------------------------------------------------------------------------
+
+def expand_ranges(ranges: Iterable[Tuple[Optional[date], Optional[date]]],
+                  start: Optional[date] = None, end: Optional[date] = None) -> Set[date]:
+    """Days in half-open ``[lo, hi)`` ranges, clipped to ``start..end`` (inclusive)."""
+    out: Set[date] = set()
+    for lo, hi in ranges:
+        first = start if lo is None or (start is not None and start > lo) else lo
+        last = hi - timedelta(days=1) if hi is not None else None
+        if end is not None and (last is None or last > end):
+            last = end
+        if first is None or last is None:
+            raise ValueError("unbounded coverage range needs a start and end to expand")
+        d = first
+        while d <= last:
+            out.add(d)
+            d += timedelta(days=1)
+    return out
+
+
+def outside_window(start: Optional[date], end: Optional[date]) -> str:
+    """``datemultirange`` literal of the days outside the keep-window ``[start, end]``.
+
+    Mirrors ``od_retention._window_pred``: both None means nothing is kept.
+    """
+    if start is None and end is None:
+        return '{(,)}'
+    parts = []
+    if start is not None:
+        parts.append(f'(,{start.isoformat()})')
+    if end is not None:
+        parts.append(f'[{(end + timedelta(days=1)).isoformat()},)')
+    return '{' + ','.join(parts) + '}'
+
+
+# --------------------------------------------------------------------------
+# Readers
+# --------------------------------------------------------------------------
+
+def ready_layers(cur) -> Set[str]:
+    """Layers whose ledger has been backfilled (empty before the migration)."""
+    cur.execute("SELECT to_regclass('coverage_ledger_layer') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return set()
+    cur.execute("SELECT layer FROM coverage_ledger_layer WHERE backfilled_at IS NOT NULL")
+    return {r[0] for r in cur.fetchall()}
+
+
+def covered_days(cur, layer: str, key_ids: Optional[List[int]], start: date, end: date) -> Set[date]:
+    """Days in ``start..end`` on which any of ``key_ids`` (None = any key) has data."""
+    if key_ids is not None and not key_ids:
+        return set()
+    key_pred, args = ('', ()) if key_ids is None else (' AND c.key_id = ANY(%s)', (list(key_ids),))
+    cur.execute(f"""
+        SELECT lower(r), upper(r)
+        FROM (
+            SELECT unnest(range_agg(x)) AS r
+            FROM coverage_ledger c, unnest(c.days * datemultirange(daterange(%s, %s, '[]'))) AS x
+            WHERE c.layer = %s{key_pred}
+        ) u
+    """, (start, end, layer) + args)
+    return expand_ranges(cur.fetchall(), start, end)
+
+
+def chain_days(cur, layer: str, since: Optional[date] = None) -> Set[Tuple[str, date]]:
+    """``(chain name lowercased, day)`` with data for ``layer`` (from ``since``)."""
+    cur.execute("""
+        SELECT LOWER(ch.name), lower(v.r), upper(v.r)
+        FROM (
+            SELECT c.chain_id, unnest(range_agg(x)) AS r
+            FROM coverage_ledger c, unnest(c.days) AS x
+            WHERE c.layer = %s AND c.chain_id IS NOT NULL
+            GROUP BY c.chain_id
+        ) v
+        JOIN chain ch ON ch.id = v.chain_id
+    """, (layer,))
+    out: Set[Tuple[str, date]] = set()
+    for chain, lo, hi in cur.fetchall():
+        out.update((chain, d) for d in expand_ranges([(lo, hi)], since))
+    return out
+
+
+# --------------------------------------------------------------------------
+# Maintenance
+# --------------------------------------------------------------------------
+
+def mark_route_days(cur, layer: str, route_days) -> int:
+    """Add ``(route_id, day)`` keys to a pair-keyed layer in the caller's transaction.
+
+    Pairs are upserted in id order so concurrent classifiers lock ledger rows
+    in the same sequence; rows that already cover the days are not rewritten.
+    """
+    keys = sorted({(int(r), str(d)[:10]) for r, d in route_days or ()})
+    if not keys:
+        return 0
+    cur.execute(f"""
+        INSERT INTO coverage_ledger (layer, key_id, chain_id, days)
+        SELECT %s, k.pair_id, k.chain_id, k.days
+        FROM (
+            SELECT r.pair_id, MIN(r.chain_id) AS chain_id,
+                   range_agg(daterange(u.day, u.day + 1)) AS days
+            FROM unnest(%s::bigint[], %s::date[]) AS u(route_id, day)
+            JOIN route r ON r.route_id = u.route_id
+            GROUP BY r.pair_id
+            ORDER BY r.pair_id
+        ) k
+        {_UPSERT}
+    """, (layer, [k for k, _ in keys], [d for _, d in keys]))
+    return max(0, cur.rowcount)
+
+
+def trim(cur, layer: str, key_ids: List[int], start: Optional[date], end: Optional[date]) -> int:
+    """Drop the days outside the keep-window ``[start, end]`` for ``key_ids``."""
+    if not key_ids:
+        return 0
+    outside = outside_window(start, end)
+    cur.execute("""
+        UPDATE coverage_ledger
+        SET days = days - %s::datemultirange, updated_at = NOW()
+        WHERE layer = %s AND key_id = ANY(%s) AND days && %s::datemultirange
+    """, (outside, layer, list(key_ids), outside))
+    return max(0, cur.rowcount)
+
+
+def refresh(cur, layer: str, start: date, end: date) -> int:
+    """Rebuild ``layer`` coverage for days ``[start, end)`` from its table."""
+    rows_sql, _ = _source(layer)
+    cur.execute("""
+        UPDATE coverage_ledger
+        SET days = days - datemultirange(daterange(%s, %s)), updated_at = NOW()
+        WHERE layer = %s AND days && daterange(%s, %s)
+    """, (start, end, layer, start, end))
+    cur.execute(f"""
+        INSERT INTO coverage_ledger (layer, key_id, chain_id, days)
+        SELECT %(layer)s, key_id, MIN(chain_id), range_agg(daterange(day, day + 1))
+        FROM (SELECT DISTINCT * FROM ({rows_sql}) s (key_id, chain_id, day)) d
+        GROUP BY key_id
+        ORDER BY key_id
+        {_UPSERT}
+    """, {'layer': layer, 'start': start, 'end': end})
+    return max(0, cur.rowcount)
+
+
+def refresh_before(cur, layer: str, end: date) -> int:
+    """Rebuild ``layer`` coverage for every ledger day before ``end`` (after a purge)."""
+    cur.execute("""
+        SELECT MIN(lower(days)) FROM coverage_ledger
+        WHERE layer = %s AND NOT isempty(days)
+    """, (layer,))
+    first = cur.fetchone()[0]
+    if first is None or first >= end:
+        return 0
+    return refresh(cur, layer, first, end)
+
+
+def backfill(conn, layers: Iterable[str] = LAYERS, chunk_days: int = 30,
+             progress=None) -> Dict[str, int]:
+    """Rebuild each layer's ledger from its table and mark it ready.
+
+    Runs ``chunk_days`` at a time, one transaction per chunk; the triggers keep
+    covering new writes meanwhile. Returns the keys touched per layer.
+    """
+    log_fn = progress or (lambda msg: log.info(msg))
+    touched: Dict[str, int] = {}
+    for layer in layers:
+        _, bounds_sql = _source(layer)
+        with conn.cursor() as cur:
+            cur.execute(bounds_sql)
+            first, last = cur.fetchone()
+            # Drop whatever lies outside the table's current extent.
+            if first is None:
+                cur.execute("DELETE FROM coverage_ledger WHERE layer = %s", (layer,))
+            else:
+                cur.execute("""
+                    UPDATE coverage_ledger
+                    SET days = days * datemultirange(daterange(%s, %s, '[]')), updated_at = NOW()
+                    WHERE layer = %s
+                """, (first, last, layer))
+        conn.commit()
+        touched[layer] = 0
+        d = first
+        while d is not None and d <= last:
+            stop = min(d + timedelta(days=max(1, chunk_days)), last + timedelta(days=1))
+            with conn.cursor() as cur:
+                touched[layer] += refresh(cur, layer, d, stop)
+            conn.commit()
+            log_fn(f"coverage ledger {layer}: {d}..{stop - timedelta(days=1)}")
+            d = stop
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO coverage_ledger_layer (layer, backfilled_at) VALUES (%s, NOW())
+                ON CONFLICT (layer) DO UPDATE SET backfilled_at = EXCLUDED.backfilled_at
+            """, (layer,))
+        conn.commit()
+    return touched
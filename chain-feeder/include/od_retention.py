@@ -23,7 +23,9 @@ There is no separate ``defaults`` category any more — a layer that no
 requirement (base or otherwise) covers is "unclaimed", meaning every row of it
 is a deletion candidate.
 
-Layers: ``swaps`` (raw rows, route-attributable), ``route_daily_stats``,
+Layers: ``swaps`` (raw rows, route-attributable; read from the classifier's
+raw store ``SWAP_RAW_TABLE``, like the coverage ledger), ``route_daily_stats``
+(pruned together with its ``pair_daily_stats`` rollup),
 ``route_daily_stats_bucket`` (swap-size distribution), and three LP layers for
 pools used as route hops: ``liquidity_pool`` (position snapshots),
 ``liquidity_pool_daily_stats`` and ``liquidity_pool_daily_stats_bucket``. Each
@@ -33,6 +35,15 @@ The engine is intentionally DB-light for resolution: pair rows are fetched
 once and rules are matched in pure Python, so the matching/specificity logic
 is unit-testable without a database (see ``test_od_rennetion.py``).
 
+The partitioned layers (``swaps``, ``liquidity_pool``) are pruned partition
+by partition -- drop, rewrite or batched delete, whichever the expired share
+calls for (see ``od_retention_planner``). The legacy ``swaps`` mirror, when it
+is not itself the raw store, is pruned by the same windows.
+
+Coverage checks read the per-pair / per-pool day ranges of
+``coverage_ledger`` for every layer that has been backfilled, and fall back
+to scanning the layer's table otherwise.
+
 This module is used by the ``ods_goal_state_retention`` Airflow DAG, the CLI
 in ``scripts/ods_goal_state.py`` and the ``GET /api/ods/goal-state`` endpoint.
 """
@@ -41,12 +52,33 @@ import os
 from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    # when imported as `include.od_retention`
+    from . import coverage_ledger, table_health
+    from .od_retention_planner import (REWRITE_THRESHOLD, SAMPLE_ROWS, execute_plan,
+                                       plan_target, summarize)
+except ImportError:
+    # when included directly with PATH=<repo>/chain-feeder/include
+    import coverage_ledger
+    import table_health
+    from od_retention_planner import (REWRITE_THRESHOLD, SAMPLE_ROWS, execute_plan,
+                                      plan_target, summarize)
+
 log = logging.getLogger(__name__)
 
 LAYERS = ('swaps', 'route_daily_stats', 'route_daily_stats_bucket',
           'liquidity_pool', 'liquidity_pool_daily_stats', 'liquidity_pool_daily_stats_bucket')
 LP_LAYERS = ('liquidity_pool', 'liquidity_pool_daily_stats', 'liquidity_pool_daily_stats_bucket')
+# Route tables pruned per route layer. pair_daily_stats re-keys
+# route_daily_stats, so it follows that layer's windows.
+ROUTE_LAYER_TABLES = {
+    'route_daily_stats': ('route_daily_stats', 'pair_daily_stats'),
+    'route_daily_stats_bucket': ('route_daily_stats_bucket',),
+}
 CONFIG_BASENAME = 'ods-goal-state.yaml'
+# The ``swaps`` layer lives where the classifier attributes routes; checks,
+# retention and the coverage ledger all read this table.
+RAW_SWAP_TABLE = coverage_ledger.RAW_SWAP_TABLE
 
 
 def _lp_table(layer: str) -> str:
@@ -414,13 +446,18 @@ def _pool_ids_for_pairs(conn, pair_ids: List[int]) -> List[int]:
 # --------------------------------------------------------------------------
 
 def _coverage_days(conn, layer: str, pair_ids, pool_ids,
-                   start: date, end: date) -> set:
+                   start: date, end: date, ledger_layers=frozenset()) -> set:
     """Distinct days with data for the given pairs/pools.
 
     ``pair_ids``/``pool_ids`` of ``None`` means "any pair/pool" (used for base
     requirements, which cover every pair — avoids a giant ``ANY(...)`` list).
-    Empty list means no matches -> empty coverage.
+    Empty list means no matches -> empty coverage. Layers in
+    ``ledger_layers`` are answered from the coverage ledger.
     """
+    if layer in ledger_layers:
+        with conn.cursor() as cur:
+            key_ids = pool_ids if layer in LP_LAYERS else pair_ids
+            return coverage_ledger.covered_days(cur, layer, key_ids, start, end)
     pair_pred = ''
     pair_args: tuple = ()
     if pair_ids is None:
@@ -451,15 +488,15 @@ def _coverage_days(conn, layer: str, pair_ids, pool_ids,
                 # Base coverage: all classified swaps, no route/pair join needed.
                 # Raw ts range lets the ts/partial index prune instead of
                 # casting ts::date (which defeats partition pruning).
-                cur.execute("""
+                cur.execute(f"""
                     SELECT DISTINCT s.ts::date AS day
-                    FROM swaps s
+                    FROM {RAW_SWAP_TABLE} s
                     WHERE s.route_id IS NOT NULL AND s.ts >= %s AND s.ts < %s
                 """, (start, end_ex))
             else:
                 cur.execute(f"""
                     SELECT DISTINCT s.ts::date AS day
-                    FROM swaps s
+                    FROM {RAW_SWAP_TABLE} s
                     JOIN route r ON s.route_id = r.route_id
                     WHERE s.ts >= %s AND s.ts < %s{pair_pred}
                 """, (start, end_ex) + pair_args)
@@ -533,6 +570,8 @@ def run_checks(conn, goal: Dict[str, Any], today: Optional[date] = None) -> List
     today = today or date.today()
     reqs = _resolve_sides(conn, goal['requirements'])
     pairs = fetch_pairs(conn)
+    with conn.cursor() as cur:
+        ledger_layers = coverage_ledger.ready_layers(cur)
     report: List[Dict[str, Any]] = []
 
     for req in reqs:
@@ -553,7 +592,7 @@ def run_checks(conn, goal: Dict[str, Any], today: Optional[date] = None) -> List
             start, end = window_resolve(win, today)
             if start is None or end is None:
                 continue
-            present = _coverage_days(conn, layer, pair_ids, pool_ids, start, end)
+            present = _coverage_days(conn, layer, pair_ids, pool_ids, start, end, ledger_layers)
             expected = _expected_days(start, end)
             missing = sorted(expected - present) if expected else []
             status = _check_status(present, expected, start, end, today)
@@ -632,9 +671,9 @@ def _delete_batched(conn, delete_sql: str, args: tuple, batch: int = 10000) -> i
     return deleted
 
 
-def _prune_route_layer(conn, layer: str, groups, batch: int) -> int:
-    table = 'route_daily_stats' if layer == 'route_daily_stats' else 'route_daily_stats_bucket'
-    tmp = 'rs' if layer == 'route_daily_stats' else 'rb'
+def _prune_route_layer(conn, table: str, groups, batch: int) -> int:
+    """Batch-delete rows of a route table outside each pair group's window."""
+    tmp = 'rt'
     col = 't.day'
     total = 0
     for pair_ids, start, end in groups:
@@ -662,63 +701,6 @@ def _prune_route_layer(conn, layer: str, groups, batch: int) -> int:
     return total
 
 
-def _prune_swaps(conn, pairs, goal, today, batch) -> Dict[str, int]:
-    total = 0
-    # Classified rows: per-pair effective windows (requirements + chain floors).
-    groups = _group_pair_windows(pairs, 'swaps', goal, today)
-    for pair_ids, start, end in groups:
-        if not pair_ids:
-            continue
-        args: Tuple = (pair_ids,)
-        pred: List[str] = []
-        if start is not None:
-            pred.append("s2.ts::date < %s")
-            args += (start,)
-        if end is not None:
-            pred.append("s2.ts::date > %s")
-            args += (end,)
-        pred_sql = " OR ".join(pred) if pred else "1=1"
-        sql = f"""
-            DELETE FROM swaps s
-            WHERE s.ctid IN (
-                SELECT s2.ctid FROM swaps s2
-                JOIN route r ON s2.route_id = r.route_id
-                WHERE s2.route_id IS NOT NULL AND r.pair_id = ANY(%s) AND ({pred_sql})
-                LIMIT %s
-            )
-        """
-        total += _delete_batched(conn, sql, args, batch)
-
-    # Unclassified rows (route_id IS NULL): apply the per-chain base floor.
-    # They cannot be attributed to an O&D set, so only the base requirement's
-    # swaps window governs them (this replaces the old network/protocol
-    # retention mechanism).
-    floors = _window_row_for_unclassified(conn, goal, today)
-    for chain, (start, end) in floors.items():
-        args = (chain,)
-        pred = []
-        if start is not None:
-            pred.append("s2.ts::date < %s")
-            args += (start,)
-        if end is not None:
-            pred.append("s2.ts::date > %s")
-            args += (end,)
-        pred_sql = " OR ".join(pred) if pred else "1=1"
-        sql = f"""
-            DELETE FROM swaps s
-            WHERE s.ctid IN (
-                SELECT s2.ctid FROM swaps s2
-                JOIN liquidity_pool lp ON s2.pool_id = lp.id
-                JOIN chain ch ON lp.chain_id = ch.id
-                WHERE s2.route_id IS NULL
-                  AND LOWER(ch.name) = LOWER(%s) AND ({pred_sql})
-                LIMIT %s
-            )
-        """
-        total += _delete_batched(conn, sql, args, batch)
-    return {'swaps': total}
-
-
 def _window_row_for_unclassified(conn, goal, today) -> Dict[str, Tuple[Optional[date], Optional[date]]]:
     """Per-chain floor windows for unclassified raw-swap rows (all chains).
 
@@ -776,62 +758,185 @@ def _layer_pool_windows(conn, pairs, goal, today, layer: str) -> Dict[int, Tuple
     return pool_win
 
 
-def _prune_lp_layer(conn, pairs, goal, today, batch, layer: str) -> int:
-    """Prune one LP layer's table outside each used pool's keep-window."""
-    from collections import defaultdict as dd
-    pool_win = _layer_pool_windows(conn, pairs, goal, today, layer)
+def _used_pool_windows(conn, pairs, goal, today, layer: str) -> Dict[int, Tuple[Optional[date], Optional[date]]]:
+    """Keep-window of every pool used by some route hop for an LP layer.
 
-    groups: Dict[Tuple, List[int]] = dd(list)
-    key_to_win: Dict[Tuple, Tuple[Optional[date], Optional[date]]] = {}
-    # Leftover pools (used by some route but covered by no requirement) are
-    # unclaimed -> everything is a deletion candidate.
+    Leftover pools (used by some route but covered by no requirement) are
+    unclaimed -> ``(None, None)``, everything is a deletion candidate.
+    """
+    pool_win = _layer_pool_windows(conn, pairs, goal, today, layer)
     with conn.cursor() as cur:
         cur.execute("SELECT DISTINCT h.pool_id FROM route_hop h")
         used = [r[0] for r in cur.fetchall()]
-    for pid in used:
-        win = pool_win.get(pid, (None, None))
+    return {pid: pool_win.get(pid, (None, None)) for pid in used}
+
+
+def _prune_lp_layer(conn, pairs, goal, today, batch, layer: str) -> int:
+    """Prune one LP daily layer's table outside each used pool's keep-window.
+
+    The position-snapshot layer (``liquidity_pool``) is partitioned and goes
+    through the partition planner instead (``_prune_partitioned``).
+    """
+    from collections import defaultdict as dd
+    groups: Dict[Tuple, List[int]] = dd(list)
+    key_to_win: Dict[Tuple, Tuple[Optional[date], Optional[date]]] = {}
+    for pid, win in _used_pool_windows(conn, pairs, goal, today, layer).items():
         key = (win[0].isoformat() if win[0] else None, win[1].isoformat() if win[1] else None)
         groups[key].append(pid)
         key_to_win[key] = (win[0], win[1])
 
     total = 0
-    if layer == 'liquidity_pool':
-        for key, pool_ids in groups.items():
-            if not pool_ids:
-                continue
-            start, end = key_to_win[key]
-            pred, args = _window_pred('ps2.timestamp::date', 'ps2', start, end)
-            pred_sql = " OR ".join(pred)
-            sql = f"""
-                DELETE FROM liquidity_pool_position_snapshot ps
-                WHERE ps.ctid IN (
-                    SELECT ps2.ctid FROM liquidity_pool_position_snapshot ps2
-                    JOIN liquidity_pool_position p ON ps2.position_id = p.id
-                    WHERE p.pool_id = ANY(%s) AND ({pred_sql})
-                    LIMIT %s
-                )
-            """
-            total += _delete_batched(conn, sql, (pool_ids,) + args, batch)
-    else:
-        table = _lp_table(layer)
-        for key, pool_ids in groups.items():
-            if not pool_ids:
-                continue
-            start, end = key_to_win[key]
-            pred, args = _window_pred('t2.day', 't2', start, end)
-            pred_sql = " OR ".join(pred)
-            sql = f"""
-                DELETE FROM {table} t
-                WHERE t.ctid IN (
-                    SELECT t2.ctid FROM {table} t2
-                    WHERE t2.pool_id = ANY(%s) AND ({pred_sql})
-                    LIMIT %s
-                )
-            """
-            total += _delete_batched(conn, sql, (pool_ids,) + args, batch)
+    table = _lp_table(layer)
+    for key, pool_ids in groups.items():
+        if not pool_ids:
+            continue
+        start, end = key_to_win[key]
+        pred, args = _window_pred('t2.day', 't2', start, end)
+        pred_sql = " OR ".join(pred)
+        sql = f"""
+            DELETE FROM {table} t
+            WHERE t.ctid IN (
+                SELECT t2.ctid FROM {table} t2
+                WHERE t2.pool_id = ANY(%s) AND ({pred_sql})
+                LIMIT %s
+            )
+        """
+        total += _delete_batched(conn, sql, (pool_ids,) + args, batch)
     return total
 
 
+# --------------------------------------------------------------------------
+# Partitioned layers (swaps, liquidity_pool_position_snapshot)
+# --------------------------------------------------------------------------
+# The effective windows are staged once per run in temp tables keyed by
+# route / pool, so the planner can classify a whole partition with one query
+# (see od_retention_planner). ``keeps = false`` encodes the (None, None)
+# "no floor" window: every row of that route / pool is a delete candidate.
+
+PARTITIONED_LAYERS = ('swaps', 'liquidity_pool')
+_KEEP_TABLES = ('_od_route_keep', '_od_pool_floor', '_od_pool_keep')
+
+
+def _in_window(alias: str, col: str) -> str:
+    return (f"({alias}.keeps AND ({alias}.keep_start IS NULL OR {col} >= {alias}.keep_start) "
+            f"AND ({alias}.keep_end IS NULL OR {col} <= {alias}.keep_end))")
+
+
+def _stage_keep_windows(conn, pairs, goal, today) -> None:
+    """(Re)create the keep-window temp tables for the partitioned layers."""
+    with conn.cursor() as cur:
+        for name, key in zip(_KEEP_TABLES, ('route_id', 'pool_id', 'pool_id')):
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+            cur.execute(f"CREATE TEMP TABLE {name} ({key} BIGINT PRIMARY KEY, keeps BOOLEAN NOT NULL, "
+                        f"keep_start DATE, keep_end DATE)")
+        # Classified swaps: the pair's effective window, per route.
+        for pair_ids, start, end in _group_pair_windows(pairs, 'swaps', goal, today):
+            cur.execute("""
+                INSERT INTO _od_route_keep
+                SELECT r.route_id, %s, %s, %s FROM route r WHERE r.pair_id = ANY(%s)
+                ON CONFLICT DO NOTHING
+            """, (start is not None or end is not None, start, end, pair_ids))
+        # Unclassified swaps: the chain's base floor, per pool.
+        for chain, (start, end) in _window_row_for_unclassified(conn, goal, today).items():
+            cur.execute("""
+                INSERT INTO _od_pool_floor
+                SELECT lp.id, %s, %s, %s FROM liquidity_pool lp
+                JOIN chain ch ON lp.chain_id = ch.id
+                WHERE LOWER(ch.name) = LOWER(%s)
+                ON CONFLICT DO NOTHING
+            """, (start is not None or end is not None, start, end, chain))
+        # Position snapshots: the most specific window of each used pool.
+        rows = [(pid, s is not None or e is not None, s, e)
+                for pid, (s, e) in _used_pool_windows(conn, pairs, goal, today, 'liquidity_pool').items()]
+        if rows:
+            cur.executemany("INSERT INTO _od_pool_keep VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING", rows)
+        for name in _KEEP_TABLES:
+            cur.execute(f"ANALYZE {name}")
+
+
+def _drop_keep_windows(conn, commit: bool = True) -> None:
+    with conn.cursor() as cur:
+        for name in _KEEP_TABLES:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+    if commit:
+        conn.commit()
+
+
+def _partition_targets(layer: str) -> List[Dict[str, Any]]:
+    """Planner targets of a partitioned layer: its table, plus the legacy
+    ``swaps`` mirror for the ``swaps`` layer when that is a separate table."""
+    if layer == 'swaps' and RAW_SWAP_TABLE != 'swaps':
+        return [_partition_target(layer), _partition_target(layer, 'swaps')]
+    return [_partition_target(layer)]
+
+
+def _partition_target(layer: str, table: Optional[str] = None) -> Dict[str, Any]:
+    """Planner target for a partitioned layer (requires _stage_keep_windows)."""
+    if layer == 'swaps':
+        return {
+            'layer': 'swaps', 'table': table or RAW_SWAP_TABLE, 'alias': 's2',
+            'joins': "LEFT JOIN _od_route_keep w ON w.route_id = s2.route_id "
+                     "LEFT JOIN _od_pool_floor f ON s2.route_id IS NULL AND f.pool_id = s2.pool_id",
+            'expired': f"(w.route_id IS NOT NULL AND NOT {_in_window('w', 's2.ts::date')}) "
+                       f"OR (f.pool_id IS NOT NULL AND NOT {_in_window('f', 's2.ts::date')})",
+            'args': (),
+        }
+    if layer == 'liquidity_pool':
+        return {
+            'layer': 'liquidity_pool', 'table': 'liquidity_pool_position_snapshot', 'alias': 'ps2',
+            'joins': "LEFT JOIN liquidity_pool_position p ON ps2.position_id = p.id "
+                     "LEFT JOIN _od_pool_keep k ON k.pool_id = p.pool_id",
+            'expired': f"k.pool_id IS NOT NULL AND NOT {_in_window('k', 'ps2.timestamp::date')}",
+            'args': (),
+        }
+    raise ValueError(f"{layer} is not a partitioned layer")
+
+
+def _trim_coverage_ledger(conn, pairs, goal, today) -> None:
+    """Drop the pruned days of the partitioned layers from the coverage ledger.
+
+    The daily tables keep their ledger rows current through triggers;
+    partition drops and rewrites do not fire them.
+    """
+    pool_groups: Dict[Tuple[Optional[date], Optional[date]], List[int]] = {}
+    for pid, win in _used_pool_windows(conn, pairs, goal, today, 'liquidity_pool').items():
+        pool_groups.setdefault(win, []).append(pid)
+    with conn.cursor() as cur:
+        for pair_ids, start, end in _group_pair_windows(pairs, 'swaps', goal, today):
+            coverage_ledger.trim(cur, 'swaps', pair_ids, start, end)
+        for (start, end), pool_ids in pool_groups.items():
+            coverage_ledger.trim(cur, 'liquidity_pool', pool_ids, start, end)
+    conn.commit()
+
+
+def _refresh_table_health(conn, layer_plan: List[Dict[str, Any]]) -> None:
+    """Re-derive the table-health metrics of the snapshot partitions pruned.
+
+    Partition drops, rewrites and residue deletes address the partitions
+    directly, so the parent's statement triggers do not see them; refresh the
+    day range of every partition that was not kept (all days for the default
+    partition). Like ``table_health.rebuild`` it holds a SHARE lock on the
+    snapshot table meanwhile, so snapshot writers wait instead of applying
+    trigger deltas to rows being re-derived.
+    """
+    spans = set()
+    for part in layer_plan:
+        if part['strategy'] == 'keep':
+            continue
+        lo, sep, hi = part['range'].partition('..')
+        try:
+            spans.add((date.fromisoformat(lo), date.fromisoformat(hi)) if sep else (None, None))
+        except ValueError:
+            spans.add((None, None))
+    if (None, None) in spans:
+        spans = {(None, None)}
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE liquidity_pool_position_snapshot IN SHARE MODE")
+        for start, end in sorted(spans, key=str):
+            table_health.refresh_range(cur, 'liquidity_pool_position_snapshot', start, end)
+    conn.commit()
+
+
 def _verify_no_inwindow_casualties(pairs, goal, today) -> None:
     """Guard: no pair governed by a requirement may ever be pruned inside that
     requirement's keep-window.
@@ -874,11 +979,15 @@ def _verify_no_inwindow_casualties(pairs, goal, today) -> None:
 
 def prune(conn, goal: Dict[str, Any], today: Optional[date] = None,
           dry_run: bool = True, batch: int = 10000,
-          progress=None) -> Dict[str, Any]:
+          progress=None, rewrite_threshold: float = REWRITE_THRESHOLD,
+          sample_rows: int = SAMPLE_ROWS) -> Dict[str, Any]:
     """Delete data outside the effective keep-windows of the goal state.
 
-    Returns per-layer delete counts (all zero when ``dry_run``). Never touches
-    unclassified rows that cannot be attributed to a chain.
+    Returns per-layer counts of removed rows (the estimate when ``dry_run``)
+    and, under ``plan``, one row per partition of the partitioned layers with
+    the chosen strategy (drop / rewrite / delete / keep) and the estimated I/O
+    of each (see ``od_retention_planner``). Never touches unclassified rows
+    that cannot be attributed to a chain.
     """
     today = today or date.today()
     log_fn = progress or (lambda msg: log.info(msg))
@@ -886,107 +995,95 @@ def prune(conn, goal: Dict[str, Any], today: Optional[date] = None,
     goal = dict(goal)
     goal['requirements'] = _resolve_sides(conn, goal.get('requirements') or [])
     layer_counts: Dict[str, int] = {layer: 0 for layer in LAYERS}
+    strategies: Dict[str, Dict[str, int]] = {}
 
     if not dry_run:
         _verify_no_inwindow_casualties(pairs, goal, today)
-        for layer in ('route_daily_stats', 'route_daily_stats_bucket'):
-            groups = _group_pair_windows(pairs, layer, goal, today)
-            layer_counts[layer] = _prune_route_layer(conn, layer, groups, batch)
-            log_fn(f"pruned {layer}: {layer_counts[layer]} rows")
-
-        layer_counts.update(_prune_swaps(conn, pairs, goal, today, batch))
-        log_fn(f"pruned swaps: {layer_counts['swaps']} rows")
-
-        for layer in LP_LAYERS:
-            layer_counts[layer] = _prune_lp_layer(conn, pairs, goal, today, batch, layer)
-            log_fn(f"pruned {layer}: {layer_counts[layer]} rows")
+    plan: List[Dict[str, Any]] = []
+    try:
+        _stage_keep_windows(conn, pairs, goal, today)
+        for layer in PARTITIONED_LAYERS:
+            for target in _partition_targets(layer):
+                layer_plan = plan_target(conn, target, rewrite_threshold, sample_rows)
+                plan.extend(layer_plan)
+                if dry_run:
+                    layer_counts[layer] += sum(p['expired'] for p in layer_plan)
+
+        if not dry_run:
+            conn.commit()
+            for layer, tables in ROUTE_LAYER_TABLES.items():
+                groups = _group_pair_windows(pairs, layer, goal, today)
+                for table in tables:
+                    layer_counts[table] = _prune_route_layer(conn, table, groups, batch)
+                    log_fn(f"pruned {table}: {layer_counts[table]} rows")
+
+            for layer in PARTITIONED_LAYERS:
+                strategies[layer] = {}
+                for target in _partition_targets(layer):
+                    layer_plan = [p for p in plan if p['table'] == target['table']]
+                    removed = execute_plan(conn, target, layer_plan, batch, rewrite_threshold, log_fn)
+                    for strategy, n in removed.items():
+                        strategies[layer][strategy] = strategies[layer].get(strategy, 0) + n
+                layer_counts[layer] = sum(strategies[layer].values())
+                log_fn(f"pruned {layer}: {layer_counts[layer]} rows {strategies[layer]}")
+                if layer == 'liquidity_pool':
+                    _refresh_table_health(conn, [p for p in plan if p['layer'] == layer])
+
+            for layer in LP_LAYERS:
+                if layer in PARTITIONED_LAYERS:
+                    continue
+                layer_counts[layer] = _prune_lp_layer(conn, pairs, goal, today, batch, layer)
+                log_fn(f"pruned {layer}: {layer_counts[layer]} rows")
+            _trim_coverage_ledger(conn, pairs, goal, today)
+    except Exception:
+        conn.rollback()
+        _drop_keep_windows(conn)
+        raise
+    _drop_keep_windows(conn, commit=not dry_run)
 
     # Estimate (dry-run) counts too, cheaply.
     if dry_run:
-        counts = {'swaps': _count_deletable(conn, pairs, goal, today, 'swaps'),
-                  'route_daily_stats': _count_deletable(conn, pairs, goal, today, 'route_daily_stats'),
-                  'route_daily_stats_bucket': _count_deletable(conn, pairs, goal, today, 'route_daily_stats_bucket')}
+        for layer, tables in ROUTE_LAYER_TABLES.items():
+            for table in tables:
+                layer_counts[table] = _count_deletable(conn, pairs, goal, today, layer, table)
         for layer in LP_LAYERS:
-            counts[layer] = _count_lp_deletable(conn, pairs, goal, today, layer)
-        layer_counts.update(counts)
+            if layer not in PARTITIONED_LAYERS:
+                layer_counts[layer] = _count_lp_deletable(conn, pairs, goal, today, layer)
 
-    return {'dry_run': dry_run, 'rows': layer_counts, 'vacuum': not dry_run}
+    return {'dry_run': dry_run, 'rows': layer_counts, 'vacuum': not dry_run,
+            'plan': plan, 'plan_summary': summarize(plan), 'strategies': strategies}
 
 
-def _count_deletable(conn, pairs, goal, today, layer) -> int:
-    if layer == 'swaps':
-        total = 0
-        for pair_ids, start, end in _group_pair_windows(pairs, 'swaps', goal, today):
-            pred, args = _window_pred('s2.ts::date', 's2', start, end)
-            if not pred:
-                continue
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    SELECT COUNT(*) FROM swaps s2
-                    JOIN route r ON s2.route_id = r.route_id
-                    WHERE s2.route_id IS NOT NULL AND r.pair_id = ANY(%s) AND ({" OR ".join(pred)})
-                """, (pair_ids,) + args)
-                total += cur.fetchone()[0]
-        # unclassified floor
-        for chain, (start, end) in _window_row_for_unclassified(conn, goal, today).items():
-            pred, args = _window_pred('s2.ts::date', 's2', start, end)
-            if not pred:
-                continue
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    SELECT COUNT(*) FROM swaps s2
-                    JOIN liquidity_pool lp ON s2.pool_id = lp.id
-                    JOIN chain ch ON lp.chain_id = ch.id
-                    WHERE s2.route_id IS NULL AND LOWER(ch.name) = LOWER(%s) AND ({" OR ".join(pred)})
-                """, (chain,) + args)
-                total += cur.fetchone()[0]
-        return total
-    if layer in ('route_daily_stats', 'route_daily_stats_bucket'):
-        table = 'route_daily_stats' if layer == 'route_daily_stats' else 'route_daily_stats_bucket'
-        total = 0
-        for pair_ids, start, end in _group_pair_windows(pairs, layer, goal, today):
-            pred, args = _window_pred('t.day', 't', start, end)
-            if not pred:
-                continue
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    SELECT COUNT(*) FROM {table} t
-                    JOIN route r ON t.route_id = r.route_id
-                    WHERE r.pair_id = ANY(%s) AND ({" OR ".join(pred)})
-                """, (pair_ids,) + args)
-                total += cur.fetchone()[0]
-        return total
-    return 0
+def _count_deletable(conn, pairs, goal, today, layer, table: Optional[str] = None) -> int:
+    """Rows of a route layer's table (default: the layer's own) outside its
+    pairs' keep-windows."""
+    table = table or layer
+    total = 0
+    for pair_ids, start, end in _group_pair_windows(pairs, layer, goal, today):
+        pred, args = _window_pred('t.day', 't', start, end)
+        if not pred:
+            continue
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT COUNT(*) FROM {table} t
+                JOIN route r ON t.route_id = r.route_id
+                WHERE r.pair_id = ANY(%s) AND ({" OR ".join(pred)})
+            """, (pair_ids,) + args)
+            total += cur.fetchone()[0]
+    return total
 
 
 def _count_lp_deletable(conn, pairs, goal, today, layer: str) -> int:
-    pool_win = _layer_pool_windows(conn, pairs, goal, today, layer)
+    """Rows of an LP daily layer outside each used pool's keep-window."""
     total = 0
+    table = _lp_table(layer)
     with conn.cursor() as cur:
-        cur.execute("SELECT DISTINCT h.pool_id FROM route_hop h")
-        pool_ids = [r[0] for r in cur.fetchall()]
-        if layer == 'liquidity_pool':
-            col = 'ps.timestamp::date'
-            for pid in pool_ids:
-                start, end = pool_win.get(pid, (None, None))
-                pred, args = _window_pred(col, 'ps', start, end)
-                if not pred:
-                    continue
-                cur.execute(
-                    f"SELECT COUNT(*) FROM liquidity_pool_position_snapshot ps "
-                    f"JOIN liquidity_pool_position p ON ps.position_id = p.id "
-                    f"WHERE p.pool_id = %s AND ({' OR '.join(pred)})", (pid,) + args)
-                total += cur.fetchone()[0]
-        else:
-            col = 't.day'
-            table = _lp_table(layer)
-            for pid in pool_ids:
-                start, end = pool_win.get(pid, (None, None))
-                pred, args = _window_pred(col, 't', start, end)
-                if not pred:
-                    continue
-                cur.execute(f"SELECT COUNT(*) FROM {table} t WHERE t.pool_id = %s AND ({' OR '.join(pred)})", (pid,) + args)
-                total += cur.fetchone()[0]
+        for pid, (start, end) in _used_pool_windows(conn, pairs, goal, today, layer).items():
+            pred, args = _window_pred('t.day', 't', start, end)
+            if not pred:
+                continue
+            cur.execute(f"SELECT COUNT(*) FROM {table} t WHERE t.pool_id = %s AND ({' OR '.join(pred)})", (pid,) + args)
+            total += cur.fetchone()[0]
     return total
 
 
@@ -0,0 +1,488 @@
+"""Partition-aware execution plan for O&D goal-state pruning.
+
+``od_retention.prune`` used to remove expired raw rows with
+``DELETE ... WHERE ctid IN (SELECT ... LIMIT n)`` loops over the parent
+table, committing every batch. On monthly partitions holding tens of millions
+of rows that rewrites every touched page twice (the DELETE, then VACUUM) with
+full-page images in WAL, leaves the partition as bloated as before and keeps
+autovacuum busy for hours.
+
+For a partitioned layer the engine now classifies each partition by the share
+of its rows that falls outside every keep-window, and picks a strategy:
+
+* ``drop``    -- nothing in the partition is retained: detach and drop it
+  (catalog-only).
+* ``rewrite`` -- at least ``rewrite_threshold`` of the rows are expired: copy
+  the retained rows into a fresh table and swap it in (detach + drop the old
+  partition, attach the new one, recreate partition-local indexes).
+* ``delete``  -- a small residue: batched deletes scoped to that partition.
+* ``keep``    -- nothing expired.
+
+The default partition and unpartitioned tables are only ever ``delete``d.
+Drops and rewrites re-count the partition exactly under a lock that blocks
+writers before acting, so a sampled estimate can never drop retained rows.
+
+Drops and rewrites run in two transactions so the parent is never waited on
+while the partition is locked (ingestion inserting through the parent holds
+RowExclusive on it and waits on the partition -- a lock-order deadlock):
+
+1. *prepare* (long, partition lock only): re-count; for a rewrite copy the
+   retained rows into ``<partition>_rw`` and build on it every index and
+   unique constraint of the parent, the partition's local indexes and a
+   CHECK equal to the partition bound, so ATTACH neither builds nor scans.
+   A row trigger on the old partition then marks a guard sequence on any
+   write that lands after this transaction commits.
+2. *swap* (short, ``lock_timeout``): lock the parent first, check the guard,
+   detach/drop the old partition and attach the new one. If the lock times
+   out or a write slipped in, everything prepared is dropped and the
+   partition is left for the next run.
+
+A layer is described by a *target* dict (built by od_retention):
+
+    {'layer': 'swaps', 'table': 'swaps', 'alias': 's2',
+     'joins': "LEFT JOIN ... ",   # attach the keep-window to each row
+     'expired': "...",            # SQL boolean, true when the row is expired
+     'args': ()}                  # parameters for joins/expired
+
+Joins must be LEFT JOINs on unique keys so every row of the partition appears
+exactly once (the rewrite copies ``WHERE NOT expired``).
+
+``estimate_io`` gives, per partition and strategy, the approximate bytes read
+and written (heap, index and WAL) and the space returned to the OS, so the
+dry-run report shows why a strategy was picked.
+"""
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+PAGE_SIZE = 8192
+# Expired share at or above which a partition is rewritten instead of deleted from.
+REWRITE_THRESHOLD = 0.5
+# Partitions with more (estimated) rows than this are classified on a TABLESAMPLE.
+SAMPLE_ROWS = 200000
+STRATEGIES = ('drop', 'rewrite', 'delete')
+# How long the swap transaction waits for its lock on the parent table.
+LOCK_TIMEOUT_MS = 5000
+# SQLSTATE of lock_not_available (lock_timeout expired).
+_LOCK_NOT_AVAILABLE = '55P03'
+
+_BOUND_RE = re.compile(r"FOR VALUES FROM \('([^']*)'\) TO \('([^']*)'\)")
+_INDEX_DEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX ("(?:[^"]|"")+"|\S+) ON (?:ONLY )?\S+ (USING .*)$', re.S)
+_PARTKEY_RE = re.compile(r'^RANGE \((\w+)\)$')
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def parse_partition_bound(expr: Optional[str]) -> Optional[Tuple[str, str]]:
+    """``(from, to)`` of a range partition bound as returned by
+    ``pg_get_expr(relpartbound, oid)``; None for DEFAULT or unparsable bounds."""
+    m = _BOUND_RE.match(expr or '')
+    return (m.group(1), m.group(2)) if m else None
+
+
+def choose_strategy(total_rows: int, expired_rows: int, droppable: bool,
+                    rewrite_threshold: float = REWRITE_THRESHOLD) -> str:
+    if expired_rows <= 0:
+        return 'keep'
+    if not droppable:
+        return 'delete'
+    if expired_rows >= total_rows:
+        return 'drop'
+    if expired_rows >= rewrite_threshold * total_rows:
+        return 'rewrite'
+    return 'delete'
+
+
+def estimate_io(heap_bytes: int, index_bytes: int, total_rows: int,
+                expired_rows: int) -> Dict[str, Dict[str, int]]:
+    """Approximate bytes read / written (data files + WAL) and freed per strategy.
+
+    Expired rows are assumed to be spread uniformly over the heap pages.
+    ``drop`` and ``rewrite`` include the exact re-count scan they run first.
+    """
+    pages = max(1, heap_bytes // PAGE_SIZE)
+    total_rows = max(total_rows, 0)
+    expired_rows = min(max(expired_rows, 0), total_rows)
+    expired_share = expired_rows / total_rows if total_rows else 0.0
+    kept_bytes = (heap_bytes + index_bytes) * (1.0 - expired_share)
+    # heap pages holding at least one expired row
+    touched = pages * (1.0 - (1.0 - 1.0 / pages) ** expired_rows) if expired_rows else 0.0
+    return {
+        'drop': {'read': heap_bytes, 'write': 0,
+                 'freed': heap_bytes + index_bytes},
+        # the new heap and its index builds are written once and WAL-logged once
+        'rewrite': {'read': 2 * heap_bytes, 'write': int(2 * kept_bytes),
+                    'freed': int((heap_bytes + index_bytes) * expired_share)},
+        # DELETE and then VACUUM each dirty every touched page, each time with
+        # a full-page image in WAL; VACUUM also scans the heap and the indexes
+        'delete': {'read': 2 * heap_bytes + index_bytes,
+                   'write': int(4 * touched * PAGE_SIZE + index_bytes * expired_share),
+                   'freed': 0},
+    }
+
+
+def list_partitions(cur, table: str) -> List[Dict[str, Any]]:
+    """Leaf partitions of ``table`` with size statistics; an unpartitioned
+    table is returned as its own single, non-droppable unit."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    if row is None:
+        return []
+    if row[0] != 'p':
+        cur.execute("SELECT pg_relation_size(%s::regclass), pg_indexes_size(%s::regclass), "
+                    "reltuples FROM pg_class WHERE oid = %s::regclass", (table, table, table))
+        heap, idx, reltuples = cur.fetchone()
+        return [{'name': table, 'bound': None, 'range': 'unpartitioned', 'droppable': False,
+                 'heap_bytes': heap, 'index_bytes': idx, 'reltuples': reltuples}]
+    cur.execute("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid),
+               pg_relation_size(child.oid), pg_indexes_size(child.oid), child.reltuples
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s) AND child.relkind = 'r'
+        ORDER BY child.relname
+    """, (table,))
+    out = []
+    for name, bound, heap, idx, reltuples in cur.fetchall():
+        rng = parse_partition_bound(bound)
+        out.append({'name': name, 'bound': bound,
+                    'range': f"{rng[0][:10]}..{rng[1][:10]}" if rng else 'default',
+                    'droppable': rng is not None,
+                    'heap_bytes': heap, 'index_bytes': idx, 'reltuples': reltuples})
+    return out
+
+
+def _expired_sql(target: Dict[str, Any]) -> str:
+    return f"COALESCE(({target['expired']}), false)"
+
+
+def _count(cur, target: Dict[str, Any], relation: str, sample_pct: Optional[float] = None) -> Tuple[int, int]:
+    """(rows, expired rows) of one partition, optionally on a block sample."""
+    sample = f" TABLESAMPLE SYSTEM ({sample_pct:.4f})" if sample_pct else ""
+    cur.execute(f"""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE {_expired_sql(target)})
+        FROM {_ident(relation)} {target['alias']}{sample}
+        {target['joins']}
+    """, target.get('args', ()))
+    n, e = cur.fetchone()
+    return int(n), int(e)
+
+
+def _has_expired(cur, target: Dict[str, Any], relation: str) -> bool:
+    cur.execute(f"""
+        SELECT 1 FROM {_ident(relation)} {target['alias']} {target['joins']}
+        WHERE {_expired_sql(target)} LIMIT 1
+    """, target.get('args', ()))
+    return cur.fetchone() is not None
+
+
+def plan_target(conn, target: Dict[str, Any], rewrite_threshold: float = REWRITE_THRESHOLD,
+                sample_rows: int = SAMPLE_ROWS) -> List[Dict[str, Any]]:
+    """One plan row per partition of the target's table."""
+    plans = []
+    with conn.cursor() as cur:
+        for part in list_partitions(cur, target['table']):
+            reltuples = part['reltuples'] or 0
+            estimated = sample_rows > 0 and reltuples > sample_rows
+            if estimated:
+                pct = min(100.0, max(0.01, 100.0 * sample_rows / reltuples))
+                n, e = _count(cur, target, part['name'], pct)
+                total = int(reltuples)
+                expired = total if n and e == n else int(round(total * e / n)) if n else 0
+                if expired == 0 and _has_expired(cur, target, part['name']):
+                    expired = 1  # the sample missed a small residue
+            else:
+                total, expired = _count(cur, target, part['name'])
+            strategy = choose_strategy(total, expired, part['droppable'], rewrite_threshold)
+            plans.append({
+                'layer': target['layer'], 'table': target['table'], 'partition': part['name'],
+                'range': part['range'], 'rows': total, 'expired': expired, 'estimated': estimated,
+                'heap_bytes': part['heap_bytes'], 'index_bytes': part['index_bytes'],
+                'strategy': strategy,
+                'io': estimate_io(part['heap_bytes'], part['index_bytes'], total, expired),
+            })
+    return plans
+
+
+def _columns(cur, table: str) -> List[str]:
+    cur.execute("""
+        SELECT a.attname FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0
+          AND NOT a.attisdropped AND a.attgenerated = ''
+        ORDER BY a.attnum
+    """, (table,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def _local_index_defs(cur, relation: str) -> List[str]:
+    """CREATE INDEX statements for indexes created on the partition itself
+    (e.g. per-partition BRIN), as opposed to partitions of a parent index."""
+    cur.execute("""
+        SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x
+        WHERE x.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits h WHERE h.inhrelid = x.indexrelid)
+    """, (relation,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def _parent_index_defs(cur, table: str, relation: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(index definition, unique/primary-key constraint definition or None,
+    name of the partition's index attached to it) per index of the parent."""
+    cur.execute("""
+        SELECT pg_get_indexdef(x.indexrelid), pg_get_constraintdef(con.oid), child.relname
+        FROM pg_index x
+        LEFT JOIN pg_constraint con
+               ON con.conindid = x.indexrelid AND con.conrelid = x.indrelid
+              AND con.contype IN ('p', 'u')
+        LEFT JOIN LATERAL (
+            SELECT c.relname FROM pg_inherits h
+            JOIN pg_index cx ON cx.indexrelid = h.inhrelid
+            JOIN pg_class c ON c.oid = h.inhrelid
+            WHERE h.inhparent = x.indexrelid AND cx.indrelid = to_regclass(%s)
+        ) child ON true
+        WHERE x.indrelid = to_regclass(%s)
+        ORDER BY x.indexrelid
+    """, (relation, table))
+    return cur.fetchall()
+
+
+def _bound_check(cur, table: str, bound: str) -> Optional[str]:
+    """CHECK expression equal to a range partition bound on a single-column key."""
+    rng = parse_partition_bound(bound)
+    cur.execute("SELECT pg_get_partkeydef(to_regclass(%s))", (table,))
+    m = _PARTKEY_RE.match(cur.fetchone()[0] or '')
+    if rng is None or m is None:
+        return None
+    key = _ident(m.group(1))
+    lo, hi = (v.replace("'", "''") for v in rng)
+    return f"{key} IS NOT NULL AND {key} >= '{lo}' AND {key} < '{hi}'"
+
+
+def _guard_name(name: str) -> str:
+    return f"{name}_rw_guard"
+
+
+def _install_guard(cur, name: str) -> None:
+    """Mark a sequence on any write to ``name`` (sequences ignore rollbacks,
+    so even an aborted write counts)."""
+    guard = _guard_name(name)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION od_retention_guard() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM nextval(TG_ARGV[0]::regclass);
+            RETURN NULL;
+        END $$
+    """)
+    cur.execute(f"DROP SEQUENCE IF EXISTS {_ident(guard)}")
+    cur.execute(f"CREATE SEQUENCE {_ident(guard)}")
+    cur.execute(f"CREATE TRIGGER od_retention_guard AFTER INSERT OR UPDATE OR DELETE "
+                f"ON {_ident(name)} FOR EACH ROW EXECUTE FUNCTION od_retention_guard(%s)",
+                (_ident(guard),))
+
+
+def _prepare_rewrite(cur, target: Dict[str, Any], part: Dict[str, Any], bound: str) -> Dict[str, Any]:
+    """Copy the retained rows into ``<partition>_rw`` and make it attachable
+    without an index build or a validation scan. Returns what the swap needs."""
+    table, name, alias = target['table'], part['partition'], target['alias']
+    fresh = f"{name}_rw"
+    cols = _columns(cur, table)
+    cur.execute(f"DROP TABLE IF EXISTS {_ident(fresh)}")
+    cur.execute(f"CREATE TABLE {_ident(fresh)} (LIKE {_ident(table)} "
+                f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)")
+    col_sql = ", ".join(_ident(c) for c in cols)
+    cur.execute(f"""
+        INSERT INTO {_ident(fresh)} ({col_sql})
+        SELECT {", ".join(f"{alias}.{_ident(c)}" for c in cols)}
+        FROM {_ident(name)} {alias} {target['joins']}
+        WHERE NOT {_expired_sql(target)}
+    """, target.get('args', ()))
+    kept = cur.rowcount
+
+    # Indexes are built under temporary names (the old partition still holds
+    # the real ones) and renamed during the swap.
+    renames = []
+    for i, (indexdef, condef, child) in enumerate(_parent_index_defs(cur, table, name)):
+        tmp = f"{child}_rw" if child else f"{fresh}_idx{i}"
+        if condef:
+            cur.execute(f"ALTER TABLE {_ident(fresh)} ADD CONSTRAINT {_ident(tmp)} {condef}")
+        else:
+            m = _INDEX_DEF_RE.match(indexdef)
+            cur.execute(f"CREATE {m.group(1) or ''}INDEX {_ident(tmp)} ON {_ident(fresh)} {m.group(3)}")
+        if child:
+            renames.append((tmp, child))
+    for indexdef in _local_index_defs(cur, name):
+        m = _INDEX_DEF_RE.match(indexdef)
+        local = m.group(2).strip('"').replace('""', '"')
+        cur.execute(f"CREATE {m.group(1) or ''}INDEX {_ident(local + '_rw')} ON {_ident(fresh)} {m.group(3)}")
+        renames.append((local + '_rw', local))
+
+    check = _bound_check(cur, table, bound)
+    if check:
+        cur.execute(f"ALTER TABLE {_ident(fresh)} ADD CONSTRAINT {_ident(fresh + '_bound')} CHECK ({check})")
+    return {'fresh': fresh, 'kept': kept, 'renames': renames, 'check': fresh + '_bound' if check else None}
+
+
+def _swap(conn, target: Dict[str, Any], part: Dict[str, Any], bound: str,
+          prepared: Optional[Dict[str, Any]], lock_timeout_ms: int) -> bool:
+    """Detach/drop the old partition and attach the prepared copy (if any) in
+    one short transaction. False, with everything prepared dropped, when the
+    parent lock times out or the partition was written to since preparing."""
+    table, name = target['table'], part['partition']
+    guard = _guard_name(name)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}")
+            cur.execute(f"LOCK TABLE {_ident(table)} IN ACCESS EXCLUSIVE MODE")
+            cur.execute(f"SELECT is_called FROM {_ident(guard)}")
+            if cur.fetchone()[0]:
+                conn.rollback()
+                log.warning("%s: %s was written to while being prepared; left for the next run",
+                            target['layer'], name)
+                _discard(conn, name, prepared)
+                return False
+            cur.execute(f"ALTER TABLE {_ident(table)} DETACH PARTITION {_ident(name)}")
+            cur.execute(f"DROP TABLE {_ident(name)}")
+            if prepared:
+                cur.execute(f"ALTER TABLE {_ident(prepared['fresh'])} RENAME TO {_ident(name)}")
+                for tmp, final in prepared['renames']:
+                    cur.execute(f"ALTER INDEX {_ident(tmp)} RENAME TO {_ident(final)}")
+                cur.execute(f"ALTER TABLE {_ident(table)} ATTACH PARTITION {_ident(name)} {bound}")
+                if prepared['check']:
+                    cur.execute(f"ALTER TABLE {_ident(name)} DROP CONSTRAINT {_ident(prepared['check'])}")
+            cur.execute(f"DROP SEQUENCE {_ident(guard)}")
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        _discard(conn, name, prepared)
+        if getattr(e, 'pgcode', None) != _LOCK_NOT_AVAILABLE:
+            raise
+        log.warning("%s: lock on %s not granted within %d ms; %s left for the next run",
+                    target['layer'], table, lock_timeout_ms, name)
+        return False
+
+
+def _discard(conn, name: str, prepared: Optional[Dict[str, Any]]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TRIGGER IF EXISTS od_retention_guard ON {_ident(name)}")
+        cur.execute(f"DROP SEQUENCE IF EXISTS {_ident(_guard_name(name))}")
+        if prepared:
+            cur.execute(f"DROP TABLE IF EXISTS {_ident(prepared['fresh'])}")
+    conn.commit()
+
+
+def _delete_residue(conn, target: Dict[str, Any], relation: str, batch: int) -> int:
+    sql = f"""
+        DELETE FROM {_ident(relation)} t
+        WHERE t.ctid IN (
+            SELECT {target['alias']}.ctid FROM {_ident(relation)} {target['alias']}
+            {target['joins']}
+            WHERE {_expired_sql(target)}
+            LIMIT %s
+        )
+    """
+    deleted = 0
+    with conn.cursor() as cur:
+        while True:
+            cur.execute(sql, tuple(target.get('args', ())) + (batch,))
+            n = cur.rowcount
+            conn.commit()
+            deleted += n
+            if n < batch:
+                break
+    return deleted
+
+
+def execute_plan(conn, target: Dict[str, Any], plans: List[Dict[str, Any]], batch: int = 10000,
+                 rewrite_threshold: float = REWRITE_THRESHOLD,
+                 progress: Optional[Callable[[str], None]] = None,
+                 lock_timeout_ms: int = LOCK_TIMEOUT_MS) -> Dict[str, int]:
+    """Apply ``plans`` (from plan_target); returns rows removed per strategy.
+
+    Each drop/rewrite is prepared in its own transaction -- the partition is
+    locked against writers, re-counted exactly and the strategy re-chosen
+    from the exact numbers -- and swapped in a second, short one (see the
+    module docstring).
+    """
+    log_fn = progress or log.info
+    removed = {s: 0 for s in STRATEGIES}
+    for part in plans:
+        strategy = part['strategy']
+        if strategy == 'keep':
+            continue
+        name = part['partition']
+        if strategy in ('drop', 'rewrite'):
+            prepared = None
+            with conn.cursor() as cur:
+                cur.execute(f"LOCK TABLE {_ident(name)} IN SHARE ROW EXCLUSIVE MODE")
+                cur.execute("SELECT pg_get_expr(relpartbound, oid) FROM pg_class "
+                            "WHERE oid = to_regclass(%s)", (name,))
+                bound = cur.fetchone()[0]
+                total, expired = _count(cur, target, name)
+                strategy = choose_strategy(total, expired, parse_partition_bound(bound) is not None,
+                                           rewrite_threshold)
+                if strategy == 'rewrite':
+                    prepared = _prepare_rewrite(cur, target, part, bound)
+                    expired = total - prepared['kept']
+                if strategy in ('drop', 'rewrite'):
+                    _install_guard(cur, name)
+            conn.commit()
+            if strategy in ('drop', 'rewrite'):
+                if not _swap(conn, target, part, bound, prepared, lock_timeout_ms):
+                    continue
+                removed[strategy] += expired
+                log_fn(f"{target['layer']}: {strategy} {name} ({part['range']}): "
+                       f"{expired} of {total} rows expired")
+                continue
+            if strategy == 'keep':
+                continue
+        n = _delete_residue(conn, target, name, batch)
+        removed['delete'] += n
+        log_fn(f"{target['layer']}: delete {name} ({part['range']}): {n} rows")
+    return removed
+
+
+def summarize(plans: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Per-strategy totals (partitions, rows, expired rows, estimated I/O) of
+    the chosen strategies, plus the same plan executed as deletes only."""
+    out: Dict[str, Dict[str, int]] = {}
+    for p in plans:
+        s = out.setdefault(p['strategy'], {'partitions': 0, 'rows': 0, 'expired': 0,
+                                           'read': 0, 'write': 0, 'freed': 0})
+        s['partitions'] += 1
+        s['rows'] += p['rows']
+        s['expired'] += p['expired']
+        if p['strategy'] != 'keep':
+            for k in ('read', 'write', 'freed'):
+                s[k] += p['io'][p['strategy']][k]
+    baseline = {'partitions': 0, 'rows': 0, 'expired': 0, 'read': 0, 'write': 0, 'freed': 0}
+    for p in plans:
+        if p['strategy'] != 'keep':
+            baseline['partitions'] += 1
+            baseline['rows'] += p['rows']
+            baseline['expired'] += p['expired']
+            for k in ('read', 'write', 'freed'):
+                baseline[k] += p['io']['delete'][k]
+    out['delete_only'] = baseline
+    return out
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1048576:.0f}MB"
+
+
+def format_plan(plans: List[Dict[str, Any]]) -> List[str]:
+    """Text report: one line per partition with the estimated I/O of every strategy."""
+    lines = [f"{'partition':34} {'range':22} {'rows':>12} {'expired':>12} {'pick':8} "
+             f"{'drop r/w':>15} {'rewrite r/w':>15} {'delete r/w':>15}"]
+    for p in plans:
+        rw = {s: f"{_mb(p['io'][s]['read'])}/{_mb(p['io'][s]['write'])}" for s in STRATEGIES}
+        lines.append(f"{p['partition']:34} {p['range']:22} {p['rows']:>12} "
+                     f"{('~' if p['estimated'] else '') + str(p['expired']):>12} {p['strategy']:8} "
+                     f"{rw['drop']:>15} {rw['rewrite']:>15} {rw['delete']:>15}")
+    return lines
@@ -25,16 +25,28 @@ from typing import Any, Dict, List, Optional, Set
 
 try:
     # when imported as `include.reconcile`
+    from . import coverage_ledger
     from .od_retention import window_resolve
     from .od_catalog import PRODUCTS, SetCatalog
 except ImportError:
     # when included directly with PATH=<repo>/chain-feeder/include
+    import coverage_ledger
     from od_retention import window_resolve
     from od_catalog import PRODUCTS, SetCatalog
 
 
 WORKERS = ('FETCH', 'CLASSIFY', 'MATERIALIZE', 'RESOLVE', 'UNAVAILABLE')
 
+# Product facts answered by each coverage_ledger layer.
+LEDGER_PRODUCTS = {
+    'swaps': 'route.swap_logs',
+    'route_daily_stats': 'route.daily_stats',
+    'route_daily_stats_bucket': 'route.daily_stats_buckets',
+    'liquidity_pool': 'pool.position_snapshots',
+    'liquidity_pool_daily_stats': 'pool.daily_stats',
+    'liquidity_pool_daily_stats_bucket': 'pool.daily_stats_buckets',
+}
+
 
 @dataclass
 class CoverageState:
@@ -104,8 +116,9 @@ def plan_requirement(cat_set: SetCatalog, state: CoverageState,
 def load_coverage_state(conn) -> CoverageState:
     """Build a CoverageState from the control-plane coverage ledger.
 
-    Falls back to computing raw/classified/product presence from the live swap
-    tables when the ledger is empty (so the planner works before the new
+    Falls back to the per-pair coverage ledger (``coverage_ledger``) once it
+    is backfilled, and to computing raw/classified/product presence from the
+    live swap tables before that (so the planner works before the new
     coverage tables are populated).
     """
     state = CoverageState()
@@ -129,12 +142,51 @@ def load_coverage_state(conn) -> CoverageState:
             ledger_populated = bool(state.raw_present) or bool(state.classified) or bool(state.product_present)
     except Exception:
         ledger_populated = False
-    if not ledger_populated:
+    if not ledger_populated and not _load_from_coverage_ledger(conn, state):
         # Control plane not yet populated -> derive from live swap tables.
         _load_from_swaps(conn, state)
     return state
 
 
+def _load_raw_watermarks(cur, state: CoverageState, since: date) -> None:
+    """Raw presence from the ``ingestion_state`` watermark: a network whose
+    watermark is recent has swap logs for the days since ``since`` (no
+    partitions scan)."""
+    cur.execute("SELECT network, last_ts FROM ingestion_state WHERE last_ts IS NOT NULL")
+    for network, last_ts in cur.fetchall():
+        chain = str(network).lower()
+        d = last_ts.date()
+        while d >= since:
+            state.raw_present.add((chain, d))
+            d -= timedelta(days=1)
+
+
+def _load_from_coverage_ledger(conn, state: CoverageState) -> bool:
+    """Coverage from ``coverage_ledger`` when every layer is backfilled.
+
+    Classified days are the ledger's ``swaps`` layer (raw swaps attributed to
+    a route), which also count as raw presence on top of the ingestion
+    watermark. Returns False (state untouched) when the ledger is not ready.
+    """
+    from datetime import datetime, timezone
+    recent = (datetime.now(timezone.utc) - timedelta(days=14)).date()
+    try:
+        with conn.cursor() as cur:
+            if not set(LEDGER_PRODUCTS) <= coverage_ledger.ready_layers(cur):
+                return False
+            _load_raw_watermarks(cur, state, recent)
+            for layer, product_id in LEDGER_PRODUCTS.items():
+                days = coverage_ledger.chain_days(cur, layer)
+                state.product_present.setdefault(product_id, set()).update(days)
+                if layer == 'swaps':
+                    state.classified.update(days)
+                    state.raw_present.update(days)
+    except Exception:
+        conn.rollback()
+        return False
+    return True
+
+
 def _load_from_swaps(conn, state: CoverageState) -> None:
     """Best-effort coverage from durable, indexed tables (not a swaps scan).
 
@@ -145,19 +197,11 @@ def _load_from_swaps(conn, state: CoverageState) -> None:
     ``liquidity_pool_daily_stats``, which are exactly the durable read models and
     are indexed by day.
     """
-    from datetime import datetime, timedelta, timezone
+    from datetime import datetime, timezone
     recent = (datetime.now(timezone.utc) - timedelta(days=14)).date()
     try:
         with conn.cursor() as cur:
-            # Raw presence: a network whose watermark is recent indicates swap
-            # logs are present for the last few days (no partitions scan).
-            cur.execute("SELECT network, last_ts FROM ingestion_state WHERE last_ts IS NOT NULL")
-            for network, last_ts in cur.fetchall():
-                chain = str(network).lower()
-                d = last_ts.date()
-                while d >= recent:
-                    state.raw_present.add((chain, d))
-                    d -= timedelta(days=1)
+            _load_raw_watermarks(cur, state, recent)
 
             # Classified presence (route products): distinct (chain, day) with
             # route_daily_stats rows.
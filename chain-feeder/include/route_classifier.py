@@ -18,14 +18,17 @@ import csv
 import io
 import hashlib
 import os
+import threading
 from collections import defaultdict
 from typing import Dict, List, Optional
 import psycopg2.extras
 
 try:
     from include.settings import load_distribution_config
+    from include.coverage_ledger import mark_route_days
 except ImportError:
     from settings import load_distribution_config
+    from coverage_ledger import mark_route_days
 
 log = logging.getLogger(__name__)
 
@@ -53,6 +56,11 @@ def _get_dsn() -> str:
 # classification queue read from this instead of the legacy `swaps` table.
 import os as _os
 RAW_SWAP_TABLE = _os.getenv('SWAP_RAW_TABLE', 'swaps_staging').strip()
+# route_hourly_stats keeps only this many recent days (intraday views).
+HOURLY_RETENTION_DAYS = int(_os.getenv('ROUTE_HOURLY_RETENTION_DAYS', '30'))
+# materialization_watermark row moved by every committed route-stats recompute;
+# the API response cache drops entries built under an older version.
+ROUTE_STATS_WATERMARK = 'route_stats'
 
 
 # ---------------------------------------------------------------------------
@@ -276,37 +284,108 @@ def resolve_route(cur, pair_id: int, chain_id: int, pools: List[int],
             time.sleep(0.2 * (1.5 ** attempt))
 
 
-def _legs_for_txs(cur, tx_hashes: List[str], table_name: str = 'swaps') -> List[Dict]:
-    """Fetch classifier legs (with per-token addresses/symbols via pool joins)
-    for a set of tx hashes, ordered by (tx_hash, log_index)."""
+class PoolDimensionCache:
+    """Process-level ``pool_id -> leg topology`` cache for the classifier.
+
+    Pool topology (chain, token contracts, symbols, coin ids) almost never
+    changes, yet every batch used to join it from four dimension tables per
+    leg. The cache is keyed by the insert/update/delete counters of
+    liquidity_pool, coin_contract and coin in pg_stat_user_tables: any change
+    to those tables drops it. Pools missing from the cache (new since the last
+    load) are fetched on demand, and the whole cache is dropped every
+    ``ttl_secs`` as a backstop for the stats collector's flush lag.
+    """
+
+    TABLES = ('liquidity_pool', 'coin_contract', 'coin')
+
+    def __init__(self, ttl_secs: float = 900.0):
+        self.ttl_secs = ttl_secs
+        self._dims: Dict[int, Optional[tuple]] = {}
+        self._version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+    def _read_version(self, cur) -> tuple:
+        cur.execute("""
+            SELECT relid::regclass::text, n_tup_ins + n_tup_upd + n_tup_del
+            FROM pg_stat_user_tables
+            WHERE relid = ANY(ARRAY['liquidity_pool', 'coin_contract', 'coin']::regclass[])
+            ORDER BY 1
+        """)
+        return tuple(cur.fetchall())
+
+    def lookup(self, cur, pool_ids) -> Dict[int, Optional[tuple]]:
+        """``{pool_id: (chain_id, token0, token1, symbol0, symbol1, coin0_id, coin1_id)}``.
+
+        The value is None for pools without a contract on their chain; the old
+        inner join dropped those legs too.
+        """
+        version = self._read_version(cur)
+        wanted = set(pool_ids)
+        with self._lock:
+            if version != self._version or time.time() - self._loaded_at > self.ttl_secs:
+                if self._version is not None:
+                    self.stats['reloads'] += 1
+                self._dims = {}
+                self._version = version
+                self._loaded_at = time.time()
+            missing = [pid for pid in wanted if pid not in self._dims]
+            self.stats['hits'] += len(wanted) - len(missing)
+            self.stats['misses'] += len(missing)
+            if missing:
+                cur.execute("""
+                    SELECT lp.id, lp.chain_id,
+                           cc0.contract_address, cc1.contract_address,
+                           c0.symbol, c1.symbol, lp.coin0_id, lp.coin1_id
+                    FROM liquidity_pool lp
+                    JOIN coin_contract cc0 ON cc0.coin_id = lp.coin0_id AND cc0.chain_id = lp.chain_id
+                    JOIN coin_contract cc1 ON cc1.coin_id = lp.coin1_id AND cc1.chain_id = lp.chain_id
+                    JOIN coin c0 ON c0.coin_id = lp.coin0_id
+                    JOIN coin c1 ON c1.coin_id = lp.coin1_id
+                    WHERE lp.id = ANY(%s)
+                """, (missing,))
+                for pool_id in missing:
+                    self._dims[pool_id] = None
+                for row in cur.fetchall():
+                    self._dims[row[0]] = tuple(row[1:])
+            return {pid: self._dims[pid] for pid in wanted}
+
+
+POOL_DIMENSIONS = PoolDimensionCache()
+
+
+def _legs_for_txs(cur, tx_hashes: List[str], table_name: str = 'swaps',
+                  dims: Optional[PoolDimensionCache] = None) -> List[Dict]:
+    """Fetch classifier legs (with per-token addresses/symbols from the pool
+    dimension cache) for a set of tx hashes, ordered by (tx_hash, log_index).
+
+    Only the narrow swap columns are read; pool topology is enriched in Python
+    from ``dims`` (default: the process-wide :data:`POOL_DIMENSIONS`).
+    """
     target_table = table_name.strip() if table_name and table_name.strip() else 'swaps'
     cur.execute(
         f"""
-        SELECT
-            s.tx_hash, s.log_index, s.ts, s.pool_id,
-            s.amount0, s.amount1, s.amount_usd,
-            lp.chain_id,
-            cc0.contract_address AS token0, cc1.contract_address AS token1,
-            c0.symbol AS symbol0, c1.symbol AS symbol1,
-            lp.coin0_id, lp.coin1_id
+        SELECT s.tx_hash, s.log_index, s.ts, s.pool_id,
+               s.amount0, s.amount1, s.amount_usd, s.route_id
         FROM {target_table} s
-        JOIN liquidity_pool lp ON s.pool_id = lp.id
-        JOIN coin_contract cc0 ON cc0.coin_id = lp.coin0_id AND cc0.chain_id = lp.chain_id
-        JOIN coin_contract cc1 ON cc1.coin_id = lp.coin1_id AND cc1.chain_id = lp.chain_id
-        JOIN coin c0 ON c0.coin_id = lp.coin0_id
-        JOIN coin c1 ON c1.coin_id = lp.coin1_id
         WHERE s.tx_hash IN %s
         ORDER BY s.tx_hash, s.log_index
         """,
         (tuple(tx_hashes),),
     )
+    rows = cur.fetchall()
+    topology = (dims or POOL_DIMENSIONS).lookup(cur, {row[3] for row in rows if row[3] is not None})
     legs: List[Dict] = []
-    for (tx_hash, log_index, ts, pool_id, amount0, amount1, amount_usd,
-         chain_id, token0, token1, s0, s1, coin0_id, coin1_id) in cur.fetchall():
+    for tx_hash, log_index, ts, pool_id, amount0, amount1, amount_usd, route_id in rows:
+        pool = topology.get(pool_id)
+        if pool is None:
+            continue
+        chain_id, token0, token1, s0, s1, coin0_id, coin1_id = pool
         legs.append({
             'tx_hash': tx_hash, 'log_index': log_index, 'ts': ts,
             'pool_id': pool_id, 'amount0': amount0, 'amount1': amount1,
-            'amount_usd': amount_usd, 'chain_id': chain_id, 'token0': token0,
+            'amount_usd': amount_usd, 'route_id': route_id, 'chain_id': chain_id, 'token0': token0,
             'token1': token1, 'symbol0': s0, 'symbol1': s1,
             'coin0_id': coin0_id, 'coin1_id': coin1_id,
         })
@@ -366,6 +445,7 @@ def collect_route_staging(cur, tx_hashes: List[str], table_name: str = 'swaps')
                     'tx_hash': leg['tx_hash'],
                     'log_index': leg['log_index'],
                     'ts': leg['ts'],
+                    'pool_id': leg['pool_id'],
                 })
 
     return list(candidates.values()), assignments, affected_days
@@ -375,6 +455,11 @@ def merge_route_staging(cur, candidates: list[dict], assignments: list[dict],
                         table_name: str = 'swaps', chain_scope: Optional[int] = None) -> int:
     """Merge staged route topology and assignments using set-based SQL.
 
+    Annotates every assignment with its resolved ``route_id`` and, for legs
+    that moved off another route, ``prev_route_id`` (returned by the UPDATE),
+    so :func:`dirty_from_staging` can derive exact dirty keys. Returns the
+    number of legs whose route changed.
+
     ``chain_scope`` (a chain id) shards the route-write advisory lock per chain.
     Routes never cross chains, so distinct chains can merge concurrently while
     same-chain merges still serialize. Default (None) uses the global lock.
@@ -496,17 +581,27 @@ def merge_route_staging(cur, candidates: list[dict], assignments: list[dict],
         CROSS JOIN LATERAL generate_subscripts(c.pools, 1) AS x(n)
         ON CONFLICT (route_id, seq) DO NOTHING
     """)
+    # The second scan of the target (prev) reads the pre-update row, so the
+    # RETURNING clause reports the route each leg is moving off.
     cur.execute(f"""
         UPDATE {target_table} s
         SET route_id = c.route_id
         FROM route_stage_assignments a
         JOIN route_stage_candidates c ON c.candidate_key = a.candidate_key
+        JOIN {target_table} prev
+          ON prev.tx_hash = a.tx_hash AND prev.log_index = a.log_index AND prev.ts = a.ts
         WHERE s.tx_hash = a.tx_hash
           AND s.log_index = a.log_index
           AND s.ts = a.ts
           AND s.route_id IS DISTINCT FROM c.route_id
+        RETURNING s.tx_hash, s.log_index, prev.route_id
     """)
-    return cur.rowcount
+    changed = {(tx_hash, log_index): prev for tx_hash, log_index, prev in cur.fetchall()}
+    route_by_key = {c['candidate_key']: c['route_id'] for c in candidates}
+    for a in assignments:
+        a['route_id'] = route_by_key[a['candidate_key']]
+        a['prev_route_id'] = changed.get((a['tx_hash'], a['log_index']))
+    return len(changed)
 
 
 def classify_legs(cur, legs: List[Dict], pair_cache: Optional[Dict] = None,
@@ -558,6 +653,9 @@ def classify_legs(cur, legs: List[Dict], pair_cache: Optional[Dict] = None,
                     update_rows.append((route_id, leg['tx_hash'], leg['log_index'], leg['ts']))
                     dirty_route_days.add((route_id, d))
                     dirty_pool_days.add((leg['pool_id'], d))
+                    # A reclassified leg leaves its previous route's day stale too.
+                    if leg.get('route_id') not in (None, route_id):
+                        dirty_route_days.add((leg['route_id'], d))
 
     if not update_rows:
         return 0, set(), {'route_days': set(), 'pool_days': set()}
@@ -610,7 +708,7 @@ def classify_tx_hashes_batch(cur, tx_hashes: List[str], table_name: str = 'swaps
     if not assignments:
         return 0, days, {'route_days': set(), 'pool_days': set()}
     updated = merge_route_staging(cur, candidates, assignments, table_name=table_name)
-    dirty = _dirty_from_staging(assignments, candidates)
+    dirty = dirty_from_staging(assignments)
     return updated, days, dirty
 
 
@@ -627,7 +725,6 @@ def classify_tx_hashes_sharded(cur, tx_hashes: List[str], table_name: str = 'swa
     ``pool`` may be a shared ``ProcessPoolExecutor``; if None one is created.
     Returns ``(legs_updated, affected_days, dirty)``.
     """
-    import concurrent.futures as _cf
     from concurrent.futures import ProcessPoolExecutor
 
     if not tx_hashes or workers <= 1:
@@ -636,89 +733,278 @@ def classify_tx_hashes_sharded(cur, tx_hashes: List[str], table_name: str = 'swa
     shards = [tx_hashes[i::workers] for i in range(workers)]
     shards = [s for s in shards if s]
 
-    def _reconstruct_one(shard):
-        # Each handle opens its own read-only connection (mirrors backfill).
-        conn_own = psycopg2.connect(_get_dsn())
-        try:
-            with conn_own.cursor() as c:
-                cand, assign, days = collect_route_staging(c, shard, table_name=table_name)
-            conn_own.commit()
-            return cand, assign, days
-        finally:
-            conn_own.close()
-
     owns_pool = pool is None
     exec_ = pool or ProcessPoolExecutor(max_workers=workers)
     try:
-        results = list(exec_.map(_reconstruct_one, shards))
+        results = list(exec_.map(reconstruct_tx_hashes, shards, [table_name] * len(shards)))
     finally:
         if owns_pool:
             exec_.shutdown(wait=True)
 
-    all_candidates = []
-    all_assignments = []
-    all_days = set()
-    for candidates, assignments, days in results:
-        all_candidates.extend(candidates)
-        all_assignments.extend(assignments)
-        all_days.update(days)
-
+    all_candidates, all_assignments, all_days = combine_staging(results)
     if not all_assignments:
         return 0, all_days, {'route_days': set(), 'pool_days': set()}
     updated = merge_route_staging(cur, all_candidates, all_assignments, table_name=table_name)
-    dirty = _dirty_from_staging(all_assignments)
+    dirty = dirty_from_staging(all_assignments)
     return updated, all_days, dirty
 
 
-def _dirty_from_staging(assignments: list[dict]) -> dict:
-    """Derive dirty (route_id, day) / (pool, day) would need route_id; staging
-    assignments carry candidate_key (route identity) not ids. Return empty for
-    now — the legacy per-tx path records dirty directly; the batch path is
-    cleanly matched by the dirty_day_materializer scanning classified swaps.
+_WORKER_CONN = None
+
+
+def reconstruct_tx_hashes(tx_hashes: List[str], table_name: str = 'swaps') -> tuple:
+    """Process-pool task: :func:`collect_route_staging` for one shard.
+
+    Each worker process opens one read connection on first use and keeps it
+    for its lifetime, so a persistent pool does not reconnect per shard.
     """
-    return {'route_days': set(), 'pool_days': set()}
+    global _WORKER_CONN
+    if _WORKER_CONN is None or _WORKER_CONN.closed:
+        _WORKER_CONN = psycopg2.connect(_get_dsn())
+    try:
+        with _WORKER_CONN.cursor() as c:
+            return collect_route_staging(c, tx_hashes, table_name=table_name)
+    finally:
+        # End the read transaction so the worker holds no snapshot while idle.
+        _WORKER_CONN.rollback()
+
+
+def combine_staging(results) -> tuple[list, list, set]:
+    """Concatenate ``collect_route_staging`` results from several shards.
+
+    Shards can stage the same route; duplicates collapse to one candidate with
+    the widest first/last seen, since the merge keys its temp table on
+    ``candidate_key``.
+    """
+    candidates: Dict[str, dict] = {}
+    assignments: list = []
+    days: set = set()
+    for shard_candidates, shard_assignments, shard_days in results:
+        for c in shard_candidates:
+            existing = candidates.get(c['candidate_key'])
+            if existing is None:
+                candidates[c['candidate_key']] = c
+                continue
+            if c['first_seen'] and (not existing['first_seen'] or c['first_seen'] < existing['first_seen']):
+                existing['first_seen'] = c['first_seen']
+            if c['last_seen'] and (not existing['last_seen'] or c['last_seen'] > existing['last_seen']):
+                existing['last_seen'] = c['last_seen']
+        assignments.extend(shard_assignments)
+        days.update(shard_days)
+    return list(candidates.values()), assignments, days
+
+
+def _day_of(ts):
+    import datetime as _dt
+    return _dt.date.fromisoformat(ts[:10] if isinstance(ts, str) else ts.strftime('%Y-%m-%d'))
+
+
+def dirty_from_staging(assignments: list[dict]) -> dict:
+    """Exact dirty (route_id, day) / (pool_id, day) keys of merged assignments.
+
+    Mirrors :func:`classify_legs`: every attributed leg dirties its route and
+    pool day, and a leg that moved routes also dirties its previous route.
+    ``covered_route_days`` holds only the routes legs now belong to, for the
+    coverage ledger. Needs the ``route_id`` / ``prev_route_id`` set by
+    merge_route_staging.
+    """
+    route_days: set = set()
+    pool_days: set = set()
+    covered: set = set()
+    for a in assignments:
+        if a.get('route_id') is None or not a.get('ts'):
+            continue
+        day = _day_of(a['ts'])
+        route_days.add((a['route_id'], day))
+        covered.add((a['route_id'], day))
+        if a.get('prev_route_id') is not None:
+            route_days.add((a['prev_route_id'], day))
+        if a.get('pool_id') is not None:
+            pool_days.add((a['pool_id'], day))
+    return {'route_days': route_days, 'pool_days': pool_days, 'covered_route_days': covered}
+
+
+def record_dirty_keys(cur, dirty: dict) -> tuple:
+    """Bulk-insert dirty keys into dirty_route_day / dirty_pool_day.
+
+    One statement per table; keys are inserted in sorted order so concurrent
+    classifiers lock rows in the same sequence. ``covered_route_days``, when
+    present, also marks the raw ``swaps`` layer of the coverage ledger in the
+    same transaction. Returns ``(route_rows, pool_rows)`` newly queued.
+    """
+    mark_route_days(cur, 'swaps', dirty.get('covered_route_days'))
+    counts = []
+    for table, column, key in (('dirty_route_day', 'route_id', 'route_days'),
+                               ('dirty_pool_day', 'pool_id', 'pool_days')):
+        keys = sorted(dirty.get(key) or (), key=lambda k: (k[0], str(k[1])))
+        if not keys:
+            counts.append(0)
+            continue
+        cur.execute(f"""
+            INSERT INTO {table} ({column}, day)
+            SELECT * FROM unnest(%s::bigint[], %s::date[])
+            ON CONFLICT DO NOTHING
+        """, ([k for k, _ in keys], [str(d) for _, d in keys]))
+        counts.append(max(0, cur.rowcount))
+    return tuple(counts)
+
+
+def _day_windows(days, chunk_days: int) -> list:
+    """Half-open ``[start, end)`` date windows covering exactly ``days``.
+
+    Consecutive days share a window (at most ``chunk_days`` long); gaps start a
+    new one, so a sparse day set never rebuilds the days in between.
+    """
+    from datetime import date, datetime, timedelta
+    parsed = sorted({d if isinstance(d, date) else datetime.strptime(str(d)[:10], '%Y-%m-%d').date()
+                     for d in days})
+    windows: list = []
+    for d in parsed:
+        if windows and windows[-1][1] == d and (d - windows[-1][0]).days < max(1, chunk_days):
+            windows[-1][1] = d + timedelta(days=1)
+        else:
+            windows.append([d, d + timedelta(days=1)])
+    return [(start, end) for start, end in windows]
 
 
-def recompute_daily_stats(cur, days: List[str], chunk_days: int = 7, table_name: str = None) -> int:
+def _count(stats: Optional[dict], key: str, n: int) -> None:
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + max(0, n or 0)
+
+
+def load_dirty_keys(cur, name: str, keys) -> str:
+    """COPY ``(key_id, day)`` tuples into session temp table ``name``.
+
+    The table is emptied first and dropped at commit, so the key-scoped
+    recomputes below can join against it within the caller's transaction.
+    """
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {name} (
+            key_id BIGINT NOT NULL,
+            day DATE NOT NULL,
+            PRIMARY KEY (key_id, day)
+        ) ON COMMIT DROP
+    """)
+    cur.execute(f"TRUNCATE {name}")
+    stream = io.StringIO()
+    for key_id, day in set(keys):
+        stream.write(f"{int(key_id)}\t{str(day)[:10]}\n")
+    stream.seek(0)
+    cur.copy_expert(f"COPY {name} (key_id, day) FROM STDIN", stream)
+    cur.execute(f"ANALYZE {name}")
+    return name
+
+
+def plan_dirty_recompute(route_days, pool_days, max_keys_per_day: int) -> tuple:
+    """Split claimed dirty keys into whole-day rebuilds and key-scoped work.
+
+    A day with more than ``max_keys_per_day`` dirty routes or pools is cheaper
+    to rebuild whole (one range scan) than through the key join. Returns
+    ``(full_days, route_keys, pool_keys)``; the key sets exclude full days.
+    """
+    route_per_day: Dict = defaultdict(int)
+    pool_per_day: Dict = defaultdict(int)
+    for _, day in route_days:
+        route_per_day[day] += 1
+    for _, day in pool_days:
+        pool_per_day[day] += 1
+    full_days = {day for counts in (route_per_day, pool_per_day)
+                 for day, n in counts.items() if n > max_keys_per_day}
+    route_keys = {(k, day) for k, day in route_days if day not in full_days}
+    pool_keys = {(k, day) for k, day in pool_days if day not in full_days}
+    return full_days, route_keys, pool_keys
+
+
+def recompute_daily_stats(cur, days: List[str], chunk_days: int = 7, table_name: str = None,
+                          stats: Optional[dict] = None) -> int:
     """Recompute route_daily_stats for a set of ISO days ('YYYY-MM-DD').
 
     The table is derived (materialized), so DELETE+INSERT is correct regardless
     of classification order — late mixed-protocol legs reclassify a tx's route.
     Executes in fast chunked date ranges with integer coin_id matching and partition pruning.
+    ``stats`` (optional) accumulates rows_scanned / rows_deleted / rows_inserted.
     """
     if not days:
         return 0
+    return _recompute_daily_stats(cur, days, chunk_days, table_name, stats=stats)
 
-    source_table = (table_name or RAW_SWAP_TABLE).strip()
-    sorted_days = sorted(set(days))
-    log.info("Recomputing route_daily_stats for %d days (from %s to %s)...",
-             len(sorted_days), sorted_days[0], sorted_days[-1])
 
-    from datetime import datetime, timedelta
-    start_dt = datetime.strptime(sorted_days[0], '%Y-%m-%d').date()
-    end_dt = datetime.strptime(sorted_days[-1], '%Y-%m-%d').date()
+def recompute_route_days(cur, route_days, chunk_days: int = 7, table_name: str = None,
+                         stats: Optional[dict] = None) -> int:
+    """Recompute route_daily_stats and route buckets for exact (route_id, day) keys.
 
-    total_rows = 0
-    curr = start_dt
-    chunk_idx = 1
-    import time as _time
-    while curr <= end_dt:
-        chunk_end = min(curr + timedelta(days=chunk_days), end_dt + timedelta(days=1))
-        t_start = f"{curr.isoformat()} 00:00:00"
-        t_end = f"{chunk_end.isoformat()} 00:00:00"
+    Only the dirty routes are deleted and re-aggregated: the keys go into a temp
+    table that the DELETE and the source scan join against, so a late leg on
+    one route no longer rebuilds every route of that day.
+    """
+    if not route_days:
+        return 0
+    keys = load_dirty_keys(cur, '_dirty_route_keys', route_days)
+    days = {day for _, day in route_days}
+    n = _recompute_daily_stats(cur, days, chunk_days, table_name, keys_table=keys, stats=stats)
+    cfg = load_distribution_config()
+    return n + _recompute_distribution_buckets(
+        cur, days, chunk_days, table_name,
+        grain='route_id',
+        bucket_table='route_daily_stats_bucket',
+        bucket_count=cfg['bucket_count'],
+        min_amount_usd=cfg['min_amount_usd'],
+        max_amount_usd=cfg['max_amount_usd'],
+        keys_table=keys, stats=stats,
+    )
 
-        c_t0 = _time.time()
-        cur.execute(
-            "DELETE FROM route_daily_stats WHERE day >= %s AND day < %s",
-            (curr.isoformat(), chunk_end.isoformat()),
-        )
 
-        cur.execute(
-            f"""
-            INSERT INTO route_daily_stats (route_id, day, tx_count, swap_count, volume_usd, fees_usd)
+def recompute_pool_days(cur, pool_days, chunk_days: int = 7, table_name: str = None,
+                        stats: Optional[dict] = None) -> int:
+    """Recompute pool buckets for exact (pool_id, day) keys (see recompute_route_days)."""
+    if not pool_days:
+        return 0
+    keys = load_dirty_keys(cur, '_dirty_pool_keys', pool_days)
+    cfg = load_distribution_config()
+    return _recompute_distribution_buckets(
+        cur, {day for _, day in pool_days}, chunk_days, table_name,
+        grain='pool_id',
+        bucket_table='liquidity_pool_daily_stats_bucket',
+        bucket_count=cfg['bucket_count'],
+        min_amount_usd=cfg['min_amount_usd'],
+        max_amount_usd=cfg['max_amount_usd'],
+        keys_table=keys, stats=stats,
+    )
+
+
+def _key_scope(keys_table: Optional[str], grain: str, target: str) -> tuple:
+    """(source join, target DELETE USING/predicate) restricting work to keys_table."""
+    if not keys_table:
+        return "", "", ""
+    join = (f"JOIN {keys_table} k ON k.key_id = s.{grain} "
+            f"AND s.ts >= k.day::timestamp AND s.ts < (k.day + 1)::timestamp")
+    return join, f"USING {keys_table} k", f"AND {target}.{grain} = k.key_id AND {target}.day = k.day"
+
+
+def hourly_cutoff(retention_days: int = None):
+    """First UTC day kept in route_hourly_stats."""
+    from datetime import datetime, timedelta, timezone
+    days = HOURLY_RETENTION_DAYS if retention_days is None else retention_days
+    return datetime.now(timezone.utc).date() - timedelta(days=days)
+
+
+def purge_hourly_stats(cur, retention_days: int = None) -> int:
+    """Drop route_hourly_stats rows older than the hourly retention window."""
+    cur.execute("DELETE FROM route_hourly_stats WHERE hour < %s::timestamp",
+                (f"{hourly_cutoff(retention_days).isoformat()} 00:00:00",))
+    return cur.rowcount
+
+
+def _route_stats_insert(target: str, bucket_col: str, bucket_expr: str,
+                        source_table: str, key_join: str) -> str:
+    """INSERT ... SELECT aggregating classified legs per (route_id, bucket);
+    selects (rows inserted, legs aggregated)."""
+    return f"""
+        WITH ins AS (
+            INSERT INTO {target} (route_id, {bucket_col}, tx_count, swap_count, volume_usd, fees_usd)
             SELECT
                 s.route_id,
-                s.ts::date AS day,
+                {bucket_expr} AS {bucket_col},
                 count(DISTINCT s.tx_hash) AS tx_count,
                 count(*) AS swap_count,
                 sum(CASE
@@ -727,30 +1013,281 @@ def recompute_daily_stats(cur, days: List[str], chunk_days: int = 7, table_name:
                     ELSE 0 END) AS volume_usd,
                 sum(s.amount_usd * COALESCE(lp.fee_bps, 0) / 10000.0) AS fees_usd
             FROM {source_table} s
+            {key_join}
             JOIN liquidity_pool lp ON s.pool_id = lp.id
             JOIN route r ON s.route_id = r.route_id
             JOIN origin_destination_pair p ON r.pair_id = p.id
             WHERE s.route_id IS NOT NULL
               AND s.ts >= %s::timestamp AND s.ts < %s::timestamp
               AND ({LEG_AMOUNT_GATE})
-            GROUP BY s.route_id, s.ts::date
-            """,
-            (t_start, t_end),
+            GROUP BY s.route_id, {bucket_expr}
+            RETURNING swap_count
+        )
+        SELECT count(*), COALESCE(sum(swap_count), 0) FROM ins
+    """
+
+
+def _rebuild_hourly_stats(cur, source_table: str, start, end,
+                          keys_table: Optional[str], stats: Optional[dict]) -> tuple:
+    """Rebuild route_hourly_stats for [start, end) (optionally keys_table
+    keys only) and then the matching route_daily_stats rows by summing hours.
+
+    Every leg of a transaction carries the block timestamp, so a tx falls in
+    exactly one hour and tx_count adds up across hours like the other sums.
+    Returns (daily rows inserted, legs aggregated).
+    """
+    key_join, _, _ = _key_scope(keys_table, 'route_id', 'route_hourly_stats')
+    hour_join = hour_using = hour_where = ""
+    if keys_table:
+        hour_join = (f"JOIN {keys_table} k ON k.key_id = h.route_id "
+                     f"AND h.hour >= k.day::timestamp AND h.hour < (k.day + 1)::timestamp")
+        hour_using = f"USING {keys_table} k"
+        hour_where = ("AND route_hourly_stats.route_id = k.key_id "
+                      "AND route_hourly_stats.hour >= k.day::timestamp "
+                      "AND route_hourly_stats.hour < (k.day + 1)::timestamp")
+    bounds = (f"{start.isoformat()} 00:00:00", f"{end.isoformat()} 00:00:00")
+
+    cur.execute(
+        f"DELETE FROM route_hourly_stats {hour_using} "
+        f"WHERE hour >= %s::timestamp AND hour < %s::timestamp {hour_where}",
+        bounds,
+    )
+    _count(stats, 'rows_deleted', cur.rowcount)
+    cur.execute(_route_stats_insert('route_hourly_stats', 'hour', "date_trunc('hour', s.ts)",
+                                    source_table, key_join), bounds)
+    n, scanned = cur.fetchone()
+    _count(stats, 'rows_inserted', n)
+
+    cur.execute(
+        f"""
+        WITH ins AS (
+            INSERT INTO route_daily_stats (route_id, day, tx_count, swap_count, volume_usd, fees_usd)
+            SELECT h.route_id, h.hour::date, sum(h.tx_count), sum(h.swap_count),
+                   sum(h.volume_usd), sum(h.fees_usd)
+            FROM route_hourly_stats h
+            {hour_join}
+            WHERE h.hour >= %s::timestamp AND h.hour < %s::timestamp
+            GROUP BY h.route_id, h.hour::date
+            RETURNING 1
+        )
+        SELECT count(*) FROM ins
+        """,
+        bounds,
+    )
+    return cur.fetchone()[0], scanned
+
+
+def _recompute_daily_stats(cur, days, chunk_days: int, table_name: str,
+                           keys_table: Optional[str] = None, stats: Optional[dict] = None) -> int:
+    source_table = (table_name or RAW_SWAP_TABLE).strip()
+    windows = _day_windows(days, chunk_days)
+    log.info("Recomputing route_daily_stats for %d days (from %s to %s)%s...",
+             sum((end - start).days for start, end in windows), windows[0][0], _last_day(windows[-1][1]),
+             f" scoped to {keys_table}" if keys_table else "")
+    key_join, delete_using, delete_where = _key_scope(keys_table, 'route_id', 'route_daily_stats')
+    hourly_from = hourly_cutoff()
+
+    total_rows = 0
+    import time as _time
+    for chunk_idx, (start, end) in enumerate(windows, 1):
+        c_t0 = _time.time()
+        cur.execute(
+            f"DELETE FROM route_daily_stats {delete_using} WHERE day >= %s AND day < %s {delete_where}",
+            (start.isoformat(), end.isoformat()),
         )
-        n = cur.rowcount
-        c_elapsed = _time.time() - c_t0
-        total_rows += n if n > 0 else 0
-        log.info("  [daily_stats chunk %d: %s .. %s] inserted %d rows (%.2fs)",
-                 chunk_idx, curr.isoformat(), (chunk_end - timedelta(days=1)).isoformat(), n if n > 0 else 0, c_elapsed)
-        curr = chunk_end
-        chunk_idx += 1
-
-    log.info("Finished recomputing route_daily_stats (%d rows inserted across %d days).",
-             total_rows, len(sorted_days))
+        _count(stats, 'rows_deleted', cur.rowcount)
+
+        # Days older than the hourly retention aggregate straight from the
+        # legs; recent days go through route_hourly_stats (one scan for both).
+        split = min(max(start, hourly_from), end)
+        n = scanned = 0
+        if start < split:
+            cur.execute(_route_stats_insert('route_daily_stats', 'day', 's.ts::date', source_table, key_join),
+                        (f"{start.isoformat()} 00:00:00", f"{split.isoformat()} 00:00:00"))
+            n, scanned = cur.fetchone()
+        if split < end:
+            n_hourly, scanned_hourly = _rebuild_hourly_stats(cur, source_table, split, end, keys_table, stats)
+            n += n_hourly
+            scanned += scanned_hourly
+        _count(stats, 'rows_inserted', n)
+        _count(stats, 'rows_scanned', scanned)
+        _refresh_pair_daily_stats(cur, start, end, keys_table, stats)
+        total_rows += n
+        log.info("  [daily_stats chunk %d: %s .. %s] inserted %d rows from %d legs (%.2fs)",
+                 chunk_idx, start.isoformat(), _last_day(end), n, scanned, _time.time() - c_t0)
+
+    new_paths = ensure_route_paths(cur, windows[0][0], windows[-1][1], keys_table)
+    log.info("Finished recomputing route_daily_stats (%d rows inserted across %d windows, %d new route paths).",
+             total_rows, len(windows), new_paths)
     return total_rows
 
 
-def recompute_distribution_buckets(cur, days: List[str], chunk_days: int = 7, table_name: str = None) -> int:
+def _refresh_pair_daily_stats(cur, start, end, keys_table: Optional[str], stats: Optional[dict]) -> int:
+    """Re-derive pair_daily_stats for [start, end) (optionally keys_table
+    keys only) from the route_daily_stats rows just written.
+
+    pair_daily_stats re-keys route_daily_stats by (origin_coin_id,
+    dest_coin_id, chain_id, day, route_id) with the measures in the index, so
+    /api/routes/analyze reads a token pair's routes with one index-only scan
+    instead of joining route/pair/chain and matching symbols per request.
+    Pairs without both coin ids are left out (they cannot be looked up).
+    """
+    key_join = delete_using = delete_where = ""
+    if keys_table:
+        key_join = f"JOIN {keys_table} k ON k.key_id = rs.route_id AND k.day = rs.day"
+        delete_using = f"USING {keys_table} k"
+        delete_where = "AND pair_daily_stats.route_id = k.key_id AND pair_daily_stats.day = k.day"
+    bounds = (start.isoformat(), end.isoformat())
+    cur.execute(f"DELETE FROM pair_daily_stats {delete_using} WHERE day >= %s AND day < %s {delete_where}",
+                bounds)
+    _count(stats, 'rows_deleted', cur.rowcount)
+    cur.execute(
+        f"""
+        INSERT INTO pair_daily_stats (origin_coin_id, dest_coin_id, chain_id, day, route_id,
+                                      tx_count, swap_count, volume_usd, fees_usd)
+        SELECT p.origin_coin_id, p.dest_coin_id, r.chain_id, rs.day, rs.route_id,
+               rs.tx_count, rs.swap_count, rs.volume_usd, rs.fees_usd
+        FROM route_daily_stats rs
+        {key_join}
+        JOIN route r ON rs.route_id = r.route_id
+        JOIN origin_destination_pair p ON r.pair_id = p.id
+        WHERE rs.day >= %s AND rs.day < %s
+          AND p.origin_coin_id IS NOT NULL AND p.dest_coin_id IS NOT NULL
+        """,
+        bounds,
+    )
+    _count(stats, 'rows_inserted', cur.rowcount)
+    return cur.rowcount
+
+
+def route_path_tokens(hops: List[tuple], origin_symbol: str, dest_symbol: str) -> tuple:
+    """``([Token, fee|protocol|network, Token, ...], cumulative fee)`` for a route.
+
+    ``hops`` are ``(token_in_sym, token_out_sym, fee_display, protocol, network)``
+    in hop order. Also used by api/routing/postgres_fetcher for routes without
+    a route_path row: a missing hop symbol falls back to the pair endpoint, a
+    'Dynamic' fee counts as 2 bps.
+    """
+    path_tokens: List[str] = []
+    for i, (token_in, token_out, fee_display, protocol, network) in enumerate(hops):
+        if i == 0:
+            path_tokens.append(token_in or origin_symbol or '')
+        path_tokens.append(f"{fee_display}|{protocol}|{network}")
+        path_tokens.append(token_out or dest_symbol or '')
+    if not path_tokens:
+        path_tokens = [origin_symbol or '', dest_symbol or '']
+
+    cum_fee = 0.0
+    for i in range(1, len(path_tokens), 2):
+        try:
+            fee_raw = path_tokens[i].split('|')[0].strip().replace('%', '')
+            if fee_raw.lower() == 'dynamic':
+                cum_fee += 0.0002
+            elif fee_raw:
+                val = float(fee_raw)
+                cum_fee += (val / 1_000_000.0 if val > 5 else val / 100.0)
+        except (ValueError, AttributeError):
+            pass
+    return path_tokens, cum_fee
+
+
+def refresh_route_paths(cur, route_ids: Optional[List[int]] = None, chunk: int = 5000) -> int:
+    """(Re)build route_path rows (path_tokens, cumulative fee) for route_ids,
+    or for every route when None. Returns the number of rows written."""
+    if route_ids is None:
+        cur.execute("SELECT route_id FROM route ORDER BY route_id")
+        route_ids = [r[0] for r in cur.fetchall()]
+    written = 0
+    route_ids = list(route_ids)
+    for i in range(0, len(route_ids), chunk):
+        ids = route_ids[i:i + chunk]
+        cur.execute("""
+            SELECT r.route_id, r.pair_id, r.hops, UPPER(p.origin_symbol), UPPER(p.dest_symbol)
+            FROM route r
+            JOIN origin_destination_pair p ON r.pair_id = p.id
+            WHERE r.route_id = ANY(%s)
+        """, (ids,))
+        routes = cur.fetchall()
+        cur.execute("""
+            SELECT
+                h.route_id,
+                UPPER(ci.symbol),
+                UPPER(co.symbol),
+                CASE WHEN lp.fee_bps IS NULL THEN 'Dynamic'
+                     ELSE (lp.fee_bps / 100.0)::text || '%%' END,
+                pr.name,
+                ch.name
+            FROM route_hop h
+            JOIN liquidity_pool lp ON h.pool_id = lp.id
+            JOIN protocol pr ON lp.protocol_id = pr.id
+            JOIN chain ch ON lp.chain_id = ch.id
+            LEFT JOIN coin_contract cic ON LOWER(cic.contract_address) = LOWER(h.token_in) AND cic.chain_id = lp.chain_id
+            LEFT JOIN coin ci ON cic.coin_id = ci.coin_id
+            LEFT JOIN coin_contract coc ON LOWER(coc.contract_address) = LOWER(h.token_out) AND coc.chain_id = lp.chain_id
+            LEFT JOIN coin co ON coc.coin_id = co.coin_id
+            WHERE h.route_id = ANY(%s)
+            ORDER BY h.route_id, h.seq
+        """, (ids,))
+        hops_by_route: Dict[int, list] = defaultdict(list)
+        for route_id, *hop in cur.fetchall():
+            hops_by_route[route_id].append(tuple(hop))
+        rows = []
+        for route_id, pair_id, hops, origin_sym, dest_sym in routes:
+            tokens, cum_fee = route_path_tokens(hops_by_route.get(route_id, []), origin_sym, dest_sym)
+            rows.append((route_id, pair_id, hops, origin_sym, dest_sym, tokens, cum_fee))
+        if rows:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO route_path (route_id, pair_id, hops, origin_symbol, dest_symbol, path_tokens, cum_fee)
+                VALUES %s
+                ON CONFLICT (route_id) DO UPDATE SET
+                    pair_id = EXCLUDED.pair_id, hops = EXCLUDED.hops,
+                    origin_symbol = EXCLUDED.origin_symbol, dest_symbol = EXCLUDED.dest_symbol,
+                    path_tokens = EXCLUDED.path_tokens, cum_fee = EXCLUDED.cum_fee,
+                    updated_at = NOW()
+            """, rows, page_size=1000)
+            written += len(rows)
+    return written
+
+
+def ensure_route_paths(cur, start, end, keys_table: Optional[str] = None) -> int:
+    """Build route_path rows for routes with stats in [start, end) that have none yet.
+
+    Routes are immutable (their id hashes the pool sequence), so a path is
+    written once; refresh_route_paths() rebuilds after pool metadata changes.
+    """
+    key_join = f"JOIN {keys_table} k ON k.key_id = rs.route_id AND k.day = rs.day" if keys_table else ""
+    cur.execute(f"""
+        SELECT DISTINCT rs.route_id
+        FROM route_daily_stats rs
+        {key_join}
+        WHERE rs.day >= %s AND rs.day < %s
+          AND NOT EXISTS (SELECT 1 FROM route_path rp WHERE rp.route_id = rs.route_id)
+    """, (start.isoformat(), end.isoformat()))
+    missing = [r[0] for r in cur.fetchall()]
+    return refresh_route_paths(cur, missing) if missing else 0
+
+
+def bump_materialization_watermark(cur, name: str = ROUTE_STATS_WATERMARK) -> int:
+    """Advance a materialization_watermark row inside the caller's
+    transaction (visible once it commits). Returns the new version."""
+    cur.execute("""
+        INSERT INTO materialization_watermark (name, version, completed_at)
+        VALUES (%s, 1, now())
+        ON CONFLICT (name) DO UPDATE
+            SET version = materialization_watermark.version + 1,
+                completed_at = EXCLUDED.completed_at
+        RETURNING version
+    """, (name,))
+    return cur.fetchone()[0]
+
+
+def _last_day(end) -> str:
+    from datetime import timedelta
+    return (end - timedelta(days=1)).isoformat()
+
+
+def recompute_distribution_buckets(cur, days: List[str], chunk_days: int = 7, table_name: str = None,
+                                   stats: Optional[dict] = None) -> int:
     """Rebuild swap-size buckets for EVERY route for the supplied days.
 
     A routed transaction contributes its first route leg once, matching the
@@ -766,10 +1303,12 @@ def recompute_distribution_buckets(cur, days: List[str], chunk_days: int = 7, ta
         bucket_count=cfg['bucket_count'],
         min_amount_usd=cfg['min_amount_usd'],
         max_amount_usd=cfg['max_amount_usd'],
+        stats=stats,
     )
 
 
-def recompute_pool_distribution_buckets(cur, days: List[str], chunk_days: int = 7, table_name: str = None) -> int:
+def recompute_pool_distribution_buckets(cur, days: List[str], chunk_days: int = 7, table_name: str = None,
+                                        stats: Optional[dict] = None) -> int:
     """Rebuild swap-size buckets for EVERY pool for the supplied days.
 
     Mirrors the route distribution buckets at the pool grain: a transaction
@@ -784,37 +1323,37 @@ def recompute_pool_distribution_buckets(cur, days: List[str], chunk_days: int =
         bucket_count=cfg['bucket_count'],
         min_amount_usd=cfg['min_amount_usd'],
         max_amount_usd=cfg['max_amount_usd'],
+        stats=stats,
     )
 
 
 def _recompute_distribution_buckets(cur, days: List[str], chunk_days: int, table_name: str,
                                     grain: str, bucket_table: str,
-                                    bucket_count: int, min_amount_usd: float, max_amount_usd: float) -> int:
+                                    bucket_count: int, min_amount_usd: float, max_amount_usd: float,
+                                    keys_table: Optional[str] = None,
+                                    stats: Optional[dict] = None) -> int:
     """Shared log-volume bucket rebuild used by the route and pool variants.
 
     Bucketing is unconditional: every route (or pool) with swap legs in the
-    window is bucketed with the supplied global parameters.
+    window is bucketed with the supplied global parameters. With ``keys_table``
+    only the (grain, day) keys listed there are deleted and rebuilt.
     """
     if not days:
         return 0
 
     source_table = (table_name or RAW_SWAP_TABLE).strip()
-
-    sorted_days = sorted(set(days))
-    from datetime import datetime, timedelta
-    start_dt = datetime.strptime(sorted_days[0], '%Y-%m-%d').date()
-    end_dt = datetime.strptime(sorted_days[-1], '%Y-%m-%d').date()
+    windows = _day_windows(days, chunk_days)
+    key_join, delete_using, delete_where = _key_scope(keys_table, grain, bucket_table)
     total_rows = 0
-    curr = start_dt
-    while curr <= end_dt:
-        chunk_end = min(curr + timedelta(days=chunk_days), end_dt + timedelta(days=1))
+    for start, end in windows:
         cur.execute(
             f"""
-            DELETE FROM {bucket_table}
-            WHERE day >= %s AND day < %s
+            DELETE FROM {bucket_table} {delete_using}
+            WHERE day >= %s AND day < %s {delete_where}
             """,
-            (curr.isoformat(), chunk_end.isoformat()),
+            (start.isoformat(), end.isoformat()),
         )
+        _count(stats, 'rows_deleted', cur.rowcount)
         cur.execute(
             f"""
             WITH first_legs AS (
@@ -825,6 +1364,7 @@ def _recompute_distribution_buckets(cur, days: List[str], chunk_days: int, table
                     s.amount_usd,
                     s.amount_usd * COALESCE(lp.fee_bps, 0) / 10000.0 AS fee_usd
                 FROM {source_table} s
+                {key_join}
                 JOIN liquidity_pool lp ON s.pool_id = lp.id
                 WHERE s.ts >= %s::timestamp
                   AND s.ts < %s::timestamp
@@ -844,32 +1384,38 @@ def _recompute_distribution_buckets(cur, days: List[str], chunk_days: int, table
                     fee_usd,
                     LN(amount_usd) AS log_amount
                 FROM first_legs
+            ), ins AS (
+                INSERT INTO {bucket_table}
+                    ({grain}, day, bucket_index, tx_count, sample_count, volume_usd, fees_usd, log_sum, log_sum2)
+                SELECT {grain}, day, bucket_index,
+                       COUNT(DISTINCT tx_hash), COUNT(*), SUM(amount_usd), SUM(fee_usd),
+                       SUM(log_amount), SUM(log_amount * log_amount)
+                FROM bucketed
+                WHERE bucket_index BETWEEN 1 AND 256
+                GROUP BY {grain}, day, bucket_index
+                ON CONFLICT ({grain}, day, bucket_index) DO UPDATE SET
+                    tx_count = EXCLUDED.tx_count,
+                    sample_count = EXCLUDED.sample_count,
+                    volume_usd = EXCLUDED.volume_usd,
+                    fees_usd = EXCLUDED.fees_usd,
+                    log_sum = EXCLUDED.log_sum,
+                    log_sum2 = EXCLUDED.log_sum2
+                RETURNING sample_count
             )
-            INSERT INTO {bucket_table}
-                ({grain}, day, bucket_index, tx_count, sample_count, volume_usd, fees_usd, log_sum, log_sum2)
-            SELECT {grain}, day, bucket_index,
-                   COUNT(DISTINCT tx_hash), COUNT(*), SUM(amount_usd), SUM(fee_usd),
-                   SUM(log_amount), SUM(log_amount * log_amount)
-            FROM bucketed
-            WHERE bucket_index BETWEEN 1 AND 256
-            GROUP BY {grain}, day, bucket_index
-            ON CONFLICT ({grain}, day, bucket_index) DO UPDATE SET
-                tx_count = EXCLUDED.tx_count,
-                sample_count = EXCLUDED.sample_count,
-                volume_usd = EXCLUDED.volume_usd,
-                fees_usd = EXCLUDED.fees_usd,
-                log_sum = EXCLUDED.log_sum,
-                log_sum2 = EXCLUDED.log_sum2
+            SELECT count(*), COALESCE(sum(sample_count), 0) FROM ins
             """,
-            (curr.isoformat(), chunk_end.isoformat(),
+            (f"{start.isoformat()} 00:00:00", f"{end.isoformat()} 00:00:00",
              min_amount_usd, max_amount_usd,
              bucket_count, min_amount_usd, max_amount_usd, bucket_count),
         )
-        total_rows += cur.rowcount if cur.rowcount > 0 else 0
-        curr = chunk_end
-
-    log.info("Rebuilt %d %s bucket rows for %d days (%s).",
-             total_rows, grain, len(sorted_days), bucket_table)
+        n, scanned = cur.fetchone()
+        _count(stats, 'rows_inserted', n)
+        _count(stats, 'rows_scanned', scanned)
+        total_rows += n
+
+    log.info("Rebuilt %d %s bucket rows for %d windows (%s%s).",
+             total_rows, grain, len(windows), bucket_table,
+             f", scoped to {keys_table}" if keys_table else "")
     return total_rows
 
 
@@ -0,0 +1,351 @@
+"""Parallel consumer for ``route_classification_queue``.
+
+The hourly DAG used to drain the queue on one connection: claim 5000 hashes,
+classify them with the per-tx ``classify_tx_hashes`` path, commit, repeat.
+Route reconstruction (pure Python) and the set-based merge never overlapped,
+and one process did all of the reconstruction.
+
+``QueueConsumer`` runs ``claimers`` threads, each with its own connection,
+claiming disjoint batches with ``FOR UPDATE SKIP LOCKED``. Reconstruction
+(``reconstruct_tx_hashes``) is sharded over one persistent process pool for the
+whole run, and each claimer pipelines: it claims and submits batch k+1 before
+merging batch k, so the pool reconstructs while the database merges. Merges
+still serialize on the route-write advisory lock, but only for the short SQL
+phase. A batch's merge, dirty keys and conditional completion commit in one
+transaction; a failed batch is released back to pending with a retry delay.
+
+Each run records queue depth, per-batch latency and legs/sec in
+``route_classification_run``; :func:`classification_health` reads them back
+for the API health endpoint.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from include.route_classifier import (
+        combine_staging, dirty_from_staging, merge_route_staging,
+        reconstruct_tx_hashes, record_dirty_keys, RAW_SWAP_TABLE,
+    )
+except ImportError:
+    from route_classifier import (
+        combine_staging, dirty_from_staging, merge_route_staging,
+        reconstruct_tx_hashes, record_dirty_keys, RAW_SWAP_TABLE,
+    )
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+MAX_BATCHES_PER_RUN = 300
+STALE_AFTER_MINUTES = 30
+RETRY_AFTER_MINUTES = 5
+CLAIMERS = int(os.getenv('ROUTE_QUEUE_CLAIMERS', '3'))
+RECONSTRUCT_WORKERS = int(os.getenv('ROUTE_QUEUE_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+SHARD_SIZE = int(os.getenv('ROUTE_QUEUE_SHARD_SIZE', '1000'))
+
+
+def recover_stale_claims(conn, stale_after_minutes: int = STALE_AFTER_MINUTES) -> int:
+    """Return claims abandoned by a crashed worker to pending."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE route_classification_queue
+            SET status = 'pending', claimed_at = NULL, updated_at = NOW(),
+                last_error = COALESCE(last_error, 'stale claim recovered')
+            WHERE status = 'processing'
+              AND claimed_at < NOW() - (%s || ' minutes')::interval
+        """, (stale_after_minutes,))
+        n = cur.rowcount
+    conn.commit()
+    return n
+
+
+def claim_batch(conn, batch_size: int = BATCH_SIZE) -> List[Tuple[str, int]]:
+    """Claim up to ``batch_size`` ready hashes; returns ``[(tx_hash, generation)]``.
+
+    SKIP LOCKED keeps concurrent claimers on disjoint rows. ``claim_token``
+    records the generation at claim time so completion can be made conditional
+    (no overwriting a newer requeue).
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE route_classification_queue q
+            SET status = 'processing', claimed_at = NOW(), updated_at = NOW(),
+                attempts = q.attempts + 1, claim_token = q.generation
+            FROM (
+                SELECT tx_hash
+                FROM route_classification_queue
+                WHERE status = 'pending' AND available_at <= NOW()
+                ORDER BY available_at DESC, tx_hash DESC
+                FOR UPDATE SKIP LOCKED
+                LIMIT %s
+            ) picked
+            WHERE q.tx_hash = picked.tx_hash
+            RETURNING q.tx_hash, q.generation
+        """, (batch_size,))
+        rows = [(row[0], row[1]) for row in cur.fetchall()]
+    conn.commit()
+    return rows
+
+
+def complete_batch(cur, claimed: List[Tuple[str, int]]) -> int:
+    """Mark claimed rows complete unless a producer requeued them meanwhile.
+
+    A requeue (new leg) bumps generation, so a worker that classified an older
+    value must NOT overwrite the requeue.
+    """
+    cur.execute("""
+        UPDATE route_classification_queue q
+        SET status = 'complete', claimed_at = NULL, updated_at = NOW(), last_error = NULL
+        FROM unnest(%s::text[], %s::bigint[]) AS c(tx_hash, generation)
+        WHERE q.tx_hash = c.tx_hash AND q.claim_token = c.generation
+              AND q.generation = c.generation
+    """, ([c[0] for c in claimed], [c[1] for c in claimed]))
+    return cur.rowcount
+
+
+def release_batch(conn, tx_hashes: List[str], error: str,
+                  retry_after_minutes: int = RETRY_AFTER_MINUTES) -> None:
+    """Return a failed batch to pending with a retry delay and the error text."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE route_classification_queue
+            SET status = 'pending', claimed_at = NULL,
+                available_at = NOW() + (%s || ' minutes')::interval,
+                updated_at = NOW(), last_error = LEFT(%s, 2000)
+            WHERE tx_hash = ANY(%s)
+        """, (retry_after_minutes, error, tx_hashes))
+    conn.commit()
+
+
+def queue_depth(cur) -> Dict[str, object]:
+    """Queue rows by status plus the ready backlog and its oldest age."""
+    cur.execute("""
+        SELECT
+            COUNT(*) FILTER (WHERE status = 'pending'),
+            COUNT(*) FILTER (WHERE status = 'pending' AND available_at <= NOW()),
+            COUNT(*) FILTER (WHERE status = 'processing'),
+            EXTRACT(EPOCH FROM NOW() - MIN(available_at) FILTER (WHERE status = 'pending'))
+        FROM route_classification_queue
+        WHERE status IN ('pending', 'processing')
+    """)
+    pending, ready, processing, oldest = cur.fetchone()
+    return {
+        'pending': pending or 0,
+        'ready': ready or 0,
+        'processing': processing or 0,
+        'oldest_pending_s': round(float(oldest), 1) if oldest is not None else None,
+    }
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+
+
+class QueueConsumer:
+    """Drains the queue with concurrent claimers feeding one process pool.
+
+    ``connect`` returns a new DB-API connection (one per claimer plus one for
+    bookkeeping). ``pool`` may be a shared ``ProcessPoolExecutor``; when None
+    the consumer starts one (spawned, so no claimer thread state is forked)
+    and shuts it down at the end of :meth:`run`.
+    """
+
+    def __init__(self, connect: Callable, claimers: int = CLAIMERS,
+                 workers: int = RECONSTRUCT_WORKERS, batch_size: int = BATCH_SIZE,
+                 max_batches: int = MAX_BATCHES_PER_RUN, shard_size: int = SHARD_SIZE,
+                 table_name: str = RAW_SWAP_TABLE, pool=None):
+        self.connect = connect
+        self.claimers = max(1, claimers)
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.shard_size = max(1, shard_size)
+        self.table_name = table_name
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._claimed_batches = 0
+        self._latencies: List[float] = []
+        self._errors: List[BaseException] = []
+        self.stats = {'batches': 0, 'failed_batches': 0, 'tx_hashes': 0, 'failed_tx_hashes': 0,
+                      'legs': 0, 'legs_updated': 0}
+
+    def run(self) -> Dict[str, object]:
+        started = datetime.now(timezone.utc)
+        t0 = time.monotonic()
+        conn = self.connect()
+        try:
+            recovered = recover_stale_claims(conn)
+            with conn.cursor() as cur:
+                depth_start = queue_depth(cur)
+            conn.commit()
+
+            owns_pool = self.pool is None
+            if owns_pool:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            try:
+                threads = [threading.Thread(target=self._claimer, name=f'route-claimer-{n}', daemon=True)
+                           for n in range(self.claimers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                if owns_pool:
+                    self.pool.shutdown(wait=True)
+                    self.pool = None
+
+            with conn.cursor() as cur:
+                depth_end = queue_depth(cur)
+                summary = self._summary(started, time.monotonic() - t0, recovered, depth_start, depth_end)
+                record_run(cur, summary)
+            conn.commit()
+        finally:
+            conn.close()
+        log.info("Route queue run: %d batches (%d failed), %d tx, %d legs in %.1fs (%.0f legs/s, "
+                 "batch p50 %s ms / p95 %s ms); ready backlog %d -> %d",
+                 summary['batches'], summary['failed_batches'], summary['tx_hashes'], summary['legs'],
+                 summary['elapsed_s'], summary['legs_per_sec'], summary['batch_p50_ms'],
+                 summary['batch_p95_ms'], depth_start['ready'], depth_end['ready'])
+        if self._errors:
+            raise self._errors[0]
+        return summary
+
+    # -- claimer thread ---------------------------------------------------
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._claimed_batches >= self.max_batches:
+                return False
+            self._claimed_batches += 1
+            return True
+
+    def _submit(self, tx_hashes: List[str]) -> list:
+        shards = [tx_hashes[i:i + self.shard_size] for i in range(0, len(tx_hashes), self.shard_size)]
+        return [self.pool.submit(reconstruct_tx_hashes, shard, self.table_name) for shard in shards]
+
+    def _claimer(self):
+        try:
+            conn = self.connect()
+        except Exception as exc:
+            with self._lock:
+                self._errors.append(exc)
+            return
+        pending = None  # (claimed, futures, claimed_at) waiting to merge
+        try:
+            while True:
+                claimed = claim_batch(conn, self.batch_size) if self._take_budget() else []
+                # Start reconstructing the next batch before merging the previous one.
+                ahead = (claimed, self._submit([c[0] for c in claimed]), time.monotonic()) if claimed else None
+                if pending:
+                    self._finish(conn, *pending)
+                pending = ahead
+                if not claimed:
+                    break
+        except Exception as exc:
+            # Queue or connection failure: stop this claimer; stale-claim
+            # recovery returns anything it still held to pending.
+            log.exception('Route queue claimer stopped')
+            with self._lock:
+                self._errors.append(exc)
+        finally:
+            if pending:
+                try:
+                    self._finish(conn, *pending)
+                except Exception:
+                    log.exception('Route queue claimer could not finish its last batch')
+            conn.close()
+
+    def _finish(self, conn, claimed, futures, claimed_at):
+        tx_hashes = [c[0] for c in claimed]
+        try:
+            candidates, assignments, _ = combine_staging([f.result() for f in futures])
+            with conn.cursor() as cur:
+                updated = 0
+                if assignments:
+                    updated = merge_route_staging(cur, candidates, assignments, table_name=self.table_name)
+                    record_dirty_keys(cur, dirty_from_staging(assignments))
+                complete_batch(cur, claimed)
+            conn.commit()
+        except Exception as exc:
+            conn.rollback()
+            release_batch(conn, tx_hashes, str(exc))
+            with self._lock:
+                self.stats['failed_batches'] += 1
+                self.stats['failed_tx_hashes'] += len(tx_hashes)
+            log.exception('Route classification batch failed')
+            return
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['tx_hashes'] += len(tx_hashes)
+            self.stats['legs'] += len(assignments)
+            self.stats['legs_updated'] += updated
+            self._latencies.append((time.monotonic() - claimed_at) * 1000.0)
+
+    def _summary(self, started, elapsed, recovered, depth_start, depth_end) -> Dict[str, object]:
+        lat = self._latencies
+        pct = _percentile
+        return dict(self.stats, **{
+            'started_at': started,
+            'elapsed_s': round(elapsed, 2),
+            'claimers': self.claimers,
+            'workers': self.workers,
+            'recovered_claims': recovered,
+            'legs_per_sec': round(self.stats['legs'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'batch_p50_ms': round(pct(lat, 50), 1) if lat else None,
+            'batch_p95_ms': round(pct(lat, 95), 1) if lat else None,
+            'batch_max_ms': round(max(lat), 1) if lat else None,
+            'queue_ready_start': depth_start['ready'],
+            'queue_ready_end': depth_end['ready'],
+            'queue_pending_end': depth_end['pending'],
+        })
+
+
+_RUN_COLUMNS = ('started_at', 'elapsed_s', 'claimers', 'workers', 'batches', 'failed_batches',
+                'tx_hashes', 'legs', 'legs_updated', 'legs_per_sec', 'batch_p50_ms', 'batch_p95_ms',
+                'batch_max_ms', 'queue_ready_start', 'queue_ready_end', 'queue_pending_end')
+
+
+def record_run(cur, summary: Dict[str, object]) -> bool:
+    """Append one run's metrics to route_classification_run. Best-effort: the
+    run's batches are already committed, so a failure (e.g. the table was
+    never migrated) is logged and rolled back instead of failing the run."""
+    try:
+        cur.execute(f"""
+            INSERT INTO route_classification_run ({', '.join(_RUN_COLUMNS)})
+            VALUES ({', '.join(['%s'] * len(_RUN_COLUMNS))})
+        """, tuple(summary.get(col) for col in _RUN_COLUMNS))
+        return True
+    except Exception as e:
+        cur.connection.rollback()
+        log.warning("Could not record route queue run metrics: %s", e)
+        return False
+
+
+def classification_health(cur, runs: int = 10) -> Dict[str, object]:
+    """Live queue depth plus the most recent consumer runs (newest first)."""
+    depth = queue_depth(cur)
+    cur.execute(f"""
+        SELECT {', '.join(_RUN_COLUMNS)}
+        FROM route_classification_run
+        ORDER BY started_at DESC
+        LIMIT %s
+    """, (runs,))
+    recent = []
+    for row in cur.fetchall():
+        item = dict(zip(_RUN_COLUMNS, row))
+        item['started_at'] = item['started_at'].isoformat() if item['started_at'] else None
+        recent.append(item)
+    return {'queue': depth, 'last_run': recent[0] if recent else None, 'recent_runs': recent}
@@ -3,12 +3,15 @@
 
 Sweeps `swaps` partition-by-partition, classifies every transaction's legs into
 (origin_destination_pair, route, route_hop), sets swaps.route_id, and finally
-recomputes route_daily_stats for all affected days. Idempotent — safe to re-run.
+recomputes route_daily_stats for all affected days. With --record-dirty the
+exact changed (route|pool, day) keys are queued for dirty_day_materializer
+instead of the final recompute. Idempotent — safe to re-run.
 
 Usage:
     python3 backfill_route_tables.py                      # everything
     python3 backfill_route_tables.py --limit-days 30      # only last 30 days
     python3 backfill_route_tables.py --table swaps_default # specific partition
+    python3 backfill_route_tables.py --table swaps_staging --record-dirty
 """
 
 import os
@@ -141,7 +144,8 @@ def classify_partition(conn, table_name: str, lo: str | None, hi: str | None,
                        batch_size: int = TX_BATCH,
                        workers: int = 1,
                        executor: ProcessPoolExecutor | None = None,
-                        chunk_limit: int = 20000) -> tuple[int, set]:
+                        chunk_limit: int = 20000,
+                       record_dirty: bool = False) -> tuple[int, set]:
     """Classify unclassified tx hashes in a swap partition in streaming chunks."""
     if unclassified_only and not dry_run:
         ensure_indexes(conn, table_name)
@@ -233,11 +237,13 @@ def classify_partition(conn, table_name: str, lo: str | None, hi: str | None,
                     log.info("  [%s] chunk %d progress: %d/%d batches complete (%d txs)",
                              table_name, chunk_num, completed_batches, len(batches), len(chunk_assignments))
             chunk_classified = _merge_staging_with_retry(
-                conn, list(chunk_candidate_map.values()), chunk_assignments, table_name
+                conn, list(chunk_candidate_map.values()), chunk_assignments, table_name,
+                record_dirty=record_dirty,
             )
         else:
             for batch in batches:
-                days = _classify_batch(conn, batch, pair_cache, route_cache, table_name)
+                days = _classify_batch(conn, batch, pair_cache, route_cache, table_name,
+                                       record_dirty=record_dirty)
                 chunk_classified += len(batch)
                 affected_days.update(days)
 
@@ -256,15 +262,19 @@ def classify_partition(conn, table_name: str, lo: str | None, hi: str | None,
     return total_partition_txs, affected_days
 
 
-def _classify_batch(conn, txs, pair_cache, route_cache, table_name):
+def _classify_batch(conn, txs, pair_cache, route_cache, table_name, record_dirty=False):
     import random
-    from include.route_classifier import collect_route_staging, merge_route_staging
+    from include.route_classifier import (
+        collect_route_staging, dirty_from_staging, merge_route_staging, record_dirty_keys,
+    )
     max_retries = 10
     for attempt in range(max_retries):
         try:
             with conn.cursor() as cur:
                 candidates, assignments, days = collect_route_staging(cur, txs, table_name=table_name)
                 merge_route_staging(cur, candidates, assignments, table_name=table_name)
+                if record_dirty:
+                    record_dirty_keys(cur, dirty_from_staging(assignments))
             conn.commit()
             return days
         except Exception as err:
@@ -277,15 +287,18 @@ def _classify_batch(conn, txs, pair_cache, route_cache, table_name):
     return []
 
 
-def _merge_staging_with_retry(conn, candidates, assignments, table_name, max_retries=8):
+def _merge_staging_with_retry(conn, candidates, assignments, table_name, max_retries=8,
+                              record_dirty=False):
     """Merge one staged batch, retrying the complete transaction on deadlock."""
-    from include.route_classifier import merge_route_staging
+    from include.route_classifier import dirty_from_staging, merge_route_staging, record_dirty_keys
     import random
 
     for attempt in range(max_retries):
         try:
             with conn.cursor() as cur:
                 updated = merge_route_staging(cur, candidates, assignments, table_name=table_name)
+                if record_dirty:
+                    record_dirty_keys(cur, dirty_from_staging(assignments))
             conn.commit()
             return updated
         except psycopg2.errors.DeadlockDetected:
@@ -323,6 +336,13 @@ def main():
                     help='Force re-classification of all transactions, even if already classified.')
     ap.add_argument('--dry-run', action='store_true',
                     help='Count only, do not write.')
+    ap.add_argument('--record-dirty', action='store_true',
+                    help='Queue exact changed (route|pool, day) keys for dirty_day_materializer '
+                         'instead of recomputing route_daily_stats for every affected day. '
+                         'Use when sweeping the materializer source table (SWAP_RAW_TABLE).')
+    ap.add_argument('--refresh-route-paths', action='store_true',
+                    help='Only rebuild route_path (display path + cumulative fee) for every route, '
+                         'e.g. after pool fee/protocol/symbol fixes, then exit.')
     args = ap.parse_args()
 
     unclassified_only = not args.reclassify_all if args.reclassify_all else args.unclassified_only
@@ -335,10 +355,21 @@ def main():
             log.error("Another route backfill is already running; exiting.")
             conn.close()
             raise SystemExit(2)
+    if args.refresh_route_paths:
+        from include.route_classifier import refresh_route_paths
+        with conn.cursor() as cur:
+            n = refresh_route_paths(cur)
+        conn.commit()
+        conn.close()
+        log.info("Rebuilt %d route paths.", n)
+        return
     pair_cache = {}
     route_cache = {}
 
     all_affected_days = set()
+    # The top-down seed does not report per-route keys; its days are always
+    # recomputed whole, even with --record-dirty.
+    seeded_days = set()
 
     # Phase 1: Top-down seed ingestion (if requested and not dry run)
     if args.seed_top > 0 and not args.dry_run:
@@ -387,7 +418,8 @@ def main():
                     batch_size=args.batch_size,
                     workers=args.workers,
                     executor=executor,
-                    chunk_limit=args.chunk_limit
+                    chunk_limit=args.chunk_limit,
+                    record_dirty=args.record_dirty,
                 )
                 grand_txs += n_txs
                 all_affected_days.update(affected_days)
@@ -401,11 +433,16 @@ def main():
                 log.info("Worker pool closed successfully.")
                 executor = None
 
-        if all_affected_days and not args.dry_run:
-            log.info("Starting daily stats recomputation across %d unique affected days...", len(all_affected_days))
+        recompute_days = all_affected_days
+        if args.record_dirty and not args.dry_run:
+            log.info("Dirty keys queued for %d affected days; dirty_day_materializer will roll them up.",
+                     len(all_affected_days))
+            recompute_days = seeded_days
+        if recompute_days and not args.dry_run:
+            log.info("Starting daily stats recomputation across %d unique affected days...", len(recompute_days))
             with conn.cursor() as cur:
                 source_table = args.table if args.table else 'swaps'
-                recompute_daily_stats(cur, sorted(all_affected_days), table_name=source_table)
+                recompute_daily_stats(cur, sorted(recompute_days), table_name=source_table)
             log.info("Committing daily stats transaction to database...")
             conn.commit()
             log.info("Daily stats committed successfully.")
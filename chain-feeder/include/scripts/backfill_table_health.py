@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Rebuild the table-health metrics behind GET /health from scratch.
+
+Run once after applying sql/create_table_health.sql (until a table is rebuilt
+/health lists it under `metrics_not_ready`); afterwards the triggers keep the
+metrics current. Each table is rebuilt in its own transaction under a SHARE
+lock, so its writers wait rather than race the rebuild. Idempotent.
+
+Usage:
+    python3 backfill_table_health.py                                  # all tables
+    python3 backfill_table_health.py --tables coin_price_history
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'chain-feeder'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'chain-feeder', 'dags'))
+
+import psycopg2
+
+from common.utils.config import DATA_WAREHOUSE_DB
+from include import table_health
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+log = logging.getLogger('backfill_table_health')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', nargs='+', choices=table_health.TABLES,
+                        help='tables to rebuild (default: all)')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.getenv('DATA_WAREHOUSE_DB', DATA_WAREHOUSE_DB))
+    try:
+        table_health.rebuild(conn, args.tables or table_health.TABLES, log.info)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
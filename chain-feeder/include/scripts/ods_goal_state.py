@@ -9,9 +9,11 @@ Usage:
     python3 ods_goal_state.py check                           # coverage report (table)
     python3 ods_goal_state.py check --json                    # machine-readable report
     python3 ods_goal_state.py gaps                            # contiguous missing ranges
-    python3 ods_goal_state.py prune                           # dry-run delete estimate
+    python3 ods_goal_state.py prune                           # dry-run estimate + partition plan
     python3 ods_goal_state.py prune --apply --batch 20000     # actually delete rows
     python3 ods_goal_state.py backfill                        # recompute missing daily stats
+    python3 ods_goal_state.py ledger-backfill                 # rebuild the coverage ledger
+    python3 ods_goal_state.py ledger-backfill --layers swaps --chunk-days 7
     python3 ods_goal_state.py --config /path/to/ods-goal-state.yaml check --json
 """
 
@@ -30,6 +32,8 @@ sys.path.insert(0, os.path.join(REPO_ROOT, 'chain-feeder', 'dags'))
 import psycopg2
 
 from common.utils.config import DATA_WAREHOUSE_DB
+from include import coverage_ledger
+from include.od_retention_planner import REWRITE_THRESHOLD, SAMPLE_ROWS, format_plan
 from include.od_retention import (
     load_goal_state,
     run_checks,
@@ -98,9 +102,19 @@ def cmd_gaps(args, goal):
 def cmd_prune(args, goal):
     conn = connect()
     try:
-        result = prune(conn, goal, today=args.today, dry_run=not args.apply, batch=args.batch)
+        result = prune(conn, goal, today=args.today, dry_run=not args.apply, batch=args.batch,
+                       rewrite_threshold=args.rewrite_threshold, sample_rows=args.sample_rows)
     finally:
         conn.close()
+    if result['plan']:
+        print("Partition plan (estimated I/O read/write per strategy, ~ = sampled):")
+        for line in format_plan(result['plan']):
+            print(f"  {line}")
+        for strategy, s in result['plan_summary'].items():
+            print(f"  {strategy:12} {s['partitions']:4} partitions {s['expired']:>12} expired rows  "
+                  f"read {s['read'] / 1048576:.0f}MB write {s['write'] / 1048576:.0f}MB "
+                  f"freed {s['freed'] / 1048576:.0f}MB")
+        print()
     counts = result['rows']
     total = sum(counts.values())
     mode = "DRY-RUN estimate" if result['dry_run'] else "DELETED"
@@ -115,6 +129,7 @@ def cmd_prune(args, goal):
             with vc.cursor() as cur:
                 for layer, table in (('swaps', 'swaps'),
                                      ('route_daily_stats', 'route_daily_stats'),
+                                     ('pair_daily_stats', 'pair_daily_stats'),
                                      ('route_daily_stats_bucket', 'route_daily_stats_bucket'),
                                      ('liquidity_pool', 'liquidity_pool_daily_stats')):
                     if counts.get(layer, 0) > 0:
@@ -130,6 +145,18 @@ def cmd_backfill(args, goal):
     print(f"Recomputed {n} days of route daily stats/buckets (0 = nothing missing).")
 
 
+def cmd_ledger_backfill(args, goal):
+    conn = connect()
+    try:
+        touched = coverage_ledger.backfill(conn, args.layers or coverage_ledger.LAYERS,
+                                           chunk_days=args.chunk_days)
+    finally:
+        conn.close()
+    for layer, n in touched.items():
+        print(f"  {layer:34} {n} keys")
+    print("Coverage ledger ready; checks and reconciliation now read it for these layers.")
+
+
 def cmd_show_rules(args, goal):
     today = args.today or date.today()
     bases = [r for r in goal['requirements'] if is_floor_requirement(r)]
@@ -193,12 +220,22 @@ def main():
     p = sub.add_parser('prune')
     p.add_argument('--apply', action='store_true', help='actually delete (default: dry-run estimate)')
     p.add_argument('--batch', type=int, default=10000)
+    p.add_argument('--rewrite-threshold', type=float, default=REWRITE_THRESHOLD,
+                   help='expired share at which a partition is rewritten instead of deleted from')
+    p.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                   help='classify partitions larger than this on a TABLESAMPLE (0 = exact counts)')
     p.set_defaults(fn=cmd_prune)
 
     p = sub.add_parser('backfill')
     p.add_argument('--chunk-days', type=int, default=7)
     p.set_defaults(fn=cmd_backfill)
 
+    p = sub.add_parser('ledger-backfill')
+    p.add_argument('--layers', nargs='+', choices=coverage_ledger.LAYERS,
+                   help='layers to rebuild (default: all)')
+    p.add_argument('--chunk-days', type=int, default=30)
+    p.set_defaults(fn=cmd_ledger_backfill)
+
     args = parser.parse_args()
     goal = load_goal_state(config_path=args.config)
     if args.config is None and goal.get('config_path'):
@@ -0,0 +1,31 @@
+-- ============================================================================
+-- Per-run metrics for the route classification queue consumer.
+--
+-- include/route_queue_consumer.QueueConsumer appends one row per DAG run:
+-- batches and legs processed, legs/sec, per-batch latency percentiles (claim
+-- to commit) and the ready backlog before and after the run. The API serves
+-- the newest rows next to the live queue depth at /health/classification.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS route_classification_run (
+    run_id            BIGSERIAL PRIMARY KEY,
+    started_at        TIMESTAMPTZ NOT NULL,
+    elapsed_s         DOUBLE PRECISION NOT NULL,
+    claimers          SMALLINT NOT NULL,
+    workers           SMALLINT NOT NULL,
+    batches           INTEGER NOT NULL,
+    failed_batches    INTEGER NOT NULL,
+    tx_hashes         INTEGER NOT NULL,
+    legs              BIGINT NOT NULL,
+    legs_updated      BIGINT NOT NULL,
+    legs_per_sec      DOUBLE PRECISION,
+    batch_p50_ms      DOUBLE PRECISION,
+    batch_p95_ms      DOUBLE PRECISION,
+    batch_max_ms      DOUBLE PRECISION,
+    queue_ready_start INTEGER,
+    queue_ready_end   INTEGER,
+    queue_pending_end INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_route_classification_run_started
+    ON route_classification_run (started_at DESC);
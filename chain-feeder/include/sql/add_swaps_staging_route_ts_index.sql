@@ -0,0 +1,21 @@
+-- ============================================================================
+-- Partial index on swaps_staging(route_id, ts) for key-scoped materialization
+--
+-- dirty_day_materializer recomputes individual (route_id, day) keys by joining
+-- a temp table of dirty keys to the raw store:
+--
+--     JOIN _dirty_route_keys k ON k.key_id = s.route_id
+--      AND s.ts >= k.day::timestamp AND s.ts < (k.day + 1)::timestamp
+--
+-- idx_swaps_staging_route is on route_id alone, so each key probe reads every
+-- leg the route ever had in the partition and filters the day afterwards. With
+-- ts as the second column the probe is a bounded range scan. Pool keys already
+-- use idx_swaps_staging_pool_ts.
+--
+-- NOTE: CONCURRENTLY is not permitted on a partitioned table, so this is a
+-- blocking CREATE INDEX. Run during a low-ingestion window.
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_swaps_staging_route_ts
+    ON swaps_staging (route_id, ts)
+    WHERE route_id IS NOT NULL;
@@ -0,0 +1,191 @@
+-- ============================================================================
+-- Coverage ledger: which days each goal-state layer holds, per pair / pool.
+--
+-- One row per (layer, key): key_id is the origin_destination_pair id for the
+-- route-attributed layers ('swaps', 'route_daily_stats',
+-- 'route_daily_stats_bucket') and the liquidity_pool id for the LP layers
+-- ('liquidity_pool' = position snapshots, 'liquidity_pool_daily_stats',
+-- 'liquidity_pool_daily_stats_bucket'). `days` is the set of covered UTC days
+-- as a datemultirange, so a year of daily data is usually a single range.
+--
+-- Maintained in the writers' own transactions:
+--   * statement-level triggers on the aggregate tables (below) add the days a
+--     statement inserts and remove days a statement leaves empty;
+--   * the route classifier marks the (pair, day)s it attributes swaps to
+--     (coverage_ledger.mark_route_days, from record_dirty_keys);
+--   * the goal-state retention prune trims the partitioned layers and the
+--     raw-swap purge refreshes the purged window (partition drops and bulk
+--     deletes on those tables fire no triggers).
+--
+-- Readers (od_retention.run_checks, reconcile.load_coverage_state) only trust
+-- a layer once coverage_ledger_layer.backfilled_at is set; until then they scan
+-- the tables as before. Backfill with `ods_goal_state.py ledger-backfill`.
+-- Requires PostgreSQL 14+ (multiranges).
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS coverage_ledger (
+    layer      TEXT NOT NULL,
+    key_id     BIGINT NOT NULL,
+    chain_id   INTEGER,
+    days       DATEMULTIRANGE NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (layer, key_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_coverage_ledger_layer_chain
+    ON coverage_ledger (layer, chain_id);
+
+CREATE TABLE IF NOT EXISTS coverage_ledger_layer (
+    layer         TEXT PRIMARY KEY,
+    backfilled_at TIMESTAMPTZ
+);
+
+-- Route aggregates (keyed by route_id) -> pair coverage. TG_ARGV[0] = layer.
+CREATE OR REPLACE FUNCTION coverage_ledger_route_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT TG_ARGV[0], k.pair_id, k.chain_id, k.days
+    FROM (
+        SELECT r.pair_id, MIN(r.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT route_id, day FROM new_rows) n
+        JOIN route r ON r.route_id = n.route_id
+        GROUP BY r.pair_id
+        ORDER BY r.pair_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION coverage_ledger_route_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format($q$
+        WITH gone AS (
+            SELECT DISTINCT r.pair_id, o.day
+            FROM (SELECT DISTINCT route_id, day FROM old_rows) o
+            JOIN route r ON r.route_id = o.route_id
+        ), still AS (
+            SELECT DISTINCT r.pair_id, t.day
+            FROM %I t
+            JOIN route r ON r.route_id = t.route_id
+            WHERE t.day IN (SELECT day FROM gone)
+              AND r.pair_id IN (SELECT pair_id FROM gone)
+        ), emptied AS (
+            SELECT g.pair_id, range_agg(daterange(g.day, g.day + 1)) AS days
+            FROM gone g
+            LEFT JOIN still s ON s.pair_id = g.pair_id AND s.day = g.day
+            WHERE s.pair_id IS NULL
+            GROUP BY g.pair_id
+        )
+        UPDATE coverage_ledger c
+        SET days = c.days - e.days, updated_at = NOW()
+        FROM emptied e
+        WHERE c.layer = $1 AND c.key_id = e.pair_id AND c.days && e.days
+    $q$, TG_TABLE_NAME) USING TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+-- Pool aggregates (keyed by pool_id) -> pool coverage. TG_ARGV[0] = layer.
+CREATE OR REPLACE FUNCTION coverage_ledger_pool_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT TG_ARGV[0], k.pool_id, k.chain_id, k.days
+    FROM (
+        SELECT n.pool_id, MIN(lp.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT pool_id, day FROM new_rows) n
+        LEFT JOIN liquidity_pool lp ON lp.id = n.pool_id
+        GROUP BY n.pool_id
+        ORDER BY n.pool_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION coverage_ledger_pool_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format($q$
+        WITH gone AS (
+            SELECT DISTINCT pool_id, day FROM old_rows
+        ), still AS (
+            SELECT DISTINCT t.pool_id, t.day
+            FROM %I t
+            WHERE t.pool_id IN (SELECT pool_id FROM gone)
+              AND t.day IN (SELECT day FROM gone)
+        ), emptied AS (
+            SELECT g.pool_id, range_agg(daterange(g.day, g.day + 1)) AS days
+            FROM gone g
+            LEFT JOIN still s ON s.pool_id = g.pool_id AND s.day = g.day
+            WHERE s.pool_id IS NULL
+            GROUP BY g.pool_id
+        )
+        UPDATE coverage_ledger c
+        SET days = c.days - e.days, updated_at = NOW()
+        FROM emptied e
+        WHERE c.layer = $1 AND c.key_id = e.pool_id AND c.days && e.days
+    $q$, TG_TABLE_NAME) USING TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+-- Position snapshots (keyed by position_id, timestamped) -> pool coverage.
+-- Inserts only: snapshots are removed by retention, which trims the ledger.
+CREATE OR REPLACE FUNCTION coverage_ledger_snapshot_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT 'liquidity_pool', k.pool_id, k.chain_id, k.days
+    FROM (
+        SELECT p.pool_id, MIN(lp.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT position_id, timestamp::date AS day FROM new_rows) n
+        JOIN liquidity_pool_position p ON p.id = n.position_id
+        LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id
+        WHERE p.pool_id IS NOT NULL
+        GROUP BY p.pool_id
+        ORDER BY p.pool_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_ins
+    AFTER INSERT ON route_daily_stats REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_insert('route_daily_stats');
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_del
+    AFTER DELETE ON route_daily_stats REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_delete('route_daily_stats');
+
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_bucket_ins
+    AFTER INSERT ON route_daily_stats_bucket REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_insert('route_daily_stats_bucket');
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_bucket_del
+    AFTER DELETE ON route_daily_stats_bucket REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_delete('route_daily_stats_bucket');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_ins
+    AFTER INSERT ON liquidity_pool_daily_stats REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_insert('liquidity_pool_daily_stats');
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_del
+    AFTER DELETE ON liquidity_pool_daily_stats REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_delete('liquidity_pool_daily_stats');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_bucket_ins
+    AFTER INSERT ON liquidity_pool_daily_stats_bucket REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_insert('liquidity_pool_daily_stats_bucket');
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_bucket_del
+    AFTER DELETE ON liquidity_pool_daily_stats_bucket REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_delete('liquidity_pool_daily_stats_bucket');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_snapshot_ins
+    AFTER INSERT ON liquidity_pool_position_snapshot REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_snapshot_insert();
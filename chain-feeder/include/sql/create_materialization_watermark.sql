@@ -0,0 +1,23 @@
+-- ============================================================================
+-- Completion watermark of the route-stats materialization.
+--
+-- One row per materialized read model. dirty_day_materializer and
+-- route_daily_stats_rollup bump the 'route_stats' row in the same transaction
+-- as their recompute, so a new version is visible exactly when the rewritten
+-- route_daily_stats / route_hourly_stats / pair_daily_stats / bucket rows are.
+-- The API response cache (api/routing/response_cache.py) stamps each cached
+-- /api/routes/analyze, /api/swap-time-series and /api/swap-distribution
+-- result with the version it was computed under and recomputes once the
+-- version moves. Without this table the API still coalesces identical
+-- concurrent requests but caches nothing.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS materialization_watermark (
+    name         TEXT PRIMARY KEY,
+    version      BIGINT NOT NULL DEFAULT 0,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO materialization_watermark (name, version)
+VALUES ('route_stats', 1)
+ON CONFLICT (name) DO NOTHING;
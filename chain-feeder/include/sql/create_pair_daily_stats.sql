@@ -0,0 +1,67 @@
+-- ============================================================================
+-- Read model for /api/routes/analyze: token-pair daily rollup + route paths.
+--
+-- pair_daily_stats re-keys route_daily_stats by
+-- (origin_coin_id, dest_coin_id, chain_id, day, route_id) and carries the
+-- measures in the primary-key index, so one pair over any window is a single
+-- index-only range scan (no route/pair/chain join, no UPPER(symbol) filter).
+-- route_classifier re-derives it with every route_daily_stats recompute.
+--
+-- route_path holds each route's display path ([Token, fee|protocol|network,
+-- Token, ...]) and cumulative fee, written once per route by the same
+-- recompute (routes are immutable). After pool fee/protocol/symbol fixes,
+-- rebuild it with:
+--   python include/scripts/backfill_route_tables.py --refresh-route-paths
+--
+-- Apply via:  psql "$DATA_WAREHOUSE_DB" -f create_pair_daily_stats.sql
+-- then run the command above once to fill route_path for existing routes.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pair_daily_stats (
+    origin_coin_id INTEGER NOT NULL,
+    dest_coin_id   INTEGER NOT NULL,
+    chain_id       SMALLINT NOT NULL,
+    day            DATE NOT NULL,
+    route_id       BIGINT NOT NULL REFERENCES route(route_id) ON DELETE CASCADE,
+    tx_count       INT NOT NULL DEFAULT 0,
+    swap_count     INT NOT NULL DEFAULT 0,
+    volume_usd     DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fees_usd       DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (origin_coin_id, dest_coin_id, chain_id, day, route_id)
+        INCLUDE (tx_count, swap_count, volume_usd)
+);
+
+-- Key-scoped deletes from the dirty-day materializer.
+CREATE INDEX IF NOT EXISTS idx_pair_daily_stats_route_day ON pair_daily_stats (route_id, day);
+
+CREATE TABLE IF NOT EXISTS route_path (
+    route_id      BIGINT PRIMARY KEY REFERENCES route(route_id) ON DELETE CASCADE,
+    pair_id       BIGINT NOT NULL,
+    hops          SMALLINT NOT NULL,
+    origin_symbol VARCHAR(20),
+    dest_symbol   VARCHAR(20),
+    path_tokens   TEXT[] NOT NULL,
+    cum_fee       DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Covering index: the analyze lookup by route_id never touches the heap.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_route_path_covering
+    ON route_path (route_id) INCLUDE (pair_id, hops, origin_symbol, dest_symbol, path_tokens, cum_fee);
+
+-- Backfill the rollup from the existing daily stats.
+INSERT INTO pair_daily_stats (origin_coin_id, dest_coin_id, chain_id, day, route_id,
+                              tx_count, swap_count, volume_usd, fees_usd)
+SELECT p.origin_coin_id, p.dest_coin_id, r.chain_id, rs.day, rs.route_id,
+       rs.tx_count, rs.swap_count, rs.volume_usd, rs.fees_usd
+FROM route_daily_stats rs
+JOIN route r ON rs.route_id = r.route_id
+JOIN origin_destination_pair p ON r.pair_id = p.id
+WHERE p.origin_coin_id IS NOT NULL AND p.dest_coin_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+COMMIT;
+
+VACUUM ANALYZE pair_daily_stats;
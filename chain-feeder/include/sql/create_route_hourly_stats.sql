@@ -0,0 +1,22 @@
+-- ============================================================================
+-- Hourly route aggregate for intraday time series.
+--
+-- Same measures as route_daily_stats at (route_id, hour) grain. It is rebuilt
+-- by the same recompute paths (dirty_day_materializer, route_daily_stats_rollup,
+-- backfill): for days inside ROUTE_HOURLY_RETENTION_DAYS the legs are
+-- aggregated into hours once and route_daily_stats is summed from those hours.
+-- dirty_day_materializer deletes hours older than the retention window.
+-- /api/swap-time-series?interval=hour reads only this table.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS route_hourly_stats (
+    route_id   BIGINT NOT NULL REFERENCES route(route_id) ON DELETE CASCADE,
+    hour       TIMESTAMPTZ NOT NULL,
+    tx_count   INT NOT NULL DEFAULT 0,
+    swap_count INT NOT NULL DEFAULT 0,
+    volume_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fees_usd   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (route_id, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_route_hourly_stats_hour ON route_hourly_stats (hour);
@@ -0,0 +1,224 @@
+-- ============================================================================
+-- Table-health metrics behind GET /health.
+--
+-- table_health_daily: per (table, chain, protocol, day) counters -- rows,
+--   summed tx count and USD volume, and for liquidity_pool_daily_stats the
+--   rows with a positive TVL.
+-- table_health_key: per (table, pool / position / coin / route) state -- first
+--   and last day with rows; for liquidity_pool_daily_stats also the days with
+--   a positive TVL (datemultirange) and the trailing 7-day tx count / volume
+--   that the volume thresholds filter on, as of window_day. A pool that gets
+--   no writes keeps an old window: /health re-derives windows older than
+--   today, and the daily rollup refreshes them (table_health.refresh_windows).
+--
+-- A statement-level trigger on each tracked table applies the delta of every
+-- INSERT / UPDATE / DELETE in the writer's own transaction, so the rollup,
+-- classifier/materializer and ingestion jobs emit the counters as they run.
+-- Partition drops and rewrites fire no triggers; the goal-state retention
+-- refreshes the affected day range (table_health.refresh_range).
+--
+-- table_health_table.rebuilt_at marks a table as rebuilt from scratch
+-- (`backfill_table_health.py`); /health reports tables without it as not
+-- ready. Requires PostgreSQL 14+ (multiranges).
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS table_health_daily (
+    table_name  TEXT NOT NULL,
+    chain_id    INTEGER NOT NULL DEFAULT 0,
+    protocol_id INTEGER NOT NULL DEFAULT 0,
+    day         DATE NOT NULL,
+    row_count   BIGINT NOT NULL DEFAULT 0,
+    tx_count    BIGINT NOT NULL DEFAULT 0,
+    volume_usd  DOUBLE PRECISION NOT NULL DEFAULT 0,
+    valid_count BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, chain_id, protocol_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS table_health_key (
+    table_name  TEXT NOT NULL,
+    key_id      BIGINT NOT NULL,
+    chain_id    INTEGER NOT NULL DEFAULT 0,
+    protocol_id INTEGER NOT NULL DEFAULT 0,
+    first_day   DATE,
+    last_day    DATE,
+    valid_days  DATEMULTIRANGE NOT NULL DEFAULT '{}',
+    tx_7d       BIGINT NOT NULL DEFAULT 0,
+    volume_7d   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    window_day  DATE,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, key_id)
+);
+
+ALTER TABLE table_health_key ADD COLUMN IF NOT EXISTS window_day DATE;
+
+CREATE TABLE IF NOT EXISTS table_health_table (
+    table_name TEXT PRIMARY KEY,
+    rebuilt_at TIMESTAMPTZ
+);
+
+-- Normalized rows of a tracked table (or one of its transition tables):
+-- key_id, chain_id, protocol_id, day, tx, volume, valid.
+CREATE OR REPLACE FUNCTION table_health_rows(tbl TEXT, rel TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT format('SELECT * FROM (%s) r (key_id, chain_id, protocol_id, day, tx, volume, valid)', CASE tbl
+        WHEN 'liquidity_pool_daily_stats' THEN format(
+            'SELECT t.pool_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0), t.day,
+                    COALESCE(t.tx_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8,
+                    COALESCE(t.tvl_usd, 0) > 0
+             FROM %I t LEFT JOIN liquidity_pool lp ON lp.id = t.pool_id', rel)
+        WHEN 'liquidity_pool_position_snapshot' THEN format(
+            'SELECT t.position_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0),
+                    t.timestamp::date, 0::bigint, 0::float8, false
+             FROM %I t
+             LEFT JOIN liquidity_pool_position p ON p.id = t.position_id
+             LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id', rel)
+        WHEN 'liquidity_pool_position_event' THEN format(
+            'SELECT t.position_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0),
+                    t.timestamp::date, 1::bigint, COALESCE(t.amount_usd, 0)::float8, false
+             FROM %I t
+             LEFT JOIN liquidity_pool_position p ON p.id = t.position_id
+             LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id', rel)
+        WHEN 'coin_price_history' THEN format(
+            'SELECT t.coin_id::bigint, 0, 0, t.timestamp::date, 0::bigint, 0::float8, false
+             FROM %I t', rel)
+        WHEN 'route_daily_stats' THEN format(
+            'SELECT t.route_id::bigint, COALESCE(r.chain_id, 0), 0, t.day,
+                    COALESCE(t.swap_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8, false
+             FROM %I t LEFT JOIN route r ON r.route_id = t.route_id', rel)
+        WHEN 'route_daily_stats_bucket' THEN format(
+            'SELECT t.route_id::bigint, COALESCE(r.chain_id, 0), 0, t.day,
+                    COALESCE(t.tx_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8, false
+             FROM %I t LEFT JOIN route r ON r.route_id = t.route_id', rel)
+    END)
+$$;
+
+-- Key and time columns of a tracked table.
+CREATE OR REPLACE FUNCTION table_health_columns(tbl TEXT, OUT key_col TEXT, OUT day_col TEXT)
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE tbl
+               WHEN 'liquidity_pool_daily_stats' THEN 'pool_id'
+               WHEN 'coin_price_history' THEN 'coin_id'
+               WHEN 'route_daily_stats' THEN 'route_id'
+               WHEN 'route_daily_stats_bucket' THEN 'route_id'
+               ELSE 'position_id' END,
+           CASE WHEN tbl IN ('liquidity_pool_daily_stats', 'route_daily_stats', 'route_daily_stats_bucket')
+                THEN 'day' ELSE 'timestamp' END
+$$;
+
+CREATE OR REPLACE FUNCTION table_health_capture() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    tbl    TEXT := TG_TABLE_NAME;
+    signed TEXT;
+    cols   RECORD;
+BEGIN
+    -- Signed rows: +1 for the new image, -1 for the old one.
+    signed := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT n.*, 1 AS sign FROM (%s) n', table_health_rows(tbl, 'new_rows'))
+        WHEN 'DELETE' THEN format('SELECT o.*, -1 AS sign FROM (%s) o', table_health_rows(tbl, 'old_rows'))
+        ELSE format('SELECT n.*, 1 AS sign FROM (%s) n UNION ALL SELECT o.*, -1 FROM (%s) o',
+                    table_health_rows(tbl, 'new_rows'), table_health_rows(tbl, 'old_rows'))
+    END;
+    SELECT * INTO cols FROM table_health_columns(tbl);
+
+    EXECUTE format($q$
+        INSERT INTO table_health_daily AS d
+            (table_name, chain_id, protocol_id, day, row_count, tx_count, volume_usd, valid_count)
+        SELECT $1, chain_id, protocol_id, day, SUM(sign), SUM(sign * tx), SUM(sign * volume),
+               SUM(sign * valid::int)
+        FROM (%s) s
+        GROUP BY chain_id, protocol_id, day
+        ORDER BY chain_id, protocol_id, day
+        ON CONFLICT (table_name, chain_id, protocol_id, day) DO UPDATE
+            SET row_count = d.row_count + EXCLUDED.row_count,
+                tx_count = d.tx_count + EXCLUDED.tx_count,
+                volume_usd = d.volume_usd + EXCLUDED.volume_usd,
+                valid_count = d.valid_count + EXCLUDED.valid_count,
+                updated_at = NOW()
+    $q$, signed) USING tbl;
+
+    IF TG_OP <> 'DELETE' THEN
+        -- New days only widen a key's extent; TVL flips move its valid days.
+        EXECUTE format($q$
+            INSERT INTO table_health_key AS k
+                (table_name, key_id, chain_id, protocol_id, first_day, last_day, valid_days)
+            SELECT $1, key_id, MIN(chain_id), MIN(protocol_id), MIN(day), MAX(day),
+                   COALESCE(range_agg(daterange(day, day + 1)) FILTER (WHERE valid), '{}')
+            FROM (%s) n
+            GROUP BY key_id
+            ORDER BY key_id
+            ON CONFLICT (table_name, key_id) DO UPDATE
+                SET chain_id = EXCLUDED.chain_id,
+                    protocol_id = EXCLUDED.protocol_id,
+                    first_day = LEAST(k.first_day, EXCLUDED.first_day),
+                    last_day = GREATEST(k.last_day, EXCLUDED.last_day),
+                    valid_days = k.valid_days + EXCLUDED.valid_days,
+                    updated_at = NOW()
+        $q$, table_health_rows(tbl, 'new_rows')) USING tbl;
+    END IF;
+    IF TG_OP = 'UPDATE' AND tbl = 'liquidity_pool_daily_stats' THEN
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET valid_days = k.valid_days - g.days
+            FROM (
+                SELECT key_id, range_agg(daterange(day, day + 1)) AS days
+                FROM (%s) n WHERE NOT valid GROUP BY key_id
+            ) g
+            WHERE k.table_name = $1 AND k.key_id = g.key_id AND k.valid_days && g.days
+        $q$, table_health_rows(tbl, 'new_rows')) USING tbl;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        -- Deletes can shrink a key's extent: re-read it through the key index.
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET first_day = (SELECT MIN(t.%2$I)::date FROM %1$I t WHERE t.%3$I = k.key_id),
+                last_day = (SELECT MAX(t.%2$I)::date FROM %1$I t WHERE t.%3$I = k.key_id),
+                valid_days = k.valid_days - COALESCE(g.days, '{}'),
+                updated_at = NOW()
+            FROM (
+                SELECT key_id, range_agg(daterange(day, day + 1)) AS days
+                FROM (%4$s) o GROUP BY key_id
+            ) g
+            WHERE k.table_name = $1 AND k.key_id = g.key_id
+        $q$, tbl, cols.day_col, cols.key_col, table_health_rows(tbl, 'old_rows')) USING tbl;
+        DELETE FROM table_health_key WHERE table_name = tbl AND first_day IS NULL;
+    END IF;
+
+    IF tbl = 'liquidity_pool_daily_stats' THEN
+        -- Trailing 7-day activity of the touched pools (PK range scans).
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET tx_7d = COALESCE(w.tx, 0), volume_7d = COALESCE(w.volume, 0),
+                window_day = CURRENT_DATE, updated_at = NOW()
+            FROM (SELECT DISTINCT key_id FROM (%s) s) g
+            LEFT JOIN LATERAL (
+                SELECT SUM(t.tx_count)::bigint AS tx, SUM(t.volume_usd) AS volume
+                FROM liquidity_pool_daily_stats t
+                WHERE t.pool_id = g.key_id
+                  AND t.day >= CURRENT_DATE - 7 AND t.day < CURRENT_DATE
+            ) w ON true
+            WHERE k.table_name = $1 AND k.key_id = g.key_id
+        $q$, signed) USING tbl;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DO $$
+DECLARE
+    tbl TEXT;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['liquidity_pool_daily_stats', 'liquidity_pool_position_snapshot',
+                               'liquidity_pool_position_event', 'coin_price_history',
+                               'route_daily_stats', 'route_daily_stats_bucket'] LOOP
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_ins AFTER INSERT ON %1$I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_upd AFTER UPDATE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_del AFTER DELETE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+    END LOOP;
+END $$;
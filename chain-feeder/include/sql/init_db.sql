@@ -493,6 +493,59 @@ CREATE TABLE IF NOT EXISTS route_daily_stats (
 );
 
 CREATE INDEX IF NOT EXISTS idx_route_daily_stats_day ON route_daily_stats (day);
+
+-- Intraday route aggregate; recent days only (ROUTE_HOURLY_RETENTION_DAYS).
+CREATE TABLE IF NOT EXISTS route_hourly_stats (
+    route_id   BIGINT NOT NULL REFERENCES route(route_id) ON DELETE CASCADE,
+    hour       TIMESTAMPTZ NOT NULL,
+    tx_count   INT NOT NULL DEFAULT 0,
+    swap_count INT NOT NULL DEFAULT 0,
+    volume_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fees_usd   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (route_id, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_route_hourly_stats_hour ON route_hourly_stats (hour);
+
+-- Token-pair rollup + route display paths for /api/routes/analyze
+-- (see create_pair_daily_stats.sql).
+CREATE TABLE IF NOT EXISTS pair_daily_stats (
+    origin_coin_id INTEGER NOT NULL,
+    dest_coin_id   INTEGER NOT NULL,
+    chain_id       SMALLINT NOT NULL,
+    day            DATE NOT NULL,
+    route_id       BIGINT NOT NULL REFERENCES route(route_id) ON DELETE CASCADE,
+    tx_count       INT NOT NULL DEFAULT 0,
+    swap_count     INT NOT NULL DEFAULT 0,
+    volume_usd     DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fees_usd       DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (origin_coin_id, dest_coin_id, chain_id, day, route_id)
+        INCLUDE (tx_count, swap_count, volume_usd)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pair_daily_stats_route_day ON pair_daily_stats (route_id, day);
+
+CREATE TABLE IF NOT EXISTS route_path (
+    route_id      BIGINT PRIMARY KEY REFERENCES route(route_id) ON DELETE CASCADE,
+    pair_id       BIGINT NOT NULL,
+    hops          SMALLINT NOT NULL,
+    origin_symbol VARCHAR(20),
+    dest_symbol   VARCHAR(20),
+    path_tokens   TEXT[] NOT NULL,
+    cum_fee       DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_route_path_covering
+    ON route_path (route_id) INCLUDE (pair_id, hops, origin_symbol, dest_symbol, path_tokens, cum_fee);
+
+-- Completion watermark of the route-stats recomputes; invalidates the API
+-- response cache (see create_materialization_watermark.sql).
+CREATE TABLE IF NOT EXISTS materialization_watermark (
+    name         TEXT PRIMARY KEY,
+    version      BIGINT NOT NULL DEFAULT 0,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
 CREATE INDEX IF NOT EXISTS idx_route_hop_pool ON route_hop (pool_id);
 CREATE INDEX IF NOT EXISTS idx_route_pair ON route (pair_id);
 
@@ -532,6 +585,376 @@ CREATE TABLE IF NOT EXISTS liquidity_pool_daily_stats_bucket (
 CREATE INDEX IF NOT EXISTS idx_lp_daily_stats_bucket_day
     ON liquidity_pool_daily_stats_bucket (day, pool_id);
 
+-- 8.8 Per-(layer, pair / pool) day coverage for goal-state and reconciliation
+-- reads, maintained by the triggers below (see create_coverage_ledger.sql).
+CREATE TABLE IF NOT EXISTS coverage_ledger (
+    layer      TEXT NOT NULL,
+    key_id     BIGINT NOT NULL,
+    chain_id   INTEGER,
+    days       DATEMULTIRANGE NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (layer, key_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_coverage_ledger_layer_chain
+    ON coverage_ledger (layer, chain_id);
+
+CREATE TABLE IF NOT EXISTS coverage_ledger_layer (
+    layer         TEXT PRIMARY KEY,
+    backfilled_at TIMESTAMPTZ
+);
+
+-- Route aggregates (keyed by route_id) -> pair coverage. TG_ARGV[0] = layer.
+CREATE OR REPLACE FUNCTION coverage_ledger_route_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT TG_ARGV[0], k.pair_id, k.chain_id, k.days
+    FROM (
+        SELECT r.pair_id, MIN(r.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT route_id, day FROM new_rows) n
+        JOIN route r ON r.route_id = n.route_id
+        GROUP BY r.pair_id
+        ORDER BY r.pair_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION coverage_ledger_route_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format($q$
+        WITH gone AS (
+            SELECT DISTINCT r.pair_id, o.day
+            FROM (SELECT DISTINCT route_id, day FROM old_rows) o
+            JOIN route r ON r.route_id = o.route_id
+        ), still AS (
+            SELECT DISTINCT r.pair_id, t.day
+            FROM %I t
+            JOIN route r ON r.route_id = t.route_id
+            WHERE t.day IN (SELECT day FROM gone)
+              AND r.pair_id IN (SELECT pair_id FROM gone)
+        ), emptied AS (
+            SELECT g.pair_id, range_agg(daterange(g.day, g.day + 1)) AS days
+            FROM gone g
+            LEFT JOIN still s ON s.pair_id = g.pair_id AND s.day = g.day
+            WHERE s.pair_id IS NULL
+            GROUP BY g.pair_id
+        )
+        UPDATE coverage_ledger c
+        SET days = c.days - e.days, updated_at = NOW()
+        FROM emptied e
+        WHERE c.layer = $1 AND c.key_id = e.pair_id AND c.days && e.days
+    $q$, TG_TABLE_NAME) USING TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+-- Pool aggregates (keyed by pool_id) -> pool coverage. TG_ARGV[0] = layer.
+CREATE OR REPLACE FUNCTION coverage_ledger_pool_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT TG_ARGV[0], k.pool_id, k.chain_id, k.days
+    FROM (
+        SELECT n.pool_id, MIN(lp.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT pool_id, day FROM new_rows) n
+        LEFT JOIN liquidity_pool lp ON lp.id = n.pool_id
+        GROUP BY n.pool_id
+        ORDER BY n.pool_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION coverage_ledger_pool_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format($q$
+        WITH gone AS (
+            SELECT DISTINCT pool_id, day FROM old_rows
+        ), still AS (
+            SELECT DISTINCT t.pool_id, t.day
+            FROM %I t
+            WHERE t.pool_id IN (SELECT pool_id FROM gone)
+              AND t.day IN (SELECT day FROM gone)
+        ), emptied AS (
+            SELECT g.pool_id, range_agg(daterange(g.day, g.day + 1)) AS days
+            FROM gone g
+            LEFT JOIN still s ON s.pool_id = g.pool_id AND s.day = g.day
+            WHERE s.pool_id IS NULL
+            GROUP BY g.pool_id
+        )
+        UPDATE coverage_ledger c
+        SET days = c.days - e.days, updated_at = NOW()
+        FROM emptied e
+        WHERE c.layer = $1 AND c.key_id = e.pool_id AND c.days && e.days
+    $q$, TG_TABLE_NAME) USING TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+-- Position snapshots (keyed by position_id, timestamped) -> pool coverage.
+-- Inserts only: snapshots are removed by retention, which trims the ledger.
+CREATE OR REPLACE FUNCTION coverage_ledger_snapshot_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO coverage_ledger AS c (layer, key_id, chain_id, days)
+    SELECT 'liquidity_pool', k.pool_id, k.chain_id, k.days
+    FROM (
+        SELECT p.pool_id, MIN(lp.chain_id) AS chain_id,
+               range_agg(daterange(n.day, n.day + 1)) AS days
+        FROM (SELECT DISTINCT position_id, timestamp::date AS day FROM new_rows) n
+        JOIN liquidity_pool_position p ON p.id = n.position_id
+        LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id
+        WHERE p.pool_id IS NOT NULL
+        GROUP BY p.pool_id
+        ORDER BY p.pool_id
+    ) k
+    ON CONFLICT (layer, key_id) DO UPDATE
+        SET days = c.days + EXCLUDED.days, updated_at = NOW()
+        WHERE NOT c.days @> EXCLUDED.days;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_ins
+    AFTER INSERT ON route_daily_stats REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_insert('route_daily_stats');
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_del
+    AFTER DELETE ON route_daily_stats REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_delete('route_daily_stats');
+
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_bucket_ins
+    AFTER INSERT ON route_daily_stats_bucket REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_insert('route_daily_stats_bucket');
+CREATE OR REPLACE TRIGGER trg_coverage_route_daily_stats_bucket_del
+    AFTER DELETE ON route_daily_stats_bucket REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_route_delete('route_daily_stats_bucket');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_ins
+    AFTER INSERT ON liquidity_pool_daily_stats REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_insert('liquidity_pool_daily_stats');
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_del
+    AFTER DELETE ON liquidity_pool_daily_stats REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_delete('liquidity_pool_daily_stats');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_bucket_ins
+    AFTER INSERT ON liquidity_pool_daily_stats_bucket REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_insert('liquidity_pool_daily_stats_bucket');
+CREATE OR REPLACE TRIGGER trg_coverage_lp_daily_stats_bucket_del
+    AFTER DELETE ON liquidity_pool_daily_stats_bucket REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_pool_delete('liquidity_pool_daily_stats_bucket');
+
+CREATE OR REPLACE TRIGGER trg_coverage_lp_snapshot_ins
+    AFTER INSERT ON liquidity_pool_position_snapshot REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coverage_ledger_snapshot_insert();
+
+-- 8.9 Table-health metrics behind GET /health, maintained by the triggers
+-- below (see create_table_health.sql).
+CREATE TABLE IF NOT EXISTS table_health_daily (
+    table_name  TEXT NOT NULL,
+    chain_id    INTEGER NOT NULL DEFAULT 0,
+    protocol_id INTEGER NOT NULL DEFAULT 0,
+    day         DATE NOT NULL,
+    row_count   BIGINT NOT NULL DEFAULT 0,
+    tx_count    BIGINT NOT NULL DEFAULT 0,
+    volume_usd  DOUBLE PRECISION NOT NULL DEFAULT 0,
+    valid_count BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, chain_id, protocol_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS table_health_key (
+    table_name  TEXT NOT NULL,
+    key_id      BIGINT NOT NULL,
+    chain_id    INTEGER NOT NULL DEFAULT 0,
+    protocol_id INTEGER NOT NULL DEFAULT 0,
+    first_day   DATE,
+    last_day    DATE,
+    valid_days  DATEMULTIRANGE NOT NULL DEFAULT '{}',
+    tx_7d       BIGINT NOT NULL DEFAULT 0,
+    volume_7d   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    window_day  DATE,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, key_id)
+);
+
+CREATE TABLE IF NOT EXISTS table_health_table (
+    table_name TEXT PRIMARY KEY,
+    rebuilt_at TIMESTAMPTZ
+);
+
+-- Normalized rows of a tracked table (or one of its transition tables):
+-- key_id, chain_id, protocol_id, day, tx, volume, valid.
+CREATE OR REPLACE FUNCTION table_health_rows(tbl TEXT, rel TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT format('SELECT * FROM (%s) r (key_id, chain_id, protocol_id, day, tx, volume, valid)', CASE tbl
+        WHEN 'liquidity_pool_daily_stats' THEN format(
+            'SELECT t.pool_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0), t.day,
+                    COALESCE(t.tx_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8,
+                    COALESCE(t.tvl_usd, 0) > 0
+             FROM %I t LEFT JOIN liquidity_pool lp ON lp.id = t.pool_id', rel)
+        WHEN 'liquidity_pool_position_snapshot' THEN format(
+            'SELECT t.position_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0),
+                    t.timestamp::date, 0::bigint, 0::float8, false
+             FROM %I t
+             LEFT JOIN liquidity_pool_position p ON p.id = t.position_id
+             LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id', rel)
+        WHEN 'liquidity_pool_position_event' THEN format(
+            'SELECT t.position_id::bigint, COALESCE(lp.chain_id, 0), COALESCE(lp.protocol_id, 0),
+                    t.timestamp::date, 1::bigint, COALESCE(t.amount_usd, 0)::float8, false
+             FROM %I t
+             LEFT JOIN liquidity_pool_position p ON p.id = t.position_id
+             LEFT JOIN liquidity_pool lp ON lp.id = p.pool_id', rel)
+        WHEN 'coin_price_history' THEN format(
+            'SELECT t.coin_id::bigint, 0, 0, t.timestamp::date, 0::bigint, 0::float8, false
+             FROM %I t', rel)
+        WHEN 'route_daily_stats' THEN format(
+            'SELECT t.route_id::bigint, COALESCE(r.chain_id, 0), 0, t.day,
+                    COALESCE(t.swap_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8, false
+             FROM %I t LEFT JOIN route r ON r.route_id = t.route_id', rel)
+        WHEN 'route_daily_stats_bucket' THEN format(
+            'SELECT t.route_id::bigint, COALESCE(r.chain_id, 0), 0, t.day,
+                    COALESCE(t.tx_count, 0)::bigint, COALESCE(t.volume_usd, 0)::float8, false
+             FROM %I t LEFT JOIN route r ON r.route_id = t.route_id', rel)
+    END)
+$$;
+
+-- Key and time columns of a tracked table.
+CREATE OR REPLACE FUNCTION table_health_columns(tbl TEXT, OUT key_col TEXT, OUT day_col TEXT)
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE tbl
+               WHEN 'liquidity_pool_daily_stats' THEN 'pool_id'
+               WHEN 'coin_price_history' THEN 'coin_id'
+               WHEN 'route_daily_stats' THEN 'route_id'
+               WHEN 'route_daily_stats_bucket' THEN 'route_id'
+               ELSE 'position_id' END,
+           CASE WHEN tbl IN ('liquidity_pool_daily_stats', 'route_daily_stats', 'route_daily_stats_bucket')
+                THEN 'day' ELSE 'timestamp' END
+$$;
+
+CREATE OR REPLACE FUNCTION table_health_capture() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    tbl    TEXT := TG_TABLE_NAME;
+    signed TEXT;
+    cols   RECORD;
+BEGIN
+    -- Signed rows: +1 for the new image, -1 for the old one.
+    signed := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT n.*, 1 AS sign FROM (%s) n', table_health_rows(tbl, 'new_rows'))
+        WHEN 'DELETE' THEN format('SELECT o.*, -1 AS sign FROM (%s) o', table_health_rows(tbl, 'old_rows'))
+        ELSE format('SELECT n.*, 1 AS sign FROM (%s) n UNION ALL SELECT o.*, -1 FROM (%s) o',
+                    table_health_rows(tbl, 'new_rows'), table_health_rows(tbl, 'old_rows'))
+    END;
+    SELECT * INTO cols FROM table_health_columns(tbl);
+
+    EXECUTE format($q$
+        INSERT INTO table_health_daily AS d
+            (table_name, chain_id, protocol_id, day, row_count, tx_count, volume_usd, valid_count)
+        SELECT $1, chain_id, protocol_id, day, SUM(sign), SUM(sign * tx), SUM(sign * volume),
+               SUM(sign * valid::int)
+        FROM (%s) s
+        GROUP BY chain_id, protocol_id, day
+        ORDER BY chain_id, protocol_id, day
+        ON CONFLICT (table_name, chain_id, protocol_id, day) DO UPDATE
+            SET row_count = d.row_count + EXCLUDED.row_count,
+                tx_count = d.tx_count + EXCLUDED.tx_count,
+                volume_usd = d.volume_usd + EXCLUDED.volume_usd,
+                valid_count = d.valid_count + EXCLUDED.valid_count,
+                updated_at = NOW()
+    $q$, signed) USING tbl;
+
+    IF TG_OP <> 'DELETE' THEN
+        -- New days only widen a key's extent; TVL flips move its valid days.
+        EXECUTE format($q$
+            INSERT INTO table_health_key AS k
+                (table_name, key_id, chain_id, protocol_id, first_day, last_day, valid_days)
+            SELECT $1, key_id, MIN(chain_id), MIN(protocol_id), MIN(day), MAX(day),
+                   COALESCE(range_agg(daterange(day, day + 1)) FILTER (WHERE valid), '{}')
+            FROM (%s) n
+            GROUP BY key_id
+            ORDER BY key_id
+            ON CONFLICT (table_name, key_id) DO UPDATE
+                SET chain_id = EXCLUDED.chain_id,
+                    protocol_id = EXCLUDED.protocol_id,
+                    first_day = LEAST(k.first_day, EXCLUDED.first_day),
+                    last_day = GREATEST(k.last_day, EXCLUDED.last_day),
+                    valid_days = k.valid_days + EXCLUDED.valid_days,
+                    updated_at = NOW()
+        $q$, table_health_rows(tbl, 'new_rows')) USING tbl;
+    END IF;
+    IF TG_OP = 'UPDATE' AND tbl = 'liquidity_pool_daily_stats' THEN
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET valid_days = k.valid_days - g.days
+            FROM (
+                SELECT key_id, range_agg(daterange(day, day + 1)) AS days
+                FROM (%s) n WHERE NOT valid GROUP BY key_id
+            ) g
+            WHERE k.table_name = $1 AND k.key_id = g.key_id AND k.valid_days && g.days
+        $q$, table_health_rows(tbl, 'new_rows')) USING tbl;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        -- Deletes can shrink a key's extent: re-read it through the key index.
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET first_day = (SELECT MIN(t.%2$I)::date FROM %1$I t WHERE t.%3$I = k.key_id),
+                last_day = (SELECT MAX(t.%2$I)::date FROM %1$I t WHERE t.%3$I = k.key_id),
+                valid_days = k.valid_days - COALESCE(g.days, '{}'),
+                updated_at = NOW()
+            FROM (
+                SELECT key_id, range_agg(daterange(day, day + 1)) AS days
+                FROM (%4$s) o GROUP BY key_id
+            ) g
+            WHERE k.table_name = $1 AND k.key_id = g.key_id
+        $q$, tbl, cols.day_col, cols.key_col, table_health_rows(tbl, 'old_rows')) USING tbl;
+        DELETE FROM table_health_key WHERE table_name = tbl AND first_day IS NULL;
+    END IF;
+
+    IF tbl = 'liquidity_pool_daily_stats' THEN
+        -- Trailing 7-day activity of the touched pools (PK range scans).
+        EXECUTE format($q$
+            UPDATE table_health_key k
+            SET tx_7d = COALESCE(w.tx, 0), volume_7d = COALESCE(w.volume, 0),
+                window_day = CURRENT_DATE, updated_at = NOW()
+            FROM (SELECT DISTINCT key_id FROM (%s) s) g
+            LEFT JOIN LATERAL (
+                SELECT SUM(t.tx_count)::bigint AS tx, SUM(t.volume_usd) AS volume
+                FROM liquidity_pool_daily_stats t
+                WHERE t.pool_id = g.key_id
+                  AND t.day >= CURRENT_DATE - 7 AND t.day < CURRENT_DATE
+            ) w ON true
+            WHERE k.table_name = $1 AND k.key_id = g.key_id
+        $q$, signed) USING tbl;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DO $$
+DECLARE
+    tbl TEXT;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['liquidity_pool_daily_stats', 'liquidity_pool_position_snapshot',
+                               'liquidity_pool_position_event', 'coin_price_history',
+                               'route_daily_stats', 'route_daily_stats_bucket'] LOOP
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_ins AFTER INSERT ON %1$I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_upd AFTER UPDATE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+        EXECUTE format('CREATE OR REPLACE TRIGGER trg_health_%1$s_del AFTER DELETE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION table_health_capture()', tbl);
+    END LOOP;
+END $$;
+
 -- 6. Asynchronous route-classification work queue.
 CREATE TABLE IF NOT EXISTS route_classification_queue (
     tx_hash       TEXT PRIMARY KEY,
@@ -550,6 +973,31 @@ CREATE INDEX IF NOT EXISTS idx_route_classification_queue_claim
     ON route_classification_queue (available_at, tx_hash)
     WHERE status IN ('pending', 'processing');
 
+-- Per-run metrics of the queue consumer (include/route_queue_consumer.py),
+-- served at /health/classification.
+CREATE TABLE IF NOT EXISTS route_classification_run (
+    run_id            BIGSERIAL PRIMARY KEY,
+    started_at        TIMESTAMPTZ NOT NULL,
+    elapsed_s         DOUBLE PRECISION NOT NULL,
+    claimers          SMALLINT NOT NULL,
+    workers           SMALLINT NOT NULL,
+    batches           INTEGER NOT NULL,
+    failed_batches    INTEGER NOT NULL,
+    tx_hashes         INTEGER NOT NULL,
+    legs              BIGINT NOT NULL,
+    legs_updated      BIGINT NOT NULL,
+    legs_per_sec      DOUBLE PRECISION,
+    batch_p50_ms      DOUBLE PRECISION,
+    batch_p95_ms      DOUBLE PRECISION,
+    batch_max_ms      DOUBLE PRECISION,
+    queue_ready_start INTEGER,
+    queue_ready_end   INTEGER,
+    queue_pending_end INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_route_classification_run_started
+    ON route_classification_run (started_at DESC);
+
 DO $$
 BEGIN
     IF to_regclass('public.swaps') IS NOT NULL THEN
@@ -0,0 +1,627 @@
+"""Incrementally maintained table-health metrics and the ``/health`` report.
+
+The fact tables behind the health report (pool daily stats, position
+snapshots and events, coin prices, route daily stats and buckets) feed two
+small tables through statement-level triggers (``sql/create_table_health.sql``):
+
+* ``table_health_daily`` -- per (table, chain, protocol, day) row count, tx
+  count, USD volume and, for pool daily stats, rows with a positive TVL;
+* ``table_health_key`` -- per (table, pool / position / coin / route) first
+  and last day, and for pool daily stats the positive-TVL days and the
+  trailing 7-day tx count / volume as of ``window_day``.
+
+Every writer -- the rollups, the classifier's materializer and the ingestion
+DAGs -- therefore updates them in its own transaction, and ``build_report``
+answers ``GET /health`` (any ``lph_lookback``) from them plus a few counts on
+the small dimension tables, instead of re-aggregating the fact tables.
+
+``rebuild`` populates a table's metrics from scratch (run once after the
+migration, see ``scripts/backfill_table_health.py``); ``refresh_range``
+re-derives a day range after partition drops, which fire no triggers;
+``refresh_windows`` rolls the pools' 7-day windows forward each day.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+TABLES = ('liquidity_pool_daily_stats', 'liquidity_pool_position_snapshot',
+          'liquidity_pool_position_event', 'coin_price_history',
+          'route_daily_stats', 'route_daily_stats_bucket')
+VOLUME_THRESHOLDS = (0, 1000, 100000, 10000000)
+
+_KEY_COLUMN = {
+    'liquidity_pool_daily_stats': 'pool_id',
+    'liquidity_pool_position_snapshot': 'position_id',
+    'liquidity_pool_position_event': 'position_id',
+    'coin_price_history': 'coin_id',
+    'route_daily_stats': 'route_id',
+    'route_daily_stats_bucket': 'route_id',
+}
+_DAY_COLUMN = {t: ('day' if t in ('liquidity_pool_daily_stats', 'route_daily_stats',
+                                  'route_daily_stats_bucket') else 'timestamp')
+               for t in TABLES}
+
+
+# --------------------------------------------------------------------------
+# Maintenance
+# --------------------------------------------------------------------------
+
+def _rows_sql(cur, table: str, start: Optional[date], end: Optional[date]) -> str:
+    """Normalized rows of ``table`` for ``[start, end)`` (None = unbounded).
+
+    The range filter is applied to the raw time column inside a CTE so it
+    prunes partitions and uses the time indexes.
+    """
+    cur.execute("SELECT table_health_rows(%s, '_th_src')", (table,))
+    rows = cur.fetchone()[0]
+    col = _DAY_COLUMN[table]
+    pred = []
+    if start is not None:
+        pred.append(cur.mogrify(f"{col} >= %s", (start,)).decode())
+    if end is not None:
+        pred.append(cur.mogrify(f"{col} < %s", (end,)).decode())
+    where = f" WHERE {' AND '.join(pred)}" if pred else ''
+    return f"WITH _th_src AS (SELECT * FROM {table}{where}) {rows}"
+
+
+def refresh_range(cur, table: str, start: Optional[date] = None, end: Optional[date] = None) -> None:
+    """Re-derive ``table``'s metrics for days ``[start, end)`` from the table.
+
+    Used after partition drops / rewrites (no row triggers fire) and, with no
+    bounds, by ``rebuild``. Run it in the same transaction as the change, or
+    under a lock that keeps writers out.
+    """
+    if table not in TABLES:
+        return
+    rows = _rows_sql(cur, table, start, end)
+    lo, hi = start or date.min, end or date.max
+    key, col = _KEY_COLUMN[table], _DAY_COLUMN[table]
+    cur.execute("DELETE FROM table_health_daily WHERE table_name = %s AND day >= %s AND day < %s",
+                (table, lo, hi))
+    cur.execute(f"""
+        INSERT INTO table_health_daily
+            (table_name, chain_id, protocol_id, day, row_count, tx_count, volume_usd, valid_count)
+        SELECT %s, chain_id, protocol_id, day, COUNT(*), SUM(tx), SUM(volume), COUNT(*) FILTER (WHERE valid)
+        FROM ({rows}) s
+        GROUP BY chain_id, protocol_id, day
+    """, (table,))
+    # Keys with rows in the range: re-read their extent through the key index.
+    cur.execute(f"""
+        UPDATE table_health_key k
+        SET first_day = (SELECT MIN(t.{col})::date FROM {table} t WHERE t.{key} = k.key_id),
+            last_day = (SELECT MAX(t.{col})::date FROM {table} t WHERE t.{key} = k.key_id),
+            valid_days = k.valid_days - datemultirange(daterange(%s, %s)),
+            updated_at = NOW()
+        WHERE k.table_name = %s AND k.first_day < %s AND k.last_day >= %s
+    """, (start, end, table, hi, lo))
+    cur.execute(f"""
+        INSERT INTO table_health_key AS k
+            (table_name, key_id, chain_id, protocol_id, first_day, last_day, valid_days)
+        SELECT %s, key_id, MIN(chain_id), MIN(protocol_id), MIN(day), MAX(day),
+               COALESCE(range_agg(daterange(day, day + 1)) FILTER (WHERE valid), '{{}}')
+        FROM ({rows}) s
+        GROUP BY key_id
+        ON CONFLICT (table_name, key_id) DO UPDATE
+            SET chain_id = EXCLUDED.chain_id,
+                protocol_id = EXCLUDED.protocol_id,
+                first_day = LEAST(k.first_day, EXCLUDED.first_day),
+                last_day = GREATEST(k.last_day, EXCLUDED.last_day),
+                valid_days = k.valid_days + EXCLUDED.valid_days,
+                updated_at = NOW()
+    """, (table,))
+    cur.execute("DELETE FROM table_health_key WHERE table_name = %s AND first_day IS NULL", (table,))
+    if table == 'liquidity_pool_daily_stats':
+        refresh_windows(cur, stale_only=False)
+
+
+def refresh_windows(cur, stale_only: bool = True) -> int:
+    """Re-derive pools' trailing 7-day tx count / volume as of today.
+
+    The triggers only recompute the pools a statement touches, so the window
+    of a pool without writes goes stale as days pass; the daily rollup runs
+    this for every window computed before today. Returns the rows updated.
+    """
+    stale = "AND (k.window_day IS NULL OR k.window_day < CURRENT_DATE)" if stale_only else ""
+    cur.execute(f"""
+        UPDATE table_health_key k
+        SET tx_7d = COALESCE(w.tx, 0), volume_7d = COALESCE(w.volume, 0),
+            window_day = CURRENT_DATE, updated_at = NOW()
+        FROM table_health_key k2
+        LEFT JOIN (
+            SELECT pool_id, SUM(tx_count)::bigint AS tx, SUM(volume_usd) AS volume
+            FROM liquidity_pool_daily_stats
+            WHERE day >= CURRENT_DATE - 7 AND day < CURRENT_DATE
+            GROUP BY pool_id
+        ) w ON w.pool_id = k2.key_id
+        WHERE k.table_name = 'liquidity_pool_daily_stats'
+          AND k2.table_name = k.table_name AND k2.key_id = k.key_id
+          AND (k.tx_7d, k.volume_7d, k.window_day)
+              IS DISTINCT FROM (COALESCE(w.tx, 0), COALESCE(w.volume, 0), CURRENT_DATE)
+          {stale}
+    """)
+    return cur.rowcount
+
+
+def rebuild(conn, tables: Iterable[str] = TABLES, progress=None) -> None:
+    """Rebuild each table's metrics from scratch, one transaction per table.
+
+    Holds a SHARE lock on the table meanwhile, so its writers wait instead of
+    applying trigger deltas to half-built counters.
+    """
+    log_fn = progress or (lambda msg: log.info(msg))
+    for table in tables:
+        with conn.cursor() as cur:
+            cur.execute(f"LOCK TABLE {table} IN SHARE MODE")
+            cur.execute("DELETE FROM table_health_daily WHERE table_name = %s", (table,))
+            cur.execute("DELETE FROM table_health_key WHERE table_name = %s", (table,))
+            refresh_range(cur, table)
+            cur.execute("""
+                INSERT INTO table_health_table (table_name, rebuilt_at) VALUES (%s, NOW())
+                ON CONFLICT (table_name) DO UPDATE SET rebuilt_at = EXCLUDED.rebuilt_at
+            """, (table,))
+        conn.commit()
+        log_fn(f"table health rebuilt: {table}")
+
+
+# --------------------------------------------------------------------------
+# Report
+# --------------------------------------------------------------------------
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _pct(part, whole, digits=2):
+    return round(part / whole * 100, digits) if whole else 0
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _daily_totals(cur, table: str) -> Tuple[Optional[date], Optional[date], int, int]:
+    cur.execute("""
+        SELECT MIN(day) FILTER (WHERE row_count > 0), MAX(day) FILTER (WHERE row_count > 0),
+               COALESCE(SUM(row_count), 0)::bigint, COALESCE(SUM(tx_count), 0)::bigint
+        FROM table_health_daily WHERE table_name = %s
+    """, (table,))
+    return cur.fetchone()
+
+
+def _key_coverage(cur, table: str, fresh_since: date) -> Tuple[int, int]:
+    cur.execute("""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE last_day >= %s)
+        FROM table_health_key WHERE table_name = %s
+    """, (fresh_since, table))
+    return cur.fetchone()
+
+
+# Pool keys with their trailing 7-day tx count / volume as of %(today)s. A
+# window stored on an earlier day (a pool without writes since, before the
+# daily refresh_windows run) is re-derived from the pool's daily stats rows.
+_POOL_KEYS = """(
+    SELECT k.key_id, k.chain_id, k.protocol_id, k.first_day, k.last_day, k.valid_days,
+           CASE WHEN k.window_day >= %(today)s THEN k.tx_7d ELSE COALESCE(w.tx, 0) END AS tx_7d,
+           CASE WHEN k.window_day >= %(today)s THEN k.volume_7d ELSE COALESCE(w.volume, 0) END AS volume_7d
+    FROM table_health_key k
+    LEFT JOIN LATERAL (
+        SELECT SUM(t.tx_count)::bigint AS tx, SUM(t.volume_usd) AS volume
+        FROM liquidity_pool_daily_stats t
+        WHERE (k.window_day IS NULL OR k.window_day < %(today)s) AND k.last_day >= %(today)s - 7
+          AND t.pool_id = k.key_id AND t.day >= %(today)s - 7 AND t.day < %(today)s
+    ) w ON true
+    WHERE k.table_name = 'liquidity_pool_daily_stats'
+)"""
+
+
+def _swaps_section(cur, today: date, now: datetime) -> Tuple[bool, Dict[str, Any]]:
+    """Swap activity per chain/protocol over the last 7 days, from pool daily stats."""
+    degraded = False
+    ws, we = today - timedelta(days=7), today - timedelta(days=1)
+    cols = ','.join(f"""
+        COALESCE(SUM(k.tx_7d) FILTER (WHERE k.volume_7d >= {v}), 0),
+        MIN(GREATEST(k.first_day, %(ws)s)) FILTER (WHERE k.volume_7d >= {v}),
+        MAX(LEAST(k.last_day, %(we)s)) FILTER (WHERE k.volume_7d >= {v})""" for v in VOLUME_THRESHOLDS)
+    cur.execute(f"""
+        SELECT ch.name, pr.name, {cols}
+        FROM {_POOL_KEYS} k
+        JOIN chain ch ON ch.id = k.chain_id
+        JOIN protocol pr ON pr.id = k.protocol_id
+        WHERE k.last_day >= %(ws)s AND k.first_day <= %(we)s
+        GROUP BY ch.name, pr.name
+        ORDER BY ch.name, pr.name
+    """, {'ws': ws, 'we': we, 'today': today})
+    lph_rows = cur.fetchall()
+
+    filters = {}
+    for i, min_vol in enumerate(VOLUME_THRESHOLDS):
+        chains: Dict[str, Any] = {}
+        total = 0
+        any_stale = False
+        daily_pass = True
+        for row in lph_rows:
+            chain, protocol = row[0], row[1]
+            count, earliest, latest = row[2 + i * 3], row[3 + i * 3], row[4 + i * 3]
+            chains.setdefault(chain, {"status": "fresh", "protocols": {}})
+            every_day = False
+            if latest:
+                ft = _day_start(latest)
+                stale = ft < now - timedelta(hours=3)
+                if stale and min_vol == 0:
+                    degraded = True
+                any_stale = stale or any_stale
+                every_day = ft >= now - timedelta(days=2)
+                daily_pass = daily_pass and every_day
+            else:
+                stale = True
+            if stale:
+                chains[chain]["status"] = "stale"
+            chains[chain]["protocols"][protocol] = {
+                "count": int(count),
+                "earliest": _iso(earliest),
+                "latest": _iso(latest),
+                "checks": {
+                    "has_data_every_day": "pass" if every_day else "fail",
+                    "is_fresher_than_3_hours": "pass" if not stale else "fail",
+                },
+            }
+            total += int(count)
+        filters[str(min_vol)] = {
+            "freshness_requirement": "Latest pool history date for each protocol on a chain must be within the last 3 hours",
+            "count": total,
+            "chains": chains,
+            "checks": {
+                "has_data_every_day": "pass" if daily_pass else "fail",
+                "is_fresher_than_3_hours": "pass" if not any_stale else "fail",
+            },
+        }
+
+    lph_earliest, _, _, _ = _daily_totals(cur, 'liquidity_pool_daily_stats')
+    _, _, _, routed = _daily_totals(cur, 'route_daily_stats')
+    cur.execute("SELECT COUNT(*) FROM route_classification_queue WHERE status <> 'complete'")
+    pending = cur.fetchone()[0]
+    section = dict(filters["0"])
+    section["volume_filters"] = filters
+    section["earliest_all_time"] = _iso(lph_earliest)
+    section["total_estimate"] = routed
+    section["route_assignment"] = {
+        "assigned_count": routed,
+        "unassigned_count": pending,
+        "total_count": routed + pending,
+        "assigned_percentage": _pct(routed, routed + pending),
+    }
+    return degraded, section
+
+
+def _coin_sections(cur, today: date, now: datetime) -> Tuple[bool, Dict[str, Any]]:
+    degraded = False
+    out: Dict[str, Any] = {}
+    cur.execute("SELECT COUNT(*) FROM coin")
+    total_coins = cur.fetchone()[0]
+    cur.execute("SELECT COUNT(DISTINCT coin_id) FROM coin_contract")
+    with_contract = cur.fetchone()[0]
+    cur.execute("""
+        SELECT ch.name, COUNT(DISTINCT cc.coin_id)
+        FROM coin_contract cc
+        JOIN chain ch ON cc.chain_id = ch.id
+        WHERE ch.name IN ('Ethereum', 'BNB', 'Arbitrum', 'Base')
+        GROUP BY ch.name
+    """)
+    chain_counts = dict(cur.fetchall())
+    coverage = {"any_chain_percentage": _pct(with_contract, total_coins)}
+    for chain in ('Ethereum', 'BNB', 'Arbitrum', 'Base'):
+        coverage[f"{chain.lower()}_percentage"] = _pct(chain_counts.get(chain, 0), total_coins)
+
+    cur.execute("""
+        (SELECT symbol, cmc_last_updated FROM coin WHERE cmc_last_updated IS NOT NULL
+         ORDER BY cmc_last_updated ASC LIMIT 1)
+        UNION ALL
+        (SELECT symbol, cmc_last_updated FROM coin WHERE cmc_last_updated IS NOT NULL
+         ORDER BY cmc_last_updated DESC LIMIT 1)
+    """)
+    ends = cur.fetchall()
+    coin = {"count": total_coins, "contract_coverage": coverage}
+    if ends:
+        (old_sym, old_ts), (new_sym, new_ts) = ends[0], ends[-1]
+        ft = new_ts if new_ts.tzinfo else new_ts.replace(tzinfo=timezone.utc)
+        stale = ft < now - timedelta(days=2)
+        degraded = degraded or stale
+        coin["oldest"] = {"symbol": old_sym, "last_updated": _iso(old_ts)}
+        coin["latest"] = {"symbol": new_sym, "last_updated": _iso(new_ts)}
+        coin["checks"] = {"is_fresher_than_2_days": "fail" if stale else "pass"}
+    else:
+        coin["checks"] = {"is_fresher_than_2_days": "fail"}
+    out["coin"] = coin
+
+    covered, fresh = _key_coverage(cur, 'coin_price_history', today - timedelta(days=1))
+    ph_min, ph_max, ph_count, _ = _daily_totals(cur, 'coin_price_history')
+    stale = ph_max is None or ph_max < today - timedelta(days=2)
+    degraded = degraded or stale
+    out["coin_price_history"] = {
+        "freshness_requirement": "Latest price history timestamp must be within the last 2 days",
+        "count": ph_count,
+        "earliest": _iso(ph_min),
+        "latest": _iso(ph_max),
+        "covered_coins": {
+            "count": covered,
+            "percentage": _pct(covered, total_coins),
+            "fresh_count": fresh,
+            "fresh_percentage": _pct(fresh, total_coins),
+        },
+        "checks": {"is_fresher_than_2_days": "fail" if stale else "pass"},
+    }
+    return degraded, out
+
+
+def _pool_matrix(cur, today: date) -> Dict[str, Any]:
+    """Pool coverage per chain/protocol for each 7-day volume threshold."""
+    filters = {}
+    for min_vol in VOLUME_THRESHOLDS:
+        cur.execute(f"""
+            SELECT ch.name, pr.name,
+                   COUNT(lp.id),
+                   COUNT(k.key_id),
+                   COUNT(k.key_id) FILTER (WHERE NOT isempty(k.valid_days)),
+                   COUNT(k.key_id) FILTER (WHERE k.last_day >= %(fresh)s),
+                   MAX(k.last_day)
+            FROM liquidity_pool lp
+            JOIN chain ch ON lp.chain_id = ch.id
+            JOIN protocol pr ON lp.protocol_id = pr.id
+            LEFT JOIN {_POOL_KEYS} k ON k.key_id = lp.id
+            WHERE (%(v)s = 0 OR COALESCE(k.volume_7d, 0) >= %(v)s)
+            GROUP BY ch.name, pr.name
+            ORDER BY ch.name, pr.name
+        """, {'fresh': today - timedelta(days=2), 'v': min_vol, 'today': today})
+        chains: Dict[str, Any] = {}
+        tot = [0, 0, 0, 0]
+        for chain, protocol, count, covered, tvl_covered, fresh, latest in cur.fetchall():
+            chains.setdefault(chain, {"protocols": {}})["protocols"][protocol] = {
+                "count": count,
+                "covered_count": covered,
+                "tvl_covered_count": tvl_covered,
+                "fresh_count": fresh,
+                "coverage_percentage": _pct(covered, count, None),
+                "tvl_coverage_percentage": _pct(tvl_covered, count, None),
+                "fresh_percentage": _pct(fresh, count, None),
+                "latest_history_date": _iso(latest),
+            }
+            tot = [a + b for a, b in zip(tot, (count, covered, tvl_covered, fresh))]
+        filters[str(min_vol)] = {
+            "min_volume": min_vol,
+            "count": tot[0],
+            "chains": chains,
+            "covered_pools": {
+                "count": tot[1],
+                "percentage": _pct(tot[1], tot[0], None),
+                "tvl_covered_count": tot[2],
+                "tvl_coverage_percentage": _pct(tot[2], tot[0], None),
+                "fresh_count": tot[3],
+                "fresh_percentage": _pct(tot[3], tot[0], None),
+            },
+        }
+    section = dict(filters["0"])
+    section["volume_filters"] = filters
+    return section
+
+
+def _route_taxonomy(cur) -> Dict[str, Any]:
+    def per_chain(sql):
+        cur.execute(sql)
+        return dict(cur.fetchall())
+
+    pairs = per_chain("""
+        SELECT ch.name, COUNT(*) FROM origin_destination_pair odp
+        JOIN chain ch ON odp.chain_id = ch.id GROUP BY ch.name
+    """)
+    routes = per_chain("SELECT ch.name, COUNT(*) FROM route r JOIN chain ch ON r.chain_id = ch.id GROUP BY ch.name")
+    stats: Dict[str, int] = {}
+    buckets: Dict[str, int] = {}
+    cur.execute("""
+        SELECT k.table_name, ch.name, COUNT(*)
+        FROM table_health_key k JOIN chain ch ON ch.id = k.chain_id
+        WHERE k.table_name IN ('route_daily_stats', 'route_daily_stats_bucket')
+        GROUP BY k.table_name, ch.name
+    """)
+    for table, chain, n in cur.fetchall():
+        (stats if table == 'route_daily_stats' else buckets)[chain] = n
+    hops = per_chain("""
+        SELECT ch.name, COUNT(DISTINCT r.route_id) FROM route_hop rh
+        JOIN route r ON r.route_id = rh.route_id
+        JOIN chain ch ON r.chain_id = ch.id GROUP BY ch.name
+    """)
+    chains = {
+        chain: {
+            "pairs": pairs.get(chain, 0),
+            "routes": routes.get(chain, 0),
+            "daily_stats": stats.get(chain, 0),
+            "route_daily_stats_bucket": buckets.get(chain, 0),
+            "route_hop": hops.get(chain, 0),
+        }
+        for chain in sorted(set(pairs) | set(routes) | set(stats) | set(buckets) | set(hops))
+    }
+    cur.execute("""
+        SELECT (SELECT COUNT(*) FROM origin_destination_pair),
+               (SELECT COUNT(*) FROM route),
+               (SELECT COUNT(*) FROM table_health_key WHERE table_name = 'route_daily_stats'),
+               (SELECT COUNT(*) FROM table_health_key WHERE table_name = 'route_daily_stats_bucket'),
+               (SELECT COUNT(DISTINCT route_id) FROM route_hop)
+    """)
+    pair_count, route_count, stats_count, bucket_count, hop_count = cur.fetchone()
+    return {
+        "count": route_count,
+        "pairs_count": pair_count,
+        "routes_count": route_count,
+        "daily_stats_count": stats_count,
+        "route_daily_stats_bucket_count": bucket_count,
+        "route_hop_count": hop_count,
+        "chains": chains,
+    }
+
+
+def _pool_history(cur, today: date, lookback_days: int) -> Tuple[bool, Dict[str, Any]]:
+    """Pool daily stats freshness and, per chain/protocol, the pools with a
+    positive TVL on every day of the last ``lookback_days`` days."""
+    cur.execute("SELECT COUNT(*) FROM liquidity_pool")
+    total_pools = cur.fetchone()[0]
+    covered, fresh = _key_coverage(cur, 'liquidity_pool_daily_stats', today - timedelta(days=1))
+    lph_min, lph_max, lph_count, _ = _daily_totals(cur, 'liquidity_pool_daily_stats')
+    stale = lph_max is None or lph_max < today - timedelta(days=2)
+    section = {
+        "freshness_requirement": "Latest pool history timestamp must be within the last 2 days",
+        "count": lph_count,
+        "earliest": _iso(lph_min),
+        "latest": _iso(lph_max),
+        "covered_pools": {
+            "count": covered,
+            "percentage": _pct(covered, total_pools),
+            "fresh_count": fresh,
+            "fresh_percentage": _pct(fresh, total_pools),
+        },
+        "checks": {"is_fresher_than_2_days": "fail" if stale else "pass"},
+        "lookback_days": lookback_days,
+    }
+
+    window = (today - timedelta(days=lookback_days), today)
+    volume_filters: Dict[str, Any] = {}
+    for min_vol in VOLUME_THRESHOLDS:
+        cur.execute(f"""
+            SELECT ch.name, pr.name, COUNT(lp.id),
+                   COUNT(k.key_id) FILTER (WHERE k.valid_days @> daterange(%(ws)s, %(we)s)),
+                   MIN(lower(k.valid_days * datemultirange(daterange(%(ws)s, %(we)s)))),
+                   MAX(upper(k.valid_days * datemultirange(daterange(%(ws)s, %(we)s))) - 1)
+            FROM liquidity_pool lp
+            JOIN chain ch ON lp.chain_id = ch.id
+            JOIN protocol pr ON lp.protocol_id = pr.id
+            LEFT JOIN {_POOL_KEYS} k ON k.key_id = lp.id
+            WHERE (%(v)s = 0 OR COALESCE(k.volume_7d, 0) >= %(v)s)
+            GROUP BY ch.name, pr.name
+            ORDER BY ch.name, pr.name
+        """, {'ws': window[0], 'we': window[1], 'v': min_vol, 'today': today})
+        chains: Dict[str, Any] = {}
+        tot_pools = tot_passing = 0
+        for chain, protocol, pools, passing, earliest, latest in cur.fetchall():
+            entry = {
+                "total_pools": pools,
+                "passing_pools": passing,
+                "passing_pct": _pct(passing, pools, 1) if pools else 0.0,
+                "earliest": _iso(earliest),
+                "latest": _iso(latest),
+            }
+            if min_vol == 0:
+                entry = dict(entry, lookback_days=lookback_days, checks={
+                    "is_fresher_than_2_days":
+                        "pass" if latest and latest >= today - timedelta(days=2) else "fail"})
+            chains.setdefault(chain, {"protocols": {}})["protocols"][protocol] = entry
+            tot_pools += pools
+            tot_passing += passing
+        if min_vol == 0:
+            section["chains"] = chains
+        volume_filters[str(min_vol)] = {
+            "chains": {c: {"protocols": {p: {k: v for k, v in e.items()
+                                             if k not in ('lookback_days', 'checks')}
+                                         for p, e in d["protocols"].items()}}
+                       for c, d in chains.items()},
+            "count": tot_pools,
+            "covered_pools": {"count": tot_passing, "percentage": _pct(tot_passing, tot_pools)},
+        }
+    section["volume_filters"] = volume_filters
+    return stale, section
+
+
+def _position_sections(cur, today: date) -> Tuple[bool, Dict[str, Any]]:
+    out: Dict[str, Any] = {}
+    cur.execute("SELECT COUNT(*) FROM liquidity_pool_position")
+    lpp_count = cur.fetchone()[0]
+    covered, fresh = _key_coverage(cur, 'liquidity_pool_position_snapshot', today - timedelta(days=1))
+    out["liquidity_pool_position"] = {
+        "count": lpp_count,
+        "snapshot_coverage": {
+            "covered_positions_count": covered,
+            "covered_positions_percentage": _pct(covered, lpp_count),
+            "fresh_positions_count": fresh,
+            "fresh_positions_percentage": _pct(fresh, lpp_count),
+        },
+    }
+    ev_min, ev_max, ev_count, _ = _daily_totals(cur, 'liquidity_pool_position_event')
+    out["liquidity_pool_position_event"] = {
+        "count": ev_count, "earliest": _iso(ev_min), "latest": _iso(ev_max)}
+    s_min, s_max, s_count, _ = _daily_totals(cur, 'liquidity_pool_position_snapshot')
+    stale = s_max is None or s_max < today - timedelta(days=2)
+    out["liquidity_pool_position_snapshot"] = {
+        "freshness_requirement": "Latest pool position snapshot timestamp must be within the last 2 days",
+        "count": s_count,
+        "earliest": _iso(s_min),
+        "latest": _iso(s_max),
+        "covered_positions": {
+            "count": covered,
+            "percentage": _pct(covered, lpp_count),
+            "fresh_count": fresh,
+            "fresh_percentage": _pct(fresh, lpp_count),
+        },
+        "checks": {
+            "has_data_every_day": "pass" if s_max else "fail",
+            "is_fresher_than_2_days": "fail" if stale else "pass",
+        },
+    }
+    return stale, out
+
+
+def build_report(cur, lookback_days: int = 7) -> Tuple[bool, Dict[str, Any]]:
+    """``(degraded, data)`` for ``GET /health``, read from the metrics tables.
+
+    Dates are day-granular (the metrics are per day). Volume thresholds filter
+    pools on their trailing 7-day volume. Tables that were never rebuilt are
+    listed under ``metrics_not_ready`` and mark the report degraded.
+    """
+    now = datetime.now(timezone.utc)
+    cur.execute("SELECT CURRENT_DATE")
+    today = cur.fetchone()[0]
+    data: Dict[str, Any] = {}
+    degraded = False
+
+    cur.execute("SELECT table_name FROM table_health_table WHERE rebuilt_at IS NOT NULL")
+    not_ready = sorted(set(TABLES) - {r[0] for r in cur.fetchall()})
+    if not_ready:
+        degraded = True
+        data["metrics_not_ready"] = not_ready
+
+    stale, data["swaps"] = _swaps_section(cur, today, now)
+    degraded = degraded or stale
+    stale, coins = _coin_sections(cur, today, now)
+    degraded = degraded or stale
+    data["coin"] = coins["coin"]
+    data["coin_price_history"] = coins["coin_price_history"]
+    data["liquidity_pool"] = _pool_matrix(cur, today)
+
+    cur.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE tracked = true) FROM coin_contract")
+    cc_total, cc_tracked = cur.fetchone()
+    cur.execute("""
+        SELECT ch.name, COUNT(*), COUNT(*) FILTER (WHERE cc.tracked = true)
+        FROM coin_contract cc JOIN chain ch ON cc.chain_id = ch.id
+        GROUP BY ch.name ORDER BY ch.name
+    """)
+    data["coin_contract"] = {
+        "count": cc_total,
+        "tracked_count": cc_tracked,
+        "untracked_count": cc_total - cc_tracked,
+        "chains": {chain: {"count": n, "tracked_count": t, "untracked_count": n - t}
+                   for chain, n, t in cur.fetchall()},
+    }
+    data["route_taxonomy"] = _route_taxonomy(cur)
+    cur.execute("SELECT COUNT(*) FROM coin_family")
+    data["coin_family"] = {"count": cur.fetchone()[0]}
+    cur.execute("SELECT name FROM chain ORDER BY id")
+    chains = [r[0] for r in cur.fetchall()]
+    data["chain"] = {"count": len(chains), "chains": chains}
+    cur.execute("SELECT name FROM protocol ORDER BY id")
+    protocols = [r[0] for r in cur.fetchall()]
+    data["protocol"] = {"count": len(protocols), "protocols": protocols}
+
+    stale, data["liquidity_pool_daily_stats"] = _pool_history(cur, today, lookback_days)
+    degraded = degraded or stale
+    stale, positions = _position_sections(cur, today)
+    degraded = degraded or stale
+    data.update(positions)
+    return degraded, data
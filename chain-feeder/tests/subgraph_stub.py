@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Local stand-in for a Uniswap V3 swaps subgraph, for offline load tests.
+
+Serves deterministic synthetic swaps over HTTP (POST {"query": ...}) and
+answers the `swaps(first, orderBy, where)` queries UniswapV3Fetcher issues:
+timestamp_gte / _gt / _lte / _lt / exact timestamp, id_gt, and token0 /
+token1 _in / _not_in filters. Rows tied on timestamp come back in a
+hash-scrambled order, like the real gateway, so only id ordering can be
+used as a keyset. A few "hot" seconds hold more swaps than one page to
+exercise the within-second pagination.
+
+Usage:
+  python chain-feeder/tests/subgraph_stub.py --swaps 200000 --port 8765
+  python chain-feeder/tests/subgraph_stub.py --latency-ms 150 --hot-seconds 5 --hot-size 2500
+
+Point a fetcher at it with `fetcher.subgraph_url = "http://127.0.0.1:8765/"`.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACKED = {
+    "USDC": ("0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48", 6),
+    "USDT": ("0xdac17f958d2ee523a2206206994597c13d831ec7", 6),
+    "WETH": ("0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2", 18),
+    "WBTC": ("0x2260fac5e5542a773aa44fbcfedf7c193bc2c599", 8),
+}
+UNTRACKED = {
+    "PEPE": ("0x6982508145454ce325ddbe47a25d4ec3d2311933", 18),
+    "SHIB": ("0x95ad61b0a150d79219dcf64e1e6cc01f0b64c4ce", 18),
+}
+
+_ARG = re.compile(r'(\w+):\s*(\[[^\]]*\]|"[^"]*"|-?\d+|\w+)')
+
+
+def _value(raw):
+    if raw.startswith("["):
+        return [v.lower() for v in json.loads(raw)]
+    if raw.startswith('"'):
+        return raw[1:-1]
+    try:
+        return int(raw)
+    except ValueError:
+        return raw  # enum value, e.g. orderBy: timestamp
+
+
+class SwapStubData:
+    """The synthetic swap set and the query evaluator."""
+
+    def __init__(self, swaps=50000, start_ts=1735689600, span_secs=86400,
+                 hot_seconds=3, hot_size=2500, seed=7):
+        rng = random.Random(seed)
+        tokens = list(TRACKED.items()) + list(UNTRACKED.items())
+        stamps = [start_ts + rng.randrange(span_secs) for _ in range(swaps)]
+        for _ in range(hot_seconds):
+            stamps.extend([start_ts + rng.randrange(span_secs)] * hot_size)
+        rows = []
+        for n, ts in enumerate(stamps):
+            (s0, (a0, d0)), (s1, (a1, d1)) = rng.sample(tokens, 2)
+            tx = "0x%064x" % (n // 2)
+            amt = rng.uniform(1.0, 5000.0)
+            rows.append({
+                "id": "%s#%d" % (tx, n % 2),
+                "timestamp": str(ts),
+                "transaction": {"id": tx},
+                "token0": {"id": a0, "symbol": s0, "decimals": str(d0)},
+                "token1": {"id": a1, "symbol": s1, "decimals": str(d1)},
+                "amount0": str(amt), "amount1": str(-amt * rng.uniform(0.99, 1.01)),
+                "amountUSD": str(amt),
+                "pool": {"id": "0x" + hashlib.sha1((a0 + a1).encode()).hexdigest(), "feeTier": "500"},
+            })
+        rows.sort(key=lambda r: (int(r["timestamp"]), hashlib.md5(r["id"].encode()).digest()))
+        self.rows = rows
+        self._ts = [int(r["timestamp"]) for r in rows]
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def tracked_ids(self, addresses=None):
+        """Ids of every swap with at least one token in `addresses` (default:
+        the tracked set) — what a complete fetch must return."""
+        wanted = {a.lower() for a in (addresses or [a for a, _ in TRACKED.values()])}
+        return {r["id"] for r in self.rows
+                if r["token0"]["id"] in wanted or r["token1"]["id"] in wanted}
+
+    def query(self, graphql: str) -> dict:
+        with self._lock:
+            self.requests += 1
+        head, _, where_part = graphql.partition("where:")
+        args = {k: _value(v) for k, v in _ARG.findall(head)}
+        where = {k: _value(v) for k, v in _ARG.findall(where_part.split("}")[0])}
+
+        lo, hi = 0, len(self.rows)
+        if "timestamp" in where:
+            lo = bisect.bisect_left(self._ts, where["timestamp"])
+            hi = bisect.bisect_right(self._ts, where["timestamp"])
+        if "timestamp_gte" in where:
+            lo = max(lo, bisect.bisect_left(self._ts, where["timestamp_gte"]))
+        if "timestamp_gt" in where:
+            lo = max(lo, bisect.bisect_right(self._ts, where["timestamp_gt"]))
+        if "timestamp_lte" in where:
+            hi = min(hi, bisect.bisect_right(self._ts, where["timestamp_lte"]))
+        if "timestamp_lt" in where:
+            hi = min(hi, bisect.bisect_left(self._ts, where["timestamp_lt"]))
+
+        def keep(r):
+            for side in ("token0", "token1"):
+                addr = r[side]["id"]
+                if f"{side}_in" in where and addr not in where[f"{side}_in"]:
+                    return False
+                if f"{side}_not_in" in where and addr in where[f"{side}_not_in"]:
+                    return False
+            return "id_gt" not in where or r["id"] > where["id_gt"]
+
+        first = args.get("first", 100)
+        candidates = (r for r in self.rows[lo:hi] if keep(r))
+        if args.get("orderBy") == "id":
+            out = sorted(candidates, key=lambda r: r["id"])[:first]
+        else:
+            out = []
+            for r in candidates:
+                out.append(r)
+                if len(out) >= first:
+                    break
+        return {"data": {"swaps": out}}
+
+
+def serve(data: SwapStubData, host="127.0.0.1", port=0, latency_ms=0.0):
+    """Start the stub in a daemon thread; returns (server, url)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            payload = json.dumps(data.query(body["query"])).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://%s:%d/" % server.server_address[:2]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--swaps", type=int, default=50000)
+    p.add_argument("--start-ts", type=int, default=1735689600)
+    p.add_argument("--span-secs", type=int, default=86400)
+    p.add_argument("--hot-seconds", type=int, default=3)
+    p.add_argument("--hot-size", type=int, default=2500)
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    data = SwapStubData(args.swaps, args.start_ts, args.span_secs, args.hot_seconds, args.hot_size, args.seed)
+    server, url = serve(data, port=args.port, latency_ms=args.latency_ms)
+    print(f"subgraph stub: {len(data.rows)} swaps in [{args.start_ts}, {args.start_ts + args.span_secs}) at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
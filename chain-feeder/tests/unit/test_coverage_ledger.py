@@ -0,0 +1,125 @@
+"""Unit tests for the coverage ledger and its readers (no database required)."""
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import coverage_ledger as cl  # noqa: E402
+import od_retention as odr  # noqa: E402
+import reconcile  # noqa: E402
+import route_classifier as rc  # noqa: E402
+
+D = date(2026, 3, 1)
+
+
+def d(day):
+    return date(2026, 3, day)
+
+
+def conn_for(cur):
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return conn
+
+
+class TestRanges(unittest.TestCase):
+    def test_expand_clips_half_open_ranges(self):
+        self.assertEqual(cl.expand_ranges([(d(1), d(3)), (d(5), d(9))], d(2), d(6)),
+                         {d(2), d(5), d(6)})
+        self.assertEqual(cl.expand_ranges([(None, d(2))], d(1)), {d(1)})
+        with self.assertRaises(ValueError):
+            cl.expand_ranges([(None, None)])
+
+    def test_outside_window_mirrors_window_pred(self):
+        self.assertEqual(cl.outside_window(None, None), '{(,)}')
+        self.assertEqual(cl.outside_window(d(1), None), '{(,2026-03-01)}')
+        self.assertEqual(cl.outside_window(d(1), d(31)), '{(,2026-03-01),[2026-04-01,)}')
+
+
+class TestLedger(unittest.TestCase):
+    def test_covered_days_unions_key_ranges(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [(d(1), d(3)), (d(7), d(8))]
+        self.assertEqual(cl.covered_days(cur, 'swaps', [4, 2], d(1), d(10)), {d(1), d(2), d(7)})
+        sql, params = cur.execute.call_args[0]
+        self.assertIn('c.key_id = ANY(%s)', sql)
+        self.assertEqual(params, (d(1), d(10), 'swaps', [4, 2]))
+        cur.reset_mock()
+        self.assertEqual(cl.covered_days(cur, 'swaps', [], d(1), d(10)), set())
+        cur.execute.assert_not_called()
+
+    def test_mark_route_days_upserts_sorted_keys(self):
+        cur = MagicMock()
+        cur.rowcount = 1
+        self.assertEqual(cl.mark_route_days(cur, 'swaps', {(9, d(2)), (3, D), (3, '2026-03-01')}), 1)
+        sql, params = cur.execute.call_args[0]
+        self.assertIn('WHERE NOT coverage_ledger.days @> EXCLUDED.days', sql)
+        self.assertEqual(params, ('swaps', [3, 9], ['2026-03-01', '2026-03-02']))
+        cur.reset_mock()
+        self.assertEqual(cl.mark_route_days(cur, 'swaps', set()), 0)
+        cur.execute.assert_not_called()
+
+    def test_classifier_marks_only_current_routes(self):
+        assignments = [{'route_id': 5, 'prev_route_id': 777, 'pool_id': 1, 'ts': '2026-03-01T10:00:00'}]
+        dirty = rc.dirty_from_staging(assignments)
+        self.assertEqual(dirty['covered_route_days'], {(5, D)})
+        cur = MagicMock()
+        cur.rowcount = 1
+        rc.record_dirty_keys(cur, dirty)
+        first_sql, first_params = cur.execute.call_args_list[0][0]
+        self.assertIn('INSERT INTO coverage_ledger', first_sql)
+        self.assertEqual(first_params[1], [5])
+
+
+class TestReaders(unittest.TestCase):
+    def test_goal_state_check_reads_ready_layers_from_ledger(self):
+        cur = MagicMock()
+        with patch.object(cl, 'covered_days', return_value={D}) as covered:
+            days = odr._coverage_days(conn_for(cur), 'liquidity_pool_daily_stats', [1], [10, 11],
+                                      D, d(7), ledger_layers={'liquidity_pool_daily_stats'})
+        self.assertEqual(days, {D})
+        covered.assert_called_once_with(cur, 'liquidity_pool_daily_stats', [10, 11], D, d(7))
+        cur.execute.assert_not_called()
+
+    def test_swaps_layer_fallback_scans_the_ledger_source(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [(D,)]
+        self.assertEqual(odr._coverage_days(conn_for(cur), 'swaps', [1], None, D, d(7)), {D})
+        self.assertIn(f'FROM {cl.RAW_SWAP_TABLE} s', cur.execute.call_args[0][0])
+        self.assertIn(f' FROM {cl.RAW_SWAP_TABLE} s ', cl._source('swaps')[0])
+
+    def test_retention_prunes_and_trims_the_ledger_source(self):
+        with patch.object(odr, 'RAW_SWAP_TABLE', 'swaps_staging'):
+            self.assertEqual([t['table'] for t in odr._partition_targets('swaps')],
+                             ['swaps_staging', 'swaps'])  # legacy mirror pruned alongside
+        with patch.object(odr, 'RAW_SWAP_TABLE', 'swaps'):
+            self.assertEqual([t['table'] for t in odr._partition_targets('swaps')], ['swaps'])
+        pairs = [{'pair_id': 3}]
+        with patch.object(odr, '_used_pool_windows', return_value={}), \
+                patch.object(odr, 'effective_window', return_value=(D, None)), \
+                patch.object(cl, 'trim') as trim:
+            odr._trim_coverage_ledger(conn_for(MagicMock()), pairs, {}, d(7))
+        trim.assert_called_once()
+        self.assertEqual(trim.call_args[0][1:], ('swaps', [3], D, None))
+
+    def test_reconcile_uses_ledger_only_when_fully_backfilled(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+        state = reconcile.CoverageState()
+        with patch.object(cl, 'ready_layers', return_value={'swaps'}):
+            self.assertFalse(reconcile._load_from_coverage_ledger(conn_for(cur), state))
+        with patch.object(cl, 'ready_layers', return_value=set(cl.LAYERS)), \
+                patch.object(cl, 'chain_days', side_effect=lambda _c, layer: {('base', D)}
+                             if layer in ('swaps', 'route_daily_stats') else set()):
+            self.assertTrue(reconcile._load_from_coverage_ledger(conn_for(cur), state))
+        self.assertEqual(state.classified, {('base', D)})
+        self.assertIn(('base', D), state.raw_present)
+        self.assertEqual(state.product_present['route.daily_stats'], {('base', D)})
+        self.assertEqual(state.product_present['pool.daily_stats'], set())
+
+
+if __name__ == '__main__':
+    unittest.main()
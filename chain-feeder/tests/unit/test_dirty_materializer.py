@@ -0,0 +1,214 @@
+"""Unit tests for the key-scoped dirty-day recompute (no database required)."""
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import route_classifier as rc  # noqa: E402
+
+D1, D2, D3 = date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 9)
+CFG = {'bucket_count': 64, 'min_amount_usd': 1.0, 'max_amount_usd': 1e9}
+
+
+class TestPlanning(unittest.TestCase):
+    def test_day_windows_skip_gaps_and_chunk(self):
+        self.assertEqual(rc._day_windows(['2026-03-02', D1, D3], 7),
+                         [(D1, date(2026, 3, 3)), (D3, date(2026, 3, 10))])
+        days = [date(2026, 3, n) for n in range(1, 6)]
+        self.assertEqual(rc._day_windows(days, 2),
+                         [(D1, date(2026, 3, 3)), (date(2026, 3, 3), date(2026, 3, 5)),
+                          (date(2026, 3, 5), date(2026, 3, 6))])
+
+    def test_busy_days_fall_back_to_whole_day(self):
+        route_days = [(r, D1) for r in range(5)] + [(9, D2)]
+        pool_days = [(1, D2), (2, D3), (3, D3), (4, D3)]
+        full, routes, pools = rc.plan_dirty_recompute(route_days, pool_days, max_keys_per_day=2)
+        self.assertEqual(full, {D1, D3})
+        self.assertEqual(routes, {(9, D2)})
+        self.assertEqual(pools, {(1, D2)})
+
+
+class TestKeyScopedRecompute(unittest.TestCase):
+    def _cursor(self):
+        cur = MagicMock()
+        cur.rowcount = 3
+        cur.fetchone.return_value = (2, 40)
+        return cur
+
+    def test_route_days_join_the_key_table(self):
+        cur = self._cursor()
+        stats = {}
+        with patch.object(rc, 'load_distribution_config', return_value=CFG):
+            n = rc.recompute_route_days(cur, [(11, D1), (12, D1), (11, D3)], table_name='swaps_staging',
+                                        stats=stats)
+        copied = cur.copy_expert.call_args[0][1].getvalue().splitlines()
+        self.assertEqual(sorted(copied), ['11\t2026-03-01', '11\t2026-03-09', '12\t2026-03-01'])
+
+        sql = [c[0][0] for c in cur.execute.call_args_list]
+        deletes = [s for s in sql if s.lstrip().startswith('DELETE')]
+        self.assertEqual(len(deletes), 6)  # two windows x (daily stats, pair rollup, buckets)
+        self.assertTrue(all('USING _dirty_route_keys k' in s and 'k.key_id' in s for s in deletes))
+        inserts = [s for s in sql if 'INSERT INTO' in s]
+        self.assertTrue(all('JOIN _dirty_route_keys k ON k.key_id = s.route_id' in s
+                            for s in inserts if 'FROM swaps_staging s' in s))
+        pair_inserts = [s for s in inserts if 'INSERT INTO pair_daily_stats' in s]
+        self.assertEqual(len(pair_inserts), 2)
+        self.assertTrue(all('JOIN _dirty_route_keys k ON k.key_id = rs.route_id' in s for s in pair_inserts))
+        self.assertEqual(n, 8)
+        self.assertEqual(stats, {'rows_deleted': 18, 'rows_inserted': 14, 'rows_scanned': 160})
+
+    def test_whole_day_rebuild_has_no_key_join(self):
+        cur = self._cursor()
+        stats = {}
+        rc.recompute_daily_stats(cur, ['2026-03-01'], table_name='swaps_staging', stats=stats)
+        sql = ' '.join(c[0][0] for c in cur.execute.call_args_list)
+        self.assertNotIn('_dirty_', sql)
+        cur.copy_expert.assert_not_called()
+        self.assertEqual(stats, {'rows_deleted': 6, 'rows_inserted': 5, 'rows_scanned': 40})
+
+    def test_empty_keys_do_nothing(self):
+        cur = self._cursor()
+        self.assertEqual(rc.recompute_pool_days(cur, set()), 0)
+        cur.execute.assert_not_called()
+
+
+class TestHourlyLayer(unittest.TestCase):
+    def test_recent_days_go_through_hourly_stats(self):
+        cur = MagicMock()
+        cur.rowcount = 3
+        cur.fetchone.side_effect = [(2, 40), (5, 30), (1,)]
+        stats = {}
+        with patch.object(rc, 'hourly_cutoff', return_value=D2):
+            n = rc.recompute_daily_stats(cur, [D1, D2], table_name='swaps_staging', stats=stats)
+        calls = [(c[0][0], c[0][1]) for c in cur.execute.call_args_list]
+        self.assertIn('INSERT INTO route_daily_stats', calls[1][0])
+        self.assertIn('FROM swaps_staging s', calls[1][0])
+        self.assertEqual(calls[1][1], ('2026-03-01 00:00:00', '2026-03-02 00:00:00'))
+        self.assertTrue(calls[2][0].startswith('DELETE FROM route_hourly_stats'))
+        self.assertIn("date_trunc('hour', s.ts)", calls[3][0])
+        self.assertIn('FROM route_hourly_stats h', calls[4][0])
+        self.assertEqual(calls[4][1], ('2026-03-02 00:00:00', '2026-03-03 00:00:00'))
+        self.assertEqual(n, 3)
+        self.assertTrue(calls[5][0].startswith('DELETE FROM pair_daily_stats'))
+        self.assertEqual(calls[5][1], ('2026-03-01', '2026-03-03'))
+        self.assertEqual(stats, {'rows_deleted': 9, 'rows_inserted': 11, 'rows_scanned': 70})
+
+    def test_hourly_rebuild_is_key_scoped(self):
+        cur = MagicMock()
+        cur.fetchone.side_effect = [(5, 30), (1,)]
+        with patch.object(rc, 'hourly_cutoff', return_value=D1):
+            rc._recompute_daily_stats(cur, {D2}, 7, 'swaps_staging', keys_table='_dirty_route_keys')
+        sql = [c[0][0] for c in cur.execute.call_args_list]
+        self.assertIn('USING _dirty_route_keys k', sql[1])
+        self.assertIn('route_hourly_stats.route_id = k.key_id', sql[1])
+        self.assertIn('JOIN _dirty_route_keys k ON k.key_id = s.route_id', sql[2])
+        self.assertIn('JOIN _dirty_route_keys k ON k.key_id = h.route_id', sql[3])
+
+    def test_purge_uses_retention(self):
+        cur = MagicMock()
+        cur.rowcount = 7
+        with patch.object(rc, 'hourly_cutoff', return_value=D3):
+            self.assertEqual(rc.purge_hourly_stats(cur), 7)
+        self.assertEqual(cur.execute.call_args[0][1], ('2026-03-09 00:00:00',))
+
+    def test_watermark_bump_upserts_route_stats(self):
+        cur = MagicMock()
+        cur.fetchone.return_value = (42,)
+        self.assertEqual(rc.bump_materialization_watermark(cur), 42)
+        sql, params = cur.execute.call_args[0]
+        self.assertIn('ON CONFLICT (name) DO UPDATE', sql)
+        self.assertIn('version = materialization_watermark.version + 1', sql)
+        self.assertEqual(params, ('route_stats',))
+
+
+class TestRoutePaths(unittest.TestCase):
+    def test_path_tokens_and_cumulative_fee(self):
+        hops = [('USDC', 'WETH', '0.05000000000000000000%', 'Uniswap V3', 'Ethereum'),
+                (None, 'WBTC', 'Dynamic', 'Uniswap V4', 'Ethereum')]
+        tokens, fee = rc.route_path_tokens(hops, 'USDC', 'WBTC')
+        self.assertEqual(tokens, ['USDC', '0.05000000000000000000%|Uniswap V3|Ethereum', 'WETH',
+                                  'Dynamic|Uniswap V4|Ethereum', 'WBTC'])
+        self.assertAlmostEqual(fee, 0.0005 + 0.0002)
+        self.assertEqual(rc.route_path_tokens([], 'A', 'B'), (['A', 'B'], 0.0))
+
+    def test_only_routes_without_a_path_are_built(self):
+        cur = MagicMock()
+        cur.fetchall.side_effect = [
+            [(7,)],                                                    # routes missing a path
+            [(7, 70, 1, 'USDC', 'WETH')],                               # route meta
+            [(7, 'USDC', 'WETH', '0.30000000000000000000%', 'Uniswap V3', 'Base')],
+        ]
+        with patch.object(rc.psycopg2.extras, 'execute_values') as ev:
+            self.assertEqual(rc.ensure_route_paths(cur, D1, D2), 1)
+        self.assertIn('NOT EXISTS (SELECT 1 FROM route_path', cur.execute.call_args_list[0][0][0])
+        rows = ev.call_args[0][2]
+        self.assertEqual(rows[0][:5], (7, 70, 1, 'USDC', 'WETH'))
+        self.assertEqual(rows[0][5], ['USDC', '0.30000000000000000000%|Uniswap V3|Base', 'WETH'])
+        self.assertAlmostEqual(rows[0][6], 0.003)
+
+
+class TestReclassifiedLegs(unittest.TestCase):
+    def test_previous_route_is_marked_dirty(self):
+        legs = [{'tx_hash': '0xa', 'log_index': 0, 'ts': '2026-03-01 10:00:00', 'pool_id': 5,
+                 'amount0': 1.0, 'amount1': -1.0, 'amount_usd': 50.0, 'route_id': 777,
+                 'chain_id': 1, 'token0': '0x1', 'token1': '0x2', 'symbol0': 'A', 'symbol1': 'B',
+                 'coin0_id': 1, 'coin1_id': 2}]
+        with patch.object(rc, 'resolve_pair', return_value=10), \
+                patch.object(rc, 'resolve_route', return_value=888), \
+                patch.object(rc.psycopg2.extras, 'execute_values'):
+            _, _, dirty = rc.classify_legs(MagicMock(), legs)
+        self.assertEqual(dirty['route_days'], {(888, D1), (777, D1)})
+        self.assertEqual(dirty['pool_days'], {(5, D1)})
+
+
+class TestStagingDirtyKeys(unittest.TestCase):
+    CANDIDATES = [{'candidate_key': 'k1', 'chain_id': 1, 'origin_contract': '0x1', 'dest_contract': '0x3',
+                   'origin_coin_id': 1, 'dest_coin_id': 3, 'origin_symbol': 'A', 'dest_symbol': 'C',
+                   'pools': [5, 6], 'tokens': ['0x1', '0x2', '0x3'],
+                   'first_seen': '2026-03-01 10:00:00', 'last_seen': '2026-03-01 10:00:00'}]
+
+    def _assignments(self):
+        return [{'candidate_key': 'k1', 'tx_hash': '0xa', 'log_index': i, 'ts': '2026-03-01 10:00:00',
+                 'pool_id': pool} for i, pool in ((0, 5), (1, 6))]
+
+    def test_merge_annotates_assignments_from_returning(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [('0xa', 0, 777), ('0xa', 1, None)]
+        assignments = self._assignments()
+        updated = rc.merge_route_staging(cur, [dict(c) for c in self.CANDIDATES], assignments)
+        self.assertEqual(updated, 2)
+        self.assertIn('RETURNING s.tx_hash, s.log_index, prev.route_id', cur.execute.call_args[0][0])
+        rid = assignments[0]['route_id']
+        self.assertEqual([a['route_id'] for a in assignments], [rid, rid])
+        self.assertEqual([a['prev_route_id'] for a in assignments], [777, None])
+
+        dirty = rc.dirty_from_staging(assignments)
+        self.assertEqual(dirty['route_days'], {(rid, D1), (777, D1)})
+        self.assertEqual(dirty['pool_days'], {(5, D1), (6, D1)})
+
+    def test_batch_path_returns_exact_keys(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+        with patch.object(rc, 'collect_route_staging',
+                          return_value=([dict(c) for c in self.CANDIDATES], self._assignments(), {'2026-03-01'})):
+            updated, days, dirty = rc.classify_tx_hashes_batch(cur, ['0xa'])
+        self.assertEqual((updated, days), (0, {'2026-03-01'}))
+        self.assertEqual(len(dirty['route_days']), 1)
+        self.assertEqual(dirty['pool_days'], {(5, D1), (6, D1)})
+
+    def test_record_dirty_keys_one_statement_per_table(self):
+        cur = MagicMock()
+        cur.rowcount = 2
+        counts = rc.record_dirty_keys(cur, {'route_days': {(9, D2), (3, D1)}, 'pool_days': set()})
+        self.assertEqual(counts, (2, 0))
+        self.assertEqual(cur.execute.call_count, 1)
+        sql, params = cur.execute.call_args[0]
+        self.assertIn('dirty_route_day', sql)
+        self.assertEqual(params, ([3, 9], ['2026-03-01', '2026-03-02']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+"""Unit tests for the partition-aware retention planner (no database required)."""
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import od_retention_planner as rp  # noqa: E402
+
+BOUND = "FOR VALUES FROM ('2025-06-01 00:00:00+00') TO ('2025-07-01 00:00:00+00')"
+TARGET = {'layer': 'swaps', 'table': 'swaps', 'alias': 's2',
+          'joins': "LEFT JOIN _od_route_keep w ON w.route_id = s2.route_id",
+          'expired': "w.route_id IS NOT NULL AND NOT w.keeps", 'args': ()}
+MB = 1 << 20
+
+
+class FakeCursor:
+    """Answers catalog/count queries from `counts` {partition: (rows, expired)}."""
+
+    def __init__(self, counts, rowcount=0, guard_called=False):
+        self.counts, self.rowcount, self.sql = counts, rowcount, []
+        self.guard_called = guard_called
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        self.sql.append(' '.join(sql.split()))
+        self._row = None
+        if 'relpartbound' in sql and 'pg_class WHERE oid' in sql:
+            self._row = (BOUND,)
+        elif 'pg_get_partkeydef' in sql:
+            self._row = ('RANGE (ts)',)
+        elif 'is_called' in sql:
+            self._row = (self.guard_called,)
+        elif 'COUNT(*) FILTER' in sql:
+            name = sql.split('FROM "', 1)[1].split('"', 1)[0]
+            self._row = self.counts[name]
+        elif sql.lstrip().startswith('INSERT INTO'):
+            name = sql.split('FROM "', 1)[1].split('"', 1)[0]
+            self.rowcount = self.counts[name][0] - self.counts[name][1]
+        elif sql.lstrip().startswith('DELETE'):
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self._row
+
+    def fetchall(self):
+        if 'attname' in self.sql[-1]:
+            return [('ts',), ('tx_hash',)]
+        if 'pg_get_constraintdef' in self.sql[-1]:
+            return [('CREATE UNIQUE INDEX swaps_pkey ON ONLY public.swaps USING btree (ts, tx_hash)',
+                     'PRIMARY KEY (ts, tx_hash)', 'swaps_2025_06_pkey'),
+                    ('CREATE INDEX swaps_route_idx ON ONLY public.swaps USING btree (route_id)',
+                     None, 'swaps_2025_06_route_id_idx')]
+        if 'pg_get_indexdef' in self.sql[-1]:
+            return [('CREATE INDEX swaps_2025_06_brin ON public.swaps_2025_06 USING brin (network, ts)',)]
+        return []
+
+
+def conn_for(cur):
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+    return conn
+
+
+def plan_row(name, rows, expired, strategy):
+    return {'layer': 'swaps', 'table': 'swaps', 'partition': name, 'range': '2025-06-01..2025-07-01',
+            'rows': rows, 'expired': expired, 'strategy': strategy, 'estimated': False,
+            'io': rp.estimate_io(100 * MB, 40 * MB, rows, expired)}
+
+
+class TestPlanning(unittest.TestCase):
+    def test_parse_bound(self):
+        self.assertEqual(rp.parse_partition_bound(BOUND),
+                         ('2025-06-01 00:00:00+00', '2025-07-01 00:00:00+00'))
+        self.assertIsNone(rp.parse_partition_bound('DEFAULT'))
+
+    def test_choose_strategy(self):
+        self.assertEqual(rp.choose_strategy(100, 0, True), 'keep')
+        self.assertEqual(rp.choose_strategy(100, 100, True), 'drop')
+        self.assertEqual(rp.choose_strategy(100, 60, True), 'rewrite')
+        self.assertEqual(rp.choose_strategy(100, 10, True), 'delete')
+        self.assertEqual(rp.choose_strategy(100, 100, False), 'delete')  # default partition
+        self.assertEqual(rp.choose_strategy(100, 30, True, rewrite_threshold=0.25), 'rewrite')
+
+    def test_io_estimates_favour_the_chosen_strategy(self):
+        mostly = rp.estimate_io(1000 * MB, 400 * MB, 10_000_000, 9_000_000)
+        self.assertEqual(mostly['drop']['write'], 0)
+        self.assertLess(mostly['rewrite']['write'], mostly['delete']['write'])
+        self.assertEqual(mostly['delete']['freed'], 0)
+        residue = rp.estimate_io(1000 * MB, 400 * MB, 10_000_000, 2_000)
+        self.assertLess(residue['delete']['write'], residue['rewrite']['write'])
+        self.assertEqual(rp.estimate_io(0, 0, 0, 0)['rewrite']['write'], 0)
+
+    def test_plan_samples_large_partitions(self):
+        cur = FakeCursor({'swaps_2025_06': (1000, 1000), 'swaps_2025_07': (50, 5)})
+        cur.fetchall = lambda: [('swaps_2025_06', BOUND, 100 * MB, 40 * MB, 5e6),
+                                ('swaps_2025_07', BOUND, MB, MB, 50.0)]
+        cur.fetchone = lambda: ('p',) if 'relkind' in cur.sql[-1] else cur._row
+        plans = rp.plan_target(conn_for(cur), TARGET, sample_rows=1000)
+        self.assertEqual([(p['strategy'], p['rows'], p['expired'], p['estimated']) for p in plans],
+                         [('drop', 5000000, 5000000, True), ('delete', 50, 5, False)])
+        self.assertIn('TABLESAMPLE SYSTEM (0.0200)', next(s for s in cur.sql if 'swaps_2025_06' in s))
+        summary = rp.summarize(plans)
+        self.assertEqual(summary['drop']['freed'], 140 * MB)
+        self.assertEqual(summary['delete_only']['partitions'], 2)
+        self.assertEqual(len(rp.format_plan(plans)), 3)
+
+
+class TestExecution(unittest.TestCase):
+    def test_drop_detaches_and_drops(self):
+        cur = FakeCursor({'swaps_2025_06': (500, 500)})
+        conn = conn_for(cur)
+        removed = rp.execute_plan(conn, TARGET, [plan_row('swaps_2025_06', 500, 500, 'drop')])
+        self.assertEqual(removed, {'drop': 500, 'rewrite': 0, 'delete': 0})
+        self.assertTrue(cur.sql[0].startswith('LOCK TABLE "swaps_2025_06" IN SHARE ROW EXCLUSIVE MODE'))
+        swap = cur.sql[cur.sql.index('SET LOCAL lock_timeout = 5000'):]
+        self.assertEqual(swap, [
+            'SET LOCAL lock_timeout = 5000',
+            'LOCK TABLE "swaps" IN ACCESS EXCLUSIVE MODE',
+            'SELECT is_called FROM "swaps_2025_06_rw_guard"',
+            'ALTER TABLE "swaps" DETACH PARTITION "swaps_2025_06"',
+            'DROP TABLE "swaps_2025_06"',
+            'DROP SEQUENCE "swaps_2025_06_rw_guard"',
+        ])
+        self.assertEqual(conn.commit.call_count, 2)  # prepare, then the short swap
+
+    def test_rewrite_prepares_attachable_copy(self):
+        cur = FakeCursor({'swaps_2025_06': (500, 400)})
+        removed = rp.execute_plan(conn_for(cur), TARGET, [plan_row('swaps_2025_06', 500, 400, 'rewrite')])
+        self.assertEqual(removed['rewrite'], 400)
+        ddl = [s for s in cur.sql if s.startswith(('CREATE', 'INSERT', 'ALTER', 'DROP', 'LOCK TABLE "swaps"'))]
+        self.assertTrue(ddl[1].startswith('CREATE TABLE "swaps_2025_06_rw" (LIKE "swaps"'))
+        self.assertIn('INSERT INTO "swaps_2025_06_rw" ("ts", "tx_hash") SELECT s2."ts", s2."tx_hash"', ddl[2])
+        self.assertIn('WHERE NOT COALESCE((w.route_id IS NOT NULL AND NOT w.keeps), false)', ddl[2])
+        parent_lock = ddl.index('LOCK TABLE "swaps" IN ACCESS EXCLUSIVE MODE')
+        # everything expensive happens before the parent is locked
+        self.assertEqual(ddl[3:7], [
+            'ALTER TABLE "swaps_2025_06_rw" ADD CONSTRAINT "swaps_2025_06_pkey_rw" PRIMARY KEY (ts, tx_hash)',
+            'CREATE INDEX "swaps_2025_06_route_id_idx_rw" ON "swaps_2025_06_rw" USING btree (route_id)',
+            'CREATE INDEX "swaps_2025_06_brin_rw" ON "swaps_2025_06_rw" USING brin (network, ts)',
+            'ALTER TABLE "swaps_2025_06_rw" ADD CONSTRAINT "swaps_2025_06_rw_bound" CHECK ("ts" IS NOT NULL '
+            "AND \"ts\" >= '2025-06-01 00:00:00+00' AND \"ts\" < '2025-07-01 00:00:00+00')",
+        ])
+        self.assertTrue(ddl[parent_lock - 1].startswith('CREATE TRIGGER od_retention_guard'))
+        self.assertEqual(ddl[parent_lock + 1:], [
+            'ALTER TABLE "swaps" DETACH PARTITION "swaps_2025_06"',
+            'DROP TABLE "swaps_2025_06"',
+            'ALTER TABLE "swaps_2025_06_rw" RENAME TO "swaps_2025_06"',
+            'ALTER INDEX "swaps_2025_06_pkey_rw" RENAME TO "swaps_2025_06_pkey"',
+            'ALTER INDEX "swaps_2025_06_route_id_idx_rw" RENAME TO "swaps_2025_06_route_id_idx"',
+            'ALTER INDEX "swaps_2025_06_brin_rw" RENAME TO "swaps_2025_06_brin"',
+            f'ALTER TABLE "swaps" ATTACH PARTITION "swaps_2025_06" {BOUND}',
+            'ALTER TABLE "swaps_2025_06" DROP CONSTRAINT "swaps_2025_06_rw_bound"',
+            'DROP SEQUENCE "swaps_2025_06_rw_guard"',
+        ])
+
+    def test_write_during_prepare_defers_the_swap(self):
+        cur = FakeCursor({'swaps_2025_06': (500, 400)}, guard_called=True)
+        removed = rp.execute_plan(conn_for(cur), TARGET, [plan_row('swaps_2025_06', 500, 400, 'rewrite')])
+        self.assertEqual(removed, {'drop': 0, 'rewrite': 0, 'delete': 0})
+        self.assertFalse(any('DETACH' in s for s in cur.sql))
+        self.assertEqual(cur.sql[-3:], [
+            'DROP TRIGGER IF EXISTS od_retention_guard ON "swaps_2025_06"',
+            'DROP SEQUENCE IF EXISTS "swaps_2025_06_rw_guard"',
+            'DROP TABLE IF EXISTS "swaps_2025_06_rw"',
+        ])
+
+    def test_parent_lock_timeout_defers_the_swap(self):
+        class LockNotAvailable(Exception):
+            pgcode = '55P03'
+        cur = FakeCursor({'swaps_2025_06': (500, 500)})
+        execute = cur.execute
+
+        def timing_out(sql, args=None):
+            execute(sql, args)
+            if sql == 'LOCK TABLE "swaps" IN ACCESS EXCLUSIVE MODE':
+                raise LockNotAvailable()
+        cur.execute = timing_out
+        conn = conn_for(cur)
+        removed = rp.execute_plan(conn, TARGET, [plan_row('swaps_2025_06', 500, 500, 'drop')])
+        self.assertEqual(removed['drop'], 0)
+        conn.rollback.assert_called_once()
+        self.assertEqual(cur.sql[-1], 'DROP SEQUENCE IF EXISTS "swaps_2025_06_rw_guard"')
+
+    def test_exact_recount_downgrades_a_sampled_drop(self):
+        # the sample said fully expired; a few retained rows turn up under the lock
+        cur = FakeCursor({'swaps_2025_06': (500, 30)})
+        removed = rp.execute_plan(conn_for(cur), TARGET, [plan_row('swaps_2025_06', 500, 500, 'drop')])
+        self.assertEqual(removed, {'drop': 0, 'rewrite': 0, 'delete': 0})
+        self.assertFalse(any('DETACH' in s for s in cur.sql))
+        self.assertTrue(cur.sql[-1].startswith('DELETE FROM "swaps_2025_06" t WHERE t.ctid IN'))
+
+
+if __name__ == '__main__':
+    unittest.main()
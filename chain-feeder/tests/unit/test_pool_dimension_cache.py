@@ -0,0 +1,85 @@
+"""Unit tests for the classifier's pool-dimension cache (no database required)."""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import route_classifier as rc  # noqa: E402
+
+TS = datetime(2026, 3, 1, 12, 0, 0)
+DIMS = {
+    5: (1, '0xa', '0xb', 'A', 'B', 10, 11),
+    6: (1, '0xb', '0xc', 'B', 'C', 11, 12),
+}
+
+
+class FakeCursor:
+    """Answers the stats, narrow swap and dimension queries from dicts."""
+
+    def __init__(self, swaps):
+        self.swaps = swaps
+        self.version = 1
+        self.queries = []
+        self._result = []
+
+    def execute(self, sql, params=None):
+        kind = ('version' if 'pg_stat_user_tables' in sql
+                else 'dims' if 'FROM liquidity_pool lp' in sql else 'swaps')
+        self.queries.append(kind)
+        if kind == 'version':
+            self._result = [('coin', self.version), ('liquidity_pool', 7)]
+        elif kind == 'dims':
+            self._result = [(pid,) + DIMS[pid] for pid in params[0] if pid in DIMS]
+        else:
+            assert 'JOIN' not in sql
+            self._result = [row for row in self.swaps if row[0] in params[0]]
+
+    def fetchall(self):
+        return self._result
+
+
+class TestPoolDimensionCache(unittest.TestCase):
+    def setUp(self):
+        self.swaps = [
+            ('0x1', 0, TS, 5, 100.0, -99.0, 100.0, None),
+            ('0x1', 1, TS, 6, 99.0, -98.0, 99.0, None),
+            ('0x2', 0, TS, 9, 1.0, -1.0, 1.0, None),  # pool without contracts
+        ]
+        self.cache = rc.PoolDimensionCache()
+
+    def test_legs_are_enriched_from_cache(self):
+        cur = FakeCursor(self.swaps)
+        legs = rc._legs_for_txs(cur, ['0x1', '0x2'], table_name='swaps_staging', dims=self.cache)
+        self.assertEqual([(leg['tx_hash'], leg['pool_id']) for leg in legs], [('0x1', 5), ('0x1', 6)])
+        self.assertEqual((legs[1]['token0'], legs[1]['symbol1'], legs[1]['coin1_id']), ('0xb', 'C', 12))
+        self.assertEqual(cur.queries, ['swaps', 'version', 'dims'])
+
+        cur.queries.clear()
+        rc._legs_for_txs(cur, ['0x1'], dims=self.cache)
+        self.assertEqual(cur.queries, ['swaps', 'version'])
+        self.assertEqual(self.cache.stats, {'hits': 2, 'misses': 3, 'reloads': 0})
+
+    def test_dimension_change_reloads(self):
+        cur = FakeCursor(self.swaps)
+        rc._legs_for_txs(cur, ['0x1'], dims=self.cache)
+        cur.version = 2
+        cur.queries.clear()
+        rc._legs_for_txs(cur, ['0x1'], dims=self.cache)
+        self.assertEqual(cur.queries, ['swaps', 'version', 'dims'])
+        self.assertEqual(self.cache.stats['reloads'], 1)
+
+    def test_new_pool_fetched_on_miss(self):
+        cur = FakeCursor(self.swaps)
+        self.cache.lookup(cur, {5})
+        DIMS[9] = (8453, '0xd', '0xe', 'D', 'E', 13, 14)
+        try:
+            self.assertEqual(self.cache.lookup(cur, {5, 9})[9][0], 8453)
+        finally:
+            del DIMS[9]
+        self.assertEqual(cur.queries, ['version', 'dims', 'version', 'dims'])
+
+
+if __name__ == '__main__':
+    unittest.main()
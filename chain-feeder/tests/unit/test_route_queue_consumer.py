@@ -0,0 +1,115 @@
+"""Unit tests for the parallel route classification queue consumer (no database)."""
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import route_queue_consumer as rqc  # noqa: E402
+
+
+class FakeQueue:
+    """In-memory stand-in for the claim / reconstruct / merge / complete steps."""
+
+    def __init__(self, n_tx, fail_tx=None):
+        self.pending = [f"0x{n:04x}" for n in range(n_tx)]
+        self.fail_tx = fail_tx
+        self.lock = threading.Lock()
+        self.events = []
+        self.completed = []
+        self.released = []
+
+    def claim(self, conn, batch_size):
+        with self.lock:
+            batch, self.pending = self.pending[:batch_size], self.pending[batch_size:]
+            if batch:
+                self.events.append(('claim', batch[0]))
+            return [(tx, 0) for tx in batch]
+
+    def reconstruct(self, tx_hashes, table_name):
+        if self.fail_tx in tx_hashes:
+            raise ValueError('bad tx')
+        return ([{'candidate_key': tx, 'first_seen': None, 'last_seen': None} for tx in tx_hashes],
+                [{'candidate_key': tx, 'tx_hash': tx} for tx in tx_hashes], set())
+
+    def merge(self, cur, candidates, assignments, table_name):
+        with self.lock:
+            self.events.append(('merge', assignments[0]['tx_hash']))
+        return len(assignments)
+
+    def complete(self, cur, claimed):
+        with self.lock:
+            self.completed.extend(tx for tx, _ in claimed)
+
+    def release(self, conn, tx_hashes, error):
+        with self.lock:
+            self.released.extend(tx_hashes)
+
+
+def _run(queue, **kw):
+    depth = {'pending': 0, 'ready': 0, 'processing': 0, 'oldest_pending_s': None}
+    with patch.object(rqc, 'claim_batch', queue.claim), \
+            patch.object(rqc, 'reconstruct_tx_hashes', queue.reconstruct), \
+            patch.object(rqc, 'merge_route_staging', queue.merge), \
+            patch.object(rqc, 'complete_batch', queue.complete), \
+            patch.object(rqc, 'release_batch', queue.release), \
+            patch.object(rqc, 'record_dirty_keys', MagicMock()), \
+            patch.object(rqc, 'dirty_from_staging', MagicMock()), \
+            patch.object(rqc, 'recover_stale_claims', return_value=0), \
+            patch.object(rqc, 'queue_depth', return_value=depth), \
+            patch.object(rqc, 'record_run') as record_run, \
+            ThreadPoolExecutor(4) as pool:
+        consumer = rqc.QueueConsumer(MagicMock, pool=pool, **kw)
+        summary = consumer.run()
+    record_run.assert_called_once()
+    return summary
+
+
+class TestQueueConsumer(unittest.TestCase):
+    def test_concurrent_claimers_drain_every_hash_once(self):
+        queue = FakeQueue(1000)
+        summary = _run(queue, claimers=3, batch_size=50, shard_size=20, max_batches=100)
+        self.assertEqual(sorted(queue.completed), [f"0x{n:04x}" for n in range(1000)])
+        self.assertEqual((summary['batches'], summary['legs'], summary['failed_batches']), (20, 1000, 0))
+        self.assertIsNotNone(summary['batch_p95_ms'])
+
+    def test_next_batch_claimed_before_previous_merge(self):
+        queue = FakeQueue(30)
+        _run(queue, claimers=1, batch_size=10)
+        self.assertEqual(queue.events, [('claim', '0x0000'), ('claim', '0x000a'), ('merge', '0x0000'),
+                                        ('claim', '0x0014'), ('merge', '0x000a'), ('merge', '0x0014')])
+
+    def test_batch_budget_is_shared(self):
+        queue = FakeQueue(1000)
+        summary = _run(queue, claimers=4, batch_size=10, max_batches=7)
+        self.assertEqual(summary['batches'], 7)
+        self.assertEqual(len(queue.pending), 930)
+
+    def test_failed_reconstruction_releases_only_that_batch(self):
+        queue = FakeQueue(30, fail_tx='0x000c')
+        summary = _run(queue, claimers=1, batch_size=10, shard_size=5)
+        self.assertEqual(queue.released, [f"0x{n:04x}" for n in range(10, 20)])
+        self.assertEqual((summary['batches'], summary['failed_batches']), (2, 1))
+
+
+class TestRecordRun(unittest.TestCase):
+    def test_missing_metrics_table_is_logged_not_raised(self):
+        cur = MagicMock()
+        cur.execute.side_effect = RuntimeError('relation "route_classification_run" does not exist')
+        with self.assertLogs(rqc.log, 'WARNING'):
+            self.assertFalse(rqc.record_run(cur, {'batches': 1}))
+        cur.connection.rollback.assert_called_once()
+
+
+class TestPercentile(unittest.TestCase):
+    def test_nearest_rank(self):
+        self.assertEqual(rqc._percentile([5.0, 1.0, 3.0, 2.0, 4.0], 50), 3.0)
+        self.assertEqual(rqc._percentile([5.0, 1.0, 3.0, 2.0, 4.0], 95), 5.0)
+        self.assertIsNone(rqc._percentile([], 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../dags')))
+import rpc_tvl_sync as tvl  # noqa: E402
+
+try:
+    from eth_abi import decode, encode
+except ImportError:  # Multicall3 encoding tests need eth_abi (ships with web3)
+    decode = encode = None
+
+POOL = "0x88e6a0c2ddd26feeb64f039a2c41296fcb3f5640"
+SQRT_PRICE = int((10 ** 12 / 3000) ** 0.5 * 2 ** 96)  # WETH at ~$3000 in a USDC/WETH pool
+LIQUIDITY = 10 ** 18
+
+
+def _slot0_return(sqrt_price, tick):
+    return "0x" + encode(["uint160", "int24", "uint16", "uint16", "uint16", "uint8", "bool"],
+                         [sqrt_price, tick, 1, 1, 1, 0, True]).hex()
+
+
+def _fake_aggregate3(answer):
+    """A call_rpc stand-in that answers aggregate3 calls with answer(target, calldata)."""
+    calls_seen = []
+
+    def call_rpc(method, params, network="Ethereum", retries=3):
+        data = bytes.fromhex(params[0]["data"][len(tvl.SIG_AGGREGATE3):])
+        (calls,) = decode(["(address,bool,bytes)[]"], data)
+        calls_seen.append(len(calls))
+        results = [answer(target, "0x" + cd.hex()) for target, _, cd in calls]
+        return "0x" + encode(["(bool,bytes)[]"], [[(r is not None, bytes.fromhex((r or "0x")[2:]))
+                                                  for r in results]]).hex()
+    return call_rpc, calls_seen
+
+
+@unittest.skipIf(encode is None, "eth_abi not installed")
+class TestMulticall(unittest.TestCase):
+    def test_multicall_chunks_and_keeps_order(self):
+        fake, seen = _fake_aggregate3(lambda target, cd: "0x" + target[-4:].rjust(64, "0"))
+        calls = [("0x%040x" % n, tvl.SIG_LIQUIDITY) for n in range(1, 8)]
+        with patch.object(tvl, "call_rpc", fake), patch.object(tvl, "BATCH_SIZE", 3):
+            out = tvl.multicall(calls)
+        self.assertEqual(seen, [3, 3, 1])
+        self.assertEqual([int(r, 16) for r in out], list(range(1, 8)))
+
+    def test_failed_calls_and_batches_are_none(self):
+        fake, _ = _fake_aggregate3(lambda target, cd: None if target.endswith("2") else "0x01")
+        calls = [("0x%040x" % n, tvl.SIG_LIQUIDITY) for n in range(1, 4)]
+        with patch.object(tvl, "call_rpc", fake):
+            self.assertEqual(tvl.multicall(calls), ["0x01", None, "0x01"])
+        with patch.object(tvl, "call_rpc", lambda *a, **k: None):
+            self.assertEqual(tvl.multicall(calls), [None, None, None])
+
+    def test_slot0_call_decoding(self):
+        self.assertEqual(tvl._decode_slot0_call(_slot0_return(SQRT_PRICE, -201234)), (SQRT_PRICE, -201234))
+        self.assertEqual(tvl._decode_slot0_call("0x"), (0, 0))
+
+    def test_fetch_v3_tvls(self):
+        entry = {"pool_db_id": 7, "protocol": "Uniswap V3", "fee_bps": 5, "pool_address": POOL,
+                 "c0_addr": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",
+                 "c1_addr": "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2", "c0_dec": 6, "c1_dec": 18}
+        prices = {entry["c0_addr"]: 1.0, entry["c1_addr"]: 3000.0}
+
+        def answer(target, cd):
+            if cd == tvl.SIG_SLOT0:
+                return _slot0_return(SQRT_PRICE, 195000)
+            return "0x" + encode(["uint128"], [LIQUIDITY]).hex()
+        fake, _ = _fake_aggregate3(answer)
+        with patch.object(tvl, "call_rpc", fake), \
+                patch.object(tvl, "_resolve_dex_config", lambda *a: ("0xfactory", "0xhash")):
+            rows = tvl.fetch_v3_tvls("Ethereum", [entry], prices)
+        expected = tvl.compute_tvl(SQRT_PRICE, LIQUIDITY, 6, 18, 1.0, 3000.0, 195000)
+        self.assertIsNotNone(expected)
+        self.assertEqual(rows, [(7, expected)])
+
+
+class TestBatches(unittest.TestCase):
+    def test_call_rpc_batch_matches_ids(self):
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = [{"id": 1, "result": "0xb"}, {"id": 0, "result": "0xa"}]
+        calls = [{"jsonrpc": "2.0", "method": "eth_getStorageAt", "params": [], "id": n} for n in range(2)]
+        with patch("requests.post", return_value=resp):
+            self.assertEqual(tvl.call_rpc_batch(calls), ["0xa", "0xb"])
+
+    def test_bulk_prices_one_request_per_chunk(self):
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"coins": {"base:0x01": {"price": 2.5}, "base:0x02": {"price": 0}}}
+        with patch("requests.get", return_value=resp) as get, patch.object(tvl, "PRICE_CHUNK", 2):
+            prices = tvl.fetch_token_prices_bulk("Base", ["0x01", "0x02", "0x03", "0x01"])
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(prices, {"0x01": 2.5})
+
+
+class TestWrite(unittest.TestCase):
+    def test_single_statement_per_network(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.rowcount = 12
+        self.assertEqual(tvl.write_network_tvls(conn, [(1, 10.0), (2, 0.0)], "2026-01-01"), (2, 12))
+        self.assertEqual(cur.execute.call_count, 1)
+        params = cur.execute.call_args[0][1]
+        self.assertEqual((params["ids"], params["tvls"]), ([1, 2], [10.0, 0.0]))
+        conn.commit.assert_called_once()
+        self.assertEqual(tvl.write_network_tvls(conn, [], "2026-01-01"), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+_TESTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_CHAIN_FEEDER_DIR = os.path.dirname(_TESTS_DIR)
+for _path in (_TESTS_DIR, _CHAIN_FEEDER_DIR, os.path.join(_CHAIN_FEEDER_DIR, 'dags')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from subgraph_stub import TRACKED, SwapStubData  # noqa: E402
+from common.utils.subgraph_ingest import SkippedQueryError, SubgraphSwapEngine, time_shards  # noqa: E402
+from common.utils.uniswap_utils import UniswapV3Fetcher, UniswapV4Fetcher  # noqa: E402
+
+START = 1735689600
+SPAN = 7200
+
+
+def _fetcher(data, cls=UniswapV3Fetcher):
+    fetcher = cls(network="Ethereum", protocol="Uniswap V3")
+    fetcher.token_addresses = {sym: addr for sym, (addr, _) in TRACKED.items()}
+    fetcher._execute_query = data.query
+    return fetcher
+
+
+class TestTimeShards(unittest.TestCase):
+    def test_shards_cover_window_inclusive(self):
+        self.assertEqual(time_shards(0, 9, 4), [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(time_shards(5, 5, 100), [(5, 6)])
+
+
+class TestSubgraphSwapEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Two seconds with more swaps than several pages each.
+        cls.data = SwapStubData(swaps=3000, start_ts=START, span_secs=SPAN,
+                                hot_seconds=2, hot_size=450, seed=3)
+        cls.expected = cls.data.tracked_ids()
+        cls.stamps = {r['id']: int(r['timestamp']) for r in cls.data.rows if r['id'] in cls.expected}
+
+    def _run(self, fetcher, **kw):
+        engine = SubgraphSwapEngine(fetcher, concurrency=4, max_rps=0, shard_secs=1800,
+                                    queue_pages=2, page_size=100, **kw)
+        batches = []
+        addresses = list(fetcher.token_addresses.values())
+        count, swaps = engine.run(START, START + SPAN, addresses, batches.append, True)
+        return engine, count, swaps, batches
+
+    def test_fetches_every_tracked_swap_exactly_once(self):
+        engine, count, swaps, batches = self._run(_fetcher(self.data))
+        ids = [s['id'] for s in swaps]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), self.expected)
+        self.assertEqual(count, len(self.expected))
+        self.assertEqual(sum(len(b) for b in batches), count)
+        self.assertGreater(engine.stats['keyset_pages'], 0)
+
+    def test_fetch_swaps_sorted_and_counted(self):
+        fetcher = _fetcher(self.data)
+        start = datetime.fromtimestamp(START, timezone.utc)
+        end = datetime.fromtimestamp(START + SPAN, timezone.utc)
+        swaps = fetcher.fetch_swaps(start, end)
+        self.assertEqual({s['id'] for s in swaps}, self.expected)
+        stamps = [s['timestamp'] for s in swaps]
+        self.assertEqual(stamps, sorted(stamps))
+        self.assertEqual(fetcher.fetch_swaps(start, end, collect_results=False), len(self.expected))
+
+    def test_v3_query_failure_raises(self):
+        fetcher = _fetcher(self.data)
+
+        def fail(query):
+            raise RuntimeError("gateway down")
+        fetcher._execute_query = fail
+        with self.assertRaises(RuntimeError):
+            self._run(fetcher)
+
+    def test_v4_skipped_query_fails_run(self):
+        fetcher = _fetcher(self.data, UniswapV4Fetcher)
+        fetcher._execute_query = lambda query: None
+        with self.assertRaises(SkippedQueryError):
+            self._run(fetcher)
+
+    def test_watermark_trails_written_batches(self):
+        fetcher = _fetcher(self.data)
+        written, marks = [], []
+
+        def watermark(ts):
+            # Every tracked swap at or before ts has been handed to on_batch.
+            self.assertTrue({i for i, t in self.stamps.items() if t <= ts} <= set(written))
+            marks.append(ts)
+        engine = SubgraphSwapEngine(fetcher, concurrency=4, max_rps=0, shard_secs=1800,
+                                    queue_pages=2, page_size=100)
+        engine.run(START, START + SPAN, list(fetcher.token_addresses.values()),
+                   lambda b: written.extend(s['id'] for s in b), False, watermark)
+        self.assertEqual(marks, sorted(marks))
+        self.assertEqual(marks[-1], max(self.stamps.values()))
+
+    def test_watermark_stops_before_failed_shard(self):
+        fetcher = _fetcher(self.data)
+        marks = []
+
+        def query(q):
+            if f"timestamp_gte: {START + 1800} " in q:
+                raise RuntimeError("gateway down")
+            return self.data.query(q)
+        fetcher._execute_query = query
+        engine = SubgraphSwapEngine(fetcher, concurrency=4, max_rps=0, shard_secs=1800,
+                                    queue_pages=2, page_size=100)
+        with self.assertRaises(RuntimeError):
+            engine.run(START, START + SPAN, list(fetcher.token_addresses.values()),
+                       lambda b: None, False, marks.append)
+        self.assertTrue(all(ts < START + 1800 for ts in marks))
+
+    def test_failing_writer_stops_ingestion(self):
+        fetcher = _fetcher(self.data)
+        engine = SubgraphSwapEngine(fetcher, concurrency=4, max_rps=0, shard_secs=1800,
+                                    queue_pages=1, page_size=100)
+
+        def save(batch):
+            raise ValueError("db down")
+        with self.assertRaises(ValueError):
+            engine.run(START, START + SPAN, list(fetcher.token_addresses.values()), save, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
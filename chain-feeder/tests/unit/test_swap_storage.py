@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from common.utils.uniswap_utils import PostgresStorage, _copy_buffer, _copy_value, _parse_log_index
+
+
+class TestParseLogIndex(unittest.TestCase):
+    def test_hash_separator(self):
+        self.assertEqual(_parse_log_index("0xabc#12"), 12)
+
+    def test_dash_separator_takes_last_part(self):
+        self.assertEqual(_parse_log_index("0xabc-def-7"), 7)
+
+    def test_missing_or_bad_index(self):
+        self.assertIsNone(_parse_log_index("0xabc"))
+        self.assertIsNone(_parse_log_index("0xabc#"))
+        self.assertIsNone(_parse_log_index("0xabc#x1"))
+
+
+class TestCopyBuffer(unittest.TestCase):
+    def test_null_and_escaping(self):
+        self.assertEqual(_copy_value(None), "\\N")
+        self.assertEqual(_copy_value("a\tb\nc\\d"), "a\\tb\\nc\\\\d")
+
+    def test_row_layout(self):
+        ts = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        buf = _copy_buffer([("0xabc", 3, ts, None, 1.5), ("0xdef", 4, ts, "x", -0.25)])
+        lines = buf.read().splitlines()
+        self.assertEqual(lines[0], "0xabc\t3\t2025-01-02T03:04:05+00:00\t\\N\t1.5")
+        self.assertEqual(lines[1].split("\t")[3:], ["x", "-0.25"])
+
+    def test_float_round_trip(self):
+        v = 0.1 + 0.2
+        self.assertEqual(float(_copy_value(v)), v)
+
+
+class TestDimensionCaches(unittest.TestCase):
+    def test_incremental_refresh_reloads_contract_map(self):
+        storage = PostgresStorage(conn_str="unused")
+        cur = MagicMock()
+        cur.fetchall.side_effect = [
+            [(1, "Ethereum")], [(1, "Uniswap V3")], [],          # full reload
+            [("0xaaa", 10, "USDC", True)],                      # contract map
+            [],                                                 # incremental pools
+            [("0xaaa", 10, "USDC", True), ("0xbbb", 11, "EURC", True)],
+        ]
+        storage._refresh_dims(cur)
+        self.assertEqual(set(storage._contract_map(cur, 1)), {"0xaaa"})
+        storage._refresh_dims(cur)
+        self.assertEqual(set(storage._contract_map(cur, 1)), {"0xaaa", "0xbbb"})
+
+
+class FakeBatchConn:
+    """Connection whose CREATE TEMP TABLE is transactional, like Postgres's."""
+
+    def __init__(self):
+        self.closed = False
+        self.table, self.pending, self.fail_insert = False, False, False
+
+    def cursor(self):
+        cur = MagicMock()
+        cur.__enter__.return_value = cur
+
+        def execute(sql, params=None):
+            if "CREATE TEMP TABLE" in sql:
+                self.pending = True
+            elif "FROM _swap_batch" in sql and self.fail_insert:
+                raise RuntimeError("insert failed")
+
+        def copy_expert(sql, buf):
+            if not (self.table or self.pending):
+                raise RuntimeError("relation _swap_batch does not exist")
+        cur.execute.side_effect = execute
+        cur.copy_expert.side_effect = copy_expert
+        return cur
+
+    def commit(self):
+        self.table, self.pending = self.table or self.pending, False
+
+    def rollback(self):
+        self.pending = False
+
+
+class TestSaveSwaps(unittest.TestCase):
+    def test_failed_batch_does_not_break_the_next_save(self):
+        storage = PostgresStorage(conn_str="unused")
+        conn = storage._conn = FakeBatchConn()
+        storage._refresh_dims = lambda cur: None
+        storage._chain_map, storage._protocol_map = {"ethereum": 1}, {"uniswap v3": 2}
+        storage._contract_map = lambda cur, chain_id: {}
+        ts = datetime(2025, 1, 2, tzinfo=timezone.utc)
+        storage._swap_rows = lambda *a: [("0xabc", 1, ts, "Ethereum", "Uniswap V3", 7, 1.0, -1.0, 1.0)]
+
+        conn.fail_insert = True
+        with self.assertRaises(RuntimeError):
+            storage.save_swaps([{"id": "0xabc#1"}], update_watermark=False)
+        conn.fail_insert = False
+        storage.save_swaps([{"id": "0xabc#1"}], update_watermark=False)
+        self.assertTrue(conn.table)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""Unit tests for the table-health metrics and /health report (no database required)."""
+import os
+import sys
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'include'))
+
+import od_retention as odr  # noqa: E402
+import table_health as th  # noqa: E402
+
+T = date(2026, 3, 10)
+NOW = datetime(2026, 3, 10, 1, 0, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    """Answers each query with the rows of the first rule whose marker it contains."""
+
+    rowcount = 0
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self._rows = next((rows for marker, rows in self.rules if marker in sql), [])
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def mogrify(self, sql, params):
+        return (sql % tuple(f"'{p}'" for p in params)).encode()
+
+
+def conn_for(cur):
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return conn
+
+
+class TestMaintenance(unittest.TestCase):
+    def test_refresh_range_bounds_source_and_counters(self):
+        cur = FakeCursor([('table_health_rows', [('SELECT * FROM (x) r',)])])
+        th.refresh_range(cur, 'coin_price_history', T - timedelta(days=3), T)
+        sqls = [s for s, _ in cur.executed]
+        self.assertIn("WITH _th_src AS (SELECT * FROM coin_price_history "
+                      "WHERE timestamp >= '2026-03-07' AND timestamp < '2026-03-10')", sqls[2])
+        self.assertEqual(cur.executed[1][1], ('coin_price_history', T - timedelta(days=3), T))
+        self.assertIn('k.first_day < %s AND k.last_day >= %s', sqls[3])
+        self.assertTrue(sqls[-1].startswith('DELETE FROM table_health_key'))
+        self.assertFalse(any('tx_7d' in s for s in sqls))
+
+    def test_refresh_range_recomputes_pool_7d_activity(self):
+        cur = FakeCursor([('table_health_rows', [('SELECT * FROM (x) r',)])])
+        th.refresh_range(cur, 'liquidity_pool_daily_stats')
+        sqls = [s for s, _ in cur.executed]
+        self.assertIn('WITH _th_src AS (SELECT * FROM liquidity_pool_daily_stats) ', sqls[2])
+        self.assertIn('SET tx_7d', sqls[-1])
+        self.assertEqual(cur.executed[1][1], ('liquidity_pool_daily_stats', date.min, date.max))
+
+    def test_refresh_windows_rolls_stale_pool_windows_forward(self):
+        cur = FakeCursor([])
+        cur.rowcount = 3
+        self.assertEqual(th.refresh_windows(cur), 3)
+        sql = cur.executed[-1][0]
+        self.assertIn('window_day = CURRENT_DATE', sql)
+        self.assertIn('k.window_day IS NULL OR k.window_day < CURRENT_DATE', sql)
+        self.assertIn('day >= CURRENT_DATE - 7 AND day < CURRENT_DATE', sql)
+        # refresh_range re-derives every pool's window, current or not
+        cur = FakeCursor([('table_health_rows', [('SELECT * FROM (x) r',)])])
+        th.refresh_range(cur, 'liquidity_pool_daily_stats')
+        self.assertIn('window_day = CURRENT_DATE', cur.executed[-1][0])
+        self.assertNotIn('k.window_day < CURRENT_DATE', cur.executed[-1][0])
+
+    def test_rebuild_locks_and_marks_each_table(self):
+        cur = FakeCursor([('table_health_rows', [('SELECT 1',)])])
+        conn = conn_for(cur)
+        th.rebuild(conn, ['route_daily_stats'], progress=lambda _m: None)
+        sqls = [s for s, _ in cur.executed]
+        self.assertEqual(sqls[0], 'LOCK TABLE route_daily_stats IN SHARE MODE')
+        self.assertIn('INSERT INTO table_health_table', sqls[-1])
+        conn.commit.assert_called_once()
+
+    def test_retention_refreshes_pruned_snapshot_partitions(self):
+        plan = [{'strategy': 'keep', 'range': '2026-01-01..2026-02-01'},
+                {'strategy': 'drop', 'range': '2025-12-01..2026-01-01'},
+                {'strategy': 'delete', 'range': '2025-11-01..2025-12-01'}]
+        cur = MagicMock()
+        conn = conn_for(cur)
+        with patch.object(th, 'refresh_range') as refresh:
+            odr._refresh_table_health(conn, plan)
+            cur.execute.assert_called_once_with('LOCK TABLE liquidity_pool_position_snapshot IN SHARE MODE')
+            self.assertEqual([c.args[2:] for c in refresh.call_args_list],
+                             [(date(2025, 11, 1), date(2025, 12, 1)),
+                              (date(2025, 12, 1), date(2026, 1, 1))])
+            refresh.reset_mock()
+            odr._refresh_table_health(conn, plan + [{'strategy': 'delete', 'range': 'default'}])
+            self.assertEqual([c.args[2:] for c in refresh.call_args_list], [(None, None)])
+
+
+class TestReport(unittest.TestCase):
+    def test_swaps_section_per_threshold(self):
+        y = T - timedelta(days=1)
+        cur = FakeCursor([
+            ('MIN(GREATEST', [('Base', 'Uniswap V3', 30, T - timedelta(days=7), y,
+                               20, T - timedelta(days=7), y, 0, None, None, 0, None, None)]),
+            ('FROM table_health_daily', [(T - timedelta(days=90), y, 500, 1200)]),
+            ('route_classification_queue', [(300,)]),
+        ])
+        degraded, section = th._swaps_section(cur, T, NOW)
+        self.assertTrue(degraded)  # day-granular dates never pass the 3-hour check
+        self.assertEqual(section['chains']['Base']['protocols']['Uniswap V3']['checks'],
+                         {'has_data_every_day': 'pass', 'is_fresher_than_3_hours': 'fail'})
+        self.assertEqual(section['count'], 30)
+        self.assertEqual(section['volume_filters']['1000']['count'], 20)
+        base = section['volume_filters']['100000']['chains']['Base']
+        self.assertEqual(base['status'], 'stale')
+        self.assertIsNone(base['protocols']['Uniswap V3']['latest'])
+        self.assertEqual(section['route_assignment'],
+                         {'assigned_count': 1200, 'unassigned_count': 300,
+                          'total_count': 1500, 'assigned_percentage': 80.0})
+
+    def test_volume_filters_rederive_windows_stored_before_today(self):
+        # A pool last written on T keeps the window its trigger stored then;
+        # eight days later every volume filter must read a window ending today,
+        # re-derived from the pool's daily stats, not the stored totals.
+        later = T + timedelta(days=8)
+        cur = FakeCursor([("SELECT COUNT(*) FROM liquidity_pool", [(10,)]),
+                          ('last_day >= %s', [(8, 6)]),
+                          ('FROM table_health_daily', [(T - timedelta(days=90), T, 500, 0)]),
+                          ('route_classification_queue', [(0,)])])
+        th._swaps_section(cur, later, NOW + timedelta(days=8))
+        th._pool_matrix(cur, later)
+        th._pool_history(cur, later, 7)
+        filtered = [(sql, params) for sql, params in cur.executed if 'volume_7d' in sql]
+        self.assertEqual(len(filtered), 1 + 2 * len(th.VOLUME_THRESHOLDS))
+        for sql, params in filtered:
+            self.assertIn(th._POOL_KEYS, sql)
+            self.assertNotIn('LEFT JOIN table_health_key', sql)
+            self.assertEqual(params['today'], later)
+        self.assertIn('CASE WHEN k.window_day >= %(today)s THEN k.volume_7d ELSE COALESCE(w.volume, 0)',
+                      th._POOL_KEYS)
+        self.assertIn('k.window_day IS NULL OR k.window_day < %(today)s', th._POOL_KEYS)
+        self.assertIn('t.day >= %(today)s - 7 AND t.day < %(today)s', th._POOL_KEYS)
+
+    def test_pool_history_passing_pools(self):
+        cur = FakeCursor([
+            ("SELECT COUNT(*) FROM liquidity_pool", [(10,)]),
+            ('last_day >= %s', [(8, 6)]),
+            ('FROM table_health_daily', [(T - timedelta(days=90), T - timedelta(days=1), 900, 0)]),
+            ('valid_days @>', [('Base', 'Uniswap V3', 4, 3, T - timedelta(days=7), T - timedelta(days=1))]),
+        ])
+        stale, section = th._pool_history(cur, T, 7)
+        self.assertFalse(stale)
+        self.assertEqual(section['covered_pools'], {'count': 8, 'percentage': 80.0,
+                                                    'fresh_count': 6, 'fresh_percentage': 60.0})
+        entry = section['chains']['Base']['protocols']['Uniswap V3']
+        self.assertEqual((entry['passing_pools'], entry['passing_pct']), (3, 75.0))
+        self.assertEqual(entry['checks'], {'is_fresher_than_2_days': 'pass'})
+        filtered = section['volume_filters']['1000']['chains']['Base']['protocols']['Uniswap V3']
+        self.assertNotIn('checks', filtered)
+        window = next(p for s, p in cur.executed if 'valid_days @>' in s)
+        self.assertEqual((window['ws'], window['we']), (T - timedelta(days=7), T))
+
+    def test_report_flags_tables_never_rebuilt(self):
+        cur = FakeCursor([
+            ('SELECT CURRENT_DATE', [(T,)]),
+            ('FROM table_health_table', [(t,) for t in th.TABLES if t != 'coin_price_history']),
+            ('JOIN chain ch ON cc.chain_id', []),
+            ('FROM coin_contract', [(0, 0)]),
+            ('FROM coin_family', [(0,)]),
+        ])
+        ok = (False, {})
+        with patch.object(th, '_swaps_section', return_value=ok), \
+                patch.object(th, '_coin_sections', return_value=(False, {'coin': {}, 'coin_price_history': {}})), \
+                patch.object(th, '_pool_matrix', return_value={}), \
+                patch.object(th, '_route_taxonomy', return_value={}), \
+                patch.object(th, '_pool_history', return_value=ok), \
+                patch.object(th, '_position_sections', return_value=ok):
+            degraded, data = th.build_report(cur, 7)
+        self.assertTrue(degraded)
+        self.assertEqual(data['metrics_not_ready'], ['coin_price_history'])
+        self.assertEqual(data['chain'], {'count': 0, 'chains': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark undercut pricing: Fraction (original) vs Q64.96 fixed-point.
+
+Times the per-request pricing stage of /api/routes/undercut — leg price,
+fee-free price, rolling-median market prices and the median center — for
+seeded legs, once with the original Fraction / fee_free_price() path and once
+with leg_price_x96() / fee_free_price_x96(). Checks that both centers agree to
+1e-12 relative.
+
+Usage:
+  python scratch/benchmark_fixed_point_prices.py
+  python scratch/benchmark_fixed_point_prices.py --legs 10000 100000 500000
+"""
+import argparse
+import random
+import sys
+import time
+from fractions import Fraction
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import undercut_analyzer as ua  # noqa: E402
+
+
+def gen_legs(n, seed):
+    rng = random.Random(seed)
+    legs = []
+    for _ in range(n):
+        a0 = rng.lognormvariate(7.0, 1.5)
+        fee = rng.choice((1.0, 5.0, 30.0, 100.0))
+        legs.append({"t0_in": rng.random() < 0.55, "input": a0,
+                     "output": a0 * rng.uniform(0.998, 1.002) * (1 - fee / 1e4), "fee_bps": fee})
+    return legs
+
+
+def fraction_path(legs):
+    for s in legs:
+        s["price"] = ua.leg_price(s)
+        s["fee_free_price"] = ua.fee_free_price(s["price"], s["t0_in"],
+                                                ua.fee_fraction_from_bps(s["fee_bps"]))
+    markets = ua.market_prices(legs)
+    return Fraction(sorted(float(m) for m in markets)[len(markets) // 2])
+
+
+def fixed_point_path(legs):
+    for s in legs:
+        s["price"] = ua.leg_price_x96(s)
+        s["fee_free_price"] = ua.fee_free_price_x96(s["price"], s["t0_in"], s["fee_bps"])
+    markets = ua.market_prices(legs)
+    return Fraction(sorted(markets)[len(markets) // 2], ua.PRICE_ONE)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--legs", type=int, nargs="*", default=[10000, 100000])
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    print("%9s | %10s %10s %8s" % ("legs", "fraction", "q64.96", "speedup"))
+    print("-" * 44)
+    for n in args.legs:
+        ref, t_ref = timed(lambda: fraction_path(gen_legs(n, args.seed)))
+        got, t_got = timed(lambda: fixed_point_path(gen_legs(n, args.seed)))
+        assert abs(got - ref) <= ref * Fraction(1, 10 ** 12), "centers diverged"
+        print("%9d | %9.2fs %9.2fs %7.1fx" % (n, t_ref, t_got, t_ref / t_got if t_got else 0.0))
+
+
+if __name__ == "__main__":
+    main()
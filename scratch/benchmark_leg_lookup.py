@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Benchmark route_classifier._legs_for_txs: the five-way dimension join per
+leg (baseline, loaded from git) vs the narrow swap read enriched from the
+process-level PoolDimensionCache.
+
+Replays a recorded batch fixture in a throwaway schema (minimal swaps_staging,
+liquidity_pool, coin_contract and coin tables holding only the fixture rows),
+so nothing in public is touched. Each implementation fetches the fixture's tx
+hashes in --batch-size batches, --repeat times; "cold" builds a new cache per
+batch, "warm" shares one cache across batches like a long-lived classifier
+process. Reports ms per batch and legs/sec, and checks every variant returns
+the same legs. The schema is dropped at the end.
+
+Usage:
+  Record a fixture from the warehouse (latest transactions), or generate a
+  synthetic one:
+  DATA_WAREHOUSE_DB=postgresql://... python scratch/benchmark_leg_lookup.py --record batch.json --txs 20000
+  python scratch/benchmark_leg_lookup.py --synthetic batch.json --txs 20000
+
+Replay:
+  DATA_WAREHOUSE_DB=postgresql://... python scratch/benchmark_leg_lookup.py --fixture batch.json
+  python scratch/benchmark_leg_lookup.py --dsn postgresql://... --fixture batch.json --batch-size 5000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "chain-feeder"))
+
+import psycopg2  # noqa: E402
+import psycopg2.extras  # noqa: E402
+from psycopg2.extensions import make_dsn  # noqa: E402
+
+from include import route_classifier as current  # noqa: E402
+
+MODULE_PATH = "chain-feeder/include/route_classifier.py"
+SCHEMA = "bench_leg_lookup"
+RAW_TABLE = "swaps_staging"
+DDL = f"""
+    CREATE TABLE {SCHEMA}.coin (coin_id INTEGER PRIMARY KEY, symbol VARCHAR(20));
+    CREATE TABLE {SCHEMA}.coin_contract (
+        coin_id INTEGER NOT NULL, chain_id SMALLINT NOT NULL, contract_address VARCHAR(64) NOT NULL,
+        PRIMARY KEY (coin_id, chain_id));
+    CREATE TABLE {SCHEMA}.liquidity_pool (
+        id INTEGER PRIMARY KEY, chain_id SMALLINT NOT NULL, coin0_id INTEGER NOT NULL, coin1_id INTEGER NOT NULL);
+    CREATE TABLE {SCHEMA}.{RAW_TABLE} (
+        tx_hash VARCHAR(80) NOT NULL, log_index INT NOT NULL, ts TIMESTAMPTZ NOT NULL,
+        pool_id INTEGER, amount0 DOUBLE PRECISION, amount1 DOUBLE PRECISION,
+        amount_usd DOUBLE PRECISION, route_id BIGINT,
+        PRIMARY KEY (ts, tx_hash, log_index));
+    CREATE INDEX ON {SCHEMA}.{RAW_TABLE} (tx_hash);
+"""
+
+
+def load_baseline(rev):
+    """The route_classifier module as of `rev`, imported under include."""
+    src = subprocess.check_output(["git", "show", f"{rev}:{MODULE_PATH}"], cwd=ROOT, text=True)
+    mod = types.ModuleType("include.route_classifier_baseline")
+    mod.__package__ = "include"
+    exec(compile(src, f"{rev}:{MODULE_PATH}", "exec"), mod.__dict__)
+    return mod
+
+
+def record(dsn, path, txs):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT tx_hash FROM (
+                SELECT tx_hash, MAX(ts) AS ts FROM {current.RAW_SWAP_TABLE}
+                WHERE ts >= NOW() - INTERVAL '2 days' GROUP BY tx_hash
+            ) t ORDER BY ts DESC LIMIT %s
+        """, (txs,))
+        hashes = [r[0] for r in cur.fetchall()]
+        cur.execute(f"""
+            SELECT tx_hash, log_index, ts::text, pool_id, amount0, amount1, amount_usd, route_id
+            FROM {current.RAW_SWAP_TABLE} WHERE tx_hash = ANY(%s)
+        """, (hashes,))
+        swaps = cur.fetchall()
+        pool_ids = sorted({r[3] for r in swaps if r[3] is not None})
+        cur.execute("SELECT id, chain_id, coin0_id, coin1_id FROM liquidity_pool WHERE id = ANY(%s)",
+                    (pool_ids,))
+        pools = cur.fetchall()
+        coins = sorted({c for p in pools for c in p[2:]})
+        cur.execute("SELECT coin_id, chain_id, contract_address FROM coin_contract WHERE coin_id = ANY(%s)",
+                    (coins,))
+        contracts = cur.fetchall()
+        cur.execute("SELECT coin_id, symbol FROM coin WHERE coin_id = ANY(%s)", (coins,))
+        coin_rows = cur.fetchall()
+    write_fixture(path, hashes, swaps, pools, contracts, coin_rows)
+
+
+def synthesize(path, txs, pools=2000, coins=400, seed=7):
+    rng = random.Random(seed)
+    chains = (1, 10, 137, 8453, 42161)
+    coin_rows = [(c, f"T{c}") for c in range(1, coins + 1)]
+    contracts = [(c, ch, "0x%040x" % rng.getrandbits(160)) for c in range(1, coins + 1) for ch in chains]
+    pool_rows = []
+    for pid in range(1, pools + 1):
+        c0, c1 = rng.sample(range(1, coins + 1), 2)
+        pool_rows.append((pid, rng.choice(chains), c0, c1))
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    hashes, swaps = [], []
+    for _ in range(txs):
+        tx = "0x%064x" % rng.getrandbits(256)
+        ts = (start + timedelta(seconds=rng.randrange(86400))).isoformat()
+        hashes.append(tx)
+        for log_index in range(rng.choice((1, 1, 1, 2, 2, 3))):
+            amt = rng.uniform(10, 50000)
+            swaps.append((tx, log_index, ts, rng.randint(1, pools), amt, -amt, amt, None))
+    write_fixture(path, hashes, swaps, pool_rows, contracts, coin_rows)
+
+
+def write_fixture(path, hashes, swaps, pools, contracts, coins):
+    with open(path, "w") as f:
+        json.dump({"tx_hashes": hashes, "swaps": swaps, "pools": pools,
+                   "contracts": contracts, "coins": coins}, f, default=str)
+    print(f"wrote {path}: {len(hashes)} txs, {len(swaps)} legs, {len(pools)} pools")
+
+
+def load_fixture(dsn, fixture):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(DDL)
+        for table, cols, key in (("coin", "coin_id, symbol", "coins"),
+                                 ("coin_contract", "coin_id, chain_id, contract_address", "contracts"),
+                                 ("liquidity_pool", "id, chain_id, coin0_id, coin1_id", "pools"),
+                                 (RAW_TABLE, "tx_hash, log_index, ts, pool_id, amount0, amount1, amount_usd, route_id",
+                                  "swaps")):
+            psycopg2.extras.execute_values(cur, f"INSERT INTO {SCHEMA}.{table} ({cols}) VALUES %s",
+                                           fixture[key], page_size=5000)
+            cur.execute(f"ANALYZE {SCHEMA}.{table}")
+
+
+def timed(conn, hashes, batch_size, repeat, fetch):
+    out, times = [], []
+    for _ in range(repeat):
+        out = []
+        for i in range(0, len(hashes), batch_size):
+            t0 = time.perf_counter()
+            with conn.cursor() as cur:
+                out.extend(fetch(cur, hashes[i:i + batch_size]))
+            conn.rollback()
+            times.append(time.perf_counter() - t0)
+    return out, times
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--dsn", default=os.getenv("DATA_WAREHOUSE_DB"))
+    p.add_argument("--fixture")
+    p.add_argument("--record", metavar="PATH")
+    p.add_argument("--synthetic", metavar="PATH")
+    p.add_argument("--txs", type=int, default=20000)
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--baseline-rev", default="e411974")
+    args = p.parse_args()
+
+    if args.synthetic:
+        synthesize(args.synthetic, args.txs)
+        return
+    if not args.dsn:
+        p.error("--dsn or DATA_WAREHOUSE_DB is required")
+    if args.record:
+        record(args.dsn, args.record, args.txs)
+        return
+    if not args.fixture:
+        p.error("--fixture, --record or --synthetic is required")
+
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+    hashes = fixture["tx_hashes"]
+    load_fixture(args.dsn, fixture)
+    baseline = load_baseline(args.baseline_rev)
+    conn = psycopg2.connect(make_dsn(args.dsn, options=f"-c search_path={SCHEMA}"))
+    warm = current.PoolDimensionCache()
+    variants = [
+        ("join (baseline)", lambda cur, b: baseline._legs_for_txs(cur, b, table_name=RAW_TABLE)),
+        ("cache cold", lambda cur, b: current._legs_for_txs(cur, b, table_name=RAW_TABLE,
+                                                           dims=current.PoolDimensionCache())),
+        ("cache warm", lambda cur, b: current._legs_for_txs(cur, b, table_name=RAW_TABLE, dims=warm)),
+    ]
+    try:
+        results = [(name,) + timed(conn, hashes, args.batch_size, args.repeat, fetch) for name, fetch in variants]
+    finally:
+        conn.close()
+        with psycopg2.connect(args.dsn) as c, c.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+    expected = results[0][1]
+    print(f"fixture: {len(hashes)} txs, {len(fixture['swaps'])} legs, {len(fixture['pools'])} pools; "
+          f"batch {args.batch_size} x{args.repeat}\n")
+    print("%-16s | %10s %10s %12s %6s" % ("variant", "ms/batch", "p95 ms", "legs/s", "same"))
+    print("-" * 62)
+    for name, legs, times in results:
+        ordered = sorted(times)
+        mean = sum(times) / len(times)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        legs_per_sec = len(legs) * args.repeat / sum(times) if sum(times) else 0
+        print("%-16s | %10.1f %10.1f %12.0f %6s" % (name, mean * 1000, p95 * 1000, legs_per_sec,
+                                                   "yes" if legs == expected else "NO"))
+    print(f"\nwarm cache: {warm.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark undercut_analyzer.market_prices scaling (rolling median).
+
+Times the incremental rolling-median estimator in exact (Fraction) and float
+mode from 10k to 1M swaps, and the original per-swap statistics.median over a
+re-sliced window for the sizes where it is still tractable. Exact mode is
+checked against the reference wherever both run.
+
+Usage:
+  python scratch/benchmark_market_prices.py
+  python scratch/benchmark_market_prices.py --sizes 10000 100000 --reference-max 100000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from fractions import Fraction
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import undercut_analyzer as ua  # noqa: E402
+
+
+def gen_swaps(n, seed):
+    # Fee-free prices shaped like a stable pair: Fraction of two float amounts.
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        a0 = rng.lognormvariate(7.0, 1.5)
+        a1 = a0 * rng.uniform(0.998, 1.002)
+        out.append({"price": Fraction(a1) / Fraction(a0)})
+    return out
+
+
+def reference(swaps, window=50):
+    out = []
+    for i, s in enumerate(swaps):
+        if i == 0:
+            out.append(s["price"])
+            continue
+        out.append(statistics.median(x["price"] for x in swaps[max(0, i - window):i]))
+    return out
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000, 1000000])
+    p.add_argument("--window", type=int, default=50)
+    p.add_argument("--reference-max", type=int, default=100000,
+                   help="skip the statistics.median reference above this size")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    print("%9s | %10s | %10s %10s | %8s" % ("swaps", "reference", "exact", "float", "speedup"))
+    print("-" * 60)
+    for n in args.sizes:
+        swaps = gen_swaps(n, args.seed)
+        exact, t_exact = timed(lambda: ua.market_prices(swaps, window=args.window))
+        _, t_float = timed(lambda: ua.market_prices(swaps, window=args.window, exact=False))
+        if n <= args.reference_max:
+            ref, t_ref = timed(lambda: reference(swaps, window=args.window))
+            assert exact == ref, "rolling median diverged from statistics.median"
+            ref_col, speedup = "%9.2fs" % t_ref, "%7.1fx" % (t_ref / t_exact)
+        else:
+            ref_col, speedup = "%10s" % "-", "%8s" % "-"
+        print("%9d | %s | %9.2fs %9.2fs | %s" % (n, ref_col, t_exact, t_float, speedup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Peak memory of the undercut demand preparation: materialized vs streaming.
+
+"materialized" mirrors the old /api/routes/undercut path: fetch_swaps() builds
+the full row list, every row is normalized into a second list with a Fraction
+price, and the first-leg / dedup passes run over that. "streaming" feeds
+undercut_analyzer.pair_legs() from a generator of row batches, the way
+PostgresFetcher.iter_swaps() delivers them. Both must keep the same legs.
+
+Usage:
+  python scratch/benchmark_pair_legs_memory.py
+  python scratch/benchmark_pair_legs_memory.py --txs 100000 --batch 20000
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+from fractions import Fraction
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import undercut_analyzer as ua  # noqa: E402
+
+POOLS = [(1, "USDC", "DAI", 1.0), (2, "USDC", "DAI", 5.0),
+         (3, "DAI", "WETH", 30.0), (4, "USDC", "WETH", 5.0), (5, "WETH", "WBTC", 5.0)]
+
+
+def gen_rows(n_tx, seed):
+    rng = random.Random(seed)
+    for t in range(n_tx):
+        tx = "0x%064x" % t
+        for li in range(rng.randint(1, 4)):
+            cid, s0, s1, fee = rng.choice(POOLS)
+            a0 = rng.uniform(10.0, 5000.0) * rng.choice((1, -1))
+            usd = abs(a0)
+            yield {"id": "%s#%d" % (tx, li), "tx_hash": tx, "log_index": li,
+                   "timestamp": 1700000000 + t // 3, "token0_symbol": s0, "token1_symbol": s1,
+                   "amount0": a0, "amount1": -a0 * rng.uniform(0.99, 1.01),
+                   "amountUSD": usd, "amount_usd": usd, "fee_tier": "%g%%" % (fee / 100),
+                   "fee_bps": fee, "protocol": "Uniswap V3", "network": "Ethereum",
+                   "cid": cid, "pool_address": "0x%040x" % cid, "pool_id": "0x%040x" % cid}
+
+
+def batched(rows, size):
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def materialized(n_tx, seed, start, end):
+    rows = list(gen_rows(n_tx, seed))
+    events = []
+    for r in rows:
+        s = ua.normalize_leg(r)
+        if s is not None:
+            s["price"] = Fraction(abs(r["amount1"])) / Fraction(abs(r["amount0"]))
+            events.append(s)
+    first = {}
+    for s in events:
+        prev = first.get(s["tx_hash"])
+        if prev is None or s["log_index"] < prev["log_index"]:
+            first[s["tx_hash"]] = s
+    fwd = [s for s in events
+           if (s["s0"] if s["t0_in"] else s["s1"]) in start
+           and (s["s1"] if s["t0_in"] else s["s0"]) in end
+           and (first[s["tx_hash"]]["s0"] if first[s["tx_hash"]]["t0_in"] else first[s["tx_hash"]]["s1"]) in start]
+    seen = {}
+    for s in fwd:
+        key = (s["tx_hash"], s["cid"])
+        if key not in seen or s["usd"] > seen[key]["usd"]:
+            seen[key] = s
+    return list(seen.values())
+
+
+def streaming(n_tx, seed, start, end, batch):
+    rows = itertools.chain.from_iterable(batched(gen_rows(n_tx, seed), batch))
+    return ua.pair_legs(rows, start, end)["forward"]
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 2 ** 20
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--txs", type=int, nargs="*", default=[20000, 100000])
+    p.add_argument("--batch", type=int, default=20000)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+    start, end = ["USDC"], ["DAI"]
+
+    print("%8s | %22s | %22s | %6s" % ("txs", "materialized", "streaming", "kept"))
+    print("-" * 68)
+    for n in args.txs:
+        ref, t_ref, m_ref = measure(lambda: materialized(n, args.seed, start, end))
+        got, t_got, m_got = measure(lambda: streaming(n, args.seed, start, end, args.batch))
+        assert len(got) == len(ref), "streaming preparation kept a different leg set"
+        print("%8d | %7.1f MiB %9.2fs | %7.1f MiB %9.2fs | %6d" % (
+            n, m_ref, t_ref, m_got, t_got, len(got)))
+
+
+if __name__ == "__main__":
+    main()
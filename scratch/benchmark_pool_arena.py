@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Benchmark the /api/pool-arena/simulate engine: simulate_pools() (reference)
+vs simulate_pools_columnar().
+
+Runs both engines on the same seeded arena demand and pool set and asserts the
+results are identical (pools and series) before reporting timings.
+
+Usage:
+  python scratch/benchmark_pool_arena.py
+  python scratch/benchmark_pool_arena.py --swaps 20000 200000 --pools 6
+"""
+import argparse
+import sys
+import time
+from fractions import Fraction
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import undercut_analyzer as ua  # noqa: E402
+
+# (liquidity_usd, range_pct, fee_pips), cycled to the requested pool count.
+POOL_SHAPES = [(100_000.0, 1.0, 500), (1_000_000.0, 1.0, 500), (2_000_000.0, 0.5, 100),
+               (400_000.0, 5.0, 3000), (200_000.0, 1.0, 500), (6_000_000.0, 10.0, 10000)]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--swaps", type=int, nargs="*", default=[20000, 200000])
+    p.add_argument("--pools", type=int, default=6)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+    pools = [{"name": f"pool{i}", "cap": liq / 2.0, "range_pct": rng, "fee_pips": fee}
+             for i, (liq, rng, fee) in
+             enumerate(POOL_SHAPES[i % len(POOL_SHAPES)] for i in range(args.pools))]
+
+    print("%8s | %10s %10s %8s" % ("swaps", "reference", "columnar", "speedup"))
+    print("-" * 42)
+    for n in args.swaps:
+        fwd, rev = ua.arena_demand(n, args.seed, 100.0, 50000.0, 0.5)
+        call = (pools, fwd, Fraction(1), 1.0, 1.0, sum(s["usd"] for s in fwd))
+        kw = dict(reverse_swaps=rev, series_every=max(1, n // 100))
+        ref, t_ref = timed(lambda: ua.simulate_pools(*call, **kw))
+        got, t_got = timed(lambda: ua.simulate_pools_columnar(*call, **kw))
+        assert got == ref, "columnar arena result diverged from simulate_pools()"
+        print("%8d | %9.2fs %9.2fs %7.1fx" % (n, t_ref, t_got, t_ref / t_got if t_got else 0.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark response encodings for the heavy analytics endpoints.
+
+Builds seeded payloads shaped like /api/routes/analyze (routes with mixed
+path_tokens), /api/swap-time-series (groups x daily float arrays) and
+/api/swap-distribution (per-route bucket histograms), then times and sizes:
+
+  json    json.dumps (what FastAPI / the NDJSON stream used before)
+  orjson  response_format.dumps (when orjson is installed)
+  arrow   response_format.to_arrow (when pyarrow is installed)
+
+Usage:
+  python scratch/benchmark_response_formats.py
+  python scratch/benchmark_response_formats.py --routes 20000 --days 730 --repeat 5
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import response_format as rf  # noqa: E402
+
+TOKENS = ["USDC", "USDT", "DAI", "WETH", "WBTC", "STETH", "FRAX", "LUSD"]
+
+
+def analyze_payload(n, rng):
+    routes = []
+    for i in range(n):
+        hops = rng.randint(1, 3)
+        path = [rng.choice(TOKENS)]
+        for _ in range(hops):
+            path += [{"fee": "%g%%|Uniswap V3|Ethereum" % rng.choice((0.01, 0.05, 0.3)),
+                      "cid": rng.randint(1, 50000), "address": "0x%040x" % rng.getrandbits(160)},
+                     rng.choice(TOKENS)]
+        routes.append({"path": " ".join(p if isinstance(p, str) else p["fee"] for p in path),
+                       "path_tokens": path, "count": rng.randint(1, 5000),
+                       "volume": rng.lognormvariate(10, 2), "fees": rng.lognormvariate(5, 2),
+                       "apr": rng.uniform(0, 40), "apr_str": "%.2f%%" % rng.uniform(0, 40),
+                       "direction": rng.choice(("forward", "reverse")), "network": "Ethereum",
+                       "route_id": "%016x" % rng.getrandbits(64), "pair_id": "%016x" % rng.getrandbits(64)})
+    return {"routes": routes, "total_tx": sum(r["count"] for r in routes),
+            "total_volume": sum(r["volume"] for r in routes)}
+
+
+def time_series_payload(groups, days, rng):
+    stamps = ["2024-%03d" % d for d in range(days)]
+    names = ["group-%d" % g for g in range(groups)]
+    series = {g: {"volume": [round(rng.lognormvariate(12, 1.5), 2) for _ in stamps],
+                  "fees": [round(rng.lognormvariate(6, 1.5), 2) for _ in stamps],
+                  "count": [rng.randint(0, 20000) for _ in stamps]} for g in names}
+    totals = {k: [sum(series[g][k][i] for g in names) for i in range(days)]
+              for k in ("volume", "fees", "count")}
+    return {"interval": "day", "timestamps": stamps, "groups": names, "series": series,
+            "totals": totals, "grand_totals": {k: sum(v) for k, v in totals.items()}}
+
+
+def distribution_payload(routes, bins, rng):
+    chains = []
+    for r in range(routes):
+        counts = [rng.randint(0, 5000) for _ in range(bins)]
+        chains.append({"name": "route-%d" % r, "n": sum(counts), "min": 1.0, "max": 1e7,
+                       "sum_log": rng.random() * 1e5, "sum_log2": rng.random() * 1e6,
+                       "dens_log": [rng.random() for _ in range(bins)], "counts": counts,
+                       "sums": [rng.random() * 1e6 for _ in range(bins)], "fees": [0.0] * bins,
+                       "linear_counts": counts, "linear_sums": [rng.random() for _ in range(bins)],
+                       "linear_fees": [0.0] * bins})
+    return {"n": sum(c["n"] for c in chains), "chains": chains,
+            "histogram": {"edges": [10 ** (i / 10) for i in range(bins + 1)]}}
+
+
+def best_of(fn, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return out, best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--routes", type=int, default=5000)
+    p.add_argument("--groups", type=int, default=11)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--bins", type=int, default=60)
+    p.add_argument("--dist-routes", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+    rng = random.Random(args.seed)
+
+    cases = [
+        ("analyze", analyze_payload(args.routes, rng), lambda d: rf.split_table(d, "routes")),
+        ("time-series", time_series_payload(args.groups, args.days, rng), rf.time_series_table),
+        ("distribution", distribution_payload(args.dist_routes, args.bins, rng),
+         lambda d: rf.split_table(d, "chains")),
+    ]
+    print("%-13s %-7s %10s %12s %8s" % ("payload", "format", "encode", "bytes", "speedup"))
+    print("-" * 55)
+    for name, payload, table in cases:
+        ref, t_ref = best_of(lambda: json.dumps({"data": payload}).encode(), args.repeat)
+        print("%-13s %-7s %9.1fms %12d %8s" % (name, "json", t_ref * 1e3, len(ref), "1.0x"))
+        if rf.orjson is not None:
+            out, t = best_of(lambda: rf.dumps({"data": payload}), args.repeat)
+            assert json.loads(out) == json.loads(ref), "orjson payload differs"
+            print("%-13s %-7s %9.1fms %12d %7.1fx" % (name, "orjson", t * 1e3, len(out), t_ref / t))
+        if rf.pa is not None:
+            out, t = best_of(lambda: rf.to_arrow(*table(payload)), args.repeat)
+            print("%-13s %-7s %9.1fms %12d %7.1fx" % (name, "arrow", t * 1e3, len(out), t_ref / t))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark RouteAnalyzer (one pass per query) vs RouteIndex (one build, N lookups).
+
+Generates seeded synthetic swap legs shaped like the ShortcutFinder raw-mode
+swap set (stable families routed directly or through volatile intermediaries,
+1-4 legs per tx, router splits and round trips), answers every ordered pair of
+stable tokens with both engines, asserts the results are identical, and
+reports build/query wall time and legs/sec.
+
+Usage:
+  python scratch/benchmark_route_index.py                     # 1M legs
+  python scratch/benchmark_route_index.py --legs 100000 1000000
+  python scratch/benchmark_route_index.py --pairs 6           # fewer queries
+"""
+import argparse
+import random
+import sys
+import time
+from itertools import permutations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+from route_analyzer import RouteAnalyzer, RouteIndex  # noqa: E402
+
+STABLES = ["USDC", "USDT", "DAI", "USDe", "EURC", "EURe"]
+VOLATILE = ["WETH", "WBTC", "cbBTC", "SOL"]
+FEES = ["0.01%", "0.05%", "0.3%", "1%", "Dynamic"]
+PROTOCOLS = ["Uniswap V3", "Uniswap V4", "Aerodrome"]
+NETWORKS = ["Ethereum", "Base", "Arbitrum"]
+
+
+def gen_swaps(n, seed):
+    rng = random.Random(seed)
+    swaps, tx = [], 0
+    while len(swaps) < n:
+        tx += 1
+        a, b = rng.sample(STABLES, 2)
+        hops = rng.choice(([a, b], [a, rng.choice(VOLATILE), b],
+                           [a, rng.choice(VOLATILE), rng.choice(VOLATILE), b]))
+        if rng.random() < 0.1:
+            hops = hops + [a]  # round trip back to the origin
+        usd = rng.lognormvariate(7.0, 1.5)
+        ts = 1700000000 + tx
+        for i, (t_in, t_out) in enumerate(zip(hops, hops[1:])):
+            flip = rng.random() < 0.5  # pool token order is independent of direction
+            amt_in, amt_out = usd, -usd * 0.997
+            swaps.append({
+                "tx_hash": "0x%x" % tx, "log_index": i,
+                "token0_symbol": t_out if flip else t_in,
+                "token1_symbol": t_in if flip else t_out,
+                "amount0": amt_out if flip else amt_in,
+                "amount1": amt_in if flip else amt_out,
+                "amountUSD": usd if rng.random() > 0.02 else 0.0,
+                "fee_tier": rng.choice(FEES), "protocol": rng.choice(PROTOCOLS),
+                "network": rng.choice(NETWORKS), "timestamp": ts,
+            })
+    return swaps[:n]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--legs", type=int, nargs="*", default=[1000000])
+    p.add_argument("--pairs", type=int, default=0,
+                   help="number of ordered stable pairs to query (default: all %d)"
+                        % len(list(permutations(STABLES, 2))))
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    pairs = list(permutations(STABLES, 2))
+    if args.pairs:
+        pairs = pairs[:args.pairs]
+    prices = {"WETH": 3000.0, "WBTC": 60000.0, "cbBTC": 60000.0, "SOL": 150.0}
+
+    print("%10s %6s | %10s | %10s %10s %10s | %8s | %12s" % (
+        "legs", "pairs", "analyzer", "build", "queries", "index", "speedup", "legs/sec"))
+    print("-" * 92)
+    for n in args.legs:
+        swaps = gen_swaps(n, args.seed)
+        ref, t_ref = timed(lambda: [RouteAnalyzer(prices=prices).analyze_routes(swaps, [a], [b])
+                                    for a, b in pairs])
+        index, t_build = timed(lambda: RouteIndex(swaps, prices=prices))
+        got, t_query = timed(lambda: [index.analyze([a], [b]) for a, b in pairs])
+        assert got == ref, "RouteIndex diverged from RouteAnalyzer"
+        t_index = t_build + t_query
+        print("%10d %6d | %9.2fs | %9.2fs %9.2fs %9.2fs | %7.1fx | %12.0f" % (
+            n, len(pairs), t_ref, t_build, t_query, t_index,
+            t_ref / t_index if t_index else 0.0, n / t_build if t_build else 0.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark PostgresFetcher.fetch_route_stats: the route_daily_stats join with
+UPPER(symbol) filters plus the route_hop path rebuild (baseline, loaded from
+git) vs the pair_daily_stats + route_path lookups.
+
+Read-only against the warehouse; needs create_pair_daily_stats.sql applied
+and route_path filled (backfill_route_tables.py --refresh-route-paths). For
+each token pair and window length both implementations run --repeat times;
+reports median/p95 ms, the number of routes, and whether the results match
+(route ids, sums, path_tokens, market size). With --explain it also prints the
+plan node types of the two new lookups, which should be Index Only Scans
+(run VACUUM ANALYZE on both tables first so the visibility map is set).
+
+Usage:
+  DATA_WAREHOUSE_DB=postgresql://... python scratch/benchmark_route_stats.py
+  python scratch/benchmark_route_stats.py --pairs USDC:WETH WBTC:USDC --days 30 90 365 --repeat 10 --explain
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api" / "routing"))
+sys.path.insert(0, str(ROOT / "chain-feeder"))
+
+import postgres_fetcher as current  # noqa: E402
+
+MODULE_PATH = "api/routing/postgres_fetcher.py"
+
+
+def load_baseline(rev):
+    src = subprocess.check_output(["git", "show", f"{rev}:{MODULE_PATH}"], cwd=ROOT, text=True)
+    mod = types.ModuleType("postgres_fetcher_baseline")
+    mod.__file__ = str(ROOT / MODULE_PATH)
+    exec(compile(src, f"{rev}:{MODULE_PATH}", "exec"), mod.__dict__)
+    return mod
+
+
+def make_fetcher(module):
+    fetcher = module.PostgresFetcher.__new__(module.PostgresFetcher)
+    fetcher._log = lambda *a, **k: None
+    return fetcher
+
+
+def timed(fn, repeat):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return out, times
+
+
+def same(a, b):
+    def key(res):
+        return sorted((r["route_id"], r["count"], r["swaps"], round(r["volume"], 2),
+                       tuple(r["path_tokens"]), round(r["market_size"], 6), r["hops"])
+                      for r in res["routes"])
+    return key(a) == key(b)
+
+
+class ExplainCursor:
+    """Runs EXPLAIN (ANALYZE) ahead of every query and keeps the plans."""
+
+    def __init__(self, cur):
+        self.cur, self.plans = cur, []
+
+    def execute(self, sql, params=None):
+        self.cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        self.plans.append(self.cur.fetchone()[0][0]["Plan"])
+        self.cur.execute(sql, params)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+def explain(start, end, start_dt, end_dt):
+    with current.get_conn() as conn:
+        cur = ExplainCursor(conn.cursor())
+        rows = current.PostgresFetcher._route_records_from_rollup(cur, start_dt, end_dt, [start], [end], None)
+        if rows:
+            current.PostgresFetcher._cached_route_paths(cur, [r["route_id"] for r in rows])
+
+    def nodes(plan):
+        yield plan
+        for child in plan.get("Plans", []):
+            yield from nodes(child)
+    for name, plan in zip(("pair_daily_stats", "route_path"), cur.plans):
+        scans = [f"{n['Node Type']}({n.get('Relation Name', '')}, heap fetches={n.get('Heap Fetches', '-')})"
+                 for n in nodes(plan) if "Scan" in n["Node Type"]]
+        print(f"  {name:17s} {', '.join(scans)}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--pairs", nargs="*", default=["USDC:WETH", "WETH:USDC", "WBTC:USDC"])
+    p.add_argument("--days", type=int, nargs="*", default=[7, 90, 365])
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--baseline-rev", default="627b997")
+    p.add_argument("--explain", action="store_true")
+    p.add_argument("--json", action="store_true", help="also print the raw timings as JSON")
+    args = p.parse_args()
+    if not os.getenv("DATA_WAREHOUSE_DB"):
+        p.error("DATA_WAREHOUSE_DB is required")
+
+    baseline, fast = make_fetcher(load_baseline(args.baseline_rev)), make_fetcher(current)
+    end_dt = datetime.now()
+    rows = []
+    print("%-12s %5s | %10s %10s | %10s %10s | %7s %6s %5s" % (
+        "pair", "days", "join p50", "join p95", "rollup p50", "rollup p95", "speedup", "routes", "same"))
+    print("-" * 96)
+    for pair in args.pairs:
+        start, end = pair.split(":")
+        for days in args.days:
+            start_dt = end_dt - timedelta(days=days)
+            old, t_old = timed(lambda: baseline.fetch_route_stats(start_dt, end_dt, [start], [end]), args.repeat)
+            new, t_new = timed(lambda: fast.fetch_route_stats(start_dt, end_dt, [start], [end]), args.repeat)
+            p50_old, p50_new = statistics.median(t_old), statistics.median(t_new)
+            p95_old = sorted(t_old)[int(0.95 * (len(t_old) - 1))]
+            p95_new = sorted(t_new)[int(0.95 * (len(t_new) - 1))]
+            print("%-12s %5d | %10.1f %10.1f | %10.1f %10.1f | %6.1fx %6d %5s" % (
+                pair, days, p50_old, p95_old, p50_new, p95_new, p50_old / p50_new if p50_new else 0,
+                len(new["routes"]), "yes" if same(old, new) else "NO"))
+            rows.append({"pair": pair, "days": days, "join_ms": t_old, "rollup_ms": t_new})
+            if args.explain:
+                explain(start, end, start_dt, end_dt)
+    if args.json:
+        print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
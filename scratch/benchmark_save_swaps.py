@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Benchmark PostgresStorage.save_swaps: per-batch connect + executemany
+(baseline) vs persistent connection + cached dimensions + COPY.
+
+Runs against a real database in a throwaway schema: the swap tables, the
+queue and ingestion_state are cloned (LIKE ... INCLUDING ALL) and the chain /
+protocol / coin / coin_contract / liquidity_pool dimensions copied in, so
+nothing in public is touched. The baseline module is loaded from git
+(--baseline-rev) and both implementations ingest the same synthetic pages of
+subgraph swaps over the tracked token contracts of --network. Reports
+swaps/sec. The schema is dropped at the end.
+
+Usage:
+  DATA_WAREHOUSE_DB=postgresql://... python scratch/benchmark_save_swaps.py
+  python scratch/benchmark_save_swaps.py --dsn postgresql://... --pages 20 --page-size 1000
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "chain-feeder" / "dags"))
+
+import psycopg2  # noqa: E402
+from psycopg2.extensions import make_dsn  # noqa: E402
+
+MODULE_PATH = "chain-feeder/dags/common/utils/uniswap_utils.py"
+SCHEMA = "bench_save_swaps"
+CLONED = ("swaps", "route_classification_queue", "ingestion_state")
+COPIED = ("chain", "protocol", "coin", "coin_contract", "liquidity_pool")
+
+
+def load_baseline(rev):
+    """The uniswap_utils module as of `rev`, imported under common.utils."""
+    src = subprocess.check_output(["git", "show", f"{rev}:{MODULE_PATH}"], cwd=ROOT, text=True)
+    mod = types.ModuleType("common.utils.uniswap_utils_baseline")
+    mod.__package__ = "common.utils"
+    exec(compile(src, f"{rev}:{MODULE_PATH}", "exec"), mod.__dict__)
+    return mod
+
+
+def setup_schema(dsn, raw_table):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        for t in COPIED:
+            cur.execute(f"CREATE TABLE {SCHEMA}.{t} (LIKE public.{t} INCLUDING ALL)")
+            cur.execute(f"INSERT INTO {SCHEMA}.{t} SELECT * FROM public.{t}")
+        for t in {raw_table, *CLONED}:
+            cur.execute(f"CREATE TABLE {SCHEMA}.{t} (LIKE public.{t} INCLUDING ALL)")
+
+
+def truncate_facts(dsn, raw_table):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute("TRUNCATE " + ", ".join(f"{SCHEMA}.{t}" for t in {raw_table, *CLONED}))
+
+
+def tracked_pools(dsn, network, protocol, limit):
+    """(token0, token1, fee_tier, pool address) for existing pools whose both
+    tokens are tracked on `network`."""
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT LOWER(c0.contract_address), LOWER(c1.contract_address), lp.fee_bps,
+                   COALESCE(lp.pool_address, lp.pool_id)
+            FROM liquidity_pool lp
+            JOIN chain ch ON ch.id = lp.chain_id
+            JOIN protocol p ON p.id = lp.protocol_id
+            JOIN coin_contract c0 ON c0.coin_id = lp.coin0_id AND c0.chain_id = lp.chain_id AND c0.tracked
+            JOIN coin_contract c1 ON c1.coin_id = lp.coin1_id AND c1.chain_id = lp.chain_id AND c1.tracked
+            WHERE LOWER(ch.name) = LOWER(%s) AND LOWER(p.name) = LOWER(%s)
+              AND COALESCE(lp.pool_address, lp.pool_id) IS NOT NULL
+            LIMIT %s
+        """, (network, protocol, limit))
+        return cur.fetchall()
+
+
+def gen_pages(pools, pages, page_size, seed):
+    rng = random.Random(seed)
+    ts = 1735689600
+    n = 0
+    out = []
+    for _ in range(pages):
+        page = []
+        for _ in range(page_size):
+            t0, t1, fbps, addr = rng.choice(pools)
+            tx = "0x%064x" % (n // 2)
+            a0 = rng.uniform(-5000.0, 5000.0)
+            page.append({"id": f"{tx}#{n % 2}", "tx_hash": tx, "timestamp": ts + n // 4,
+                         "token0_address": t0, "token1_address": t1,
+                         "fee_tier": f"{(fbps or 0) / 100:g}%", "pool": {"id": addr},
+                         "amount0": a0, "amount1": -a0 * rng.uniform(0.99, 1.01),
+                         "amountUSD": abs(a0)})
+            n += 1
+        out.append(page)
+    return out
+
+
+def run(storage, pages, network, protocol):
+    t0 = time.perf_counter()
+    for page in pages:
+        storage.save_swaps(page, network=network, protocol=protocol)
+    return time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--dsn", default=os.getenv("DATA_WAREHOUSE_DB"))
+    p.add_argument("--network", default="Ethereum")
+    p.add_argument("--protocol", default="Uniswap V3")
+    p.add_argument("--pages", type=int, default=10)
+    p.add_argument("--page-size", type=int, default=1000)
+    p.add_argument("--pools", type=int, default=200)
+    p.add_argument("--baseline-rev", default="4bba999")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+    if not args.dsn:
+        p.error("pass --dsn or set DATA_WAREHOUSE_DB")
+
+    bench_dsn = make_dsn(args.dsn, options=f"-c search_path={SCHEMA}")
+    os.environ["DATA_WAREHOUSE_DB"] = bench_dsn
+    from common.utils import uniswap_utils as current  # noqa: E402  (reads the env above)
+    baseline = load_baseline(args.baseline_rev)
+
+    setup_schema(args.dsn, current.SWAP_RAW_TABLE)
+    try:
+        pools = tracked_pools(bench_dsn, args.network, args.protocol, args.pools)
+        if not pools:
+            sys.exit(f"no tracked {args.protocol} pools on {args.network}")
+        pages = gen_pages(pools, args.pages, args.page_size, args.seed)
+        total = args.pages * args.page_size
+
+        truncate_facts(args.dsn, current.SWAP_RAW_TABLE)
+        t_ref = run(baseline.PostgresStorage(), pages, args.network, args.protocol)
+        truncate_facts(args.dsn, current.SWAP_RAW_TABLE)
+        with current.PostgresStorage(bench_dsn) as storage:
+            t_got = run(storage, pages, args.network, args.protocol)
+
+        print("%8s | %12s %12s %8s" % ("swaps", "baseline/s", "batched/s", "speedup"))
+        print("-" * 46)
+        print("%8d | %12.0f %12.0f %7.1fx" % (total, total / t_ref, total / t_got, t_ref / t_got))
+    finally:
+        with psycopg2.connect(args.dsn) as conn, conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
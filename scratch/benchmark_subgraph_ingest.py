@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Load-test swap ingestion against the local subgraph stub: the serial
+timestamp-cursor loop (baseline, loaded from git) vs SubgraphSwapEngine.
+
+Starts chain-feeder/tests/subgraph_stub.py in-process with a per-request
+latency that stands in for the gateway round trip, points both fetchers at
+it and fetches the whole window. Reports wall time, swaps/sec, requests
+sent, and how many tracked swaps each run missed or delivered twice (the
+baseline skips the tail of seconds that hold more than a page of swaps).
+
+Usage:
+  python scratch/benchmark_subgraph_ingest.py
+  python scratch/benchmark_subgraph_ingest.py --swaps 200000 --latency-ms 200 --concurrency 8 16
+"""
+import argparse
+import subprocess
+import sys
+import time
+import types
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT / "chain-feeder", ROOT / "chain-feeder" / "dags", ROOT / "chain-feeder" / "tests"):
+    sys.path.insert(0, str(p))
+
+from subgraph_stub import TRACKED, SwapStubData, serve  # noqa: E402
+from common.utils import uniswap_utils as current  # noqa: E402
+from common.utils.subgraph_ingest import SubgraphSwapEngine  # noqa: E402
+
+MODULE_PATH = "chain-feeder/dags/common/utils/uniswap_utils.py"
+
+
+def load_baseline(rev):
+    src = subprocess.check_output(["git", "show", f"{rev}:{MODULE_PATH}"], cwd=ROOT, text=True)
+    mod = types.ModuleType("common.utils.uniswap_utils_baseline")
+    mod.__package__ = "common.utils"
+    exec(compile(src, f"{rev}:{MODULE_PATH}", "exec"), mod.__dict__)
+    return mod
+
+
+def make_fetcher(cls, url):
+    fetcher = cls(network="Ethereum", protocol="Uniswap V3")
+    fetcher.token_addresses = {sym: addr for sym, (addr, _) in TRACKED.items()}
+    fetcher.subgraph_url = url
+    return fetcher
+
+
+def timed_fetch(data, fetch):
+    ids = []
+    before = data.requests
+    t0 = time.perf_counter()
+    fetch(lambda batch: ids.extend(s["id"] for s in batch))
+    return ids, time.perf_counter() - t0, data.requests - before
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--swaps", type=int, default=50000)
+    p.add_argument("--span-secs", type=int, default=7 * 86400)
+    p.add_argument("--hot-seconds", type=int, default=3)
+    p.add_argument("--hot-size", type=int, default=2500)
+    p.add_argument("--latency-ms", type=float, default=100.0)
+    p.add_argument("--concurrency", type=int, nargs="*", default=[4, 8])
+    p.add_argument("--shard-hours", type=float, default=6.0)
+    p.add_argument("--baseline-rev", default="40c4f47")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    start_ts = 1735689600
+    data = SwapStubData(args.swaps, start_ts, args.span_secs, args.hot_seconds, args.hot_size, args.seed)
+    server, url = serve(data, latency_ms=args.latency_ms)
+    expected = data.tracked_ids()
+    start = datetime.fromtimestamp(start_ts, timezone.utc)
+    end = datetime.fromtimestamp(start_ts + args.span_secs, timezone.utc)
+    print(f"stub: {len(data.rows)} swaps, {len(expected)} tracked, {args.latency_ms:g} ms/request\n")
+
+    runs = []
+    baseline = make_fetcher(load_baseline(args.baseline_rev).UniswapV3Fetcher, url)
+    runs.append(("serial (baseline)",) + timed_fetch(
+        data, lambda cb: baseline.fetch_swaps(start, end, on_batch_callback=cb, collect_results=False)))
+    for c in args.concurrency:
+        fetcher = make_fetcher(current.UniswapV3Fetcher, url)
+        engine = SubgraphSwapEngine(fetcher, concurrency=c, max_rps=0,
+                                    shard_secs=int(args.shard_hours * 3600))
+        runs.append((f"engine x{c}",) + timed_fetch(
+            data, lambda cb: engine.run(int(start.timestamp()), int(end.timestamp()),
+                                        list(fetcher.token_addresses.values()), cb, False)))
+    server.shutdown()
+
+    print("%-18s | %8s %10s %9s %8s %8s" % ("run", "wall", "swaps/s", "requests", "missed", "dupes"))
+    print("-" * 70)
+    for name, ids, wall, requests in runs:
+        counts = Counter(ids)
+        missed = len(expected - counts.keys())
+        dupes = sum(n - 1 for n in counts.values())
+        print("%-18s | %7.1fs %10.0f %9d %8d %8d" % (name, wall, len(counts) / wall, requests, missed, dupes))
+
+
+if __name__ == "__main__":
+    main()
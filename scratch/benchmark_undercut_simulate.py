@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark undercut_analyzer.simulate (reference) vs simulate_columnar.
+
+Generates seeded synthetic demand shaped like the /api/routes/undercut event
+stream (both directions, several competitor fee tiers, observed outputs net of
+the competitor's fee), runs both engines on the same input,
+asserts the results are identical, and reports wall time and events/sec.
+
+Usage:
+  python scratch/benchmark_undercut_simulate.py                  # 200k legs
+  python scratch/benchmark_undercut_simulate.py --legs 50000 100000 200000
+  python scratch/benchmark_undercut_simulate.py --sweep 20        # reuse columns
+"""
+import argparse
+import random
+import sys
+import time
+from fractions import Fraction
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api" / "routing"))
+import undercut_analyzer as ua  # noqa: E402
+
+
+def gen_swaps(n, seed):
+    rng = random.Random(seed)
+    fwd, rev = [], []
+    for i in range(n):
+        usd = rng.lognormvariate(7.0, 1.5)
+        fb = rng.choice((1, 5, 30, 100))
+        # Observed output: the competitor's fee plus a little slippage, so only
+        # part of the demand is competitive for the hypothetical pool.
+        out = usd * (1 - fb / 10000.0) * rng.uniform(0.9995, 1.0)
+        sw = {"ts": i, "input": usd, "output": out,
+              "usd": usd, "fee_bps": fb, "cid": fb, "protocol": "Uniswap V3",
+              "pool_address": "0xPOOL%d" % fb}
+        (fwd if rng.random() < 0.55 else rev).append(sw)
+    return fwd, rev
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--legs", type=int, nargs="*", default=[200000])
+    p.add_argument("--liquidity", type=float, default=2000000.0)
+    p.add_argument("--range-pct", type=float, default=1.0)
+    p.add_argument("--fee-bps", type=float, default=5.0)
+    p.add_argument("--sweep", type=int, default=0,
+                   help="also time N pools over one shared event_columns()")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    fee_pips = int(round(args.fee_bps * 100))
+    cap = args.liquidity / 2.0
+    print("%10s | %10s %10s %8s | %12s" % ("legs", "reference", "columnar", "speedup", "events/sec"))
+    print("-" * 62)
+    for n in args.legs:
+        fwd, rev = gen_swaps(n, args.seed)
+        total = sum(s["usd"] for s in fwd)
+        sim_args = (cap, args.range_pct, fee_pips)
+        tail = (Fraction(1, 1), 1.0, 1.0, total)
+        ref, t_ref = timed(lambda: ua.simulate(*sim_args, fwd, *tail, reverse_swaps=rev))
+        fast, t_fast = timed(lambda: ua.simulate_columnar(*sim_args, fwd, *tail, reverse_swaps=rev))
+        assert fast == ref, "simulate_columnar diverged from simulate"
+        print("%10d | %9.2fs %9.2fs %7.1fx | %12.0f" % (
+            n, t_ref, t_fast, t_ref / t_fast if t_fast else 0.0, n / t_fast if t_fast else 0.0))
+
+        if args.sweep:
+            cols, t_cols = timed(lambda: ua.event_columns(fwd, rev))
+            caps = [cap * (1 + i) for i in range(args.sweep)]
+            _, t_grid = timed(lambda: [ua.simulate_columnar(c, args.range_pct, fee_pips, None, *tail,
+                                                            columns=cols) for c in caps])
+            print("%10s   sweep of %d pools: columns %.2fs + %.2fs simulate (%.2fs/pool)" % (
+                "", args.sweep, t_cols, t_grid, t_grid / args.sweep))
+
+
+if __name__ == "__main__":
+    main()
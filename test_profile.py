@@ -1,14 +1,14 @@
 import asyncio
 from datetime import datetime, timedelta
-from api.main import resolve_token_input
+from api.main import aresolve_token_input
 from chain_feeder.routing.postgres_fetcher import PostgresFetcher
 from chain_feeder.routing.route_analyzer import RouteAnalyzer
 import time
 
 start_token = "USDT"
 end_token = "USDC"
-start_tokens_list = resolve_token_input(start_token)
-end_tokens_list = resolve_token_input(end_token)
+start_tokens_list = asyncio.run(aresolve_token_input(start_token))
+end_tokens_list = asyncio.run(aresolve_token_input(end_token))
 token_filter = start_tokens_list + end_tokens_list
 
 end_dt = datetime(2026, 7, 2, 0, 0, 0)